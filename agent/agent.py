@@ -9,7 +9,7 @@ from typing import List, Dict, Any, Optional, TypedDict
 
 from pydantic_ai import Agent
 from pydantic_ai.tools import Tool
-from supabase import create_client, SupabaseException
+from supabase import SupabaseException
 
 from dotenv import load_dotenv
 from pathlib import Path
@@ -17,6 +17,8 @@ from pathlib import Path
 # Add parent directory to path to allow relative imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from agent.answer_cache import AnswerCache
+from database.client_registry import get_client
 from agent.tools import (
     KnowledgeBaseSearch,
     KnowledgeBaseSearchParams,
@@ -33,17 +35,12 @@ load_dotenv(dotenv_path, override=True)
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")  # angepasst an .env
 
-# Lazy-init placeholder
-global_supabase = None
-
 
 def get_supabase_client():
-    global global_supabase
-    if global_supabase is None:
-        if not SUPABASE_URL or not SUPABASE_KEY:
-            raise SupabaseException("SUPABASE_URL und SUPABASE_KEY müssen gesetzt sein")
-        global_supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-    return global_supabase
+    """Shared client from ``database.client_registry`` (created on first use)."""
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        raise SupabaseException("SUPABASE_URL und SUPABASE_KEY müssen gesetzt sein")
+    return get_client(SUPABASE_URL, SUPABASE_KEY)
 
 
 class AgentDeps(TypedDict, total=False):
@@ -56,6 +53,7 @@ class RAGAgent:
         model: Optional[str] = None,
         api_key: Optional[str] = None,
         kb_search: Optional[KnowledgeBaseSearch] = None,
+        answer_cache: Optional[AnswerCache] = None,
     ):
         self.model = model or os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
@@ -66,6 +64,10 @@ class RAGAgent:
             )
 
         self.kb_search = kb_search or KnowledgeBaseSearch(owner_agent=self)
+        self.last_match: List[Dict[str, Any]] = []
+        if answer_cache is None and int(os.getenv("ANSWER_CACHE_SIZE", "512")):
+            answer_cache = AnswerCache()
+        self.answer_cache = answer_cache
         self.search_tool = Tool(self.kb_search.search)
 
         self.agent = Agent(
@@ -74,12 +76,86 @@ class RAGAgent:
             tools=[self.search_tool],
         )
 
+    async def lookup_answer(self, question: str, use_cache: bool = True) -> Dict:
+        """
+        Look up a cached answer to a similar question.
+
+        Args:
+            question: The user's question
+            use_cache: False bypasses the cache (the answer is still stored)
+
+        Returns:
+            ``{"question", "embedding", "version", "answer"}``; ``answer`` is the
+            cache hit or None. Pass it to ``remember_answer`` after a miss.
+        """
+        lookup = {
+            "question": question,
+            "embedding": None,
+            "version": None,
+            "answer": None,
+        }
+        if self.answer_cache is None:
+            return lookup
+        try:
+            version = await self.kb_search.corpus_version()
+            embedding = (
+                await self.kb_search.embed(question) if version is not None else None
+            )
+        except Exception as e:
+            # Reason: a broken cache must never block an answer
+            print(f"⚠️ Antwort-Cache nicht verfügbar: {e}")
+            version, embedding = None, None
+        if not isinstance(version, int) or not embedding:
+            self.answer_cache.record("bypass")
+            return lookup
+        lookup.update(version=version, embedding=embedding)
+        if not use_cache:
+            self.answer_cache.record("bypass")
+            return lookup
+        lookup["answer"] = self.answer_cache.lookup(embedding, version)
+        if lookup["answer"] is not None:
+            print(
+                "⚡ Antwort aus dem Cache "
+                f"(Ähnlichkeit {lookup['answer']['similarity']:.3f})"
+            )
+        return lookup
+
+    def remember_answer(
+        self, lookup: Dict, answer: Any, citations: List[Dict[str, Any]]
+    ) -> None:
+        """Cache the final answer of a ``lookup_answer`` miss."""
+        if self.answer_cache is None or lookup["embedding"] is None:
+            return
+        if isinstance(answer, str):
+            self.answer_cache.put(
+                lookup["question"],
+                lookup["embedding"],
+                lookup["version"],
+                answer,
+                citations,
+            )
+
     async def query(
-        self, question: str, max_results: int = 5, source_filter: Optional[str] = None
+        self,
+        question: str,
+        max_results: int = 5,
+        source_filter: Optional[str] = None,
+        use_cache: bool = True,
     ) -> Dict[str, Any]:
         print("\n=== [Agent.query] ===")
         print("Frage:", question)
 
+        lookup = await self.lookup_answer(question, use_cache)
+        cached = lookup["answer"]
+        if cached is not None:
+            self.last_match = cached["citations"]
+            return {
+                "response": cached["answer"],
+                "kb_results": cached["citations"],
+                "cached": True,
+            }
+
+        self.last_match = []
         deps = AgentDeps(kb_search=self.kb_search)
         result = await self.agent.run(question, deps=deps)
         response = result.output
@@ -95,7 +171,8 @@ class RAGAgent:
             snippet = res.get("content", "").replace("\n", " ")[:100]
             print(f"[{i+1}] Score: {sim:.3f} | {snippet}...")
 
-        return {"response": response, "kb_results": kb_results}
+        self.remember_answer(lookup, response, self.last_match)
+        return {"response": response, "kb_results": kb_results, "cached": False}
 
     async def get_available_sources(self) -> List[str]:
         return await self.kb_search.get_available_sources()
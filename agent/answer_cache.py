@@ -0,0 +1,169 @@
+"""
+Semantic cache of final agent answers.
+
+Service staff ask variations of the same questions; every one of them costs
+a full LLM tool-calling loop. ``AnswerCache`` keeps the final answer and its
+citations (the retrieved chunks) together with the embedding of the question.
+A new question whose embedding is at least ANSWER_CACHE_THRESHOLD cosine
+similar to a cached one gets that answer, replayed as a stream, as long as
+the corpus version (see ``database.corpus_version``) has not moved.
+"""
+
+import os
+import re
+import sys
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import numpy as np
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.retrieval_cache import normalize_query
+from utils.metrics import registry as metrics
+
+# Characters per streamed piece when a cached answer is replayed
+REPLAY_CHARS = 24
+
+# Histogram buckets of the similarity of hits (the threshold is near 1)
+SIMILARITY_BUCKETS = (0.9, 0.92, 0.94, 0.95, 0.96, 0.97, 0.98, 0.99, 1.0)
+
+
+def _unit(embedding: List[float]) -> Optional[np.ndarray]:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    if not norm:
+        return None
+    return vector / norm
+
+
+class AnswerCache:
+    """
+    LRU + TTL cache of answers, looked up by question similarity.
+
+    Args:
+        size: Cached answers (ANSWER_CACHE_SIZE, 512)
+        ttl: Seconds an answer stays valid (ANSWER_CACHE_TTL, 86400)
+        threshold: Minimum cosine similarity of a hit (ANSWER_CACHE_THRESHOLD, 0.95)
+    """
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        ttl: Optional[float] = None,
+        threshold: Optional[float] = None,
+    ):
+        self.size = size or int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+        self.ttl = ttl or float(os.getenv("ANSWER_CACHE_TTL", "86400"))
+        if threshold is None:
+            threshold = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+        self.threshold = threshold
+        self.version: Optional[int] = None
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.counts = {"hit": 0, "miss": 0, "bypass": 0}
+        self.lock = threading.Lock()
+
+    def record(self, result: str) -> None:
+        """Count a lookup result: ``hit``, ``miss`` or ``bypass``."""
+        with self.lock:
+            self.counts[result] += 1
+        metrics.inc("rag_answer_cache_total", result=result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Lookup counts, hit rate (of non-bypassed lookups) and size."""
+        with self.lock:
+            counts = dict(self.counts)
+            size = len(self.entries)
+        lookups = counts["hit"] + counts["miss"]
+        return {
+            **counts,
+            "hit_rate": counts["hit"] / lookups if lookups else 0.0,
+            "size": size,
+        }
+
+    def _check_version(self, version: int) -> None:
+        # Reason: answers cite chunks that may be gone or outdated
+        if version != self.version:
+            self.entries.clear()
+            self.version = version
+
+    def lookup(self, embedding: List[float], version: int) -> Optional[Dict[str, Any]]:
+        """
+        Most similar cached answer for corpus ``version``.
+
+        Returns:
+            ``{"question", "answer", "citations", "similarity"}`` if the best
+            match reaches the threshold, else None
+        """
+        query = _unit(embedding)
+        with self.lock:
+            self._check_version(version)
+            now = time.monotonic()
+            for key in [
+                k for k, e in self.entries.items() if now - e["stored_at"] > self.ttl
+            ]:
+                del self.entries[key]
+            entry, similarity = None, -1.0
+            if query is not None and self.entries:
+                keys = list(self.entries)
+                scores = np.stack([self.entries[k]["vector"] for k in keys]) @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    entry, similarity = self.entries[keys[best]], float(scores[best])
+                    self.entries.move_to_end(keys[best])
+        self.record("miss" if entry is None else "hit")
+        if entry is None:
+            return None
+        metrics.observe(
+            "rag_answer_cache_similarity", similarity, buckets=SIMILARITY_BUCKETS
+        )
+        return {
+            "question": entry["question"],
+            "answer": entry["answer"],
+            "citations": entry["citations"],
+            "similarity": similarity,
+        }
+
+    def put(
+        self,
+        question: str,
+        embedding: List[float],
+        version: int,
+        answer: str,
+        citations: List[Dict[str, Any]],
+    ) -> None:
+        """Cache the final ``answer`` to ``question`` for corpus ``version``."""
+        vector = _unit(embedding)
+        if vector is None or not answer.strip():
+            return
+        key = normalize_query(question)
+        with self.lock:
+            self._check_version(version)
+            self.entries[key] = {
+                "question": question,
+                "vector": vector,
+                "answer": answer,
+                "citations": [dict(row) for row in citations],
+                "stored_at": time.monotonic(),
+            }
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+
+async def replay(answer: str, chunk_chars: int = REPLAY_CHARS) -> AsyncIterator[str]:
+    """Yield a cached answer in word-aligned pieces, like a model stream."""
+    piece = ""
+    for word in re.findall(r"\s*\S+\s*|\s+", answer):
+        piece += word
+        if len(piece) >= chunk_chars:
+            yield piece
+            piece = ""
+            # Reason: let the UI render between pieces
+            await asyncio.sleep(0)
+    if piece:
+        yield piece
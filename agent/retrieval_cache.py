@@ -0,0 +1,152 @@
+"""
+Cache of retrieval results for repeated questions.
+
+Entries are keyed by the normalized question, the filter, the number of
+results and the retrieval mode, and hold only chunk ids and scores. The chunk
+rows are kept once per id in a separate LRU, since different questions often
+hit the same chunks. Every entry remembers the corpus version it was built
+for (see ``database.corpus_version``); a newer version invalidates the whole
+cache, so uploads and deletions are picked up on the next question.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.corpus_version import CorpusVersion
+
+# Result fields that depend on the question; everything else is chunk data
+SCORE_FIELDS = ("similarity", "keyword_rank", "rrf_score", "rerank_score")
+
+
+def normalize_query(query: str) -> str:
+    """Case, whitespace and trailing punctuation do not change the retrieval."""
+    text = unicodedata.normalize("NFKC", query or "").casefold()
+    return " ".join(text.split()).strip(" ?!.")
+
+
+class RetrievalCache:
+    """
+    LRU + TTL cache of retrieval results bound to a corpus version.
+
+    Args:
+        size: Cached questions (RETRIEVAL_CACHE_SIZE, 256)
+        ttl: Seconds an entry stays valid (RETRIEVAL_CACHE_TTL, 600)
+        chunk_size: Cached chunk rows (RETRIEVAL_CACHE_CHUNKS, 4096)
+        corpus_version: Shared ``CorpusVersion`` (a new one by default)
+    """
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        ttl: Optional[float] = None,
+        chunk_size: Optional[int] = None,
+        corpus_version: Optional[CorpusVersion] = None,
+    ):
+        self.size = size or int(os.getenv("RETRIEVAL_CACHE_SIZE", "256"))
+        self.ttl = ttl or float(os.getenv("RETRIEVAL_CACHE_TTL", "600"))
+        self.chunk_size = chunk_size or int(os.getenv("RETRIEVAL_CACHE_CHUNKS", "4096"))
+        self.corpus_version = corpus_version or CorpusVersion()
+        self.version: Optional[int] = None
+        self.entries: "OrderedDict[Tuple, Tuple[float, List[Dict]]]" = OrderedDict()
+        self.chunks: "OrderedDict[Any, Dict[str, Any]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(
+        query: str,
+        filter_metadata: Optional[Dict[str, Any]],
+        max_results: int,
+        mode: str,
+    ) -> Tuple:
+        return (
+            normalize_query(query),
+            json.dumps(filter_metadata or {}, sort_keys=True),
+            max_results,
+            mode,
+        )
+
+    def _check_version(self, version: int) -> None:
+        # Reason: chunks of an older corpus may be deleted or re-embedded
+        if version != self.version:
+            self.entries.clear()
+            self.chunks.clear()
+            self.version = version
+
+    def get(self, key: Tuple, version: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Cached ids and scores of ``key`` for corpus ``version``.
+
+        Returns:
+            Score rows (``id`` plus score fields) or None on a miss
+        """
+        with self.lock:
+            self._check_version(version)
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            stored_at, scores = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return scores
+
+    def resolve(
+        self, scores: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[Any]]:
+        """
+        Join cached score rows with the cached chunk rows.
+
+        Returns:
+            ``(results, missing_ids)``; results are complete only if no id is
+            missing
+        """
+        results, missing = [], []
+        with self.lock:
+            for score in scores:
+                chunk = self.chunks.get(score["id"])
+                if chunk is None:
+                    missing.append(score["id"])
+                    continue
+                self.chunks.move_to_end(score["id"])
+                results.append({**chunk, **score})
+        return results, missing
+
+    def add_chunks(self, rows: List[Dict[str, Any]]) -> None:
+        """Cache chunk rows (score fields are dropped)."""
+        with self.lock:
+            for row in rows:
+                if row.get("id") is None:
+                    continue
+                self.chunks[row["id"]] = {
+                    k: v for k, v in row.items() if k not in SCORE_FIELDS
+                }
+                self.chunks.move_to_end(row["id"])
+            while len(self.chunks) > self.chunk_size:
+                self.chunks.popitem(last=False)
+
+    def put(self, key: Tuple, version: int, results: List[Dict[str, Any]]) -> None:
+        """Cache the results of one retrieval for corpus ``version``."""
+        if any(row.get("id") is None for row in results):
+            return
+        scores = [
+            {"id": row["id"], **{f: row[f] for f in SCORE_FIELDS if f in row}}
+            for row in results
+        ]
+        with self.lock:
+            self._check_version(version)
+        self.add_chunks(results)
+        with self.lock:
+            self.entries[key] = (time.monotonic(), scores)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
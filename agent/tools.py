@@ -4,15 +4,37 @@ Knowledge base search tool for the RAG AI agent.
 
 import os
 import sys
-from typing import Dict, List, Any, Optional
+import time
+import asyncio
+import contextvars
+from typing import Callable, Dict, List, Any, Optional
 from pydantic import BaseModel, Field
 
 # Add parent directory to path to allow relative imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database.setup import SupabaseClient
+from agent.retrieval_cache import RetrievalCache
+from database.async_client import default_client
+from database.corpus_version import CorpusVersion
 from document_processing.embeddings import EmbeddingGenerator
 from document_processing.reranker import CrossEncoderReranker
+from utils.metrics import registry as metrics
+
+# "hybrid": one RPC fusing vector and keyword search server-side (after the
+# embedding); "fanout": keyword search runs concurrently with the embedding,
+# vector search starts once it is ready, results are fused here; "lean": like
+# fanout, but both searches return ids and scores only and the content of the
+# winners is fetched in one batched query afterwards
+RETRIEVAL_MODES = ("hybrid", "fanout", "lean")
+
+# Bounds of the adaptive vector candidate count in lean mode
+LEAN_MIN_CANDIDATES = 20
+LEAN_MAX_CANDIDATES = 400
+
+# Stages that failed during the current search; degraded results are not cached
+_failed_stages: contextvars.ContextVar[Optional[List[str]]] = contextvars.ContextVar(
+    "failed_stages", default=None
+)
 
 
 class KnowledgeBaseSearchParams(BaseModel):
@@ -48,6 +70,57 @@ class KnowledgeBaseSearchResult(BaseModel):
     )
 
 
+def reciprocal_rank_fusion(
+    rankings: List[List[Dict[str, Any]]], limit: int, k: int = 60
+) -> List[Dict[str, Any]]:
+    """
+    Merge ranked result lists by chunk ``id`` with reciprocal rank fusion.
+
+    Args:
+        rankings: Result lists, each ordered best first
+        limit: Number of results to return
+        k: RRF constant (same default as ``hybrid_search_rag_pages``)
+
+    Returns:
+        Unique results ordered by ``rrf_score``; scores of all lists are kept
+    """
+    merged: Dict[Any, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, start=1):
+            key = row.get("id", (row.get("url"), row.get("chunk_number")))
+            entry = merged.setdefault(key, {**row, "rrf_score": 0.0})
+            entry.update({f: v for f, v in row.items() if f not in entry})
+            entry["rrf_score"] += 1.0 / (k + rank)
+    return sorted(merged.values(), key=lambda r: -r["rrf_score"])[:limit]
+
+
+def adaptive_cut(
+    fused: List[Dict[str, Any]], max_results: int, margin: float, keep: int = 3
+) -> List[Dict[str, Any]]:
+    """
+    Drop fused candidates that score far below the best vector hit.
+
+    Args:
+        fused: RRF-ordered candidates with ``similarity``/``keyword_rank``
+        max_results: Upper bound of returned candidates
+        margin: Allowed similarity gap to the best candidate
+        keep: Minimum number of candidates kept regardless of score
+
+    Returns:
+        Candidates within ``margin`` of the top similarity or with a keyword
+        match, in fused order
+    """
+    fused = fused[:max_results]
+    top = max((row.get("similarity") or 0.0 for row in fused), default=0.0)
+    return [
+        row
+        for i, row in enumerate(fused)
+        if i < keep
+        or (row.get("similarity") or 0.0) >= top - margin
+        or (row.get("keyword_rank") or 0.0) > 0
+    ]
+
+
 class KnowledgeBaseSearch:
     """
     Tool for searching the knowledge base using vector similarity.
@@ -55,24 +128,257 @@ class KnowledgeBaseSearch:
 
     def __init__(
         self,
-        supabase_client: Optional[SupabaseClient] = None,
+        supabase_client: Optional[Any] = None,
         embedding_generator: Optional[EmbeddingGenerator] = None,
         owner_agent: Optional[
             Any
         ] = None,  # Referenz zum Agenten, um Treffer dort abzulegen
+        retrieval_cache: Optional[RetrievalCache] = None,
     ):
         """
         Initialize the knowledge base search tool.
 
         Args:
-            supabase_client: SupabaseClient instance for database operations
+            supabase_client: ``AsyncSupabaseClient`` (default) or
+                ``SupabaseClient`` instance for database operations
             embedding_generator: EmbeddingGenerator instance for creating embeddings
             owner_agent: Optional reference to the RAGAgent to store last_match results
+            retrieval_cache: Cache of repeated questions; by default one is
+                created unless RETRIEVAL_CACHE_SIZE is 0
         """
-        self.supabase_client = supabase_client or SupabaseClient()
+        self.supabase_client = supabase_client or default_client()
         self.embedding_generator = embedding_generator or EmbeddingGenerator()
         self.owner_agent = owner_agent
         self.reranker = CrossEncoderReranker()
+        self.mode = os.getenv("RETRIEVAL_MODE", "hybrid")
+        if self.mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown RETRIEVAL_MODE: {self.mode}")
+        # Seconds per retrieval stage; a stage that times out is skipped
+        self.stage_timeouts = {
+            "embed": float(os.getenv("RETRIEVAL_EMBED_TIMEOUT", "10")),
+            "vector": float(os.getenv("RETRIEVAL_VECTOR_TIMEOUT", "10")),
+            "keyword": float(os.getenv("RETRIEVAL_KEYWORD_TIMEOUT", "5")),
+            "fetch": float(os.getenv("RETRIEVAL_FETCH_TIMEOUT", "5")),
+            "version": float(os.getenv("RETRIEVAL_VERSION_TIMEOUT", "2")),
+        }
+        self.score_margin = float(os.getenv("RETRIEVAL_SCORE_MARGIN", "0.2"))
+        if retrieval_cache is None and int(os.getenv("RETRIEVAL_CACHE_SIZE", "256")):
+            retrieval_cache = RetrievalCache()
+        self.cache = retrieval_cache
+        self.version_tracker = (
+            retrieval_cache.corpus_version if retrieval_cache else CorpusVersion()
+        )
+
+    @staticmethod
+    async def _call(func: Callable, *args, **kwargs) -> Any:
+        """
+        Await ``func`` if it is a coroutine function, else run it in a thread.
+
+        Reason: the embedding client and the sync ``SupabaseClient`` block;
+        calling them directly inside this coroutine would block the event loop.
+        """
+        if asyncio.iscoroutinefunction(func):
+            return await func(*args, **kwargs)
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    async def _run_stage(self, stage: str, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run one retrieval call with its own timeout.
+
+        Returns:
+            The call's result, or None if it timed out or failed
+        """
+        timeout_key = "vector" if stage == "hybrid" else stage
+        start = time.perf_counter()
+        try:
+            return await asyncio.wait_for(
+                self._call(func, *args, **kwargs),
+                self.stage_timeouts.get(timeout_key),
+            )
+        except asyncio.TimeoutError:
+            # A thread call finishes in the background; its result is dropped
+            print(f"⏱️ Retrieval-Stufe '{stage}' hat das Zeitlimit überschritten")
+            metrics.inc("rag_retrieval_timeouts_total", stage=stage)
+            self._stage_failed(stage)
+        except Exception as e:
+            print(f"❌ Fehler in Retrieval-Stufe '{stage}': {e}")
+            metrics.inc("rag_retrieval_errors_total", stage=stage)
+            self._stage_failed(stage)
+        finally:
+            metrics.observe(
+                "rag_retrieval_stage_seconds", time.perf_counter() - start, stage=stage
+            )
+        return None
+
+    @staticmethod
+    def _stage_failed(stage: str) -> None:
+        failed = _failed_stages.get()
+        if failed is not None:
+            failed.append(stage)
+
+    async def embed(self, text: str) -> Optional[List[float]]:
+        """Embedding of ``text`` within the embed timeout (None on failure)."""
+        return await self._run_stage("embed", self.embedding_generator.embed_text, text)
+
+    async def corpus_version(self) -> Optional[int]:
+        """Corpus version for the caches, read at most every few seconds."""
+        tracker = self.version_tracker
+        version = tracker.cached()
+        if version is None:
+            version = await self._run_stage(
+                "version", self.supabase_client.get_corpus_version
+            )
+            # Reason: without a valid version nothing can be cached safely
+            tracker.update(version if isinstance(version, int) else None)
+        return tracker.version
+
+    async def _cached_results(
+        self, key: Any, version: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Results of an identical earlier question, or None."""
+        scores = self.cache.get(key, version)
+        if scores is None:
+            return None
+        results, missing = self.cache.resolve(scores)
+        if missing:
+            rows = await self._run_stage(
+                "fetch", self.supabase_client.fetch_chunks, missing
+            )
+            self.cache.add_chunks(rows or [])
+            results, missing = self.cache.resolve(scores)
+        return None if missing else results
+
+    async def _fanout_search(
+        self,
+        query: str,
+        max_results: int,
+        candidate_count: int,
+        filter_metadata: Optional[Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        """Keyword search concurrently with embedding, then vector search."""
+        keyword_task = asyncio.create_task(
+            self._run_stage(
+                "keyword",
+                self.supabase_client.keyword_search_documents,
+                query,
+                match_count=candidate_count,
+                filter_metadata=filter_metadata,
+            )
+        )
+        vector_results = []
+        query_embedding = await self._run_stage(
+            "embed", self.embedding_generator.embed_text, query
+        )
+        if query_embedding is not None:
+            vector_results = await self._run_stage(
+                "vector",
+                self.supabase_client.search_documents,
+                query_embedding=query_embedding,
+                match_count=candidate_count,
+                filter_metadata=filter_metadata,
+            )
+        keyword_results = await keyword_task
+        return reciprocal_rank_fusion(
+            [vector_results or [], keyword_results or []], limit=max_results
+        )
+
+    async def _adaptive_vector_scores(
+        self,
+        query_embedding: List[float],
+        max_results: int,
+        filter_metadata: Optional[Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch vector scores, widening the candidate list only when needed.
+
+        Reason: a full page of near-equal scores means the cut-off lies
+        beyond it; a clear score drop means more candidates cannot win.
+        """
+        count = max(2 * max_results, LEAN_MIN_CANDIDATES)
+        while True:
+            scores = await self._call(
+                self.supabase_client.search_document_scores,
+                query_embedding,
+                match_count=count,
+                filter_metadata=filter_metadata,
+            )
+            full = len(scores) >= count
+            spread = scores[0]["similarity"] - scores[-1]["similarity"] if scores else 0
+            if not full or spread >= self.score_margin or count >= LEAN_MAX_CANDIDATES:
+                return scores
+            count = min(2 * count, LEAN_MAX_CANDIDATES)
+
+    async def _lean_search(
+        self,
+        query: str,
+        max_results: int,
+        candidate_count: int,
+        filter_metadata: Optional[Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        """Scores-only fan-out, adaptive cut, then one fetch for the winners."""
+        keyword_task = asyncio.create_task(
+            self._run_stage(
+                "keyword",
+                self.supabase_client.keyword_search_scores,
+                query,
+                match_count=candidate_count,
+                filter_metadata=filter_metadata,
+            )
+        )
+        vector_scores = []
+        query_embedding = await self._run_stage(
+            "embed", self.embedding_generator.embed_text, query
+        )
+        if query_embedding is not None:
+            vector_scores = await self._run_stage(
+                "vector",
+                self._adaptive_vector_scores,
+                query_embedding,
+                max_results,
+                filter_metadata,
+            )
+        keyword_scores = await keyword_task
+        fused = reciprocal_rank_fusion(
+            [vector_scores or [], keyword_scores or []], limit=max_results
+        )
+        winners = adaptive_cut(fused, max_results, self.score_margin)
+        rows = await self._run_stage(
+            "fetch", self.supabase_client.fetch_chunks, [w["id"] for w in winners]
+        )
+        by_id = {row["id"]: row for row in rows or []}
+        return [{**by_id[w["id"]], **w} for w in winners if w["id"] in by_id]
+
+    async def _hybrid_search(
+        self,
+        query: str,
+        max_results: int,
+        candidate_count: int,
+        filter_metadata: Optional[Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        """Embedding, then one RPC that fuses vector and keyword search."""
+        query_embedding = await self._run_stage(
+            "embed", self.embedding_generator.embed_text, query
+        )
+        if query_embedding is None:
+            # Without an embedding the keyword half can still answer
+            results = await self._run_stage(
+                "keyword",
+                self.supabase_client.keyword_search_documents,
+                query,
+                match_count=max_results,
+                filter_metadata=filter_metadata,
+            )
+            return results or []
+        results = await self._run_stage(
+            "hybrid",
+            self.supabase_client.hybrid_search_documents,
+            query,
+            query_embedding,
+            match_count=max_results,
+            filter_metadata=filter_metadata,
+            candidate_count=candidate_count,
+        )
+        return results or []
 
     async def search(
         self, params: KnowledgeBaseSearchParams
@@ -89,33 +395,47 @@ class KnowledgeBaseSearch:
         print("\n---[RAG Retrieval]---")
         print("Frage:", params.query)
 
-        # Generate embedding for the query
-        query_embedding = self.embedding_generator.embed_text(params.query)
-
         # Prepare filter metadata if source filter is provided
         filter_metadata = None
         if params.source_filter:
             filter_metadata = {"source": params.source_filter}
 
-        candidate_count = max(params.max_results, 50)
-        vector_results = self.supabase_client.search_documents(
-            query_embedding=query_embedding,
-            match_count=candidate_count,
-            filter_metadata=filter_metadata,
-        )
-        keyword_results = self.supabase_client.keyword_search_documents(
-            params.query,
-            match_count=candidate_count,
-            filter_metadata=filter_metadata,
-        )
-        results = vector_results + [
-            r for r in keyword_results if r not in vector_results
-        ]
-        # v1: mit reranking
-        # results = self.reranker.rerank(params.query, results)[: params.max_results]
+        # Repeated questions skip retrieval while the corpus is unchanged
+        results, key, version = None, None, None
+        if self.cache is not None:
+            version = await self.corpus_version()
+        if version is not None:
+            key = self.cache.key(
+                params.query, filter_metadata, params.max_results, self.mode
+            )
+            results = await self._cached_results(key, version)
+            metrics.inc(
+                "rag_retrieval_cache_total",
+                result="miss" if results is None else "hit",
+            )
+
+        if results is None:
+            failed = _failed_stages.set([])
+            try:
+                # Vector and keyword candidates are fused (RRF by id)
+                candidate_count = max(params.max_results, 50)
+                retrieve = {
+                    "hybrid": self._hybrid_search,
+                    "fanout": self._fanout_search,
+                    "lean": self._lean_search,
+                }[self.mode]
+                results = await retrieve(
+                    params.query, params.max_results, candidate_count, filter_metadata
+                )
+                # v1: mit reranking
+                # results = self.reranker.rerank(params.query, results)[: params.max_results]
 
-        # reranking deaktivieren
-        results = results[: params.max_results]
+                # reranking deaktivieren
+                results = results[: params.max_results]
+                if key is not None and not _failed_stages.get():
+                    self.cache.put(key, version, results)
+            finally:
+                _failed_stages.reset(failed)
 
         print("\n📊 Reranker-Scores:")
         for i, r in enumerate(results[: params.max_results]):
@@ -169,4 +489,4 @@ class KnowledgeBaseSearch:
         Returns:
             List of source identifiers
         """
-        return self.supabase_client.get_all_document_sources()
+        return await self._call(self.supabase_client.get_all_document_sources)
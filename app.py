@@ -30,19 +30,11 @@ from agent.agent import format_source_reference
 import asyncio
 from typing import List, Dict, Any
 from pathlib import Path
-import tempfile
 from datetime import datetime
 
 import streamlit as st
 
-import unicodedata
-import re
-
-import hashlib
-
-
-def compute_file_hash(file_bytes: bytes) -> str:
-    return hashlib.sha256(file_bytes).hexdigest()
+import mimetypes
 
 from collections import defaultdict
 
@@ -53,20 +45,6 @@ logo_path = "logo-wunschoele.png"
 with open(logo_path, "rb") as image_file:
     encoded = b64encode(image_file.read()).decode()
 
-def sanitize_filename(filename: str) -> str:
-    filename = filename.strip()
-    filename = filename.replace("ä", "ae").replace("ö", "oe").replace("ü", "ue")
-    filename = filename.replace("Ä", "Ae").replace("Ö", "Oe").replace("Ü", "Ue")
-    filename = filename.replace("ß", "ss")
-    filename = (
-        unicodedata.normalize("NFKD", filename)
-        .encode("ascii", "ignore")
-        .decode("ascii")
-    )
-    filename = re.sub(r"[^a-zA-Z0-9_.-]", "_", filename)
-    return filename
-
-
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -78,14 +56,19 @@ from utils.supabase_client import client
 from utils.delete_helper import delete_file_and_records
 
 from document_processing.ingestion import DocumentIngestionPipeline
+from document_processing.job_queue import get_job_queue
+from document_processing.utils import hash_upload, sanitize_filename, upload_stream
 from database.setup import SupabaseClient
 from agent.agent import RAGAgent, agent as rag_agent, format_source_reference
+from agent.answer_cache import replay
 from pydantic_ai.messages import (
     ModelRequest,
     ModelResponse,
     PartDeltaEvent,
     PartStartEvent,
+    TextPart,
     TextPartDelta,
+    UserPromptPart,
 )
 
 st.set_page_config(
@@ -116,10 +99,11 @@ st.markdown(
     </div>
     <hr style=\"margin-top: 0.4rem; margin-bottom: 0.8rem;\">
     """,
-    unsafe_allow_html=True
+    unsafe_allow_html=True,
 )
 
 supabase_client = SupabaseClient()
+job_queue = get_job_queue(client)
 
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -130,6 +114,9 @@ if "sources" not in st.session_state:
 if "processed_files" not in st.session_state:
     st.session_state.processed_files = set()
 
+if "ingestion_jobs" not in st.session_state:
+    st.session_state.ingestion_jobs = {}
+
 
 def display_message_part(part):
     if part.part_kind == "user-prompt" and part.content:
@@ -140,42 +127,91 @@ def display_message_part(part):
             st.markdown(part.content)
 
 
-async def process_document(
-    file_path: str, original_filename: str, metadata: Dict[str, Any]
+def enqueue_document(
+    storage_path: str, original_filename: str, metadata: Dict[str, Any]
 ) -> Dict[str, Any]:
-    pipeline = DocumentIngestionPipeline()
-    loop = asyncio.get_event_loop()
-
-    try:
-        chunks = await loop.run_in_executor(
-            None,
-            lambda: pipeline.process_file(file_path, metadata),
+    """
+    Legt einen Ingestion-Job an; die Verarbeitung übernimmt ein Worker-Prozess
+    (python -m document_processing.worker), unabhängig vom Streamlit-Rerun.
+    """
+    job = job_queue.enqueue(
+        {
+            "bucket": "privatedocs",
+            "storage_path": storage_path,
+            "original_filename": original_filename,
+            "metadata": metadata,
+        }
+    )
+    st.session_state.ingestion_jobs[job["id"]] = original_filename
+    return job
+
+
+@st.fragment(run_every=3)
+def show_ingestion_jobs():
+    """Pollt den Status der eigenen Ingestion-Jobs, ohne die ganze App neu zu laden."""
+    job_names = st.session_state.get("ingestion_jobs", {})
+    finished_jobs = st.session_state.setdefault("finished_jobs", {})
+    if not job_names:
+        return
+
+    # Nur noch offene Jobs abfragen; fertige Jobs stehen bereits im session_state
+    pending_ids = [job_id for job_id in job_names if job_id not in finished_jobs]
+    jobs = {job_id: finished_jobs[job_id] for job_id in finished_jobs}
+    if pending_ids:
+        try:
+            for job in job_queue.get_many(pending_ids):
+                jobs[job["id"]] = job
+                if job["status"] in ("done", "failed"):
+                    finished_jobs[job["id"]] = job
+        except Exception as e:
+            st.error(f"Fehler beim Abrufen des Verarbeitungsstatus: {e}")
+            return
+
+    st.subheader("⏳ Verarbeitungsstatus")
+    status_labels = {
+        "queued": "🟡 *wartet auf Worker*",
+        "running": "🔵 *Verarbeitung läuft...*",
+        "done": "🟢 *Verarbeitung abgeschlossen*",
+        "failed": "🔴 *fehlgeschlagen*",
+    }
+    for job_id, filename in job_names.items():
+        job = jobs.get(job_id)
+        if job is None:
+            continue
+        label = status_labels.get(job["status"], job["status"])
+        if job["status"] == "done":
+            chunk_count = (job.get("result") or {}).get("chunk_count", 0)
+            st.markdown(f"**{filename}**: {label} ({chunk_count} Textabschnitte)")
+        elif job["status"] == "failed":
+            st.markdown(f"**{filename}**: {label} – {job.get('error')}")
+        else:
+            st.markdown(f"**{filename}**: {label}")
+
+    if pending_ids and all(job_id in finished_jobs for job_id in pending_ids):
+        # Letzte offene Jobs fertig → Zähler und Quellenliste einmal neu laden
+        st.rerun(scope="app")
+
+
+async def run_agent_with_streaming(user_input: str, use_cache: bool = True):
+    # Reason: answers to follow-up questions depend on the conversation
+    standalone = not st.session_state.messages
+    lookup, cached = None, None
+    if standalone:
+        lookup = await rag_agent.lookup_answer(user_input, use_cache)
+        cached = lookup["answer"]
+    if cached is not None:
+        rag_agent.last_match = cached["citations"]
+        async for piece in replay(cached["answer"]):
+            yield piece
+        st.session_state.messages.extend(
+            [
+                ModelRequest(parts=[UserPromptPart(content=user_input)]),
+                ModelResponse(parts=[TextPart(content=cached["answer"])]),
+            ]
         )
-        if not chunks:
-            return {
-                "success": False,
-                "file_path": file_path,
-                "error": "Keine gültigen Textabschnitte gefunden",
-            }
-
-        print("\n📦 Embedding-Check")
-        for i, c in enumerate(chunks):
-            emb = c.get("embedding")
-            text = c.get("content", "")
-            print(
-                f"Chunk {i+1}: Embedding: {len(emb) if emb else 0} Werte | Text: {text[:100].replace(chr(10), ' ')}..."
-            )
-
-        return {"success": True, "file_path": file_path, "chunk_count": len(chunks)}
-    except Exception as e:
-        import traceback
+        return
 
-        print(f"Fehler bei der Bearbeitung des Dokuments: {str(e)}")
-        print(traceback.format_exc())
-        return {"success": False, "file_path": file_path, "error": str(e)}
-
-
-async def run_agent_with_streaming(user_input: str):
+    rag_agent.last_match = []
     async with rag_agent.agent.iter(
         user_input,
         deps={"kb_search": rag_agent.kb_search},
@@ -196,24 +232,28 @@ async def run_agent_with_streaming(user_input: str):
                             yield event.delta.content_delta
 
     st.session_state.messages.extend(run.result.new_messages())
+    if standalone:
+        rag_agent.remember_answer(lookup, run.result.output, rag_agent.last_match)
 
 
 async def update_available_sources():
     try:
-        response = client.table("rag_pages").select("url, metadata").execute()
+        # One row per document from the documents catalog
+        documents = supabase_client.list_documents(
+            sources=["ui_upload", "manuell"], columns="url,source"
+        )
 
         file_set = set()
         knowledge_set = set()
 
-        for row in response.data:
-            metadata = row.get("metadata", {})
+        for row in documents:
             url = row.get("url", "")
             if not url:
                 continue
 
-            if metadata.get("source") == "ui_upload":
+            if row.get("source") == "ui_upload":
                 file_set.add(url)
-            elif metadata.get("source") == "manuell":
+            elif row.get("source") == "manuell":
                 knowledge_set.add(url)
 
         # 👇 Kombinieren und sortieren
@@ -238,7 +278,7 @@ async def update_available_sources():
 
 async def main():
     # Logo + Titel anzeigen
-    
+
     await update_available_sources()
 
     doc_count = st.session_state.get("document_count", 0)
@@ -285,6 +325,11 @@ async def main():
                 for part in msg.parts:
                     display_message_part(part)
 
+        use_cache = st.toggle(
+            "⚡ Antworten auf ähnliche Fragen wiederverwenden",
+            value=True,
+            help="Aus: die Frage wird in jedem Fall neu beantwortet",
+        )
         user_input = st.chat_input("Stelle eine Frage zu den Dokumenten...")
         if user_input:
             with st.chat_message("user"):
@@ -294,13 +339,13 @@ async def main():
                 message_placeholder = st.empty()
                 full_response = ""
 
-                async for chunk in run_agent_with_streaming(user_input):
+                async for chunk in run_agent_with_streaming(user_input, use_cache):
                     full_response += chunk
                     message_placeholder.markdown(full_response + "▌")
 
                 # Chatbot Interface
+                source_pages = defaultdict(set)
                 if hasattr(rag_agent, "last_match") and rag_agent.last_match:
-                    source_pages = defaultdict(set)
                     print("--- Treffer im Retrieval ---")
                     for match in rag_agent.last_match:
                         sim = match.get("similarity", 0)
@@ -379,13 +424,7 @@ async def main():
                         "⚠️ Bitte gib sowohl eine Überschrift als auch einen Text ein."
                     )
                 else:
-                    existing = (
-                        client.table("rag_pages")
-                        .select("url")
-                        .ilike("url", f"{manual_title.strip()}%")
-                        .execute()
-                    )
-                    if existing.data:
+                    if supabase_client.has_url_prefix(manual_title.strip()):
                         st.warning(
                             f"⚠️ Ein Eintrag mit der Überschrift '{manual_title.strip()}' existiert bereits."
                         )
@@ -455,12 +494,14 @@ async def main():
         )
 
         if uploaded_files and not st.session_state.just_uploaded:
+            # Streamlit vergibt pro Upload eine stabile file_id → kein Hashen/Kopieren
+            # des Dateiinhalts bei jedem Rerun nötig
             new_files = [
-                (f, f"{f.name}_{hash(f.getvalue().hex())}")
+                (f, f"{f.name}_{f.file_id}")
                 for f in uploaded_files
-                if f"{f.name}_{hash(f.getvalue().hex())}"
-                not in st.session_state.processed_files
+                if f"{f.name}_{f.file_id}" not in st.session_state.processed_files
             ]
+            max_file_size_mb = int(os.getenv("MAX_FILE_SIZE_MB", "200"))
 
             if new_files:
                 st.subheader("⏳ Upload-Fortschritt")
@@ -470,100 +511,74 @@ async def main():
                 for i, (uploaded_file, file_id) in enumerate(new_files):
                     safe_filename = sanitize_filename(uploaded_file.name)
 
-                    file_bytes = uploaded_file.getvalue()
-                    file_hash = compute_file_hash(file_bytes)
+                    if uploaded_file.size > max_file_size_mb * 1024 * 1024:
+                        st.warning(
+                            f"⚠️ Die Datei **{safe_filename}** ist größer als {max_file_size_mb} MB und wird nicht verarbeitet."
+                        )
+                        continue
+
+                    # Hash direkt über den Upload-Puffer (memoryview, keine Kopie)
+                    file_hash = hash_upload(uploaded_file)
 
                     # 🔍 Duplikatprüfung anhand Hash
-                    existing_hash = (
-                        client.table("rag_pages")
-                        .select("id")
-                        .eq("metadata->>file_hash", file_hash)
-                        .execute()
-                    )
-
-                    if existing_hash.data:
+                    if supabase_client.has_file_hash(file_hash):
                         st.warning(
                             f"⚠️ Die Datei **{safe_filename}** wurde bereits (unter anderem Namen) hochgeladen und wird nicht erneut gespeichert."
                         )
                         continue
 
                     # ✅ Duplikatprüfung vor Upload
-                    existing = (
-                        client.table("rag_pages")
-                        .select("id")
-                        .eq("url", safe_filename)
-                        .execute()
-                    )
-
-                    if existing.data:
+                    if supabase_client.has_url(safe_filename):
                         st.warning(
                             f"⚠️ Die Datei **{safe_filename}** ist bereits in der Wissensdatenbank vorhanden und wurde nicht erneut hochgeladen."
                         )
                         continue
 
-                    with tempfile.NamedTemporaryFile(
-                        delete=False, suffix=Path(uploaded_file.name).suffix
-                    ) as temp_file:
-                        temp_file.write(uploaded_file.getvalue())
-                        temp_file_path = temp_file.name
-
-                    try:
-                        progress_bar.progress(0.05)
-                        status_text.markdown(
-                            f"🟡 **{safe_filename}**: 📥 *Upload startet...*"
-                        )
-
-                        with open(temp_file_path, "rb") as f:
-                            client.storage.from_("privatedocs").upload(
-                                safe_filename,
-                                f,
-                                {
-                                    "cacheControl": "3600",
-                                    "x-upsert": "true",
-                                    "content-type": "application/pdf",
-                                },
-                            )
-
-                        progress_bar.progress(0.3)
-                        status_text.markdown(
-                            f"🟠 **{safe_filename}**: 📤 *Dateiübertragung abgeschlossen*"
-                        )
-
-                        metadata = {
-                            "source": "ui_upload",
-                            "upload_time": str(datetime.now()),
-                            "original_filename": safe_filename,
-                            "file_hash": file_hash,
-                        }
-
-                        status_text.markdown(
-                            f"🔵 **{safe_filename}**: 🧠 *Verarbeitung läuft...*"
-                        )
+                    progress_bar.progress(0.05)
+                    status_text.markdown(
+                        f"🟡 **{safe_filename}**: 📥 *Upload startet...*"
+                    )
 
-                        result = await process_document(
-                            temp_file_path, safe_filename, metadata
+                    content_type = (
+                        mimetypes.guess_type(safe_filename)[0]
+                        or "application/octet-stream"
+                    )
+                    # Upload streamt aus demselben Puffer, ohne Temp-Datei
+                    with upload_stream(uploaded_file) as stream:
+                        client.storage.from_("privatedocs").upload(
+                            safe_filename,
+                            stream,
+                            {
+                                "cacheControl": "3600",
+                                "x-upsert": "true",
+                                "content-type": content_type,
+                            },
                         )
 
-                        progress_bar.progress(0.8)
+                    progress_bar.progress(0.6)
+                    status_text.markdown(
+                        f"🟠 **{safe_filename}**: 📤 *Dateiübertragung abgeschlossen*"
+                    )
 
-                        if result["success"]:
-                            st.success(
-                                f"✅ {uploaded_file.name} verarbeitet: {result['chunk_count']} Textabschnitte"
-                            )
-                            st.session_state.document_count += 1
-                            st.session_state.processed_files.add(file_id)
-                        else:
-                            st.error(
-                                f"❌ Fehler beim Verarbeiten {uploaded_file.name}: {result['error']}"
-                            )
+                    metadata = {
+                        "source": "ui_upload",
+                        "upload_time": str(datetime.now()),
+                        "original_filename": safe_filename,
+                        "file_hash": file_hash,
+                    }
 
-                        progress_bar.progress(1.0)
-                        status_text.markdown(
-                            f"🟢 **{safe_filename}**: ✅ *Verarbeitung abgeschlossen*"
+                    try:
+                        enqueue_document(safe_filename, safe_filename, metadata)
+                        st.session_state.processed_files.add(file_id)
+                    except Exception as e:
+                        st.error(
+                            f"❌ Fehler beim Einreihen von {uploaded_file.name}: {e}"
                         )
 
-                    finally:
-                        os.unlink(temp_file_path)
+                    progress_bar.progress(1.0)
+                    status_text.markdown(
+                        f"🔵 **{safe_filename}**: 🧠 *zur Verarbeitung eingereiht*"
+                    )
 
                 st.session_state.just_uploaded = True
                 await update_available_sources()
@@ -576,6 +591,8 @@ async def main():
             "<hr style='margin-top: 6px; margin-bottom: 6px;'>", unsafe_allow_html=True
         )
 
+        show_ingestion_jobs()
+
     with tab4:
         st.markdown("<h4>🗑️ Dokument / Notiz löschen</h4>", unsafe_allow_html=True)
 
@@ -591,14 +608,14 @@ async def main():
             try:
                 res = (
                     client.table("rag_pages")
-                    .select("content", "metadata")
+                    .select("content", "metadata", "document_id")
                     .eq("url", delete_filename)
                     .limit(1)
                     .execute()
                 )
 
                 if res.data:
-                    entry = res.data[0]
+                    entry = supabase_client.with_document_metadata(res.data)[0]
                     content = entry.get("content", "")
                     metadata = entry.get("metadata", {})
                     source = metadata.get("source", "")
@@ -634,49 +651,14 @@ async def main():
 
             if st.button("Ausgewählte Dokument/Notiz löschen"):
                 st.write("Dateiname zur Löschung:", delete_filename)
+                # Chunks, Katalog und Datei in einem RPC plus einem Storage-Aufruf
                 result_log = delete_file_and_records(delete_filename)
                 st.code(result_log)
-                await update_available_sources()
-
-                storage_deleted = db_deleted = False
-
-                try:
-                    st.write("Dateiname zur Löschung:", delete_filename)
-                    print("Lösche:", delete_filename)
-                    client.storage.from_("privatedocs").remove([delete_filename])
-                    storage_deleted = True
-                except Exception as e:
-                    st.error(f"Löschen aus dem Speicher fehlgeschlagen: {e}")
-
-                try:
-                    deleted_count = supabase_client.delete_documents_by_filename(
-                        delete_filename
-                    )
-                    st.code(
-                        f"🩨 SQL-Delete für '{delete_filename}' – {deleted_count} Einträge entfernt."
-                    )
-                    db_deleted = True
-                except Exception as e:
-                    st.error(f"Datenbank-Löschung fehlgeschlagen: {e}")
-                    db_deleted = False
-
-                if storage_deleted and db_deleted:
-                    st.success("✅ Vollständig gelöscht.")
-                elif storage_deleted and not db_deleted:
-                    st.warning(
-                        "⚠️ Dokument/Notiz im Storage gelöscht, aber kein Eintrag in der Datenbank gefunden."
-                    )
-                elif not storage_deleted and db_deleted:
-                    st.warning(
-                        "⚠️ Datenbankeinträge gelöscht, aber Dokument/Notiz im Storage konnte nicht entfernt werden."
-                    )
+                if result_log.startswith("❌"):
+                    st.error("❌ Dokument/Notiz konnte nicht gelöscht werden.")
                 else:
-                    st.error(
-                        "❌ Weder Dokument/Notiz noch Datenbankeinträge konnten gelöscht werden."
-                    )
-
-                await update_available_sources()
-                st.rerun()
+                    await update_available_sources()
+                    st.rerun()
 
         else:
             st.info("Keine Dokumente/Notizen zur Löschung verfügbar.")
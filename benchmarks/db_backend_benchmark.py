@@ -0,0 +1,147 @@
+"""
+Benchmark of the PostgREST and the direct Postgres backend of SupabaseClient.
+
+Loads synthetic 1536-dim chunks into the real database through each backend
+and measures ingest rows/s (``store_document_chunks``) and search latency
+(``search_documents``, i.e. the ``match_rag_pages`` RPC). Needs SUPABASE_URL /
+SUPABASE_KEY for PostgREST and DATABASE_URL for Postgres; the benchmark rows
+are deleted afterwards.
+
+    python -m benchmarks.db_backend_benchmark --rows 5000 --queries 200
+    python -m benchmarks.db_backend_benchmark --backends postgres --json
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import contextlib
+from typing import Any, Dict, List
+
+import numpy as np
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.ingestion_benchmark import synthetic_page
+from database.setup import SupabaseClient
+from document_processing.fake_embeddings import FakeEmbeddingGenerator
+
+BACKENDS = ("postgrest", "postgres")
+
+
+def make_client(backend: str) -> SupabaseClient:
+    if backend == "postgres":
+        from database.postgres import PostgresClient
+
+        return SupabaseClient(client=PostgresClient())
+    return SupabaseClient()
+
+
+def run_backend(
+    backend: str,
+    rows: int = 2000,
+    batch_size: int = 200,
+    queries: int = 100,
+    match_count: int = 10,
+    seed: int = 7,
+) -> Dict[str, Any]:
+    """
+    Ingest ``rows`` chunks and run ``queries`` searches through one backend.
+
+    Returns:
+        Dict with ingest rows/s and search p50/p95/mean in milliseconds
+    """
+    rng = random.Random(seed)
+    embedder = FakeEmbeddingGenerator()
+    texts = [synthetic_page(rng, 60) for _ in range(rows)]
+    vectors = [embedder.embed_text(text) for text in texts]
+
+    client = make_client(backend)
+    url = f"benchmark-{backend}-{uuid.uuid4().hex[:8]}"
+    document = client.upsert_document(url, {"source": "benchmark"})
+    filter_metadata = {"source": "benchmark"}
+
+    try:
+        start = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            client.store_document_chunks(
+                [
+                    {
+                        "url": url,
+                        "chunk_number": i,
+                        "content": texts[i],
+                        "embedding": vectors[i],
+                        "metadata": {"source": "benchmark", "page": 1},
+                        "document_id": document.get("id"),
+                    }
+                    for i in range(offset, min(offset + batch_size, rows))
+                ]
+            )
+        ingest_seconds = time.perf_counter() - start
+
+        latencies = []
+        # Reason: search_documents prints every hit
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            client.search_documents(vectors[0], 0.0, match_count, filter_metadata)
+            for _ in range(queries):
+                query = vectors[rng.randrange(rows)]
+                start = time.perf_counter()
+                client.search_documents(query, 0.0, match_count, filter_metadata)
+                latencies.append((time.perf_counter() - start) * 1000)
+    finally:
+        client.delete_documents_by_filename(url)
+        client._execute(
+            "delete_document", client.client.table("documents").delete().eq("url", url)
+        )
+        if hasattr(client.client, "close"):
+            client.client.close()
+
+    return {
+        "backend": backend,
+        "rows": rows,
+        "batch_size": batch_size,
+        "ingest_seconds": round(ingest_seconds, 3),
+        "ingest_rows_per_second": round(rows / ingest_seconds, 1),
+        "queries": queries,
+        "search_p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "search_p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "search_mean_ms": round(float(np.mean(latencies)), 2),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="PostgREST vs. Postgres backend")
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--match-count", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+
+    results: List[Dict[str, Any]] = []
+    for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        results.append(
+            run_backend(
+                backend, args.rows, args.batch_size, args.queries, args.match_count
+            )
+        )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'Backend':<10} {'Ingest rows/s':>14} {'p50 ms':>8} {'p95 ms':>8}")
+        for r in results:
+            print(
+                f"{r['backend']:<10} {r['ingest_rows_per_second']:>14} "
+                f"{r['search_p50_ms']:>8} {r['search_p95_ms']:>8}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
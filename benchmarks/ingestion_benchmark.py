@@ -0,0 +1,305 @@
+"""
+Offline end-to-end benchmark for DocumentIngestionPipeline.process_file.
+
+Generates a reproducible synthetic corpus of TXT and PDF files and runs the real pipeline
+against a deterministic fake embedding provider and the in-process
+``LocalSupabaseClient`` store. No network access or credentials are needed.
+
+    python -m benchmarks.ingestion_benchmark --docs 50 --formats txt,pdf
+    python -m benchmarks.ingestion_benchmark --json --fail-below-docs-per-sec 5
+
+PDF extraction uses unstructured's layout model; if it is not in the local
+Hugging Face cache, PDFs are reported as failed documents.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import tempfile
+import resource
+import tracemalloc
+import contextlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.local_store import LocalSupabaseClient
+from database.setup import SupabaseClient
+from document_processing.fake_embeddings import FakeEmbeddingGenerator
+from utils.metrics import registry as metrics
+
+STAGES = ("check", "extract", "preprocess", "embed", "store", "total")
+
+VOCABULARY = (
+    "Motorenöl Viskosität Schmierstoff Getriebeöl Hydrauliköl Temperatur "
+    "Freigabe Spezifikation Additiv Verschleißschutz Oxidationsstabilität "
+    "Flammpunkt Stockpunkt Dichte Datenblatt Anwendung Empfehlung Wechselintervall "
+    "synthetisch mineralisch teilsynthetisch Dieselmotor Ottomotor Kettensäge "
+    "Bootsmotor Landmaschine Kompressor Korrosionsschutz Kältemaschine"
+).split()
+PRODUCT_CODES = ("2-T", "10W-40", "5W-30", "15W-40", "HLP 46", "ATF III", "SAE 90")
+
+
+def synthetic_page(rng: random.Random, words: int) -> str:
+    """Generate one page of German-like product data sheet text."""
+    tokens = []
+    for i in range(words):
+        if rng.random() < 0.03:
+            tokens.append(rng.choice(PRODUCT_CODES))
+        else:
+            tokens.append(rng.choice(VOCABULARY))
+        if i % 14 == 13:
+            tokens[-1] += "."
+    return " ".join(tokens)
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_text_pdf(path: str, pages: List[str], line_length: int = 90) -> None:
+    """
+    Write a minimal PDF with a real text layer (Helvetica, one page per text).
+
+    Args:
+        path: Output file path
+        pages: Text of each page
+        line_length: Characters per line
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+        b"/Encoding /WinAnsiEncoding >>",
+    ]
+    page_refs = []
+    for text in pages:
+        lines = [
+            text[i : i + line_length] for i in range(0, len(text), line_length)
+        ] or [""]
+        stream = "BT /F1 10 Tf 12 TL 50 800 Td\n" + "\n".join(
+            f"({_pdf_escape(line)}) Tj T*" for line in lines[:60]
+        )
+        stream += "\nET"
+        data = stream.encode("cp1252", errors="replace")
+        objects.append(
+            b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream"
+        )
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        page_refs.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % ref for ref in page_refs)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_refs))
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref_offset,
+    )
+    Path(path).write_bytes(bytes(output))
+
+
+def generate_corpus(
+    directory: str,
+    docs: int,
+    formats: List[str],
+    pages_per_doc: int = 3,
+    words_per_page: int = 400,
+    seed: int = 42,
+) -> List[str]:
+    """
+    Create a reproducible synthetic corpus.
+
+    Args:
+        directory: Target directory
+        docs: Number of documents
+        formats: File formats to alternate between (``txt``, ``pdf``)
+        pages_per_doc: Pages per document
+        words_per_page: Words per page
+        seed: Random seed
+
+    Returns:
+        Paths of the generated files
+    """
+    rng = random.Random(seed)
+    paths = []
+    for i in range(docs):
+        fmt = formats[i % len(formats)]
+        pages = [synthetic_page(rng, words_per_page) for _ in range(pages_per_doc)]
+        path = os.path.join(directory, f"datenblatt_{i:04d}.{fmt}")
+        if fmt == "pdf":
+            write_text_pdf(path, pages)
+        else:
+            Path(path).write_text("\n\n".join(pages), encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def run_benchmark(
+    docs: int = 20,
+    formats: Optional[List[str]] = None,
+    pages_per_doc: int = 3,
+    words_per_page: int = 400,
+    embed_latency_ms: float = 0.0,
+    trace_memory: bool = False,
+    verbose: bool = False,
+) -> Dict[str, Any]:
+    """
+    Ingest a synthetic corpus with the real pipeline and measure throughput.
+
+    Returns:
+        Dict with docs/s, chunks/s, peak memory and per-stage seconds
+    """
+    from document_processing.ingestion import DocumentIngestionPipeline
+
+    formats = formats or ["txt", "pdf"]
+    metrics.reset()
+    with contextlib.ExitStack() as stack:
+        if not verbose:
+            # Reason: the pipeline prints progress for every file and batch
+            devnull = stack.enter_context(open(os.devnull, "w"))
+            stack.enter_context(contextlib.redirect_stdout(devnull))
+        directory = stack.enter_context(tempfile.TemporaryDirectory())
+
+        store = LocalSupabaseClient()
+        pipeline = DocumentIngestionPipeline(
+            supabase_client=SupabaseClient(client=store),
+            embedding_generator=FakeEmbeddingGenerator(latency_ms=embed_latency_ms),
+        )
+        paths = generate_corpus(directory, docs, formats, pages_per_doc, words_per_page)
+        corpus_bytes = sum(os.path.getsize(p) for p in paths)
+
+        if trace_memory:
+            tracemalloc.start()
+        failed: Dict[str, int] = {}
+        chunks = 0
+        start = time.perf_counter()
+        for path in paths:
+            name = os.path.basename(path)
+            records = pipeline.process_file(
+                path, {"source": "benchmark", "original_filename": name}
+            )
+            chunks += len(records)
+            if not records:
+                fmt = Path(path).suffix.lstrip(".")
+                failed[fmt] = failed.get(fmt, 0) + 1
+        elapsed = time.perf_counter() - start
+        heap_peak = None
+        if trace_memory:
+            heap_peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            tracemalloc.stop()
+
+    stage_seconds = {
+        stage: round(
+            metrics.histogram_totals("rag_ingestion_stage_seconds", stage=stage)[1], 4
+        )
+        for stage in STAGES
+    }
+    return {
+        "docs": docs,
+        "failed_docs": sum(failed.values()),
+        "failed_by_format": failed,
+        "formats": formats,
+        "chunks": chunks,
+        "corpus_mb": round(corpus_bytes / (1024 * 1024), 3),
+        "elapsed_seconds": round(elapsed, 4),
+        "docs_per_second": round(docs / elapsed, 2) if elapsed else None,
+        "chunks_per_second": round(chunks / elapsed, 2) if elapsed else None,
+        # ru_maxrss is reported in KiB on Linux
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+        "peak_python_heap_mb": round(heap_peak, 1) if heap_peak else None,
+        "stage_seconds": stage_seconds,
+        "db_bytes_sent": metrics.counter_value(
+            "rag_db_bytes_sent_total", operation="insert_chunks"
+        ),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline ingestion benchmark")
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--formats", default="txt,pdf")
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--words-per-page", type=int, default=400)
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0)
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Also report the Python heap peak (tracemalloc, slows the run)",
+    )
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument(
+        "--fail-below-docs-per-sec",
+        type=float,
+        default=None,
+        help="Exit with status 1 if throughput drops below this value (CI gate)",
+    )
+    args = parser.parse_args()
+
+    # Reason: unstructured downloads its PDF layout model from Hugging Face;
+    # offline this fails fast instead of retrying for minutes per document
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+    result = run_benchmark(
+        docs=args.docs,
+        formats=[f.strip() for f in args.formats.split(",") if f.strip()],
+        pages_per_doc=args.pages,
+        words_per_page=args.words_per_page,
+        embed_latency_ms=args.embed_latency_ms,
+        trace_memory=args.trace_memory,
+        verbose=args.verbose,
+    )
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"Documents:     {result['docs']} ({result['failed_docs']} failed)")
+        print(f"Chunks:        {result['chunks']}")
+        print(f"Elapsed:       {result['elapsed_seconds']:.2f} s")
+        print(
+            f"Throughput:    {result['docs_per_second']} docs/s, "
+            f"{result['chunks_per_second']} chunks/s"
+        )
+        print(f"Peak RSS:      {result['peak_rss_mb']} MB")
+        if result["peak_python_heap_mb"] is not None:
+            print(f"Peak heap:     {result['peak_python_heap_mb']} MB")
+        for stage, seconds in result["stage_seconds"].items():
+            print(f"  {stage:<11} {seconds:.3f} s")
+
+    if (
+        args.fail_below_docs_per_sec is not None
+        and (result["docs_per_second"] or 0) < args.fail_below_docs_per_sec
+    ):
+        print(
+            f"❌ Throughput below {args.fail_below_docs_per_sec} docs/s",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
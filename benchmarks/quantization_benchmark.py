@@ -0,0 +1,288 @@
+"""
+Recall, size and latency of the vector storage and quantization modes.
+
+Compares the current setup (``vector`` storage, exact index) with ``halfvec``
+storage and the binary-quantized pre-filter with exact re-scoring (see
+``database.setup_db.candidate_query_sql``). Recall@k is measured against the
+exact float32 top-k.
+
+Offline (default), the modes are simulated with numpy on synthetic clustered
+embeddings: this isolates the precision lost by quantization from the
+approximation of the ANN index. With ``--database-url`` every mode is built
+for real in scratch tables (``rag_quant_bench_*``, dropped afterwards) with
+the same index and search SQL as ``rag_pages``, and the index size comes from
+``pg_relation_size``.
+
+    python -m benchmarks.quantization_benchmark --rows 20000 --queries 200
+    python -m benchmarks.quantization_benchmark --database-url $DATABASE_URL --json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.setup_db import (
+    EMBEDDING_DIM,
+    VECTOR_STORAGE_TYPES,
+    candidates_function_sql,
+    vector_index_sql,
+)
+
+MODES: Tuple[Tuple[str, str], ...] = (
+    ("vector", "none"),
+    ("halfvec", "none"),
+    ("vector", "binary"),
+    ("halfvec", "binary"),
+)
+
+# Set bits per byte value, for Hamming distances on packed bit vectors
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+
+def synthetic_embeddings(
+    rows: int, queries: int, dim: int = EMBEDDING_DIM, clusters: int = 64, seed: int = 7
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Clustered, L2-normalized embeddings and queries near random rows.
+
+    Real embeddings are not uniform: documents cluster by topic, which is
+    what makes the binary pre-filter harder than on random vectors.
+    """
+    rng = np.random.default_rng(seed)
+    centers = 0.5 * rng.standard_normal((clusters, dim)).astype(np.float32)
+    data = centers[rng.integers(clusters, size=rows)]
+    data += rng.standard_normal((rows, dim)).astype(np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+
+    picks = data[rng.integers(rows, size=queries)]
+    noise = rng.standard_normal((queries, dim)).astype(np.float32)
+    query = picks + noise / np.sqrt(dim)
+    query /= np.linalg.norm(query, axis=1, keepdims=True)
+    return data, query
+
+
+def exact_top_k(data: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Row indices of the exact cosine top-k per query (float32)."""
+    scores = queries @ data.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(top, order, axis=1)
+
+
+def recall_at_k(found: List[List[int]], truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth.tolist()))
+    return hits / truth.size
+
+
+def _simulate(
+    stored: np.ndarray,
+    query: np.ndarray,
+    k: int,
+    quantization: str,
+    rescore_factor: int,
+    bits: np.ndarray,
+) -> List[int]:
+    if quantization == "binary":
+        query_bits = np.packbits(query > 0)
+        hamming = POPCOUNT[np.bitwise_xor(bits, query_bits)].sum(axis=1)
+        fetch = min(k * rescore_factor, len(stored))
+        candidates = np.argpartition(hamming, fetch - 1)[:fetch]
+    else:
+        candidates = np.arange(len(stored))
+    scores = stored[candidates] @ query
+    best = np.argsort(-scores)[:k]
+    return candidates[best].tolist()
+
+
+def run_offline(
+    rows: int = 20000,
+    queries: int = 100,
+    k: int = 10,
+    rescore_factor: int = 4,
+    seed: int = 7,
+) -> List[Dict[str, Any]]:
+    """
+    Simulate every mode with numpy.
+
+    ``*_bytes_per_row`` is the embedding payload of the table row and of the
+    index entry (the HNSW graph links come on top and are equal for all modes).
+
+    Returns:
+        One result dict per (storage, quantization) mode
+    """
+    data, queries_ = synthetic_embeddings(rows, queries, seed=seed)
+    truth = exact_top_k(data, queries_, k)
+    bits = np.packbits(data > 0, axis=1)
+    element = {"vector": 4, "halfvec": 2}
+    # Reason: float16 values widened back to float32 keep the halfvec rounding
+    stored = {"vector": data, "halfvec": data.astype(np.float16).astype(np.float32)}
+
+    results = []
+    for storage, quantization in MODES:
+        found = []
+        start = time.perf_counter()
+        for query in queries_:
+            found.append(
+                _simulate(stored[storage], query, k, quantization, rescore_factor, bits)
+            )
+        seconds = time.perf_counter() - start
+        column_bytes = element[storage] * EMBEDDING_DIM
+        index_bytes = EMBEDDING_DIM // 8 if quantization == "binary" else column_bytes
+        results.append(
+            {
+                "storage": storage,
+                "quantization": quantization,
+                "recall_at_k": round(recall_at_k(found, truth), 4),
+                "column_bytes_per_row": column_bytes,
+                "index_bytes_per_row": index_bytes,
+                "mean_ms": round(seconds / queries * 1000, 3),
+            }
+        )
+    return results
+
+
+def _literal(vector: np.ndarray) -> str:
+    return "[" + ",".join(f"{x:.7g}" for x in vector) + "]"
+
+
+def run_database(
+    database_url: str,
+    rows: int = 20000,
+    queries: int = 100,
+    k: int = 10,
+    rescore_factor: int = 4,
+    seed: int = 7,
+    method: str = "hnsw",
+) -> List[Dict[str, Any]]:
+    """
+    Build every mode in a scratch table and search it through the real SQL.
+
+    Needs psycopg and pgvector >= 0.7 (halfvec, binary_quantize).
+
+    Returns:
+        One result dict per (storage, quantization) mode
+    """
+    import psycopg
+
+    data, queries_ = synthetic_embeddings(rows, queries, seed=seed)
+    truth = exact_top_k(data, queries_, k)
+    results = []
+    with psycopg.connect(database_url, autocommit=True) as conn:
+        for storage, quantization in MODES:
+            table = f"rag_quant_bench_{storage}_{quantization}"
+            function = f"{table}_candidates"
+            conn.execute(f"drop table if exists {table} cascade")
+            conn.execute(
+                f"create table {table} (id bigint primary key, source text, "
+                f"metadata jsonb not null default '{{}}'::jsonb, "
+                f"collection text not null default 'documents', "
+                f"embedding {VECTOR_STORAGE_TYPES[storage]})"
+            )
+            try:
+                with conn.cursor().copy(
+                    f"copy {table} (id, embedding) from stdin"
+                ) as copy:
+                    for i, vector in enumerate(data):
+                        copy.write_row((i, _literal(vector)))
+
+                start = time.perf_counter()
+                conn.execute(
+                    vector_index_sql(
+                        method,
+                        name=f"{table}_embedding",
+                        storage=storage,
+                        quantization=quantization,
+                    ).replace("on rag_pages", f"on {table}")
+                )
+                build_seconds = time.perf_counter() - start
+                conn.execute(
+                    candidates_function_sql(storage, quantization, rescore_factor)
+                    .replace("match_rag_page_candidates", function)
+                    .replace("from rag_pages", f"from {table}")
+                )
+                conn.execute(f"analyze {table}")
+                index_bytes, table_bytes = conn.execute(
+                    f"select pg_relation_size('{table}_embedding'), "
+                    f"pg_table_size('{table}')"
+                ).fetchone()
+
+                found, latencies = [], []
+                for query in queries_:
+                    start = time.perf_counter()
+                    hits = conn.execute(
+                        f"select id from {function}(%s::vector, %s)",
+                        (_literal(query), k),
+                    ).fetchall()
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    found.append([row[0] for row in hits])
+            finally:
+                conn.execute(f"drop table if exists {table} cascade")
+                conn.execute(f"drop function if exists {function}")
+
+            results.append(
+                {
+                    "storage": storage,
+                    "quantization": quantization,
+                    "recall_at_k": round(recall_at_k(found, truth), 4),
+                    "index_bytes": index_bytes,
+                    "table_bytes": table_bytes,
+                    "index_build_seconds": round(build_seconds, 2),
+                    "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+                    "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+                }
+            )
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Vector quantization modes")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument("--index-method", default="hnsw", choices=["hnsw", "ivfflat"])
+    parser.add_argument(
+        "--database-url", help="Build the modes in this database (needs psycopg)"
+    )
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+
+    if args.database_url:
+        results = run_database(
+            args.database_url,
+            args.rows,
+            args.queries,
+            args.k,
+            args.rescore_factor,
+            method=args.index_method,
+        )
+    else:
+        results = run_offline(args.rows, args.queries, args.k, args.rescore_factor)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"{'Storage':<8} {'Quant.':<7} {'Recall@' + str(args.k):>9}  Details")
+    for r in results:
+        details = {
+            key: value
+            for key, value in r.items()
+            if key not in ("storage", "quantization", "recall_at_k")
+        }
+        print(
+            f"{r['storage']:<8} {r['quantization']:<7} {r['recall_at_k']:>9}  "
+            + ", ".join(f"{key}={value}" for key, value in details.items())
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
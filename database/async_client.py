@@ -0,0 +1,239 @@
+"""
+Async counterpart of ``SupabaseClient`` for use inside event loops.
+
+``AsyncSupabaseClient`` has the same search, fetch, insert and delete methods
+as ``SupabaseClient`` as coroutines, built on supabase-py's async client.
+Both run the requests built in ``database.queries``; only awaiting differs.
+The client comes from ``database.client_registry``: its requests run on the
+registry's long-lived event loop, so concurrent chat sessions and every
+Streamlit rerun reuse one pool of keep-alive connections instead of each
+blocking a worker thread on a synchronous request.
+"""
+
+import os
+import sys
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.client_registry import count_bytes_sent, get_async_client, run_async
+from database.documents import rows_projection
+from database.local_index import LocalVectorIndex
+from database.queries import QueryOperations, Steps, arun_steps
+from database.setup import SupabaseClient
+
+
+class AsyncSupabaseClient(QueryOperations):
+    """
+    Non-blocking client for Supabase and pgvector.
+
+    Args:
+        supabase_url: URL for Supabase instance. Defaults to SUPABASE_URL env var.
+        supabase_key: API key for Supabase. Defaults to SUPABASE_KEY env var.
+        client: Pre-built async client (e.g.
+            ``database.local_store.LocalAsyncSupabaseClient``); by default the
+            shared async client from ``database.client_registry``
+        local_index: ``LocalVectorIndex`` for unfiltered vector searches
+            (defaults to one in LOCAL_INDEX_DIR if that is set)
+    """
+
+    def __init__(
+        self,
+        supabase_url: Optional[str] = None,
+        supabase_key: Optional[str] = None,
+        client: Optional[Any] = None,
+        local_index: Optional[Any] = None,
+    ):
+        self.supabase_url = supabase_url or os.getenv("SUPABASE_URL")
+        self.supabase_key = supabase_key or os.getenv("SUPABASE_KEY")
+        if client is None and (not self.supabase_url or not self.supabase_key):
+            raise ValueError(
+                "Supabase URL and key must be provided either as arguments or environment variables."
+            )
+        self.client = client
+        self.last_bytes_sent = 0
+        if local_index is None and os.getenv("LOCAL_INDEX_DIR"):
+            local_index = LocalVectorIndex(os.getenv("LOCAL_INDEX_DIR"))
+        self.local_index = local_index
+
+    async def get_client(self) -> Any:
+        """The injected client or the shared one (created once)."""
+        if self.client is not None:
+            return self.client
+        return await get_async_client(self.supabase_url, self.supabase_key)
+
+    async def _execute(self, operation: str, request):
+        """
+        Await a PostgREST request and record duration, rows and bytes sent.
+
+        Same metric labels as ``SupabaseClient._execute``.
+        """
+        start = time.perf_counter()
+        try:
+            with count_bytes_sent() as sent:
+                if self.client is None:
+                    response = await run_async(request.execute())
+                else:
+                    response = await request.execute()
+        except Exception:
+            self._record(operation, start)
+            raise
+        self._record(operation, start, response, sent[0])
+        return response
+
+    async def _run(self, operation: Callable[..., Steps], *args, **kwargs) -> Any:
+        """Run a ``database.queries`` operation, awaiting each request."""
+        steps = operation(await self.get_client(), *args, **kwargs)
+        return await arun_steps(steps, self._execute)
+
+    async def with_document_metadata(
+        self, rows: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Merge the document-level metadata into chunk rows (in place)."""
+        return await self._run(self._document_metadata, rows)
+
+    async def search_documents(
+        self,
+        query_embedding: List[float],
+        match_threshold: Optional[float] = None,
+        match_count: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Vector search via ``match_rag_pages``; see ``SupabaseClient``."""
+        return await self._run(
+            self._search_documents,
+            query_embedding,
+            match_threshold,
+            match_count,
+            filter_metadata,
+            ef_search,
+            probes,
+        )
+
+    async def search_document_scores(
+        self,
+        query_embedding: List[float],
+        match_count: int = 50,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        match_threshold: Optional[float] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Phase 1 of two-phase retrieval: ids and similarities only."""
+        return await self._run(
+            self._search_document_scores,
+            query_embedding,
+            match_count,
+            filter_metadata,
+            match_threshold,
+            ef_search,
+        )
+
+    async def keyword_search_scores(
+        self,
+        query: str,
+        match_count: int = 50,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Phase 1 of two-phase retrieval: keyword ids and ranks only."""
+        return await self._run(
+            self._keyword_search_scores, query, match_count, filter_metadata
+        )
+
+    async def fetch_chunks(self, ids: List[int]) -> List[Dict[str, Any]]:
+        """Phase 2 of two-phase retrieval: the winning chunks in ``ids`` order."""
+        return await self._run(self._fetch_chunks, ids)
+
+    async def hybrid_search_documents(
+        self,
+        query: str,
+        query_embedding: List[float],
+        match_count: int = 10,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        candidate_count: int = 50,
+        rrf_k: int = 60,
+        ef_search: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Server-side RRF of vector and full-text search; see ``SupabaseClient``."""
+        return await self._run(
+            self._hybrid_search_documents,
+            query,
+            query_embedding,
+            match_count,
+            filter_metadata,
+            candidate_count,
+            rrf_k,
+            ef_search,
+        )
+
+    async def keyword_search_documents(
+        self,
+        query: str,
+        match_count: int = 20,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Full-text search via ``keyword_search_rag_pages``."""
+        return await self._run(
+            self._keyword_search_documents, query, match_count, filter_metadata
+        )
+
+    async def store_document_chunks(self, rows: List[Dict[str, Any]]) -> int:
+        """Insert many chunks in one request without reading them back."""
+        return await self._run(self._store_document_chunks, rows)
+
+    async def delete_documents(self, urls: List[str]) -> Dict[str, int]:
+        """Delete documents by url in one RPC; see ``SupabaseClient``."""
+        return await self._run(self._delete_documents, urls)
+
+    async def delete_documents_by_filename(self, filename: str) -> int:
+        """Delete all chunks of ``url == filename``; returns the deleted count."""
+        return await self._run(self._delete_documents_by_filename, filename)
+
+    async def iter_rows(
+        self,
+        table: str = "rag_pages",
+        columns: str = "id,url",
+        filters: Optional[Dict[str, Any]] = None,
+        key: str = "id",
+        page_size: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a table in ``key``-ordered pages; see ``SupabaseClient.iter_rows``."""
+        projection = rows_projection(columns, key)
+        last = None
+        while True:
+            rows = await self._run(
+                self._rows_page, table, projection, filters, key, last, page_size
+            )
+            if not rows:
+                return
+            for row in rows:
+                yield row
+            last = rows[-1][key]
+
+    async def get_corpus_version(self) -> Optional[int]:
+        """Current corpus version; see ``database.corpus_version``."""
+        return await self._run(self._corpus_version)
+
+    async def get_all_document_sources(self) -> List[str]:
+        """
+        Urls of all documents, read from the ``documents`` catalog.
+
+        Falls back to scanning ``rag_pages`` only if the catalog is unavailable.
+        """
+        return await self._run(self._document_sources)
+
+
+def default_client() -> Union[AsyncSupabaseClient, SupabaseClient]:
+    """
+    Client for code running in an event loop.
+
+    ``AsyncSupabaseClient`` for PostgREST. With DATABASE_BACKEND=postgres the
+    sync ``SupabaseClient`` is returned: its asyncpg pool already runs on a
+    private event loop, and callers run it in a worker thread.
+    """
+    if os.getenv("DATABASE_BACKEND", "postgrest").lower() == "postgres":
+        return SupabaseClient()
+    return AsyncSupabaseClient()
@@ -0,0 +1,356 @@
+"""
+Process-wide registry of Supabase clients.
+
+All Supabase traffic of the process (PostgREST, storage, every API key) goes
+through one keep-alive ``httpx.Client``, using HTTP/2 when the ``h2``
+package is installed. On top of it there is one supabase ``Client`` per
+credential set (url, key), so modules asking for the same credentials share
+the client instead of each opening a pool and repeating TLS handshakes.
+Async clients share one ``httpx.AsyncClient`` that lives on a long-lived
+event loop in a daemon thread (``io_loop``); ``run_async`` awaits requests
+on it from any other loop, so callers that start a new loop per run
+(Streamlit reruns with ``asyncio.run``) still reuse the pool.
+
+    from database.client_registry import get_client, pool_stats
+
+    client = get_client()              # SUPABASE_URL / SUPABASE_KEY
+    admin = get_client(key=os.getenv("SUPABASE_SERVICE_ROLE_KEY"))
+"""
+
+import os
+import sys
+import asyncio
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, Iterator, List, Optional, Tuple
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.metrics import registry as metrics
+
+_lock = threading.Lock()
+_http: Optional[Any] = None
+_clients: Dict[Tuple[str, str], Any] = {}
+# Async clients and their pool; only touched on the io_loop thread
+_io_loop: Optional[asyncio.AbstractEventLoop] = None
+_async_http: Optional[Any] = None
+_async_clients: Dict[Tuple[str, str], Any] = {}
+_requests = {"sent": 0, "in_flight": 0}
+# Byte counter of the active ``count_bytes_sent`` block (per thread / task)
+_bytes_sent: ContextVar[Optional[List[int]]] = ContextVar(
+    "supabase_bytes_sent", default=None
+)
+
+
+def _credentials(url: Optional[str], key: Optional[str]) -> Tuple[str, str]:
+    url = url or os.getenv("SUPABASE_URL")
+    key = key or os.getenv("SUPABASE_KEY")
+    if not url or not key:
+        raise ValueError(
+            "Supabase URL and key must be provided either as arguments or environment variables."
+        )
+    return url, key
+
+
+def http2_enabled() -> bool:
+    """HTTP/2 unless SUPABASE_HTTP2=0 or the ``h2`` package is missing."""
+    if os.getenv("SUPABASE_HTTP2", "1").lower() in ("0", "false", "no"):
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _transport_options() -> Dict[str, Any]:
+    import httpx
+
+    max_connections = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+    return {
+        "http2": http2_enabled(),
+        "limits": httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=float(os.getenv("SUPABASE_KEEPALIVE_SECONDS", "60")),
+        ),
+    }
+
+
+def _http_options() -> Dict[str, Any]:
+    import httpx
+
+    return {
+        "timeout": httpx.Timeout(120.0, connect=10.0),
+        "follow_redirects": True,
+    }
+
+
+def _count_in_flight(delta: int) -> None:
+    with _lock:
+        _requests["in_flight"] += delta
+
+
+class _InFlightTransport:
+    """
+    httpx transport wrapper counting requests that await their response.
+
+    Reason: unlike the response hook, ``finally`` also runs when a request
+    fails (timeout, connect error, reset), so the count cannot drift.
+    """
+
+    def __init__(self, transport: Any):
+        self.transport = transport
+
+    @property
+    def _pool(self) -> Any:
+        return getattr(self.transport, "_pool", None)
+
+    def handle_request(self, request):
+        _count_in_flight(1)
+        try:
+            return self.transport.handle_request(request)
+        finally:
+            _count_in_flight(-1)
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class _AsyncInFlightTransport(_InFlightTransport):
+    """``_InFlightTransport`` for ``httpx.AsyncClient``."""
+
+    async def handle_async_request(self, request):
+        _count_in_flight(1)
+        try:
+            return await self.transport.handle_async_request(request)
+        finally:
+            _count_in_flight(-1)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+@contextmanager
+def count_bytes_sent() -> Iterator[List[int]]:
+    """
+    Count the request body bytes sent by the current thread or task.
+
+    Reason: httpx has already encoded the body, so its length is free to
+    read, unlike serializing the payload a second time.
+
+    Yields:
+        One-element list holding the byte count
+    """
+    counter = [0]
+    token = _bytes_sent.set(counter)
+    try:
+        yield counter
+    finally:
+        _bytes_sent.reset(token)
+
+
+def note_bytes_sent(size: int) -> None:
+    """Add ``size`` to the active ``count_bytes_sent`` block (no-op outside)."""
+    counter = _bytes_sent.get()
+    if counter is not None:
+        counter[0] += size
+
+
+def _on_request(request) -> None:
+    note_bytes_sent(int(request.headers.get("content-length") or 0))
+    with _lock:
+        _requests["sent"] += 1
+    metrics.inc("rag_http_requests_total", host=request.url.host)
+
+
+async def _on_request_async(request) -> None:
+    _on_request(request)
+
+
+def http_client() -> Any:
+    """The shared keep-alive ``httpx.Client`` (created on first use)."""
+    global _http
+    with _lock:
+        if _http is None:
+            import httpx
+
+            _http = httpx.Client(
+                transport=_InFlightTransport(
+                    httpx.HTTPTransport(**_transport_options())
+                ),
+                event_hooks={"request": [_on_request]},
+                **_http_options(),
+            )
+        return _http
+
+
+def get_client(url: Optional[str] = None, key: Optional[str] = None) -> Any:
+    """
+    Shared supabase client for a credential set.
+
+    Args:
+        url: Supabase URL (defaults to SUPABASE_URL)
+        key: API key (defaults to SUPABASE_KEY)
+
+    Returns:
+        The same ``supabase.Client`` for every call with these credentials
+    """
+    credentials = _credentials(url, key)
+    client = _clients.get(credentials)
+    if client is None:
+        from supabase import ClientOptions, create_client
+
+        http = http_client()
+        with _lock:
+            client = _clients.get(credentials)
+            if client is None:
+                client = create_client(*credentials, ClientOptions(httpx_client=http))
+                _clients[credentials] = client
+    return client
+
+
+def io_loop() -> asyncio.AbstractEventLoop:
+    """
+    The event loop all async Supabase requests run on (created on first use).
+
+    Reason: httpx pools are bound to the loop they were created on; a pool on
+    a short-lived loop is never reused and leaks its connections until GC.
+    """
+    global _io_loop
+    with _lock:
+        if _io_loop is None:
+            _io_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_io_loop.run_forever, name="supabase-io", daemon=True
+            ).start()
+        return _io_loop
+
+
+async def _counted(coroutine: Awaitable[Any], counter: Optional[List[int]]) -> Any:
+    # Reason: the io_loop task does not inherit the caller's context
+    token = _bytes_sent.set(counter)
+    try:
+        return await coroutine
+    finally:
+        _bytes_sent.reset(token)
+
+
+async def run_async(coroutine: Awaitable[Any]) -> Any:
+    """
+    Await ``coroutine`` on ``io_loop()`` from the running event loop.
+
+    Cancelling the caller (e.g. a retrieval stage timeout) cancels the
+    request too; bytes sent count towards the caller's ``count_bytes_sent``.
+    """
+    future = asyncio.run_coroutine_threadsafe(
+        _counted(coroutine, _bytes_sent.get()), io_loop()
+    )
+    return await asyncio.wrap_future(future)
+
+
+async def _create_async_client(credentials: Tuple[str, str]) -> Any:
+    global _async_http
+    client = _async_clients.get(credentials)
+    if client is None:
+        import httpx
+        from supabase import AsyncClientOptions, acreate_client
+
+        if _async_http is None:
+            _async_http = httpx.AsyncClient(
+                transport=_AsyncInFlightTransport(
+                    httpx.AsyncHTTPTransport(**_transport_options())
+                ),
+                event_hooks={"request": [_on_request_async]},
+                **_http_options(),
+            )
+        client = await acreate_client(
+            *credentials, AsyncClientOptions(httpx_client=_async_http)
+        )
+        _async_clients[credentials] = client
+    return client
+
+
+async def get_async_client(url: Optional[str] = None, key: Optional[str] = None) -> Any:
+    """
+    Shared async supabase client for a credential set.
+
+    Its requests must be awaited through ``run_async``, since the client is
+    bound to ``io_loop()``.
+    """
+    credentials = _credentials(url, key)
+    client = _async_clients.get(credentials)
+    if client is None:
+        client = await run_async(_create_async_client(credentials))
+    return client
+
+
+def register(client: Any, url: Optional[str] = None, key: Optional[str] = None):
+    """Use ``client`` for a credential set, e.g. ``LocalSupabaseClient``."""
+    with _lock:
+        _clients[_credentials(url, key)] = client
+
+
+async def _close_async() -> None:
+    global _async_http
+    if _async_http is not None:
+        await _async_http.aclose()
+    _async_http = None
+    _async_clients.clear()
+
+
+def reset() -> None:
+    """Close the shared HTTP pools and forget all clients (tests, forks)."""
+    global _http
+    if _io_loop is not None:
+        asyncio.run_coroutine_threadsafe(_close_async(), _io_loop).result()
+    with _lock:
+        if _http is not None:
+            _http.close()
+        _http = None
+        _clients.clear()
+        _requests.update(sent=0, in_flight=0)
+
+
+def _connections(http: Any) -> Dict[str, int]:
+    # Reason: httpx exposes no public pool API; httpcore's pool is stable
+    pool = getattr(getattr(http, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []))
+    idle = sum(1 for c in connections if c.is_idle())
+    http2 = sum(1 for c in connections if "HTTP/2" in c.info())
+    return {
+        "open": len(connections),
+        "idle": idle,
+        "active": len(connections) - idle,
+        "http2": http2,
+    }
+
+
+def pool_stats() -> Dict[str, Any]:
+    """
+    Connection pool statistics of the shared clients.
+
+    Returns:
+        Clients per credential set, request counts and the open, idle,
+        active and HTTP/2 connections of the sync and the async pool
+    """
+    with _lock:
+        requests = dict(_requests)
+        http = _http
+        clients = len(_clients)
+    empty = {"open": 0, "idle": 0, "active": 0, "http2": 0}
+    async_http = _async_http
+    return {
+        "clients": clients,
+        "async_clients": len(_async_clients),
+        "http2_enabled": http2_enabled(),
+        "max_connections": int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20")),
+        "requests": requests["sent"],
+        "in_flight": requests["in_flight"],
+        "connections": _connections(http) if http is not None else empty,
+        "async_connections": (
+            _connections(async_http) if async_http is not None else empty
+        ),
+    }
@@ -0,0 +1,70 @@
+"""
+Corpus version: a counter bumped by every statement that changes ``rag_pages``.
+
+The ``corpus_version`` table holds a single row; a statement-level trigger
+increments it on insert, update, delete and truncate, in the same transaction
+as the change. Caches of retrieval results store the version they were built
+for and are stale as soon as it moves. ``CorpusVersion`` remembers the last
+read value for CORPUS_VERSION_INTERVAL seconds, so a cache hit costs no
+request at all; writes through this process are seen immediately.
+"""
+
+import os
+import time
+import threading
+from typing import Any, Optional
+
+CORPUS_VERSION_TABLE = "corpus_version"
+
+_local_writes = 0
+_local_writes_lock = threading.Lock()
+
+
+def note_local_write() -> None:
+    """Record that this process changed ``rag_pages`` (forces a re-read)."""
+    global _local_writes
+    with _local_writes_lock:
+        _local_writes += 1
+
+
+def local_writes() -> int:
+    return _local_writes
+
+
+def version_from_response(data: Any) -> Optional[int]:
+    """Version of a ``select version from corpus_version`` response."""
+    if not data:
+        return None
+    return int(data[0]["version"])
+
+
+class CorpusVersion:
+    """
+    Throttled view of the database's corpus version.
+
+    Args:
+        interval: Seconds a read version is trusted (CORPUS_VERSION_INTERVAL, 5)
+    """
+
+    def __init__(self, interval: Optional[float] = None):
+        if interval is None:
+            interval = float(os.getenv("CORPUS_VERSION_INTERVAL", "5"))
+        self.interval = interval
+        self.version: Optional[int] = None
+        self.checked_at = 0.0
+        self.seen_writes = local_writes()
+
+    def cached(self) -> Optional[int]:
+        """The last read version if it is still trusted, else None."""
+        if self.version is None or self.seen_writes != local_writes():
+            return None
+        if time.monotonic() - self.checked_at > self.interval:
+            return None
+        return self.version
+
+    def update(self, version: Optional[int]) -> Optional[int]:
+        """Remember a freshly read version (None: the read failed)."""
+        self.seen_writes = local_writes()
+        self.checked_at = time.monotonic()
+        self.version = version
+        return version
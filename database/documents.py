@@ -0,0 +1,265 @@
+"""
+Document-level lookups for ``SupabaseClient``.
+
+A document is all ``rag_pages`` chunks sharing one ``url``. The ``documents``
+table holds one row per document with the document-level metadata (filename,
+hash, signed URL, ...) stored once; chunks reference it via ``document_id``
+and carry only chunk fields. Listing, counting and duplicate checks read the
+catalog instead of de-duplicating chunks in Python; table-wide reads stream
+through ``iter_rows``.
+"""
+
+import re
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Rows per request when streaming a table (PostgREST caps responses)
+ROWS_PAGE_SIZE = 1000
+
+# Metadata keys stored on each chunk; everything except ``page`` is
+# document-level. ``source`` is kept on both because the search functions
+# filter chunks on it.
+CHUNK_METADATA_KEYS = ("source", "page")
+
+# Document metadata entries kept in memory for resolving search hits
+DOCUMENT_CACHE_SIZE = 2048
+
+
+def split_metadata(
+    metadata: Dict[str, Any],
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Split ingestion metadata into document-level and chunk-level parts.
+
+    Returns:
+        ``(document_metadata, chunk_metadata)``
+    """
+    document = {k: v for k, v in metadata.items() if k != "page"}
+    chunk = {k: metadata[k] for k in CHUNK_METADATA_KEYS if k in metadata}
+    return document, chunk
+
+
+def delete_counts(data: Optional[List[Dict[str, Any]]]) -> Dict[str, int]:
+    """Counts of a ``delete_documents`` RPC response."""
+    row = (data or [{}])[0]
+    return {
+        "documents": int(row.get("documents_deleted") or 0),
+        "chunks": int(row.get("chunks_deleted") or 0),
+    }
+
+
+def rows_projection(columns: str, key: str) -> str:
+    """``columns`` with the paging ``key`` of ``iter_rows`` added if missing."""
+    names = [c.strip() for c in columns.split(",")]
+    return columns if key in names else f"{key},{columns}"
+
+
+class DocumentMetadataCache:
+    """
+    Bounded id -> document metadata cache used to resolve chunk rows.
+
+    Oldest entries are evicted first; document metadata rarely changes.
+    """
+
+    def __init__(self, size: Optional[int] = None):
+        self.size = size or DOCUMENT_CACHE_SIZE
+        self.entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+
+    def missing(self, rows: List[Dict[str, Any]]) -> List[int]:
+        """Document ids referenced by ``rows`` that are not cached yet."""
+        ids = {r["document_id"] for r in rows if r.get("document_id") is not None}
+        return [i for i in ids if i not in self.entries]
+
+    def add(self, documents: Optional[List[Dict[str, Any]]]) -> None:
+        """Cache ``{"id", "metadata"}`` rows."""
+        for document in documents or []:
+            self.entries[document["id"]] = document.get("metadata") or {}
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def merge(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Merge cached document metadata into ``rows`` (chunk keys win)."""
+        for row in rows:
+            document = self.entries.get(row.get("document_id"))
+            if document is not None:
+                row["metadata"] = {**document, **(row.get("metadata") or {})}
+        return rows
+
+
+class DocumentCatalogMixin:
+    """
+    Document catalog methods; expects ``self.client``, ``self._execute`` and
+    ``self._run`` with the operations of ``database.queries.QueryOperations``.
+    """
+
+    def _exists(self, operation: str, request) -> bool:
+        return bool(self._execute(operation, request.limit(1)).data)
+
+    def has_file_hash(self, file_hash: str) -> bool:
+        """
+        Check whether a file with this SHA-256 was already ingested.
+
+        Uses the indexed ``documents.file_hash`` column, so the check stays
+        constant-time as the table grows.
+        """
+        query = self.client.table("documents").select("id").eq("file_hash", file_hash)
+        return self._exists("has_file_hash", query)
+
+    def has_url(self, url: str) -> bool:
+        """Check whether a document with exactly this ``url`` exists."""
+        query = self.client.table("documents").select("id").eq("url", url)
+        return self._exists("has_url", query)
+
+    def has_url_prefix(self, prefix: str) -> bool:
+        """
+        Check whether any document ``url`` starts with ``prefix``, ignoring case.
+
+        LIKE wildcards in the prefix are escaped. The Postgres backend runs
+        the ``ilike`` as ``lower(url) like lower(...)``, served by the
+        ``lower(url) text_pattern_ops`` index.
+        """
+        escaped = re.sub(r"([\\%_])", r"\\\1", prefix)
+        query = self.client.table("documents").select("id").ilike("url", f"{escaped}%")
+        return self._exists("has_url_prefix", query)
+
+    def upsert_document(self, url: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Create or update the document row that chunks of ``url`` reference.
+
+        Args:
+            url: Document url (same as the chunks' ``url``)
+            metadata: Document-level metadata, stored once
+
+        Returns:
+            The document row including its ``id``
+        """
+        row = {
+            "url": url,
+            "source": metadata.get("source"),
+            "source_filter": metadata.get("source_filter"),
+            "original_filename": metadata.get("original_filename"),
+            "file_hash": metadata.get("file_hash"),
+            "metadata": metadata,
+        }
+        result = self._execute(
+            "upsert_document",
+            self.client.table("documents").upsert(row, on_conflict="url"),
+        )
+        document = result.data[0] if result.data else {}
+        if document.get("id") is not None:
+            self._document_cache().add([{"id": document["id"], "metadata": metadata}])
+        return document
+
+    def delete_empty_document(self, document_id: int) -> None:
+        """
+        Delete a document row that has no chunks, e.g. after all inserts failed.
+
+        Reason: the row carries url and file hash, so an orphan would make
+        ``has_url``/``has_file_hash`` reject the re-upload.
+        """
+        self._execute(
+            "delete_empty_document",
+            self.client.table("documents")
+            .delete()
+            .eq("id", document_id)
+            .eq("chunk_count", 0),
+        )
+
+    def with_document_metadata(
+        self, rows: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Merge the document-level metadata into chunk rows (in place).
+
+        Documents are loaded in one query for all ids not yet cached; chunk
+        keys win over document keys. Rows without ``document_id`` (written
+        before the split) already carry the full metadata.
+
+        Args:
+            rows: Chunks with ``metadata`` and ``document_id``
+
+        Returns:
+            The same rows
+        """
+        return self._run(self._document_metadata, rows)
+
+    def iter_rows(
+        self,
+        table: str = "rag_pages",
+        columns: str = "id,url",
+        filters: Optional[Dict[str, Any]] = None,
+        key: str = "id",
+        page_size: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream all rows of a table in ``key``-ordered pages (keyset pagination).
+
+        Every page is a ``key > last_seen`` query on an indexed, unique column,
+        so memory stays flat and late pages cost the same as early ones. The
+        scan only stops at an empty page: a PostgREST ``max-rows`` cap below
+        ``page_size`` shortens pages but never truncates the result.
+
+        Args:
+            table: Table to read
+            columns: Projection; ``key`` is added if missing
+            filters: Column equality filters (lists become ``in``)
+            key: Unique, ordered column to page on
+            page_size: Rows per request (defaults to ROWS_PAGE_SIZE)
+
+        Yields:
+            Rows in ``key`` order
+        """
+        projection = rows_projection(columns, key)
+        last = None
+        while True:
+            rows = self._run(
+                self._rows_page, table, projection, filters, key, last, page_size
+            )
+            if not rows:
+                return
+            yield from rows
+            last = rows[-1][key]
+
+    def list_documents(
+        self,
+        sources: Optional[Iterable[str]] = None,
+        columns: str = "url,source,original_filename,chunk_count,content_bytes",
+    ) -> List[Dict[str, Any]]:
+        """
+        List documents from the ``documents`` catalog, ordered by url.
+
+        Args:
+            sources: Only documents with one of these ``source`` values
+            columns: Columns to select
+
+        Returns:
+            One dict per document, all pages fetched
+        """
+        filters = {"source": list(sources)} if sources is not None else None
+        return list(self.iter_rows("documents", columns, filters, key="url"))
+
+    def _scan_chunk_urls(self) -> Set[str]:
+        return {row["url"] for row in self.iter_rows("rag_pages", "id,url")}
+
+    def get_all_document_sources(self) -> List[str]:
+        """
+        Urls of all documents, read from the ``documents`` catalog.
+
+        Falls back to scanning ``rag_pages`` only if the catalog is unavailable.
+        """
+        return self._run(self._document_sources)
+
+    def get_corpus_version(self) -> Optional[int]:
+        """Current corpus version; see ``database.corpus_version``."""
+        return self._run(self._corpus_version)
+
+    def count_documents(self) -> int:
+        try:
+            result = self._execute(
+                "count_documents",
+                self.client.table("documents").select("url", count="exact").limit(1),
+            )
+            return result.count or 0
+        except Exception as e:
+            print(f"⚠️ Tabelle documents nicht verfügbar, lese rag_pages: {e}")
+            return len(self._scan_chunk_urls())
@@ -0,0 +1,480 @@
+"""
+In-process replica of the ``rag_pages`` embeddings for local vector search.
+
+The index lives in a directory of flat files that one sync process appends to
+and any number of Streamlit/agent processes memory-map read-only, so the OS
+page cache holds a single copy of the matrix:
+
+    meta.json     dim, dtype, published row count, watermarks, tombstones
+    vectors.bin   normalized embeddings, float32 or int8 (row-major)
+    scales.bin    per-row dequantization scale (int8 only)
+    ids.bin       rag_pages.id per row (int64)
+    lists.bin     IVF list per row (int32, after ``build-ivf``)
+    centroids.npy IVF centroids
+
+Rows are appended before ``meta.json`` is atomically replaced, so readers
+never see a partially written row.
+
+    python -m database.local_index sync --watch 30
+    python -m database.local_index build-ivf --lists 512
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.metrics import registry as metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: single writer is the caller's responsibility
+    fcntl = None
+
+DTYPES = {"float32": np.float32, "int8": np.int8}
+
+# Rows fetched per sync request and scored per matrix block
+SYNC_PAGE_SIZE = 1000
+SEARCH_BLOCK_ROWS = 65536
+
+# Reason: ids come from a sequence, but concurrent inserts can commit out of
+# id order; re-reading a short created_at window catches late commits
+SYNC_OVERLAP = timedelta(minutes=5)
+
+
+def _parse_embedding(value: Any) -> np.ndarray:
+    """PostgREST returns ``vector`` columns as ``"[0.1,...]"`` strings."""
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+class LocalVectorIndex:
+    """
+    Memory-mapped copy of the ``rag_pages`` embeddings with exact or IVF search.
+
+    Args:
+        directory: Index directory, created on first sync
+        dtype: ``float32`` or ``int8`` (4x smaller, ~1% score error); only used
+            when the index is created
+        max_age: Seconds after the last sync at which the index counts as
+            stale and searches should go to the database instead
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        dtype: Optional[str] = None,
+        max_age: Optional[float] = None,
+    ):
+        self.directory = Path(directory)
+        self.dtype = dtype or os.getenv("LOCAL_INDEX_DTYPE", "float32")
+        if self.dtype not in DTYPES:
+            raise ValueError(f"Unsupported index dtype: {self.dtype}")
+        self.max_age = (
+            max_age
+            if max_age is not None
+            else float(os.getenv("LOCAL_INDEX_MAX_AGE_SECONDS", "300"))
+        )
+        self.meta: Dict[str, Any] = {}
+        self._meta_mtime = None
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._deleted = np.empty(0, dtype=np.int64)
+
+    # -- reading -----------------------------------------------------------
+
+    def _path(self, name: str) -> Path:
+        return self.directory / name
+
+    def refresh(self) -> bool:
+        """
+        Re-map the files if another process published a new version.
+
+        Returns:
+            True if an index is available
+        """
+        meta_path = self._path("meta.json")
+        try:
+            mtime = meta_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self.meta, self._arrays = {}, {}
+            return False
+        if mtime == self._meta_mtime:
+            return bool(self.meta.get("count"))
+
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        count, dim = meta["count"], meta["dim"]
+        arrays = {}
+        if count:
+            arrays["vectors"] = self._map(
+                "vectors.bin", DTYPES[meta["dtype"]], count, dim
+            )
+            arrays["ids"] = self._map("ids.bin", np.int64, count)
+            if meta["dtype"] == "int8":
+                arrays["scales"] = self._map("scales.bin", np.float32, count)
+            if meta.get("ivf_rows"):
+                arrays["lists"] = self._map("lists.bin", np.int32, meta["ivf_rows"])
+                arrays["centroids"] = np.load(self._path("centroids.npy"))
+        self.meta, self._arrays, self._meta_mtime = meta, arrays, mtime
+        self._deleted = np.asarray(meta.get("deleted", []), dtype=np.int64)
+        return bool(count)
+
+    def _map(self, name: str, dtype, rows: int, dim: Optional[int] = None):
+        shape = (rows, dim) if dim else (rows,)
+        return np.memmap(self._path(name), dtype=dtype, mode="r", shape=shape)
+
+    def is_fresh(self) -> bool:
+        """True if an index exists and was synced within ``max_age`` seconds."""
+        if not self.refresh():
+            return False
+        return time.time() - self.meta.get("synced_at", 0) <= self.max_age
+
+    def _row_scores(self, rows: slice, query: np.ndarray, subset=None) -> np.ndarray:
+        vectors = self._arrays["vectors"][rows]
+        if subset is not None:
+            vectors = vectors[subset]
+        scores = vectors.astype(np.float32, copy=False) @ query
+        if "scales" in self._arrays:
+            scales = self._arrays["scales"][rows]
+            scores *= scales[subset] if subset is not None else scales
+        return scores
+
+    def search(
+        self,
+        query_embedding: List[float],
+        match_count: int = 10,
+        match_threshold: Optional[float] = None,
+        nprobe: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Top-k cosine search over the mapped matrix.
+
+        Args:
+            query_embedding: Query vector
+            match_count: Number of results
+            match_threshold: Minimum similarity
+            nprobe: IVF lists to scan (defaults to LOCAL_INDEX_NPROBE); rows
+                synced after ``build-ivf`` are always scanned exactly
+
+        Returns:
+            ``{"id", "similarity"}`` dicts, best first
+        """
+        start = time.perf_counter()
+        if not self.refresh():
+            return []
+        count = self.meta["count"]
+        query = _parse_embedding(query_embedding)
+        query /= np.linalg.norm(query) or 1.0
+
+        nprobe = nprobe or int(os.getenv("LOCAL_INDEX_NPROBE", "0"))
+        ivf_rows = self.meta.get("ivf_rows", 0) if nprobe else 0
+        positions, scores = [], []
+        if ivf_rows:
+            centroids = self._arrays["centroids"]
+            probe = np.argsort(-(centroids @ query))[:nprobe]
+            subset = np.flatnonzero(np.isin(self._arrays["lists"], probe))
+            positions.append(subset)
+            scores.append(self._row_scores(slice(0, ivf_rows), query, subset))
+        # Reason: score in blocks so int8 rows are never upcast all at once
+        for begin in range(ivf_rows, count, SEARCH_BLOCK_ROWS):
+            end = min(begin + SEARCH_BLOCK_ROWS, count)
+            positions.append(np.arange(begin, end))
+            scores.append(self._row_scores(slice(begin, end), query))
+
+        positions = np.concatenate(positions) if positions else np.empty(0, int)
+        scores = np.concatenate(scores) if scores else np.empty(0, np.float32)
+        ids = self._arrays["ids"][positions]
+        if self._deleted.size:
+            scores[np.isin(ids, self._deleted)] = -np.inf
+        if match_threshold is not None:
+            scores[scores < match_threshold] = -np.inf
+
+        k = min(match_count, scores.size)
+        top = np.argpartition(-scores, k - 1)[:k] if k else np.empty(0, int)
+        top = top[np.argsort(-scores[top])]
+        metrics.observe("rag_local_index_search_seconds", time.perf_counter() - start)
+        return [
+            {"id": int(ids[i]), "similarity": float(scores[i])}
+            for i in top
+            if np.isfinite(scores[i])
+        ]
+
+    # -- writing -----------------------------------------------------------
+
+    @contextlib.contextmanager
+    def _writer_lock(self) -> Iterator[None]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self._path(".lock"), "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _publish(self, meta: Dict[str, Any]) -> None:
+        tmp = self._path("meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._path("meta.json"))
+
+    def _append(self, name: str, array: np.ndarray, rows: int, row_bytes: int):
+        # Reason: drop rows written by a sync that crashed before publishing
+        with open(self._path(name), "ab") as f:
+            f.truncate(rows * row_bytes)
+            f.write(np.ascontiguousarray(array).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _append_rows(self, meta: Dict[str, Any], rows: List[Dict]) -> None:
+        matrix = np.stack([_parse_embedding(r["embedding"]) for r in rows])
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        count, dim = meta["count"], meta["dim"]
+        if meta["dtype"] == "int8":
+            scales = np.abs(matrix).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            quantized = np.round(matrix / scales[:, None]).astype(np.int8)
+            self._append("vectors.bin", quantized, count, dim)
+            self._append("scales.bin", scales.astype(np.float32), count, 4)
+        else:
+            self._append("vectors.bin", matrix, count, dim * 4)
+        self._append("ids.bin", np.asarray([r["id"] for r in rows], np.int64), count, 8)
+        meta["count"] += len(rows)
+
+    def sync(self, client: Any, page_size: int = SYNC_PAGE_SIZE) -> int:
+        """
+        Append rows inserted since the last sync.
+
+        Args:
+            client: Supabase client (or ``LocalSupabaseClient``)
+            page_size: Rows per request (keyset pagination on id)
+
+        Returns:
+            Number of rows added
+        """
+        with self._writer_lock():
+            self.refresh()
+            meta = dict(self.meta) or {
+                "dim": None,
+                "dtype": self.dtype,
+                "count": 0,
+                "last_created_at": None,
+                "deleted": [],
+            }
+            known = set(self._arrays["ids"].tolist()) if meta["count"] else set()
+            since = meta["last_created_at"]
+            if since:
+                since = (datetime.fromisoformat(since) - SYNC_OVERLAP).isoformat()
+
+            added, cursor = 0, 0
+            while True:
+                query = client.table("rag_pages").select("id,embedding,created_at")
+                if since:
+                    query = query.gte("created_at", since)
+                page = query.gt("id", cursor).order("id").limit(page_size).execute()
+                rows = page.data or []
+                if not rows:
+                    break
+                cursor = rows[-1]["id"]
+                new = [r for r in rows if r["id"] not in known and r.get("embedding")]
+                if new:
+                    meta["dim"] = meta["dim"] or len(
+                        _parse_embedding(new[0]["embedding"])
+                    )
+                    self._append_rows(meta, new)
+                    self._assign_lists(meta, new)
+                    added += len(new)
+                latest = max(r["created_at"] for r in rows)
+                if not meta["last_created_at"] or latest > meta["last_created_at"]:
+                    meta["last_created_at"] = latest
+                if len(rows) < page_size:
+                    break
+
+            meta["synced_at"] = time.time()
+            self._publish(meta)
+        metrics.inc("rag_local_index_rows_synced_total", added)
+        return added
+
+    def reconcile(self, client: Any, page_size: int = SYNC_PAGE_SIZE) -> int:
+        """
+        Tombstone rows that were deleted from ``rag_pages``.
+
+        Search results are hydrated from the database, so deleted chunks never
+        surface with content; this only keeps them from taking top-k slots.
+
+        Returns:
+            Number of newly tombstoned rows
+        """
+        with self._writer_lock():
+            if not self.refresh():
+                return 0
+            live, cursor = set(), 0
+            while True:
+                page = (
+                    client.table("rag_pages")
+                    .select("id")
+                    .gt("id", cursor)
+                    .order("id")
+                    .limit(page_size)
+                    .execute()
+                )
+                rows = page.data or []
+                live.update(r["id"] for r in rows)
+                if len(rows) < page_size:
+                    break
+                cursor = rows[-1]["id"]
+            deleted = set(self.meta.get("deleted", []))
+            gone = set(self._arrays["ids"].tolist()) - live - deleted
+            self._publish({**self.meta, "deleted": sorted(deleted | gone)})
+        return len(gone)
+
+    def _assign_lists(self, meta: Dict[str, Any], rows: List[Dict]) -> None:
+        """Keep IVF lists current only while they cover every row."""
+        if meta.get("ivf_rows") == meta["count"] - len(rows):
+            centroids = np.load(self._path("centroids.npy"))
+            matrix = np.stack([_parse_embedding(r["embedding"]) for r in rows])
+            lists = np.argmax(matrix @ centroids.T, axis=1).astype(np.int32)
+            self._append("lists.bin", lists, meta["ivf_rows"], 4)
+            meta["ivf_rows"] = meta["count"]
+
+    def build_ivf(
+        self, lists: Optional[int] = None, iterations: int = 10, seed: int = 0
+    ) -> int:
+        """
+        Train spherical k-means centroids and assign every row to a list.
+
+        Args:
+            lists: Number of lists, defaults to sqrt(rows)
+            iterations: k-means iterations
+            seed: Sampling seed
+
+        Returns:
+            Number of lists
+        """
+        with self._writer_lock():
+            if not self.refresh():
+                return 0
+            count = self.meta["count"]
+            lists = min(lists or max(1, int(np.sqrt(count))), count)
+            rng = np.random.default_rng(seed)
+            sample_rows = np.sort(rng.choice(count, min(count, 256 * lists), False))
+            sample = self._block(sample_rows)
+            centroids = sample[rng.choice(len(sample), lists, replace=False)]
+            for _ in range(iterations):
+                assignment = np.argmax(sample @ centroids.T, axis=1)
+                for c in range(lists):
+                    members = sample[assignment == c]
+                    if len(members):
+                        centroids[c] = members.mean(axis=0)
+                centroids /= np.maximum(
+                    np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12
+                )
+            # Reason: readers may have the old files mapped; write new files
+            # and rename them into place instead of rewriting in place
+            with open(self._path("centroids.tmp"), "wb") as f:
+                np.save(f, centroids.astype(np.float32))
+            with open(self._path("lists.tmp"), "wb") as f:
+                for begin in range(0, count, SEARCH_BLOCK_ROWS):
+                    end = min(begin + SEARCH_BLOCK_ROWS, count)
+                    block = self._block(np.arange(begin, end))
+                    assignment = np.argmax(block @ centroids.T, axis=1).astype(np.int32)
+                    f.write(assignment.tobytes())
+            os.replace(self._path("centroids.tmp"), self._path("centroids.npy"))
+            os.replace(self._path("lists.tmp"), self._path("lists.bin"))
+            self._publish({**self.meta, "ivf_rows": count})
+        return lists
+
+    def _block(self, positions: np.ndarray) -> np.ndarray:
+        """Dequantized float32 rows at the given positions."""
+        block = np.asarray(self._arrays["vectors"][positions], dtype=np.float32)
+        if "scales" in self._arrays:
+            block *= self._arrays["scales"][positions][:, None]
+        return block
+
+
+def local_scores(
+    index: Optional[LocalVectorIndex],
+    query_embedding: List[float],
+    match_count: int,
+    filter_metadata: Optional[Dict[str, Any]],
+    match_threshold: float,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Vector scores from the local index replica.
+
+    Returns:
+        ``{"id", "similarity"}`` dicts, or None if the search has to go to
+        the database (no or stale index, metadata filter, error)
+    """
+    if index is None:
+        return None
+    # Reason: the replica holds vectors only, metadata filters need SQL
+    if filter_metadata or not index.is_fresh():
+        metrics.inc("rag_local_index_fallbacks_total")
+        return None
+    try:
+        return index.search(
+            query_embedding, match_count, match_threshold=match_threshold
+        )
+    except Exception as e:
+        print(f"⚠️ Lokaler Index nicht verfügbar, nutze Supabase: {e}")
+        metrics.inc("rag_local_index_fallbacks_total")
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Local vector index replica")
+    parser.add_argument(
+        "--dir", default=os.getenv("LOCAL_INDEX_DIR", "data/local_index")
+    )
+    parser.add_argument("--dtype", choices=sorted(DTYPES))
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    sync = subparsers.add_parser("sync", help="Append new rag_pages rows")
+    sync.add_argument(
+        "--watch", type=float, default=0, help="Keep syncing every N seconds"
+    )
+    sync.add_argument(
+        "--reconcile-every",
+        type=int,
+        default=20,
+        help="With --watch: check for deleted rows every N syncs",
+    )
+    ivf = subparsers.add_parser("build-ivf", help="Train IVF lists")
+    ivf.add_argument("--lists", type=int)
+    args = parser.parse_args(argv)
+
+    index = LocalVectorIndex(args.dir, dtype=args.dtype)
+    if args.command == "build-ivf":
+        print(f"✅ IVF mit {index.build_ivf(args.lists)} Listen erstellt")
+        return
+
+    from database.setup import SupabaseClient
+
+    client = SupabaseClient().client
+    runs = 0
+    while True:
+        added = index.sync(client)
+        runs += 1
+        if args.watch and runs % args.reconcile_every == 0:
+            removed = index.reconcile(client)
+            if removed:
+                print(f"🧹 {removed} gelöschte Chunks aus dem Index entfernt")
+        if added:
+            print(f"✅ {added} Chunks in den lokalen Index übernommen")
+        if not args.watch:
+            break
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+In-process stand-in for the Supabase storage API (``client.storage``).
+
+Files are kept as bytes per bucket. ``upload``, ``download``, ``remove``,
+``list`` and ``create_signed_url`` return the same shapes as storage3, and
+failures raise ``LocalStorageError`` with the status code the API would send:
+
+    client = LocalSupabaseClient()
+    client.storage.from_("privatedocs").upload("a.pdf", b"%PDF...")
+"""
+
+import os
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+# Base of the signed URLs; they only identify the object, nothing serves them
+STORAGE_URL = "local://storage/v1"
+
+
+class LocalStorageError(Exception):
+    """Mimics storage3's ``StorageApiError`` (``message``, ``code``, ``status``)."""
+
+    def __init__(self, message: str, code: str, status: int):
+        super().__init__(
+            f"{{'statusCode': {status}, 'error': {code}, 'message': {message}}}"
+        )
+        self.message = message
+        self.code = code
+        self.status = status
+
+
+class LocalUploadResponse:
+    """Mimics storage3's ``UploadResponse``."""
+
+    def __init__(self, path: str, key: str):
+        self.path = path
+        self.full_path = key
+        self.fullPath = key
+
+
+def _read(file: Any) -> bytes:
+    """Bytes of an upload: bytes, a file object or a local file path."""
+    if isinstance(file, (bytes, bytearray)):
+        return bytes(file)
+    if isinstance(file, (str, os.PathLike)):
+        return Path(file).read_bytes()
+    return file.read()
+
+
+class LocalBucket:
+    """
+    File operations on one bucket of a ``LocalStorage``.
+    """
+
+    def __init__(self, storage: "LocalStorage", name: str):
+        self.storage = storage
+        self.id = name
+
+    @property
+    def files(self) -> Dict[str, bytes]:
+        return self.storage.buckets.setdefault(self.id, {})
+
+    def _missing(self, path: str) -> LocalStorageError:
+        return LocalStorageError(f"Object not found: {path}", "not_found", 404)
+
+    def upload(
+        self, path: str, file: Any, file_options: Optional[Dict[str, Any]] = None
+    ) -> LocalUploadResponse:
+        """Store a file; an existing path needs ``x-upsert: true``."""
+        options = file_options or {}
+        upsert = str(options.get("x-upsert", options.get("upsert", "false")))
+        data = _read(file)
+        with self.storage.lock:
+            if path in self.files and upsert.lower() != "true":
+                raise LocalStorageError("The resource already exists", "Duplicate", 409)
+            self.files[path] = data
+        return LocalUploadResponse(path, f"{self.id}/{path}")
+
+    def download(self, path: str, options: Optional[Dict[str, Any]] = None) -> bytes:
+        with self.storage.lock:
+            if path not in self.files:
+                raise self._missing(path)
+            return self.files[path]
+
+    def remove(self, paths: List[str]) -> List[Dict[str, Any]]:
+        """Delete files; like the API, missing paths are skipped silently."""
+        removed = []
+        with self.storage.lock:
+            for path in paths:
+                if self.files.pop(path, None) is not None:
+                    removed.append({"name": path, "bucket_id": self.id})
+        return removed
+
+    def list(
+        self, path: Optional[str] = None, options: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Files directly below ``path`` (folders are not listed)."""
+        prefix = f"{path.strip('/')}/" if path else ""
+        with self.storage.lock:
+            names = sorted(
+                name[len(prefix) :]
+                for name in self.files
+                if name.startswith(prefix) and "/" not in name[len(prefix) :]
+            )
+        return [{"name": name, "bucket_id": self.id} for name in names]
+
+    def create_signed_url(
+        self, path: str, expires_in: int, options: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, str]:
+        """Deterministic signed URL of an existing file."""
+        with self.storage.lock:
+            if path not in self.files:
+                raise self._missing(path)
+        token = hashlib.sha256(f"{self.id}/{path}:{expires_in}".encode()).hexdigest()
+        url = f"{STORAGE_URL}/object/sign/{self.id}/{quote(path)}?token={token[:32]}"
+        return {"signedURL": url, "signedUrl": url}
+
+
+class LocalStorage:
+    """
+    In-memory replacement for ``client.storage``; buckets exist on first use.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.buckets: Dict[str, Dict[str, bytes]] = {}
+
+    def from_(self, bucket: str) -> LocalBucket:
+        return LocalBucket(self, bucket)
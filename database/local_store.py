@@ -0,0 +1,549 @@
+"""
+In-process stand-in for the subset of the Supabase client used by this project.
+
+``LocalSupabaseClient`` keeps tables as lists of dicts and implements the
+PostgREST query builder calls and RPC functions our code relies on, so the real
+``SupabaseClient`` / ``DocumentIngestionPipeline`` code paths can run offline
+(benchmarks, tests). ``client.storage`` is a ``LocalStorage``:
+
+    client = SupabaseClient(client=LocalSupabaseClient())
+"""
+
+import os
+import re
+import sys
+import copy
+import json
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.client_registry import note_bytes_sent
+from database.local_storage import LocalStorage
+from database.routing import DEFAULT_COLLECTION
+
+# Same product codes as the SQL function product_codes(), e.g. 10W-40, 2-T, HLP 46
+PRODUCT_CODE_PATTERN = re.compile(
+    r"\b(\d{1,2}[Ww]-?\d{2,3}|\d-[Tt]|[A-Z]{2,5} ?\d{1,4})\b"
+)
+
+
+# Generated columns of rag_pages (typed copies of metadata keys)
+RAG_PAGES_GENERATED_COLUMNS = ("source",)
+
+# Typed documents columns the insert trigger fills from chunk metadata
+DOCUMENT_COLUMNS = ("source", "source_filter", "original_filename", "file_hash")
+
+# Columns returned by the search functions
+SEARCH_COLUMNS = ("id", "url", "chunk_number", "content", "metadata", "document_id")
+
+
+def _like_to_regex(pattern: str, flags: int = 0) -> "re.Pattern":
+    """Translate a SQL LIKE pattern (``%``, ``_``, backslash escapes)."""
+    parts, i = [], 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern):
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        elif char == "%":
+            parts.append(".*")
+        elif char == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return re.compile("".join(parts), re.DOTALL | flags)
+
+
+class LocalResponse:
+    """Mimics the PostgREST ``APIResponse`` (``data`` and ``count``)."""
+
+    def __init__(self, data: List[Dict[str, Any]], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+def _matches_filter(row: Dict[str, Any], filter: Optional[Dict[str, Any]]) -> bool:
+    """``collection`` matches the column, other keys ``metadata @> filter``."""
+    metadata = row.get("metadata") or {}
+    return all(
+        (row.get(k) if k == "collection" else metadata.get(k)) == v
+        for k, v in (filter or {}).items()
+    )
+
+
+def _contains(value: Any, expected: Any) -> bool:
+    """jsonb / array ``@>``: every key or element of ``expected`` is in ``value``."""
+    if isinstance(expected, dict):
+        return isinstance(value, dict) and all(
+            key in value and _contains(value[key], item)
+            for key, item in expected.items()
+        )
+    if isinstance(expected, (list, tuple, set)):
+        return isinstance(value, list) and all(
+            any(_contains(v, item) for v in value) for item in expected
+        )
+    return value == expected
+
+
+def _get_path(row: Dict[str, Any], column: str) -> Any:
+    """Resolve ``col``, ``col->key`` and ``col->>key`` column expressions."""
+    if "->>" in column:
+        base, key = column.split("->>", 1)
+        value = (row.get(base.strip()) or {}).get(key.strip())
+        return None if value is None else str(value)
+    if "->" in column:
+        base, key = column.split("->", 1)
+        return (row.get(base.strip()) or {}).get(key.strip())
+    return row.get(column)
+
+
+def _note_body(body: Any) -> None:
+    """Report the JSON body a real request would send (``bytes_sent``)."""
+    note_bytes_sent(len(json.dumps(body, separators=(",", ":"), default=str)))
+
+
+class LocalQuery:
+    """
+    Chainable query builder for one table of a ``LocalSupabaseClient``.
+    """
+
+    def __init__(self, store: "LocalSupabaseClient", table: str):
+        self.store = store
+        self.table_name = table
+        self._action = "select"
+        self._columns: Optional[List[str]] = None
+        self._rows: List[Dict[str, Any]] = []
+        self._filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self._limit: Optional[int] = None
+        self._order: Optional[tuple] = None
+        self._count: Optional[str] = None
+
+    def select(
+        self, *columns: str, count: Optional[str] = None, **kwargs
+    ) -> "LocalQuery":
+        self._action = "select"
+        self._count = count
+        names = [c.strip() for col in columns for c in col.split(",") if c.strip()]
+        self._columns = None if not names or "*" in names else names
+        return self
+
+    def insert(self, rows, **kwargs) -> "LocalQuery":
+        self._action = "insert"
+        self._rows = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, on_conflict: str = "id", **kwargs) -> "LocalQuery":
+        self._action = "upsert"
+        self._rows = rows if isinstance(rows, list) else [rows]
+        self._on_conflict = on_conflict
+        return self
+
+    def update(self, values: Dict[str, Any], **kwargs) -> "LocalQuery":
+        self._action = "update"
+        self._rows = [values]
+        return self
+
+    def delete(self, **kwargs) -> "LocalQuery":
+        self._action = "delete"
+        return self
+
+    def eq(self, column: str, value: Any) -> "LocalQuery":
+        expected = value if "->>" not in column else str(value)
+        self._filters.append(lambda row: _get_path(row, column) == expected)
+        return self
+
+    def in_(self, column: str, values) -> "LocalQuery":
+        allowed = list(values)
+        self._filters.append(lambda row: _get_path(row, column) in allowed)
+        return self
+
+    def like(self, column: str, pattern: str) -> "LocalQuery":
+        regex = _like_to_regex(pattern)
+        self._filters.append(
+            lambda row: regex.fullmatch(str(_get_path(row, column) or "")) is not None
+        )
+        return self
+
+    def ilike(self, column: str, pattern: str) -> "LocalQuery":
+        regex = _like_to_regex(pattern, re.IGNORECASE)
+        self._filters.append(
+            lambda row: regex.fullmatch(str(_get_path(row, column) or "")) is not None
+        )
+        return self
+
+    def contains(self, column: str, value: Any) -> "LocalQuery":
+        self._filters.append(lambda row: _contains(_get_path(row, column), value))
+        return self
+
+    def gt(self, column: str, value: Any) -> "LocalQuery":
+        self._filters.append(lambda row: _get_path(row, column) > value)
+        return self
+
+    def gte(self, column: str, value: Any) -> "LocalQuery":
+        self._filters.append(lambda row: _get_path(row, column) >= value)
+        return self
+
+    def order(self, column: str, desc: bool = False, **kwargs) -> "LocalQuery":
+        self._order = (column, desc)
+        return self
+
+    def limit(self, count: int) -> "LocalQuery":
+        self._limit = count
+        return self
+
+    def _project(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        if self._columns is None:
+            return copy.deepcopy(row)
+        return {c: copy.deepcopy(_get_path(row, c)) for c in self._columns}
+
+    def _matches(self, row: Dict[str, Any]) -> bool:
+        return all(check(row) for check in self._filters)
+
+    def execute(self) -> LocalResponse:
+        if self._action in ("insert", "upsert"):
+            _note_body(self._rows)
+        elif self._action == "update":
+            _note_body(self._rows[0])
+        with self.store.lock:
+            table = self.store.tables.setdefault(self.table_name, [])
+
+            if self._action == "insert":
+                inserted = [
+                    self.store._insert_row(self.table_name, r) for r in self._rows
+                ]
+                if self.table_name == "rag_pages":
+                    self.store._bump_corpus_version()
+                return LocalResponse(copy.deepcopy(inserted))
+
+            if self._action == "upsert":
+                upserted = []
+                for new in self._rows:
+                    key = new[self._on_conflict]
+                    row = next((r for r in table if r[self._on_conflict] == key), None)
+                    if row is None:
+                        row = self.store._insert_row(self.table_name, new)
+                    else:
+                        row.update(copy.deepcopy(new))
+                    upserted.append(row)
+                return LocalResponse(copy.deepcopy(upserted))
+
+            if self._action == "update":
+                updated = [row for row in table if self._matches(row)]
+                for row in updated:
+                    row.update(copy.deepcopy(self._rows[0]))
+                if self.table_name == "rag_pages":
+                    self.store._bump_corpus_version()
+                return LocalResponse(copy.deepcopy(updated))
+
+            if self._action == "delete":
+                deleted = [row for row in table if self._matches(row)]
+                table[:] = [row for row in table if not self._matches(row)]
+                if self.table_name == "rag_pages":
+                    self.store._documents_after_delete(deleted)
+                    self.store._bump_corpus_version()
+                return LocalResponse(copy.deepcopy(deleted))
+
+            rows = [row for row in table if self._matches(row)]
+            count = len(rows) if self._count else None
+            if self._order is not None:
+                column, desc = self._order
+                rows.sort(key=lambda row: _get_path(row, column), reverse=desc)
+            rows = [self._project(row) for row in rows]
+            # Reason: PostgREST caps every response at max-rows
+            for cap in (self._limit, self.store.max_rows):
+                if cap is not None:
+                    rows = rows[:cap]
+            return LocalResponse(rows, count)
+
+
+class LocalRPC:
+    """Deferred RPC call, executed like a PostgREST RPC builder."""
+
+    def __init__(self, func: Callable[..., List[Dict[str, Any]]], params: Dict):
+        self.func = func
+        self.params = params
+
+    def execute(self) -> LocalResponse:
+        _note_body(self.params)
+        return LocalResponse(self.func(**self.params))
+
+
+class LocalSupabaseClient:
+    """
+    In-memory replacement for ``supabase.create_client(...)``.
+
+    Tables are created on first use; ``id`` (bigserial) and ``created_at`` are
+    filled in on insert like the real ``rag_pages`` table does, and the
+    ``documents`` catalog is maintained like the SQL triggers do. ``max_rows``
+    mimics the PostgREST response cap.
+    """
+
+    def __init__(self, max_rows: Optional[int] = None):
+        self.lock = threading.RLock()
+        self.max_rows = max_rows
+        self.tables: Dict[str, List[Dict[str, Any]]] = {
+            "corpus_version": [{"id": 1, "version": 0}]
+        }
+        self._next_id: Dict[str, int] = {}
+        self.functions: Dict[str, Callable[..., List[Dict[str, Any]]]] = {
+            "match_rag_pages": self._match_rag_pages,
+            "match_rag_page_scores": self._match_rag_page_scores,
+            "keyword_search_rag_pages": self._keyword_search_rag_pages,
+            "keyword_rag_page_scores": self._keyword_rag_page_scores,
+            "hybrid_search_rag_pages": self._hybrid_search_rag_pages,
+            "delete_documents": self._delete_documents,
+        }
+        self.storage = LocalStorage()
+
+    def _insert_row(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        row = copy.deepcopy(row)
+        if "id" not in row:
+            self._next_id[table] = self._next_id.get(table, 0) + 1
+            row["id"] = self._next_id[table]
+        row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+        if table == "rag_pages":
+            row.setdefault("metadata", {})
+            row.setdefault("collection", DEFAULT_COLLECTION)
+            for column in RAG_PAGES_GENERATED_COLUMNS:
+                value = row["metadata"].get(column)
+                row[column] = None if value is None else str(value)
+            self._documents_after_insert(row)
+        elif table == "documents":
+            for column in ("chunk_count", "content_bytes"):
+                row.setdefault(column, 0)
+            row.setdefault("metadata", {})
+        self.tables.setdefault(table, []).append(row)
+        return row
+
+    def _bump_corpus_version(self) -> None:
+        self.tables["corpus_version"][0]["version"] += 1
+
+    def _document(self, url: str) -> Optional[Dict[str, Any]]:
+        documents = self.tables.setdefault("documents", [])
+        return next((d for d in documents if d["url"] == url), None)
+
+    def _documents_after_insert(self, chunk: Dict[str, Any]) -> None:
+        document = self._document(chunk["url"])
+        if document is None:
+            document = self._insert_row(
+                "documents",
+                {
+                    "url": chunk["url"],
+                    "metadata": {},
+                    "created_at": chunk["created_at"],
+                },
+            )
+        for column in DOCUMENT_COLUMNS:
+            if document.get(column) is None:
+                document[column] = chunk["metadata"].get(column)
+        document["chunk_count"] += 1
+        document["content_bytes"] += len(chunk.get("content", "").encode("utf-8"))
+
+    def _documents_after_delete(self, chunks: List[Dict[str, Any]]) -> None:
+        for chunk in chunks:
+            document = self._document(chunk["url"])
+            if document is None:
+                continue
+            document["chunk_count"] -= 1
+            document["content_bytes"] -= len(chunk.get("content", "").encode("utf-8"))
+            if document["chunk_count"] <= 0:
+                self.tables["documents"].remove(document)
+
+    @property
+    def postgrest(self) -> "LocalSupabaseClient":
+        """``client.postgrest.rpc(...)`` like supabase-py."""
+        return self
+
+    def table(self, name: str) -> LocalQuery:
+        return LocalQuery(self, name)
+
+    def from_(self, name: str) -> LocalQuery:
+        return self.table(name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> LocalRPC:
+        if name not in self.functions:
+            raise ValueError(f"Unknown RPC function: {name}")
+        return LocalRPC(self.functions[name], params or {})
+
+    def _delete_documents(self, p_urls: List[str]) -> List[Dict[str, Any]]:
+        """Chunks and catalog rows of ``p_urls``; counts like the SQL function."""
+        urls = set(p_urls)
+        with self.lock:
+            documents = self.tables.setdefault("documents", [])
+            document_count = sum(1 for d in documents if d["url"] in urls)
+            chunks = self.tables.setdefault("rag_pages", [])
+            deleted = [row for row in chunks if row["url"] in urls]
+            chunks[:] = [row for row in chunks if row["url"] not in urls]
+            self._documents_after_delete(deleted)
+            self._bump_corpus_version()
+            documents[:] = [d for d in documents if d["url"] not in urls]
+        return [{"documents_deleted": document_count, "chunks_deleted": len(deleted)}]
+
+    def _match_rag_pages(
+        self,
+        query_embedding: List[float],
+        match_count: int = 10,
+        filter: Optional[Dict[str, Any]] = None,
+        match_threshold: Optional[float] = None,
+        **kwargs,
+    ) -> List[Dict[str, Any]]:
+        """Exact cosine search, same result shape as the SQL function."""
+        with self.lock:
+            rows = [
+                row
+                for row in self.tables.get("rag_pages", [])
+                if row.get("embedding") is not None and _matches_filter(row, filter)
+            ]
+            if not rows:
+                return []
+            matrix = np.asarray([row["embedding"] for row in rows], dtype=np.float32)
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+        similarity = matrix @ query / np.where(norms == 0, 1.0, norms)
+        top = np.argsort(-similarity)[:match_count]
+        columns = SEARCH_COLUMNS
+        return [
+            {
+                **{c: copy.deepcopy(rows[i].get(c)) for c in columns},
+                "similarity": float(similarity[i]),
+            }
+            for i in top
+            if match_threshold is None or similarity[i] >= match_threshold
+        ]
+
+    def _match_rag_page_scores(
+        self,
+        query_embedding: List[float],
+        match_count: int = 50,
+        filter: Optional[Dict[str, Any]] = None,
+        match_threshold: Optional[float] = None,
+        **kwargs,
+    ) -> List[Dict[str, Any]]:
+        return [
+            {"id": hit["id"], "similarity": hit["similarity"]}
+            for hit in self._match_rag_pages(
+                query_embedding, match_count, filter, match_threshold
+            )
+        ]
+
+    def _keyword_rag_page_scores(
+        self,
+        query_text: str,
+        match_count: int = 20,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> List[Dict[str, Any]]:
+        return [
+            {"id": hit["id"], "keyword_rank": hit["keyword_rank"]}
+            for hit in self._keyword_search_rag_pages(query_text, match_count, filter)
+        ]
+
+    def _filtered_rows(self, filter: Optional[Dict[str, Any]]) -> Dict[int, Dict]:
+        with self.lock:
+            return {
+                row["id"]: row
+                for row in self.tables.get("rag_pages", [])
+                if _matches_filter(row, filter)
+            }
+
+    def _keyword_search_rag_pages(
+        self,
+        query_text: str,
+        match_count: int = 20,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> List[Dict[str, Any]]:
+        """
+        Keyword search like the SQL function: any query term may match, and
+        exact product codes add 1 each. Term overlap stands in for ts_rank_cd.
+        """
+        terms = set(re.findall(r"\w{2,}", (query_text or "").lower()))
+        codes = {c.lower() for c in PRODUCT_CODE_PATTERN.findall(query_text or "")}
+        ranked = []
+        for row in self._filtered_rows(filter).values():
+            content = row["content"].lower()
+            rank = len(terms & set(re.findall(r"\w{2,}", content)))
+            rank += sum(1 for code in codes if code in content)
+            if rank:
+                ranked.append((rank, row))
+        ranked.sort(key=lambda item: -item[0])
+        columns = SEARCH_COLUMNS
+        return [
+            {
+                **{c: copy.deepcopy(row.get(c)) for c in columns},
+                "keyword_rank": float(rank),
+            }
+            for rank, row in ranked[:match_count]
+        ]
+
+    def _hybrid_search_rag_pages(
+        self,
+        query_text: str,
+        query_embedding: List[float],
+        match_count: int = 10,
+        filter: Optional[Dict[str, Any]] = None,
+        candidate_count: int = 50,
+        rrf_k: int = 60,
+        **kwargs,
+    ) -> List[Dict[str, Any]]:
+        """RRF fusion of vector and keyword candidates like the SQL function."""
+        vector_hits = self._match_rag_pages(query_embedding, candidate_count, filter)
+        keyword_hits = self._keyword_search_rag_pages(
+            query_text, candidate_count, filter
+        )
+        hits = {hit["id"]: hit for hit in keyword_hits + vector_hits}
+
+        fused: Dict[int, float] = {}
+        for ranking in (vector_hits, keyword_hits):
+            for rank, hit in enumerate(ranking, start=1):
+                fused[hit["id"]] = fused.get(hit["id"], 0.0) + 1.0 / (rrf_k + rank)
+        similarity = {hit["id"]: hit["similarity"] for hit in vector_hits}
+        keyword_rank = {hit["id"]: hit["keyword_rank"] for hit in keyword_hits}
+
+        top = sorted(fused, key=lambda row_id: -fused[row_id])[:match_count]
+        columns = SEARCH_COLUMNS
+        return [
+            {
+                **{c: hits[row_id][c] for c in columns},
+                "similarity": similarity.get(row_id, 0.0),
+                "keyword_rank": keyword_rank.get(row_id, 0.0),
+                "rrf_score": fused[row_id],
+            }
+            for row_id in top
+        ]
+
+
+class AsyncRequest:
+    """Wraps a local query/RPC so ``execute()`` is awaitable like supabase-py's."""
+
+    def __init__(self, request: Any):
+        self.request = request
+
+    def __getattr__(self, name: str) -> Callable[..., "AsyncRequest"]:
+        method = getattr(self.request, name)
+        return lambda *args, **kwargs: AsyncRequest(method(*args, **kwargs))
+
+    async def execute(self) -> LocalResponse:
+        return self.request.execute()
+
+
+class LocalAsyncSupabaseClient(LocalSupabaseClient):
+    """
+    ``LocalSupabaseClient`` with the awaitable API of ``acreate_client(...)``:
+
+        client = AsyncSupabaseClient(client=LocalAsyncSupabaseClient())
+    """
+
+    def table(self, name: str) -> AsyncRequest:
+        return AsyncRequest(super().table(name))
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> AsyncRequest:
+        return AsyncRequest(super().rpc(name, params))
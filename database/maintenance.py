@@ -0,0 +1,202 @@
+"""
+Table-wide maintenance jobs built on ``SupabaseClient.iter_rows``.
+
+All jobs stream ``rag_pages`` in id-ordered keyset pages with a narrow
+projection, so they run in constant memory regardless of the table size:
+
+    python -m database.maintenance export chunks.jsonl [--with-embeddings]
+    python -m database.maintenance reembed [--url datei.pdf]
+    python -m database.maintenance check [--json]
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.documents import ROWS_PAGE_SIZE
+
+EXPORT_COLUMNS = "id,url,chunk_number,content,metadata,document_id"
+
+
+def _batches(rows: Iterator[Dict[str, Any]], size: int) -> Iterator[List[Dict]]:
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def export_chunks(
+    client, out: TextIO, with_embeddings: bool = False, page_size: int = 0
+) -> int:
+    """
+    Write every chunk as one JSON line, with document metadata merged in.
+
+    Args:
+        client: SupabaseClient
+        out: Text stream to write to
+        with_embeddings: Also export the embedding vectors
+        page_size: Rows per request (defaults to ROWS_PAGE_SIZE)
+
+    Returns:
+        Number of exported chunks
+    """
+    columns = EXPORT_COLUMNS + (",embedding" if with_embeddings else "")
+    page_size = page_size or ROWS_PAGE_SIZE
+    exported = 0
+    rows = client.iter_rows("rag_pages", columns, page_size=page_size)
+    for batch in _batches(rows, page_size):
+        for row in client.with_document_metadata(batch):
+            out.write(json.dumps(row, ensure_ascii=False) + "\n")
+        exported += len(batch)
+    return exported
+
+
+def reembed_chunks(
+    client,
+    embedder,
+    filters: Optional[Dict[str, Any]] = None,
+    page_size: int = 0,
+) -> int:
+    """
+    Recompute the embedding of every (matching) chunk and update it by id.
+
+    Only ``id`` and ``content`` are read. Updates never change the paging
+    key, so rows already visited are not seen again.
+
+    Args:
+        client: SupabaseClient
+        embedder: Object with ``embed_text(text)``
+        filters: Column equality filters, e.g. ``{"url": "a.pdf"}``
+        page_size: Rows per request (defaults to ROWS_PAGE_SIZE)
+
+    Returns:
+        Number of updated chunks
+    """
+    updated = 0
+    for row in client.iter_rows(
+        "rag_pages", "id,content", filters, page_size=page_size or None
+    ):
+        client._execute(
+            "reembed_chunk",
+            client.client.table("rag_pages")
+            .update({"embedding": embedder.embed_text(row["content"])})
+            .eq("id", row["id"]),
+        )
+        updated += 1
+        if updated % 100 == 0:
+            print(f"🔄 {updated} Chunks neu eingebettet")
+    return updated
+
+
+def check_consistency(client, page_size: int = 0) -> Dict[str, Any]:
+    """
+    Compare the documents catalog with the chunks it describes.
+
+    Args:
+        client: SupabaseClient
+        page_size: Rows per request (defaults to ROWS_PAGE_SIZE)
+
+    Returns:
+        Dict with ``chunks``, ``documents`` and lists of problems
+    """
+    page_size = page_size or None
+    chunk_counts: Counter = Counter()
+    chunks = 0
+    without_document = []
+    without_embedding = []
+    for row in client.iter_rows(
+        "rag_pages", "id,url,document_id,embedding", page_size=page_size
+    ):
+        chunks += 1
+        chunk_counts[row["url"]] += 1
+        if row.get("document_id") is None:
+            without_document.append(row["id"])
+        if row.get("embedding") is None:
+            without_embedding.append(row["id"])
+
+    documents = 0
+    wrong_counts = []
+    empty_documents = []
+    for doc in client.iter_rows(
+        "documents", "url,chunk_count", key="url", page_size=page_size
+    ):
+        documents += 1
+        actual = chunk_counts.pop(doc["url"], 0)
+        if actual == 0:
+            empty_documents.append(doc["url"])
+        elif doc.get("chunk_count") != actual:
+            wrong_counts.append(
+                {"url": doc["url"], "catalog": doc.get("chunk_count"), "actual": actual}
+            )
+
+    return {
+        "chunks": chunks,
+        "documents": documents,
+        "wrong_chunk_counts": wrong_counts,
+        "documents_without_chunks": empty_documents,
+        "urls_missing_in_catalog": sorted(chunk_counts),
+        "chunks_without_document": without_document,
+        "chunks_without_embedding": without_embedding,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="rag_pages maintenance jobs")
+    parser.add_argument("--page-size", type=int, default=ROWS_PAGE_SIZE)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export = subparsers.add_parser("export", help="Export chunks as JSONL")
+    export.add_argument("path", help="Output file ('-' for stdout)")
+    export.add_argument("--with-embeddings", action="store_true")
+    reembed = subparsers.add_parser("reembed", help="Recompute embeddings")
+    reembed.add_argument("--url", help="Only chunks of this document")
+    check = subparsers.add_parser("check", help="Check catalog consistency")
+    check.add_argument("--json", action="store_true", help="Print the raw report")
+    args = parser.parse_args(argv)
+
+    from database.setup import SupabaseClient
+
+    client = SupabaseClient()
+
+    if args.command == "export":
+        if args.path == "-":
+            count = export_chunks(
+                client, sys.stdout, args.with_embeddings, args.page_size
+            )
+        else:
+            with open(args.path, "w", encoding="utf-8") as out:
+                count = export_chunks(client, out, args.with_embeddings, args.page_size)
+        print(f"✅ {count} Chunks exportiert", file=sys.stderr)
+        return
+
+    if args.command == "reembed":
+        from document_processing.embeddings import EmbeddingGenerator
+
+        filters = {"url": args.url} if args.url else None
+        count = reembed_chunks(client, EmbeddingGenerator(), filters, args.page_size)
+        print(f"✅ {count} Chunks neu eingebettet")
+        return
+
+    report = check_consistency(client, args.page_size)
+    problems = sum(len(v) for v in report.values() if isinstance(v, list))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(f"📊 {report['chunks']} Chunks, {report['documents']} Dokumente")
+        for name, value in report.items():
+            if isinstance(value, list) and value:
+                print(f"⚠️ {name}: {len(value)} (z.B. {value[:3]})")
+        if not problems:
+            print("✅ Keine Inkonsistenzen gefunden")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
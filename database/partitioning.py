@@ -0,0 +1,268 @@
+"""
+List-partition ``rag_pages`` by collection (see ``database.routing``).
+
+Each collection gets its own partition with its own vector index, so note
+searches never touch the document index, and bulk loads of documents do not
+churn the notes index. Searches with a source filter are pruned to one
+partition. Collections without a partition land in ``rag_pages_default``
+until ``add-collection`` moves them out.
+
+    python -m database.partitioning sql              # print the migration
+    python -m database.partitioning migrate          # needs DATABASE_URL + psycopg
+    python -m database.partitioning add-collection kunde_a [--print]
+
+The migration copies all chunks into the new table inside one transaction
+and locks ``rag_pages`` meanwhile; run it off-peak.
+"""
+
+import os
+import re
+import sys
+import argparse
+from typing import List, Optional, Sequence
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.routing import DEFAULT_COLLECTION, collections
+from database.setup_db import (
+    VECTOR_STORAGE_TYPES,
+    vector_index_name,
+    vector_index_sql,
+    vector_storage,
+)
+
+DEFAULT_PARTITION = "rag_pages_default"
+
+# Written columns (source and fts are generated)
+COPY_COLUMNS = (
+    "id, url, chunk_number, content, metadata, embedding, created_at, "
+    "document_id, collection"
+)
+
+COLLECTION_PATTERN = re.compile(r"^[a-z][a-z0-9_]{0,40}$")
+
+
+def partition_name(collection: str) -> str:
+    """Table name of a collection's partition, e.g. ``rag_pages_notes``."""
+    if not COLLECTION_PATTERN.match(collection):
+        raise ValueError(f"Invalid collection name: {collection!r}")
+    return f"rag_pages_{collection}"
+
+
+def _table_sql(storage: Optional[str]) -> str:
+    column_type = VECTOR_STORAGE_TYPES[vector_storage(storage)]
+    return (
+        "create table rag_pages (\n"
+        "    id bigint not null default nextval('rag_pages_id_seq'),\n"
+        "    url varchar not null,\n"
+        "    chunk_number integer not null,\n"
+        "    content text not null,\n"
+        "    metadata jsonb not null default '{}'::jsonb,\n"
+        f"    embedding {column_type},\n"
+        "    created_at timestamp with time zone"
+        " default timezone('utc'::text, now()) not null,\n"
+        "    source text generated always as (metadata->>'source') stored,\n"
+        "    document_id bigint,\n"
+        "    fts tsvector generated always as (to_tsvector('german', content)) stored,\n"
+        f"    collection text not null default '{DEFAULT_COLLECTION}',\n"
+        "    -- the partition key must be part of every unique constraint\n"
+        "    primary key (id, collection),\n"
+        "    unique (url, chunk_number, collection)\n"
+        ") partition by list (collection)"
+    )
+
+
+def partition_sql(
+    names: Optional[Sequence[str]] = None,
+    storage: Optional[str] = None,
+    quantization: Optional[str] = None,
+    maintenance_work_mem: str = "512MB",
+    **index_options,
+) -> List[str]:
+    """
+    Statements that turn ``rag_pages`` into a list-partitioned table.
+
+    The old table is renamed, its rows are copied into the partitions and it
+    is dropped; indexes, the documents and corpus version triggers, the
+    foreign key and the RLS policies are recreated. All statements must run
+    in one transaction.
+
+    Args:
+        names: Collections with their own partition (defaults to
+            ``database.routing.collections()``)
+        storage: ``vector`` or ``halfvec`` embedding column
+        quantization: ``none`` or ``binary`` vector index
+        maintenance_work_mem: Memory for the index builds
+        **index_options: Passed to ``vector_index_sql`` (method, m, ...)
+
+    Returns:
+        SQL statements in execution order
+    """
+    names = list(names or collections())
+    tables = [partition_name(name) for name in names] + [DEFAULT_PARTITION]
+    statements = [
+        f"set local maintenance_work_mem = '{maintenance_work_mem}'",
+        "lock table rag_pages in access exclusive mode",
+        # Keep the id sequence when the old table is dropped
+        "alter sequence rag_pages_id_seq owned by none",
+        "alter table rag_pages rename to rag_pages_unpartitioned",
+        _table_sql(storage),
+    ]
+    statements += [
+        f"create table {partition_name(name)} partition of rag_pages"
+        f" for values in ('{name}')"
+        for name in names
+    ]
+    statements += [
+        f"create table {DEFAULT_PARTITION} partition of rag_pages default",
+        f"insert into rag_pages ({COPY_COLUMNS})\n"
+        f"select {COPY_COLUMNS} from rag_pages_unpartitioned",
+        # Also drops the old triggers, policies and foreign key
+        "drop table rag_pages_unpartitioned cascade",
+        "alter sequence rag_pages_id_seq owned by rag_pages.id",
+        "create index idx_rag_pages_source on rag_pages (source)",
+        "create index idx_rag_pages_document_id on rag_pages (document_id)",
+        "create index idx_rag_pages_fts on rag_pages using gin (fts)",
+        "create index idx_rag_pages_content_trgm\n"
+        "  on rag_pages using gin (content gin_trgm_ops)",
+    ]
+    # Reason: one vector index per partition (not a partitioned index), so
+    # each can be rebuilt CONCURRENTLY on its own (setup_db rebuild-index --table)
+    statements += [
+        vector_index_sql(
+            name=vector_index_name(table),
+            storage=storage,
+            quantization=quantization,
+            table=table,
+            **index_options,
+        )
+        for table in tables
+    ]
+    statements += [
+        "alter table rag_pages\n"
+        "  add constraint rag_pages_document_id_fkey\n"
+        "    foreign key (document_id) references documents (id) on delete cascade",
+        # Statement-level triggers on the parent see the rows of all partitions
+        "create trigger rag_pages_documents_insert\n"
+        "  after insert on rag_pages\n"
+        "  referencing new table as new_chunks\n"
+        "  for each statement execute function documents_after_chunk_insert()",
+        "create trigger rag_pages_documents_delete\n"
+        "  after delete on rag_pages\n"
+        "  referencing old table as old_chunks\n"
+        "  for each statement execute function documents_after_chunk_delete()",
+        "create trigger rag_pages_corpus_version\n"
+        "  after insert or update or delete or truncate on rag_pages\n"
+        "  for each statement execute function bump_corpus_version()",
+        "alter table rag_pages enable row level security",
+        'create policy "Allow public read access"\n'
+        "  on rag_pages for select to public using (true)",
+        'create policy "Allow public insert access"\n'
+        "  on rag_pages for insert to public with check (true)",
+        "analyze rag_pages",
+    ]
+    return statements
+
+
+def add_collection_sql(
+    name: str,
+    storage: Optional[str] = None,
+    quantization: Optional[str] = None,
+    **index_options,
+) -> List[str]:
+    """
+    Statements that give a collection its own partition.
+
+    Its chunks are moved out of the default partition (directly, so the
+    documents triggers on ``rag_pages`` do not fire) before the new table is
+    attached. All statements must run in one transaction.
+
+    Returns:
+        SQL statements in execution order
+    """
+    table = partition_name(name)
+    return [
+        f"lock table {DEFAULT_PARTITION} in exclusive mode",
+        f"create table {table}\n"
+        "  (like rag_pages including defaults including generated)",
+        f"insert into {table} ({COPY_COLUMNS})\n"
+        f"select {COPY_COLUMNS} from {DEFAULT_PARTITION} where collection = '{name}'",
+        f"delete from {DEFAULT_PARTITION} where collection = '{name}'",
+        f"alter table rag_pages attach partition {table} for values in ('{name}')",
+        vector_index_sql(
+            name=vector_index_name(table),
+            storage=storage,
+            quantization=quantization,
+            table=table,
+            **index_options,
+        ),
+        f"analyze {table}",
+    ]
+
+
+def run(database_url: str, statements: List[str]) -> None:
+    """Execute ``statements`` in a single transaction."""
+    try:
+        import psycopg
+    except ImportError as e:
+        raise RuntimeError(
+            "psycopg is required (pip install 'psycopg[binary]'); "
+            "use --print to get the SQL for psql instead"
+        ) from e
+
+    with psycopg.connect(database_url) as conn:
+        for statement in statements:
+            print(f"▶️ {statement.splitlines()[0]}")
+            conn.execute(statement)
+    print("✅ Partitionierung abgeschlossen")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Partition rag_pages by collection")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_options(subparser):
+        subparser.add_argument("--storage", choices=sorted(VECTOR_STORAGE_TYPES))
+        subparser.add_argument("--quantization", choices=["none", "binary"])
+        subparser.add_argument("--index-method", choices=["hnsw", "ivfflat"])
+        subparser.add_argument(
+            "--print", action="store_true", help="Only print the SQL (run with psql)"
+        )
+
+    migrate_help = "Partition rag_pages (sql: only print the migration)"
+    for command in ("sql", "migrate"):
+        subparser = subparsers.add_parser(command, help=migrate_help)
+        add_options(subparser)
+        subparser.add_argument(
+            "--collections", help="Comma-separated collections (default: all known)"
+        )
+    add = subparsers.add_parser("add-collection", help="Partition for one collection")
+    add.add_argument("name")
+    add_options(add)
+    args = parser.parse_args(argv)
+
+    options = {
+        "storage": args.storage,
+        "quantization": args.quantization,
+        "method": args.index_method,
+    }
+    if args.command == "add-collection":
+        statements = add_collection_sql(args.name, **options)
+    else:
+        names = None
+        if args.collections:
+            names = [c.strip() for c in args.collections.split(",") if c.strip()]
+        statements = partition_sql(names, **options)
+
+    database_url = os.getenv("DATABASE_URL")
+    if args.command == "sql" or args.print or not database_url:
+        if args.command != "sql" and not args.print:
+            print("-- DATABASE_URL not set; run this script with psql")
+        print("begin;\n" + ";\n".join(statements) + ";\ncommit;")
+    else:
+        run(database_url, statements)
+
+
+if __name__ == "__main__":
+    main()
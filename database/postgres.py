@@ -0,0 +1,426 @@
+"""
+Direct Postgres backend for ``SupabaseClient`` over a pooled asyncpg driver.
+
+``PostgresClient`` implements the subset of the supabase-py query builder
+that our code uses (``table(...).select/insert/upsert/update/delete`` with
+``eq/in_/like/ilike/gt/gte/order/limit``, and ``rpc``). Calls are compiled to
+SQL and run on an asyncpg pool instead of going through PostgREST:
+
+- vectors are sent and received in pgvector's binary format, not JSON text;
+- every statement is prepared once per connection (asyncpg statement
+  cache), so repeated ``match_rag_pages`` calls skip parsing and planning;
+- inserts that do not return rows (``returning=ReturnMethod.minimal``) are
+  loaded with binary ``COPY``.
+
+Select it with ``DATABASE_BACKEND=postgres`` and ``DATABASE_URL``:
+
+    client = SupabaseClient()  # same public methods, no PostgREST
+"""
+
+import asyncio
+import json
+import os
+import re
+import threading
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Plain column names and metadata paths like ``metadata->>source``
+IDENTIFIER = re.compile(r"^[a-z_][a-z0-9_]*(->>?[a-z_][a-z0-9_]*)?$")
+
+# asyncpg's limit is 32767 bind parameters per statement
+MAX_PARAMETERS = 32000
+
+TIMESTAMP_TYPES = ("timestamptz", "timestamp", "date")
+
+
+def _identifier(name: str) -> str:
+    name = name.strip()
+    if not IDENTIFIER.match(name):
+        raise ValueError(f"Unzulässiger Spaltenname: {name!r}")
+    if "->" in name:
+        column, operator, key = re.split(r"(->>?)", name)
+        return f"{column}{operator}'{key}'"
+    return name
+
+
+def _jsonb_encoder(value: Any) -> bytes:
+    # Reason: jsonb binary format is a version byte followed by the JSON text
+    text = value if isinstance(value, str) else json.dumps(value)
+    return b"\x01" + text.encode("utf-8")
+
+
+def _jsonb_decoder(data: bytes) -> Any:
+    return json.loads(data[1:].decode("utf-8"))
+
+
+def _to_python(value: Any) -> Any:
+    """Convert driver values to what PostgREST returns (lists, ISO strings)."""
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _coerce(args: Sequence[Any], types: Sequence[Any]) -> List[Any]:
+    """Parse ISO strings for timestamp parameters (PostgREST accepts them)."""
+    coerced = []
+    for value, pg_type in zip(args, types):
+        if isinstance(value, str) and pg_type.name in TIMESTAMP_TYPES:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        coerced.append(value)
+    return coerced
+
+
+class PostgresResponse:
+    """Response with the ``data`` / ``count`` attributes of a PostgREST one."""
+
+    def __init__(self, data: List[Dict[str, Any]], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class PostgresQuery:
+    """
+    Chainable query builder for one table, compiled to a single SQL statement.
+    """
+
+    def __init__(self, client: "PostgresClient", table: str):
+        self.client = client
+        self.table_name = _identifier(table)
+        self._action = "select"
+        self._columns = "*"
+        self._rows: List[Dict[str, Any]] = []
+        self._filters: List[Tuple[str, str, Any]] = []
+        self._order: Optional[Tuple[str, bool]] = None
+        self._limit: Optional[int] = None
+        self._count: Optional[str] = None
+        self._returning = True
+        self._on_conflict: Optional[str] = None
+
+    def select(
+        self, *columns: str, count: Optional[str] = None, **kwargs
+    ) -> "PostgresQuery":
+        self._action = "select"
+        self._count = count
+        names = [c for col in columns for c in col.split(",") if c.strip()]
+        if names and "*" not in [n.strip() for n in names]:
+            self._columns = ", ".join(_identifier(n) for n in names)
+        return self
+
+    def _write(self, action: str, rows, returning: Any) -> "PostgresQuery":
+        self._action = action
+        self._rows = rows if isinstance(rows, list) else [rows]
+        self._returning = str(getattr(returning, "value", returning)) != "minimal"
+        return self
+
+    def insert(
+        self, rows, returning: Any = "representation", **kwargs
+    ) -> "PostgresQuery":
+        return self._write("insert", rows, returning)
+
+    def upsert(
+        self,
+        rows,
+        on_conflict: str = "id",
+        returning: Any = "representation",
+        **kwargs,
+    ) -> "PostgresQuery":
+        self._on_conflict = _identifier(on_conflict)
+        return self._write("upsert", rows, returning)
+
+    def update(self, values: Dict[str, Any], **kwargs) -> "PostgresQuery":
+        return self._write("update", values, "representation")
+
+    def delete(self, **kwargs) -> "PostgresQuery":
+        self._action = "delete"
+        return self
+
+    def _filter(self, column: str, operator: str, value: Any) -> "PostgresQuery":
+        self._filters.append((_identifier(column), operator, value))
+        return self
+
+    def eq(self, column: str, value: Any) -> "PostgresQuery":
+        if "->>" in column:
+            value = str(value)
+        return self._filter(column, "=", value)
+
+    def in_(self, column: str, values) -> "PostgresQuery":
+        return self._filter(column, "= any", list(values))
+
+    def like(self, column: str, pattern: str) -> "PostgresQuery":
+        return self._filter(column, "like", pattern)
+
+    def ilike(self, column: str, pattern: str) -> "PostgresQuery":
+        return self._filter(column, "ilike", pattern)
+
+    def gt(self, column: str, value: Any) -> "PostgresQuery":
+        return self._filter(column, ">", value)
+
+    def gte(self, column: str, value: Any) -> "PostgresQuery":
+        return self._filter(column, ">=", value)
+
+    def order(self, column: str, desc: bool = False, **kwargs) -> "PostgresQuery":
+        self._order = (_identifier(column), desc)
+        return self
+
+    def limit(self, count: int) -> "PostgresQuery":
+        self._limit = int(count)
+        return self
+
+    def _where(self, args: List[Any]) -> str:
+        clauses = []
+        for column, operator, value in self._filters:
+            args.append(value)
+            if operator == "= any":
+                clauses.append(f"{column} = any(${len(args)})")
+            elif operator == "ilike":
+                # Reason: this form can use lower(column) expression indexes
+                clauses.append(f"lower({column}) like lower(${len(args)})")
+            else:
+                clauses.append(f"{column} {operator} ${len(args)}")
+        return f" where {' and '.join(clauses)}" if clauses else ""
+
+    def _columns_of(self) -> List[str]:
+        columns: List[str] = []
+        for row in self._rows:
+            columns.extend(c for c in row if c not in columns)
+        return [_identifier(c) for c in columns]
+
+    def _values(self, columns: List[str], args: List[Any]) -> str:
+        groups = []
+        for row in self._rows:
+            cells = []
+            for column in columns:
+                if column in row:
+                    args.append(row[column])
+                    cells.append(f"${len(args)}")
+                else:
+                    cells.append("default")
+            groups.append(f"({', '.join(cells)})")
+        return ", ".join(groups)
+
+    def compile(self) -> List[Tuple[str, List[Any]]]:
+        """
+        Build the SQL statements for this query.
+
+        Returns:
+            ``(sql, args)`` pairs; large inserts are split so no statement
+            exceeds the bind parameter limit
+        """
+        args: List[Any] = []
+        returning = " returning *" if self._returning else ""
+        table = self.table_name
+
+        if self._action == "select":
+            sql = f"select {self._columns} from {table}{self._where(args)}"
+            if self._order is not None:
+                column, desc = self._order
+                sql += f" order by {column}{' desc' if desc else ''}"
+            if self._limit is not None:
+                sql += f" limit {self._limit}"
+            return [(sql, args)]
+
+        if self._action == "delete":
+            if not self._filters:
+                # Reason: PostgREST refuses unfiltered deletes as well
+                raise ValueError("DELETE ohne Filter ist nicht erlaubt")
+            return [(f"delete from {table}{self._where(args)}{returning}", args)]
+
+        if self._action == "update":
+            if not self._filters:
+                raise ValueError("UPDATE ohne Filter ist nicht erlaubt")
+            assignments = []
+            for column, value in self._rows[0].items():
+                args.append(value)
+                assignments.append(f"{_identifier(column)} = ${len(args)}")
+            where = self._where(args)
+            sql = f"update {table} set {', '.join(assignments)}{where}{returning}"
+            return [(sql, args)]
+
+        columns = self._columns_of()
+        conflict = ""
+        if self._action == "upsert":
+            updates = ", ".join(
+                f"{c} = excluded.{c}" for c in columns if c != self._on_conflict
+            )
+            action = f"do update set {updates}" if updates else "do nothing"
+            conflict = f" on conflict ({self._on_conflict}) {action}"
+        statements = []
+        per_statement = max(1, MAX_PARAMETERS // max(1, len(columns)))
+        rows = self._rows
+        for start in range(0, len(rows), per_statement):
+            self._rows, args = rows[start : start + per_statement], []
+            values = self._values(columns, args)
+            sql = (
+                f"insert into {table} ({', '.join(columns)}) values {values}"
+                f"{conflict}{returning}"
+            )
+            statements.append((sql, args))
+        self._rows = rows
+        return statements
+
+    def _use_copy(self) -> bool:
+        if self._action != "insert" or self._returning or not self._rows:
+            return False
+        keys = set(self._rows[0])
+        return all(set(row) == keys for row in self._rows)
+
+    async def _run(self) -> PostgresResponse:
+        pool = await self.client.pool()
+        async with pool.acquire() as conn:
+            if self._use_copy():
+                columns = self._columns_of()
+                await conn.copy_records_to_table(
+                    self.table_name.strip(),
+                    records=[tuple(row[c] for c in columns) for row in self._rows],
+                    columns=columns,
+                )
+                return PostgresResponse([])
+
+            data: List[Dict[str, Any]] = []
+            async with conn.transaction():
+                for sql, args in self.compile():
+                    statement = await conn.prepare(sql)
+                    args = _coerce(args, statement.get_parameters())
+                    records = await statement.fetch(*args)
+                    data.extend(
+                        {k: _to_python(v) for k, v in record.items()}
+                        for record in records
+                    )
+                count = None
+                if self._action == "select" and self._count:
+                    args = []
+                    sql = f"select count(*) from {self.table_name}{self._where(args)}"
+                    statement = await conn.prepare(sql)
+                    count = await statement.fetchval(
+                        *_coerce(args, statement.get_parameters())
+                    )
+        return PostgresResponse(data, count)
+
+    def execute(self) -> PostgresResponse:
+        return self.client.run(self._run())
+
+
+class PostgresRPC:
+    """Call of a SQL function with named arguments, like a PostgREST RPC."""
+
+    def __init__(self, client: "PostgresClient", name: str, params: Dict):
+        self.client = client
+        self.name = _identifier(name)
+        self.params = params or {}
+
+    def compile(self) -> Tuple[str, List[Any]]:
+        names = [_identifier(k) for k in self.params]
+        arguments = ", ".join(f"{k} => ${i}" for i, k in enumerate(names, 1))
+        return f"select * from {self.name}({arguments})", list(self.params.values())
+
+    async def _run(self) -> PostgresResponse:
+        sql, args = self.compile()
+        pool = await self.client.pool()
+        async with pool.acquire() as conn:
+            statement = await conn.prepare(sql)
+            records = await statement.fetch(*_coerce(args, statement.get_parameters()))
+        return PostgresResponse(
+            [{k: _to_python(v) for k, v in r.items()} for r in records]
+        )
+
+    def execute(self) -> PostgresResponse:
+        return self.client.run(self._run())
+
+
+class PostgresClient:
+    """
+    Drop-in for ``supabase.create_client(...)`` that talks to Postgres directly.
+
+    The pool lives on a private event loop thread, so the synchronous
+    ``SupabaseClient`` API can be used from any thread (Streamlit,
+    ``asyncio.to_thread``, workers) while sharing one pool.
+
+    Args:
+        dsn: Postgres URL; defaults to DATABASE_URL (Supabase direct
+            connection or session pooler; transaction pooling needs
+            DATABASE_STATEMENT_CACHE_SIZE=0)
+        min_size: Pool size kept open (DATABASE_POOL_MIN_SIZE, 1)
+        max_size: Maximum connections (DATABASE_POOL_MAX_SIZE, 10)
+    """
+
+    def __init__(
+        self,
+        dsn: Optional[str] = None,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+    ):
+        self.dsn = dsn or os.getenv("DATABASE_URL")
+        if not self.dsn:
+            raise ValueError(
+                "DATABASE_URL must be set to use DATABASE_BACKEND=postgres."
+            )
+        self.min_size = min_size or int(os.getenv("DATABASE_POOL_MIN_SIZE", "1"))
+        self.max_size = max_size or int(os.getenv("DATABASE_POOL_MAX_SIZE", "10"))
+        self.statement_cache_size = int(
+            os.getenv("DATABASE_STATEMENT_CACHE_SIZE", "100")
+        )
+        self._pool = None
+        self._pool_lock: Optional[asyncio.Lock] = None
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(
+            target=self.loop.run_forever, name="postgres-pool", daemon=True
+        ).start()
+
+    def run(self, coroutine) -> Any:
+        """Run a coroutine on the pool's event loop and wait for the result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    async def pool(self):
+        if self._pool is not None:
+            return self._pool
+        if self._pool_lock is None:
+            self._pool_lock = asyncio.Lock()
+        async with self._pool_lock:
+            if self._pool is None:
+                try:
+                    import asyncpg
+                except ImportError as e:
+                    raise RuntimeError(
+                        "asyncpg and pgvector are required for DATABASE_BACKEND="
+                        "postgres (pip install asyncpg pgvector)"
+                    ) from e
+                self._pool = await asyncpg.create_pool(
+                    self.dsn,
+                    min_size=self.min_size,
+                    max_size=self.max_size,
+                    statement_cache_size=self.statement_cache_size,
+                    init=self._init_connection,
+                )
+        return self._pool
+
+    @staticmethod
+    async def _init_connection(conn) -> None:
+        from pgvector.asyncpg import register_vector
+
+        await register_vector(conn)
+        await conn.set_type_codec(
+            "jsonb",
+            encoder=_jsonb_encoder,
+            decoder=_jsonb_decoder,
+            schema="pg_catalog",
+            format="binary",
+        )
+
+    def table(self, name: str) -> PostgresQuery:
+        return PostgresQuery(self, name)
+
+    def from_(self, name: str) -> PostgresQuery:
+        return self.table(name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> PostgresRPC:
+        return PostgresRPC(self, name, params or {})
+
+    def close(self) -> None:
+        """Close all pooled connections and stop the event loop thread."""
+        if self._pool is not None:
+            self.run(self._pool.close())
+            self._pool = None
+        self.loop.call_soon_threadsafe(self.loop.stop)
@@ -0,0 +1,383 @@
+"""
+Requests shared by ``SupabaseClient`` and ``AsyncSupabaseClient``.
+
+Every operation is a generator taking the supabase client: it yields
+``(operation, request)`` pairs, receives the response of each (or the
+exception it raised) and returns the result. ``SupabaseClient._run``
+executes the requests and ``AsyncSupabaseClient._run`` awaits them, so query
+building, filter routing, the local replica and fallbacks exist only once:
+
+    def fetch_chunks(self, ids):
+        return self._run(self._fetch_chunks, ids)
+"""
+
+import os
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, Generator, List, Optional, Tuple
+
+from postgrest import ReturnMethod
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.corpus_version import (
+    CORPUS_VERSION_TABLE,
+    note_local_write,
+    version_from_response,
+)
+from database.documents import (
+    ROWS_PAGE_SIZE,
+    DocumentMetadataCache,
+    delete_counts,
+    rows_projection,
+)
+from database.local_index import local_scores
+from database.routing import with_collection
+from database.search_params import (
+    hybrid_params,
+    keyword_params,
+    match_params,
+    score_params,
+)
+from utils.metrics import registry as metrics
+
+# An operation: yields (metric label, request builder), returns the result
+Steps = Generator[Tuple[str, Any], Any, Any]
+
+
+def run_steps(steps: Steps, execute: Callable[[str, Any], Any]) -> Any:
+    """Run an operation, sending each request with ``execute(operation, request)``."""
+    try:
+        step = next(steps)
+        while True:
+            try:
+                response = execute(*step)
+            except Exception as e:
+                step = steps.throw(e)
+            else:
+                step = steps.send(response)
+    except StopIteration as done:
+        return done.value
+
+
+async def arun_steps(steps: Steps, execute: Callable[[str, Any], Awaitable]) -> Any:
+    """``run_steps`` with an awaitable ``execute``."""
+    try:
+        step = next(steps)
+        while True:
+            try:
+                response = await execute(*step)
+            except Exception as e:
+                step = steps.throw(e)
+            else:
+                step = steps.send(response)
+    except StopIteration as done:
+        return done.value
+
+
+class QueryOperations:
+    """
+    Operations on ``rag_pages`` and the ``documents`` catalog.
+
+    Expects ``self.local_index`` and ``self.last_bytes_sent``.
+    """
+
+    def _record(
+        self,
+        operation: str,
+        start: float,
+        response: Any = None,
+        bytes_sent: int = 0,
+    ) -> None:
+        """Record duration and, without ``response``, an error of a request."""
+        metrics.observe(
+            "rag_db_request_seconds", time.perf_counter() - start, operation=operation
+        )
+        if response is None:
+            metrics.inc("rag_db_errors_total", operation=operation)
+            return
+        metrics.inc("rag_db_requests_total", operation=operation)
+        metrics.inc("rag_db_bytes_sent_total", bytes_sent, operation=operation)
+        metrics.inc("rag_db_rows_total", len(response.data or []), operation=operation)
+        self.last_bytes_sent = bytes_sent
+
+    def _document_cache(self) -> DocumentMetadataCache:
+        # Reason: lazily created, so the mixin needs no __init__ of its own
+        if "_documents_metadata" not in self.__dict__:
+            self._documents_metadata = DocumentMetadataCache()
+        return self._documents_metadata
+
+    def _document_metadata(self, client, rows: List[Dict[str, Any]]) -> Steps:
+        cache = self._document_cache()
+        missing = cache.missing(rows)
+        if missing:
+            try:
+                result = yield (
+                    "document_metadata",
+                    client.table("documents").select("id,metadata").in_("id", missing),
+                )
+                cache.add(result.data)
+            except Exception as e:
+                print(f"⚠️ Dokument-Metadaten nicht verfügbar: {e}")
+        return cache.merge(rows)
+
+    def _rpc_rows(
+        self, client, operation: str, function: str, params: Dict[str, Any]
+    ) -> Steps:
+        result = yield (operation, client.rpc(function, params))
+        return result.data or []
+
+    def _fetch_chunks(self, client, ids: List[int]) -> Steps:
+        if not ids:
+            return []
+        result = yield (
+            "fetch_chunks",
+            client.table("rag_pages")
+            .select("id,url,chunk_number,content,metadata,document_id")
+            .in_("id", ids),
+        )
+        rows = {row["id"]: row for row in result.data or []}
+        return (
+            yield from self._document_metadata(
+                client, [rows[i] for i in ids if i in rows]
+            )
+        )
+
+    def _search_documents(
+        self,
+        client,
+        query_embedding: List[float],
+        match_threshold: Optional[float] = None,
+        match_count: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+    ) -> Steps:
+        params = match_params(
+            query_embedding,
+            match_threshold,
+            match_count,
+            filter_metadata,
+            ef_search,
+            probes,
+        )
+        try:
+            scores = local_scores(
+                self.local_index,
+                query_embedding,
+                match_count,
+                params.get("filter"),
+                params["match_threshold"],
+            )
+            if scores is not None:
+                rows = yield from self._fetch_chunks(
+                    client, [hit["id"] for hit in scores]
+                )
+                similarity = {hit["id"]: hit["similarity"] for hit in scores}
+                data = [{**row, "similarity": similarity[row["id"]]} for row in rows]
+            else:
+                rows = yield from self._rpc_rows(
+                    client, "match_rag_pages", "match_rag_pages", params
+                )
+                data = yield from self._document_metadata(client, rows)
+            if not data:
+                print("⚠️ Keine Dokument-Treffer für die Anfrage gefunden.")
+                return []
+
+            print(f"\n🔍 Top {len(data)} RAG-Matches:")
+            for r in data:
+                score = r.get("similarity", 0.0)
+                preview = r["content"][:120].replace("\n", " ")
+                print(f"  • Score: {score:.3f} → {preview}...")
+
+            return data
+
+        except Exception as e:
+            print("❌ Fehler bei Supabase-RPC:", str(e))
+            return []
+
+    def _search_document_scores(
+        self,
+        client,
+        query_embedding: List[float],
+        match_count: int = 50,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        match_threshold: Optional[float] = None,
+        ef_search: Optional[int] = None,
+    ) -> Steps:
+        params = score_params(
+            query_embedding, match_count, filter_metadata, match_threshold, ef_search
+        )
+        scores = local_scores(
+            self.local_index,
+            query_embedding,
+            match_count,
+            params.get("filter"),
+            params["match_threshold"],
+        )
+        if scores is not None:
+            return scores
+        return (
+            yield from self._rpc_rows(
+                client, "match_scores", "match_rag_page_scores", params
+            )
+        )
+
+    def _keyword_search_scores(
+        self,
+        client,
+        query: str,
+        match_count: int = 50,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+    ) -> Steps:
+        params = keyword_params(query, match_count, filter_metadata)
+        return (
+            yield from self._rpc_rows(
+                client, "keyword_scores", "keyword_rag_page_scores", params
+            )
+        )
+
+    def _hybrid_search_documents(
+        self,
+        client,
+        query: str,
+        query_embedding: List[float],
+        match_count: int = 10,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        candidate_count: int = 50,
+        rrf_k: int = 60,
+        ef_search: Optional[int] = None,
+    ) -> Steps:
+        params = hybrid_params(
+            query,
+            query_embedding,
+            match_count,
+            filter_metadata,
+            candidate_count,
+            rrf_k,
+            ef_search,
+        )
+        try:
+            rows = yield from self._rpc_rows(
+                client, "hybrid_search", "hybrid_search_rag_pages", params
+            )
+            return (yield from self._document_metadata(client, rows))
+        except Exception as e:
+            # Reason: databases without the hybrid function still get vector hits
+            print("❌ Fehler bei Hybrid-Suche, nur Vektorsuche:", e)
+            return (
+                yield from self._search_documents(
+                    client,
+                    query_embedding,
+                    match_count=match_count,
+                    filter_metadata=filter_metadata,
+                    ef_search=params.get("ef_search"),
+                )
+            )
+
+    def _keyword_search_documents(
+        self,
+        client,
+        query: str,
+        match_count: int = 20,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+    ) -> Steps:
+        params = keyword_params(query, match_count, filter_metadata)
+        try:
+            rows = yield from self._rpc_rows(
+                client, "keyword_search", "keyword_search_rag_pages", params
+            )
+            return (yield from self._document_metadata(client, rows))
+        except Exception as e:
+            print("❌ Fehler bei Keyword-Suche:", e)
+            return []
+
+    def _store_document_chunks(self, client, rows: List[Dict[str, Any]]) -> Steps:
+        if not rows:
+            return 0
+        rows = with_collection(rows)
+        yield (
+            "insert_chunks",
+            client.table("rag_pages").insert(rows, returning=ReturnMethod.minimal),
+        )
+        note_local_write()
+        return len(rows)
+
+    def _delete_documents(self, client, urls: List[str]) -> Steps:
+        if not urls:
+            return {"documents": 0, "chunks": 0}
+        rows = yield from self._rpc_rows(
+            client, "delete_documents", "delete_documents", {"p_urls": list(urls)}
+        )
+        note_local_write()
+        return delete_counts(rows)
+
+    def _delete_documents_by_filename(self, client, filename: str) -> Steps:
+        try:
+            deleted = (yield from self._delete_documents(client, [filename]))["chunks"]
+            print(f"🧹 {deleted} Datenbankeinträge mit url = {filename} gelöscht.")
+            return deleted
+        except Exception as e:
+            print(f"❌ Fehler beim Löschen von {filename} in rag_pages: {e}")
+            return 0
+
+    def _rows_page(
+        self,
+        client,
+        table: str,
+        projection: str,
+        filters: Optional[Dict[str, Any]],
+        key: str,
+        last: Any,
+        page_size: Optional[int] = None,
+    ) -> Steps:
+        """One ``key > last`` page of ``iter_rows``."""
+        query = client.table(table).select(projection)
+        for column, value in (filters or {}).items():
+            if isinstance(value, (list, tuple, set)):
+                query = query.in_(column, list(value))
+            else:
+                query = query.eq(column, value)
+        if last is not None:
+            query = query.gt(key, last)
+        result = yield (
+            f"iter_{table}",
+            query.order(key).limit(page_size or ROWS_PAGE_SIZE),
+        )
+        return result.data
+
+    def _all_rows(
+        self,
+        client,
+        table: str,
+        columns: str,
+        key: str = "id",
+    ) -> Steps:
+        projection = rows_projection(columns, key)
+        rows, last = [], None
+        while True:
+            page = yield from self._rows_page(
+                client, table, projection, None, key, last
+            )
+            if not page:
+                return rows
+            rows.extend(page)
+            last = page[-1][key]
+
+    def _document_sources(self, client) -> Steps:
+        try:
+            rows = yield from self._all_rows(client, "documents", "url", key="url")
+            return [row["url"] for row in rows]
+        except Exception as e:
+            # Reason: keep working until the documents table is deployed
+            print(f"⚠️ Tabelle documents nicht verfügbar, lese rag_pages: {e}")
+            rows = yield from self._all_rows(client, "rag_pages", "id,url")
+            return sorted({row["url"] for row in rows})
+
+    def _corpus_version(self, client) -> Steps:
+        result = yield (
+            "corpus_version",
+            client.table(CORPUS_VERSION_TABLE).select("version").eq("id", 1),
+        )
+        return version_from_response(result.data)
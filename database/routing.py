@@ -0,0 +1,65 @@
+"""
+Collections: the partition key of ``rag_pages``.
+
+Documents (``source: ui_upload``) and notes (``source: manuell``) live in
+their own collection, so a partitioned ``rag_pages`` keeps one small vector
+index per workload (see ``database.partitioning``). RAG_COLLECTION puts all
+chunks of a deployment into one collection, e.g. a future customer.
+"""
+
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+DEFAULT_COLLECTION = "documents"
+
+# Collection per metadata source; other sources use DEFAULT_COLLECTION
+SOURCE_COLLECTIONS = {"ui_upload": "documents", "manuell": "notes"}
+
+
+def collection_for_source(source: Optional[str]) -> str:
+    """Collection of a chunk with the given metadata ``source``."""
+    tenant = os.getenv("RAG_COLLECTION")
+    if tenant:
+        return tenant
+    return SOURCE_COLLECTIONS.get(source or "", DEFAULT_COLLECTION)
+
+
+def collections() -> List[str]:
+    """All collections that get their own partition."""
+    tenant = os.getenv("RAG_COLLECTION")
+    names = dict.fromkeys(SOURCE_COLLECTIONS.values())
+    if tenant:
+        names[tenant] = None
+    return list(names)
+
+
+def with_collection(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Set ``collection`` on chunk rows that do not have one yet (in place)."""
+    rows = list(rows)
+    for row in rows:
+        if not row.get("collection"):
+            source = (row.get("metadata") or {}).get("source")
+            row["collection"] = collection_for_source(source)
+    return rows
+
+
+def route_filter(
+    filter_metadata: Optional[Dict[str, Any]],
+) -> Optional[Dict[str, Any]]:
+    """
+    Add the collection of a source filter, so searches scan one partition.
+
+    ``{"source": "manuell"}`` becomes ``{"source": "manuell", "collection":
+    "notes"}``. The search functions compare ``collection`` with the column
+    and the remaining keys with ``metadata``. Unknown sources are not routed,
+    since their chunks may sit in any collection.
+    """
+    tenant = os.getenv("RAG_COLLECTION")
+    source = (filter_metadata or {}).get("source")
+    if "collection" in (filter_metadata or {}):
+        return filter_metadata
+    if tenant:
+        return {**(filter_metadata or {}), "collection": tenant}
+    if source in SOURCE_COLLECTIONS:
+        return {**filter_metadata, "collection": SOURCE_COLLECTIONS[source]}
+    return filter_metadata
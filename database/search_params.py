@@ -0,0 +1,104 @@
+"""
+RPC parameters of the search functions, shared by the sync and async clients.
+
+Defaults from the environment (MIN_SIMILARITY_SCORE, HNSW_EF_SEARCH,
+IVFFLAT_PROBES) are applied here so both clients send identical requests.
+Source filters are routed to their collection (see ``database.routing``).
+"""
+
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.routing import route_filter
+
+
+def default_threshold(match_threshold: Optional[float]) -> float:
+    if match_threshold is None:
+        return float(os.getenv("MIN_SIMILARITY_SCORE", "0.5"))
+    return match_threshold
+
+
+def default_ef_search(ef_search: Optional[int]) -> Optional[int]:
+    return ef_search or int(os.getenv("HNSW_EF_SEARCH", "0")) or None
+
+
+def _optional(params: Dict[str, Any], **values: Any) -> Dict[str, Any]:
+    params.update({k: v for k, v in values.items() if v})
+    return params
+
+
+def match_params(
+    query_embedding: List[float],
+    match_threshold: Optional[float],
+    match_count: int,
+    filter_metadata: Optional[Dict[str, Any]] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Parameters of ``match_rag_pages``."""
+    return _optional(
+        {
+            "query_embedding": query_embedding,
+            "match_threshold": default_threshold(match_threshold),
+            "match_count": match_count,
+        },
+        filter=route_filter(filter_metadata),
+        ef_search=default_ef_search(ef_search),
+        probes=probes or int(os.getenv("IVFFLAT_PROBES", "0")) or None,
+    )
+
+
+def score_params(
+    query_embedding: List[float],
+    match_count: int,
+    filter_metadata: Optional[Dict[str, Any]] = None,
+    match_threshold: Optional[float] = None,
+    ef_search: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Parameters of ``match_rag_page_scores``."""
+    return _optional(
+        {
+            "query_embedding": query_embedding,
+            "match_count": match_count,
+            "match_threshold": default_threshold(match_threshold),
+        },
+        filter=route_filter(filter_metadata),
+        ef_search=default_ef_search(ef_search),
+    )
+
+
+def keyword_params(
+    query: str, match_count: int, filter_metadata: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Parameters of ``keyword_search_rag_pages`` / ``keyword_rag_page_scores``."""
+    return _optional(
+        {"query_text": query, "match_count": match_count},
+        filter=route_filter(filter_metadata),
+    )
+
+
+def hybrid_params(
+    query: str,
+    query_embedding: List[float],
+    match_count: int,
+    filter_metadata: Optional[Dict[str, Any]] = None,
+    candidate_count: int = 50,
+    rrf_k: int = 60,
+    ef_search: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Parameters of ``hybrid_search_rag_pages``."""
+    return _optional(
+        {
+            "query_text": query,
+            "query_embedding": query_embedding,
+            "match_count": match_count,
+            "candidate_count": max(candidate_count, match_count),
+            "rrf_k": rrf_k,
+        },
+        filter=route_filter(filter_metadata),
+        ef_search=default_ef_search(ef_search),
+    )
@@ -3,11 +3,21 @@ Database setup and connection utilities for Supabase with pgvector.
 """
 
 import os
-from typing import Dict, List, Optional, Any
-from postgrest import ReturnMethod
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Any
 from dotenv import load_dotenv
 from pathlib import Path
-from supabase import create_client
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.client_registry import count_bytes_sent, get_client
+from database.corpus_version import note_local_write
+from database.documents import DocumentCatalogMixin
+from database.local_index import LocalVectorIndex
+from database.queries import QueryOperations, Steps, run_steps
+from database.routing import with_collection
 
 # Load environment variables from the project root .env file
 project_root = Path(__file__).resolve().parent.parent
@@ -17,38 +27,80 @@ dotenv_path = project_root / ".env"
 load_dotenv(dotenv_path, override=True)
 
 
-class SupabaseClient:
+class SupabaseClient(QueryOperations, DocumentCatalogMixin):
     """
     Client for interacting with Supabase and pgvector.
 
     Args:
         supabase_url: URL for Supabase instance. Defaults to SUPABASE_URL env var.
         supabase_key: API key for Supabase. Defaults to SUPABASE_KEY env var.
+        client: Pre-built client to use instead of the shared one from
+            ``database.client_registry`` (e.g.
+            ``database.local_store.LocalSupabaseClient`` for offline runs).
+            With DATABASE_BACKEND=postgres it defaults to a pooled
+            ``database.postgres.PostgresClient`` on DATABASE_URL.
+        local_index: ``database.local_index.LocalVectorIndex`` to serve
+            unfiltered vector searches from. Defaults to one in LOCAL_INDEX_DIR
+            if that is set.
     """
 
     def __init__(
-        self, supabase_url: Optional[str] = None, supabase_key: Optional[str] = None
+        self,
+        supabase_url: Optional[str] = None,
+        supabase_key: Optional[str] = None,
+        client: Optional[Any] = None,
+        local_index: Optional[Any] = None,
     ):
         self.supabase_url = supabase_url or os.getenv("SUPABASE_URL")
         self.supabase_key = supabase_key or os.getenv("SUPABASE_KEY")
 
-        if not self.supabase_url or not self.supabase_key:
+        if client is not None:
+            self.client = client
+        elif os.getenv("DATABASE_BACKEND", "postgrest").lower() == "postgres":
+            from database.postgres import PostgresClient
+
+            self.client = PostgresClient()
+        elif not self.supabase_url or not self.supabase_key:
             raise ValueError(
                 "Supabase URL and key must be provided either as arguments or environment variables."
             )
+        else:
+            self.client = get_client(self.supabase_url, self.supabase_key)
+        # Payload size of the most recent request (read by the ingestion report)
+        self.last_bytes_sent = 0
 
-        self.client = create_client(self.supabase_url, self.supabase_key)
+        if local_index is None and os.getenv("LOCAL_INDEX_DIR"):
+            local_index = LocalVectorIndex(os.getenv("LOCAL_INDEX_DIR"))
+        self.local_index = local_index
 
-    def insert_embedding(
-        self, text: str, metadata: dict, embedding: list, url: Optional[str] = None
-    ):
-        row = {
-            "content": text,
-            "metadata": metadata,
-            "embedding": embedding,
-        }
-        if url:
-            row["url"] = url
+    def _execute(self, operation: str, request):
+        """
+        Execute a PostgREST request and record duration, rows and bytes sent.
+
+        ``bytes_sent`` is the request body sent over the shared HTTP pool (see
+        ``client_registry.count_bytes_sent``), read from the already encoded
+        request; the Postgres backend reports 0.
+
+        Args:
+            operation: Metric label, e.g. ``insert_chunk`` or ``match_rag_pages``
+            request: Query/RPC builder with an ``execute()`` method
+
+        Returns:
+            The PostgREST response
+        """
+        start = time.perf_counter()
+        try:
+            with count_bytes_sent() as sent:
+                response = request.execute()
+        except Exception:
+            self._record(operation, start)
+            raise
+        self._record(operation, start, response, sent[0])
+        return response
+
+    def _run(self, operation: Callable[..., Steps], *args, **kwargs) -> Any:
+        """Run a ``database.queries`` operation with ``_execute``."""
+        return run_steps(operation(self.client, *args, **kwargs), self._execute)
 
     def insert_embedding(
         self,
@@ -57,6 +109,7 @@ class SupabaseClient:
         embedding: list,
         url: Optional[str] = None,
         chunk_number: int = 0,
+        document_id: Optional[int] = None,
     ):
         """
         Speichert einen einzelnen Chunk mit Text, Metadaten und Vektor in die Tabelle 'rag_pages'.
@@ -71,9 +124,15 @@ class SupabaseClient:
 
         if url:
             row["url"] = url
+        if document_id is not None:
+            row["document_id"] = document_id
+        with_collection([row])
 
         try:
-            response = self.client.table("rag_pages").insert(row).execute()
+            response = self._execute(
+                "insert_chunk", self.client.table("rag_pages").insert(row)
+            )
+            note_local_write()
             return response
         except Exception as e:
             print(f"❌ Fehler beim Einfügen des Embeddings: {e}")
@@ -86,6 +145,7 @@ class SupabaseClient:
         content: str,
         embedding: List[float],
         metadata: Dict[str, Any] = None,
+        document_id: Optional[int] = None,
     ) -> Dict[str, Any]:
         if metadata is None:
             metadata = {}
@@ -97,45 +157,164 @@ class SupabaseClient:
             "embedding": embedding,
             "metadata": metadata,
         }
+        if document_id is not None:
+            data["document_id"] = document_id
+        with_collection([data])
 
-        result = self.client.table("rag_pages").insert(data).execute()
+        result = self._execute(
+            "insert_chunk", self.client.table("rag_pages").insert(data)
+        )
+        note_local_write()
         return result.data[0] if result.data else {}
 
+    def store_document_chunks(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        Insert many chunks in one request without reading them back.
+
+        PostgREST gets a single bulk insert; the Postgres backend loads the
+        rows with binary ``COPY``.
+
+        Args:
+            rows: ``rag_pages`` rows (url, chunk_number, content, embedding,
+                metadata, document_id); ``collection`` is derived from the
+                metadata source if missing
+
+        Returns:
+            Number of inserted rows
+        """
+        return self._run(self._store_document_chunks, rows)
+
     def search_documents(
         self,
         query_embedding: List[float],
-        match_threshold: float = 0.5,
+        match_threshold: Optional[float] = None,
         match_count: int = 5,
         filter_metadata: Optional[Dict[str, Any]] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
-        match_threshold = float(os.getenv("MIN_SIMILARITY_SCORE", "0.5"))
+        """
+        Vector search via the ``match_rag_pages`` RPC.
 
-        params = {
-            "query_embedding": query_embedding,
-            "match_threshold": match_threshold,
-            "match_count": match_count,
-        }
+        Args:
+            query_embedding: Query vector
+            match_threshold: Minimum similarity, applied in SQL; defaults to
+                MIN_SIMILARITY_SCORE (0.5)
+            match_count: Number of results
+            filter_metadata: JSONB containment filter on ``metadata``
+            ef_search: HNSW candidate list size for this query (recall vs.
+                latency); defaults to HNSW_EF_SEARCH if set
+            probes: ivfflat lists to scan; defaults to IVFFLAT_PROBES if set
 
-        if filter_metadata:
-            params["filter"] = filter_metadata
+        Returns:
+            Matching chunks with ``similarity``
+        """
+        return self._run(
+            self._search_documents,
+            query_embedding,
+            match_threshold,
+            match_count,
+            filter_metadata,
+            ef_search,
+            probes,
+        )
 
-        try:
-            result = self.client.rpc("match_rag_pages", params).execute()
-            if not result.data:
-                print("⚠️ Keine Dokument-Treffer für die Anfrage gefunden.")
-                return []
+    def search_document_scores(
+        self,
+        query_embedding: List[float],
+        match_count: int = 50,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        match_threshold: Optional[float] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Phase 1 of two-phase retrieval: ids and similarities only.
+
+        Args:
+            query_embedding: Query vector
+            match_count: Number of candidates
+            filter_metadata: JSONB containment filter on ``metadata``
+            match_threshold: Minimum similarity, applied in SQL; defaults to
+                MIN_SIMILARITY_SCORE (0.5)
+            ef_search: HNSW candidate list size (defaults to HNSW_EF_SEARCH)
 
-            print(f"\n🔍 Top {len(result.data)} RAG-Matches:")
-            for r in result.data:
-                score = r.get("similarity", 0.0)
-                preview = r["content"][:120].replace("\n", " ")
-                print(f"  • Score: {score:.3f} → {preview}...")
+        Returns:
+            ``{"id", "similarity"}`` dicts, best first
+        """
+        return self._run(
+            self._search_document_scores,
+            query_embedding,
+            match_count,
+            filter_metadata,
+            match_threshold,
+            ef_search,
+        )
+
+    def keyword_search_scores(
+        self,
+        query: str,
+        match_count: int = 50,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Phase 1 of two-phase retrieval: keyword ids and ranks only.
 
-            return result.data
+        Returns:
+            ``{"id", "keyword_rank"}`` dicts, best first
+        """
+        return self._run(
+            self._keyword_search_scores, query, match_count, filter_metadata
+        )
 
-        except Exception as e:
-            print("❌ Fehler bei Supabase-RPC:", str(e))
-            return []
+    def fetch_chunks(self, ids: List[int]) -> List[Dict[str, Any]]:
+        """
+        Phase 2 of two-phase retrieval: load the winning chunks in one query.
+
+        Args:
+            ids: Chunk ids in the desired order
+
+        Returns:
+            Chunks (id, url, chunk_number, content, metadata with the
+            document metadata merged in) in the order of ``ids``
+        """
+        return self._run(self._fetch_chunks, ids)
+
+    def hybrid_search_documents(
+        self,
+        query: str,
+        query_embedding: List[float],
+        match_count: int = 10,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        candidate_count: int = 50,
+        rrf_k: int = 60,
+        ef_search: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Vector + full-text search fused server-side with reciprocal rank fusion.
+
+        Args:
+            query: Question text for the full-text part
+            query_embedding: Query vector for the vector part
+            match_count: Number of fused results to return
+            filter_metadata: JSONB containment filter on ``metadata``
+            candidate_count: Candidates taken from each retriever before fusion
+            rrf_k: RRF constant; higher values flatten the rank weights
+            ef_search: HNSW candidate list size (defaults to HNSW_EF_SEARCH)
+
+        Returns:
+            Chunks ordered by ``rrf_score``, each with ``similarity`` and
+            ``keyword_rank``
+        """
+        return self._run(
+            self._hybrid_search_documents,
+            query,
+            query_embedding,
+            match_count,
+            filter_metadata,
+            candidate_count,
+            rrf_k,
+            ef_search,
+        )
 
     def keyword_search_documents(
         self,
@@ -143,43 +322,43 @@ class SupabaseClient:
         match_count: int = 20,
         filter_metadata: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]:
-        try:
-            qb = self.client.table("rag_pages").select(
-                "id,url,chunk_number,content,metadata"
-            )
-            if filter_metadata:
-                for key, value in filter_metadata.items():
-                    qb = qb.contains("metadata", {key: value})
-            qb = qb.ilike("content", f"%{query}%").limit(match_count)
-            result = qb.execute()
-            return result.data or []
-        except Exception as e:
-            print("❌ Fehler bei Keyword-Suche:", e)
-            return []
+        """
+        Full-text search via the ``keyword_search_rag_pages`` RPC.
+
+        The question is parsed into an OR of German lexemes (GIN index on the
+        generated ``fts`` column); product codes like "10W-40" are matched
+        exactly through the trigram index and rank above word matches.
+
+        Args:
+            query: Question or keywords
+            match_count: Number of results
+            filter_metadata: JSONB containment filter on ``metadata``
+
+        Returns:
+            Matching chunks with ``keyword_rank``, best first
+        """
+        return self._run(
+            self._keyword_search_documents, query, match_count, filter_metadata
+        )
 
     def get_document_by_id(self, doc_id: int) -> Dict[str, Any]:
         result = self.client.table("rag_pages").select("*").eq("id", doc_id).execute()
         return result.data[0] if result.data else {}
 
-    def get_all_document_sources(self) -> List[str]:
-        result = self.client.table("rag_pages").select("url").execute()
-        urls = set(item["url"] for item in result.data if result.data)
-        return list(urls)
+    def delete_documents(self, urls: List[str]) -> Dict[str, int]:
+        """
+        Delete documents (chunks and catalog rows) by url in one RPC.
 
-    def count_documents(self) -> int:
-        return len(self.get_all_document_sources())
+        Args:
+            urls: Document urls; any number in a single request
+
+        Returns:
+            ``{"documents": ..., "chunks": ...}`` deleted counts
+        """
+        return self._run(self._delete_documents, urls)
 
     def delete_documents_by_filename(self, filename: str) -> int:
-        try:
-            response = (
-                self.client.table("rag_pages").delete().eq("url", filename).execute()
-            )
-            deleted = len(response.data or [])
-            print(f"🧹 {deleted} Datenbankeinträge mit url = {filename} gelöscht.")
-            return deleted
-        except Exception as e:
-            print(f"❌ Fehler beim Löschen von {filename} in rag_pages: {e}")
-            return 0
+        return self._run(self._delete_documents_by_filename, filename)
 
 
 def setup_database_tables() -> None:
@@ -1,10 +1,19 @@
 """
 Script to set up the database tables in Supabase using the Supabase MCP server.
+
+    python -m database.setup_db sql --index-method hnsw --m 16 --ef-construction 64
+    python -m database.setup_db rebuild-index        # needs DATABASE_URL + psycopg
+    python -m database.setup_db rebuild-index --print
+    python -m database.setup_db sql --storage halfvec --quantization binary
+    python -m database.setup_db sql --iterative-scan off   # pgvector < 0.8
 """
 import os
 import sys
+import math
 import asyncio
+import argparse
 from pathlib import Path
+from typing import List, Optional
 from dotenv import load_dotenv
 
 # Add parent directory to path to allow relative imports
@@ -17,63 +26,680 @@ dotenv_path = project_root / '.env'
 # Force override of existing environment variables
 load_dotenv(dotenv_path, override=True)
 
+VECTOR_INDEX_NAME = "idx_rag_pages_embedding"
+
+EMBEDDING_DIM = 1536
+
+# Column type per VECTOR_STORAGE: float32 (6 KB/row) or float16 (3 KB/row)
+VECTOR_STORAGE_TYPES = {
+    "vector": f"vector({EMBEDDING_DIM})",
+    "halfvec": f"halfvec({EMBEDDING_DIM})",
+}
+
+# VECTOR_QUANTIZATION: "none" indexes the embedding itself, "binary" indexes
+# binary_quantize(embedding) (1 bit per dimension, Hamming distance)
+VECTOR_QUANTIZATIONS = ("none", "binary")
+
+# VECTOR_ITERATIVE_SCAN for filtered searches (pgvector >= 0.8); "off" falls
+# back to a larger hnsw.ef_search (VECTOR_FILTER_OVERFETCH)
+ITERATIVE_SCAN_MODES = ("relaxed_order", "strict_order", "off")
+
+# Auto-generated name of the ivfflat index created by earlier setup scripts
+LEGACY_VECTOR_INDEX_NAME = "rag_pages_embedding_idx"
+
+
+def recommended_lists(row_count: int) -> int:
+    """
+    Number of ivfflat lists recommended by pgvector for a table size.
+
+    Args:
+        row_count: Number of rows in rag_pages
+
+    Returns:
+        rows / 1000 up to 1M rows, sqrt(rows) above (at least 10)
+    """
+    if row_count <= 1_000_000:
+        return max(10, row_count // 1000)
+    return int(math.sqrt(row_count))
+
+
+def vector_storage(storage: Optional[str] = None) -> str:
+    """Resolve the embedding storage (``vector`` or ``halfvec``, VECTOR_STORAGE)."""
+    storage = (storage or os.getenv("VECTOR_STORAGE", "vector")).lower()
+    if storage not in VECTOR_STORAGE_TYPES:
+        raise ValueError(f"Unknown vector storage: {storage}")
+    return storage
+
+
+def vector_quantization(quantization: Optional[str] = None) -> str:
+    """Resolve the index quantization (``none`` or ``binary``, VECTOR_QUANTIZATION)."""
+    quantization = (quantization or os.getenv("VECTOR_QUANTIZATION", "none")).lower()
+    if quantization not in VECTOR_QUANTIZATIONS:
+        raise ValueError(f"Unknown vector quantization: {quantization}")
+    return quantization
+
+
+def iterative_scan_mode(iterative_scan: Optional[str] = None) -> str:
+    """Resolve the filtered-search scan mode (VECTOR_ITERATIVE_SCAN)."""
+    mode = (iterative_scan or os.getenv("VECTOR_ITERATIVE_SCAN", "relaxed_order"))
+    mode = mode.lower()
+    if mode not in ITERATIVE_SCAN_MODES:
+        raise ValueError(f"Unknown iterative scan mode: {mode}")
+    return mode
+
+
+def _scan_settings_sql(
+    quantization: str, rescore_factor: int, iterative_scan: str, filter_overfetch: int
+) -> str:
+    """``set_config`` statements that run before the candidate query."""
+    statements = []
+    if iterative_scan != "off":
+        # ivfflat only knows relaxed_order
+        statements.append(
+            "  -- Filtered searches keep scanning the index until candidate_count\n"
+            "  -- rows match instead of returning the few that survive the filter\n"
+            "  select set_config('hnsw.iterative_scan', case when filter = '{}'::jsonb\n"
+            f"           then 'off' else '{iterative_scan}' end, true),\n"
+            "         set_config('ivfflat.iterative_scan', case when filter = '{}'::jsonb\n"
+            "           then 'off' else 'relaxed_order' end, true);"
+        )
+    rows = "candidate_count"
+    if quantization == "binary":
+        rows += f" * {rescore_factor}"
+    if iterative_scan == "off" and filter_overfetch > 1:
+        rows += f"\n      * case when filter = '{{}}'::jsonb then 1 else {filter_overfetch} end"
+    if rows != "candidate_count":
+        statements.append(
+            "  -- HNSW returns at most ef_search rows: make room for the over-fetch\n"
+            "  select set_config('hnsw.ef_search', greatest(\n"
+            "    coalesce(nullif(current_setting('hnsw.ef_search', true), '')::int, 40),\n"
+            f"    least({rows}, 1000))::text, true);"
+        )
+    return "\n\n".join(statements)
+
+
+def candidate_query_sql(
+    storage: Optional[str] = None,
+    quantization: Optional[str] = None,
+    rescore_factor: Optional[int] = None,
+    iterative_scan: Optional[str] = None,
+    filter_overfetch: Optional[int] = None,
+) -> str:
+    """
+    Body of ``match_rag_page_candidates``, the vector part of every search.
+
+    With binary quantization the bit index returns ``rescore_factor`` times
+    the requested candidates by Hamming distance; these are re-scored with
+    the exact cosine distance on the stored embeddings.
+
+    A ``filter`` is applied after the ANN scan, so a selective filter used to
+    leave fewer than ``candidate_count`` rows. Filtered searches therefore
+    enable pgvector's iterative index scans (0.8+), or, with
+    ``iterative_scan="off"``, raise ``hnsw.ef_search`` by ``filter_overfetch``.
+
+    Args:
+        storage: ``vector`` or ``halfvec``
+        quantization: ``none`` or ``binary``
+        rescore_factor: Over-fetch factor of the binary pre-filter
+            (VECTOR_RESCORE_FACTOR, 4)
+        iterative_scan: ``relaxed_order``, ``strict_order`` or ``off``
+            (VECTOR_ITERATIVE_SCAN, relaxed_order)
+        filter_overfetch: ef_search factor for filtered searches without
+            iterative scans (VECTOR_FILTER_OVERFETCH, 4)
+
+    Returns:
+        SQL statements of the function body
+    """
+    column_type = VECTOR_STORAGE_TYPES[vector_storage(storage)]
+    quantization = vector_quantization(quantization)
+    factor = int(rescore_factor or os.getenv("VECTOR_RESCORE_FACTOR", "4"))
+    settings = _scan_settings_sql(
+        quantization,
+        factor,
+        iterative_scan_mode(iterative_scan),
+        int(filter_overfetch or os.getenv("VECTOR_FILTER_OVERFETCH", "4")),
+    )
+    distance = f"embedding <=> query_embedding::{column_type}"
+    if quantization == "none":
+        order = f"p.{distance}"
+        fetch = "candidate_count"
+        selected = f"p.id, 1 - ({order}) as similarity"
+    else:
+        order = (
+            f"binary_quantize(p.embedding)::bit({EMBEDDING_DIM})\n"
+            f"                <~> binary_quantize(query_embedding)"
+        )
+        fetch = f"candidate_count * {factor}"
+        selected = "p.id, p.embedding"
+    # Reason: a collection filter must compare the partition key with a plain
+    # equality to prune partitions, so routed and unrouted searches are two
+    # branches. Each starts with a condition on ``filter`` alone, which the
+    # planner turns into a one-time filter, so only one branch scans
+    branches = [
+        (
+            f"      (select {selected}\n"
+            f"         from rag_pages p\n"
+            f"        where {condition}\n"
+            f"          and (filter->>'source' is null or p.source = filter->>'source')\n"
+            f"          and p.metadata @> (filter - 'collection')\n"
+            f"        order by {order.replace(chr(10), chr(10) + ' ')}\n"
+            f"        limit {fetch})\n"
+        )
+        for condition in (
+            "filter ? 'collection' and p.collection = filter->>'collection'",
+            "not filter ? 'collection'",
+        )
+    ]
+    # Reason: relaxed_order and the bit pre-filter return rows slightly out of
+    # order, so the outer query sorts the candidates exactly
+    query = (
+        f"  select c.id, 1 - (c.{distance}) as similarity\n"
+        if quantization == "binary"
+        else "  select c.id, c.similarity\n"
+    )
+    query += "    from (\n" + "      union all\n".join(branches) + "    ) c\n"
+    query += (
+        f"   order by c.{distance}\n   limit candidate_count;"
+        if quantization == "binary"
+        else "   order by c.similarity desc;"
+    )
+    return f"{settings}\n\n{query}" if settings else query
+
+
+def candidates_function_sql(
+    storage: Optional[str] = None,
+    quantization: Optional[str] = None,
+    rescore_factor: Optional[int] = None,
+    iterative_scan: Optional[str] = None,
+    filter_overfetch: Optional[int] = None,
+) -> str:
+    """``create function match_rag_page_candidates`` for the chosen modes."""
+    body = candidate_query_sql(
+        storage, quantization, rescore_factor, iterative_scan, filter_overfetch
+    )
+    # Reason: the scan settings are changed with set_config
+    volatility = "volatile" if "set_config" in body else "stable"
+    return (
+        "create or replace function match_rag_page_candidates (\n"
+        f"  query_embedding vector({EMBEDDING_DIM}),\n"
+        "  candidate_count int,\n"
+        "  filter jsonb default '{}'::jsonb\n"
+        ") returns table (\n"
+        "  id bigint,\n"
+        "  similarity float\n"
+        ")\n"
+        "language sql\n"
+        f"{volatility}\n"
+        "as $$\n"
+        f"{body}\n"
+        "$$"
+    )
+
+
+def vector_index_name(table: str = "rag_pages") -> str:
+    """Name of the vector index of ``rag_pages`` or of one of its partitions."""
+    return VECTOR_INDEX_NAME if table == "rag_pages" else f"idx_{table}_embedding"
+
+
+def vector_index_sql(
+    method: Optional[str] = None,
+    m: Optional[int] = None,
+    ef_construction: Optional[int] = None,
+    lists: Optional[int] = None,
+    name: str = VECTOR_INDEX_NAME,
+    concurrently: bool = False,
+    storage: Optional[str] = None,
+    quantization: Optional[str] = None,
+    table: str = "rag_pages",
+) -> str:
+    """
+    Build the ``create index`` statement for the embedding column.
+
+    Defaults come from VECTOR_INDEX_METHOD (``hnsw`` or ``ivfflat``), HNSW_M,
+    HNSW_EF_CONSTRUCTION, IVFFLAT_LISTS, VECTOR_STORAGE and
+    VECTOR_QUANTIZATION.
+
+    Args:
+        method: ``hnsw`` (default) or ``ivfflat``
+        m: HNSW graph degree
+        ef_construction: HNSW candidate list size while building
+        lists: Number of ivfflat lists
+        name: Index name
+        concurrently: Build without blocking writes (not inside a transaction)
+        storage: ``vector`` or ``halfvec`` column type
+        quantization: ``none`` or ``binary`` (index on the bit signatures)
+        table: ``rag_pages`` or one of its partitions
+
+    Returns:
+        SQL statement
+    """
+    method = (method or os.getenv("VECTOR_INDEX_METHOD", "hnsw")).lower()
+    if method == "hnsw":
+        m = m or int(os.getenv("HNSW_M", "16"))
+        ef_construction = ef_construction or int(
+            os.getenv("HNSW_EF_CONSTRUCTION", "64")
+        )
+        options = f"m = {int(m)}, ef_construction = {int(ef_construction)}"
+    elif method == "ivfflat":
+        # Reason: ivfflat centroids are trained on the rows present at build
+        # time, so build (or rebuild) it after loading data
+        lists = lists or int(os.getenv("IVFFLAT_LISTS", "100"))
+        options = f"lists = {int(lists)}"
+    else:
+        raise ValueError(f"Unknown vector index method: {method}")
+
+    if vector_quantization(quantization) == "binary":
+        column = f"(binary_quantize(embedding)::bit({EMBEDDING_DIM})) bit_hamming_ops"
+    else:
+        column = f"embedding {vector_storage(storage)}_cosine_ops"
+    return (
+        f"create index {'concurrently ' if concurrently else ''}if not exists {name}\n"
+        f"  on {table} using {method} ({column})\n"
+        f"  with ({options})"
+    )
+
+
+def rebuild_index_sql(
+    method: Optional[str] = None,
+    m: Optional[int] = None,
+    ef_construction: Optional[int] = None,
+    lists: Optional[int] = None,
+    maintenance_work_mem: str = "512MB",
+    storage: Optional[str] = None,
+    quantization: Optional[str] = None,
+    iterative_scan: Optional[str] = None,
+    table: str = "rag_pages",
+) -> List[str]:
+    """
+    Statements that rebuild the vector index online after bulk loads.
+
+    The new index is built CONCURRENTLY next to the old one and swapped in by
+    renaming, so searches keep using an index the whole time. Each statement
+    must run outside a transaction (psql or autocommit). A partitioned
+    ``rag_pages`` has one index per partition: pass the partition as
+    ``table``.
+
+    Returns:
+        SQL statements in execution order
+    """
+    name = vector_index_name(table)
+    new_name = f"{name}_new"
+    old_name = f"{name}_old"
+    statements = [
+        f"set maintenance_work_mem = '{maintenance_work_mem}'",
+        # Leftover (invalid) index of an aborted rebuild
+        f"drop index concurrently if exists {new_name}",
+        vector_index_sql(
+            method,
+            m,
+            ef_construction,
+            lists,
+            new_name,
+            True,
+            storage,
+            quantization,
+            table,
+        ),
+        f"alter index if exists {name} rename to {old_name}",
+        f"alter index {new_name} rename to {name}",
+        # Searches must use the expression the new index was built on
+        candidates_function_sql(storage, quantization, iterative_scan=iterative_scan),
+        f"drop index concurrently if exists {old_name}",
+    ]
+    if table == "rag_pages":
+        statements.append(f"drop index concurrently if exists {LEGACY_VECTOR_INDEX_NAME}")
+    return statements + [f"analyze {table}"]
+
+
+def rebuild_index(database_url: str, **options) -> None:
+    """
+    Rebuild the vector index on a live database.
+
+    Args:
+        database_url: Postgres connection string (Supabase: Session pooler or
+            direct connection; transaction pooling does not support this)
+        **options: Passed to ``rebuild_index_sql``
+    """
+    try:
+        import psycopg
+    except ImportError as e:
+        raise RuntimeError(
+            "psycopg is required to run the rebuild (pip install 'psycopg[binary]'); "
+            "use --print to get the SQL for psql instead"
+        ) from e
+
+    with psycopg.connect(database_url, autocommit=True) as conn:
+        method = (options.get("method") or os.getenv("VECTOR_INDEX_METHOD", "hnsw"))
+        if method == "ivfflat" and not options.get("lists"):
+            table = options.get("table") or "rag_pages"
+            rows = conn.execute(f"select count(*) from {table}").fetchone()[0]
+            options["lists"] = recommended_lists(rows)
+        for statement in rebuild_index_sql(**options):
+            print(f"▶️ {statement.splitlines()[0]}")
+            conn.execute(statement)
+    print("✅ Vektorindex neu aufgebaut")
+
+
 # SQL for creating the database tables and functions
-SQL_SETUP = """
+SQL_SETUP_TEMPLATE = """
 -- Enable the pgvector extension
 create extension if not exists vector;
 
 -- Create the documentation chunks table
-create table rag_pages (
+create table if not exists rag_pages (
     id bigserial primary key,
     url varchar not null,
     chunk_number integer not null,
     content text not null,
     metadata jsonb not null default '{}'::jsonb,
-    embedding vector(1536),  -- OpenAI embeddings are 1536 dimensions
+    embedding __EMBEDDING_TYPE__,  -- OpenAI embeddings are 1536 dimensions
     created_at timestamp with time zone default timezone('utc'::text, now()) not null,
     
     -- Add a unique constraint to prevent duplicate chunks for the same URL
     unique(url, chunk_number)
 );
 
+-- Embedding storage (VECTOR_STORAGE): vector = float32 (6 KB per row),
+-- halfvec = float16 (3 KB per row, also halves the index). Switching
+-- rewrites the table once; the vector index is dropped here and rebuilt
+-- for the new type below. Reason: a halfvec index cannot be built on a
+-- vector column.
+do $$
+begin
+  if (select format_type(atttypid, atttypmod) from pg_attribute
+       where attrelid = 'rag_pages'::regclass and attname = 'embedding')
+     <> '__EMBEDDING_TYPE__' then
+    drop index if exists idx_rag_pages_embedding;
+    drop index if exists rag_pages_embedding_idx;
+    alter table rag_pages
+      alter column embedding type __EMBEDDING_TYPE__ using embedding::__EMBEDDING_TYPE__;
+  end if;
+end;
+$$;
+
 -- Create an index for better vector similarity search performance
-create index on rag_pages using ivfflat (embedding vector_cosine_ops);
+-- (HNSW by default; see vector_index_sql for the options). A partitioned
+-- rag_pages has one index per partition instead (database/partitioning.py).
+do $$
+begin
+  if (select relkind from pg_class where oid = 'rag_pages'::regclass) <> 'p' then
+    execute $index$
+__VECTOR_INDEX__
+    $index$;
+  end if;
+end;
+$$;
+
+-- Typed copy of the metadata key used in search filters, with a B-tree
+-- index. Reason: a GIN index on the whole metadata column slows every insert
+-- and cannot serve ->> equality lookups. Document-level keys (file hash,
+-- filename, ...) live in the documents table below.
+alter table rag_pages
+  add column if not exists source text
+    generated always as (metadata->>'source') stored;
+
+alter table rag_pages
+  drop column if exists file_hash,
+  drop column if exists source_filter,
+  drop column if exists original_filename;
+
+drop index if exists idx_rag_pages_metadata;
+drop index if exists idx_rag_pages_source;
+drop index if exists idx_rag_pages_url_prefix;
+
+create index if not exists idx_rag_pages_source on rag_pages (source);
 
--- Create an index on metadata for faster filtering
-create index idx_rag_pages_metadata on rag_pages using gin (metadata);
+-- Owning document (foreign key added with the documents table below)
+alter table rag_pages add column if not exists document_id bigint;
 
--- Create an index on source for faster filtering
-CREATE INDEX idx_rag_pages_source ON rag_pages ((metadata->>'source'));
+-- Collection (documents, notes, or a customer): the partition key when
+-- rag_pages is partitioned (see database/partitioning.py). The client sets it
+-- on insert; source filters are routed to it (database/routing.py).
+alter table rag_pages
+  add column if not exists collection text not null default 'documents';
+
+update rag_pages set collection = 'notes'
+ where source = 'manuell' and collection = 'documents';
+
+-- Full-text search: generated German tsvector with a GIN index
+alter table rag_pages
+  add column if not exists fts tsvector
+  generated always as (to_tsvector('german', content)) stored;
+
+create index if not exists idx_rag_pages_fts on rag_pages using gin (fts);
+
+-- Trigram index for exact product codes such as "2-T" or "10W-40"
+create extension if not exists pg_trgm;
+
+create index if not exists idx_rag_pages_content_trgm
+  on rag_pages using gin (content gin_trgm_ops);
+
+-- Vector candidates (id, cosine similarity) shared by all search functions;
+-- with VECTOR_QUANTIZATION=binary they are pre-filtered on the bit index and
+-- re-scored exactly; filtered searches use iterative index scans so they
+-- still return candidate_count rows (see candidate_query_sql)
+__CANDIDATES_FUNCTION__;
 
 -- Create a function to search for documentation chunks
+-- (the signature changed, so drop the old overloads first)
+drop function if exists match_rag_pages(vector, int, jsonb);
+drop function if exists match_rag_pages(vector, int, jsonb, int, int);
+drop function if exists match_rag_pages(vector, int, jsonb, int, int, float);
+
 create or replace function match_rag_pages (
   query_embedding vector(1536),
   match_count int default 10,
-  filter jsonb DEFAULT '{}'::jsonb
+  filter jsonb DEFAULT '{}'::jsonb,
+  ef_search int default null,
+  probes int default null,
+  match_threshold float default null
 ) returns table (
   id bigint,
   url varchar,
   chunk_number integer,
   content text,
   metadata jsonb,
+  document_id bigint,
   similarity float
 )
 language plpgsql
 as $$
 #variable_conflict use_column
 begin
+  -- Per-call search tuning; is_local = true limits it to this transaction
+  if ef_search is not null then
+    -- HNSW returns at most ef_search rows, so never go below match_count
+    perform set_config(
+      'hnsw.ef_search', least(greatest(ef_search, match_count), 1000)::text, true
+    );
+  end if;
+  if probes is not null then
+    perform set_config('ivfflat.probes', probes::text, true);
+  end if;
+
   return query
-  select
-    id,
-    url,
-    chunk_number,
-    content,
-    metadata,
-    1 - (rag_pages.embedding <=> query_embedding) as similarity
-  from rag_pages
-  where metadata @> filter
-  order by rag_pages.embedding <=> query_embedding
-  limit match_count;
+  select p.id, p.url, p.chunk_number, p.content, p.metadata, p.document_id,
+         c.similarity
+    from match_rag_page_candidates(query_embedding, match_count, filter) c
+    join rag_pages p on p.id = c.id
+  -- Threshold after the ordered LIMIT, so the vector index is still used
+   where match_threshold is null or c.similarity >= match_threshold
+   order by c.similarity desc;
+end;
+$$;
+
+-- Two-phase retrieval, phase 1: ids and scores only (no content/metadata)
+create or replace function match_rag_page_scores (
+  query_embedding vector(1536),
+  match_count int default 50,
+  filter jsonb default '{}'::jsonb,
+  match_threshold float default null,
+  ef_search int default null
+) returns table (
+  id bigint,
+  similarity float
+)
+language plpgsql
+as $$
+#variable_conflict use_column
+begin
+  if ef_search is not null then
+    perform set_config(
+      'hnsw.ef_search', least(greatest(ef_search, match_count), 1000)::text, true
+    );
+  end if;
+
+  return query
+  select c.id, c.similarity
+    from match_rag_page_candidates(query_embedding, match_count, filter) c
+   where match_threshold is null or c.similarity >= match_threshold
+   order by c.similarity desc;
+end;
+$$;
+
+-- Product codes in a question, e.g. 10W-40, 2-T, HLP 46
+create or replace function product_codes (query_text text)
+returns text[]
+language sql
+immutable
+as $$
+  select coalesce(array_agg(distinct m[1]), '{}')
+    from regexp_matches(
+      query_text, '\\m(\\d{1,2}[Ww]-?\\d{2,3}|\\d-[Tt]|[A-Z]{2,5} ?\\d{1,4})\\M', 'g'
+    ) as m;
+$$;
+
+-- Keyword search on the fts column (GIN) plus exact product codes (pg_trgm);
+-- ids and ranks only, see keyword_search_rag_pages for full rows
+create or replace function keyword_rag_page_scores (
+  query_text text,
+  match_count int default 20,
+  filter jsonb default '{}'::jsonb
+) returns table (
+  id bigint,
+  keyword_rank float
+)
+language sql
+stable
+as $$
+  with q as (
+    select
+      -- OR of the question's lexemes: a chunk need not contain every word
+      -- of the question, ts_rank_cd ranks chunks with more of them higher
+      (select string_agg(quote_literal(t.lexeme), ' | ')
+         from unnest(to_tsvector('german', query_text)) as t)::tsquery as query,
+      (select coalesce(array_agg('%' || c || '%'), '{}')
+         from unnest(product_codes(query_text)) as c) as patterns
+  )
+  select p.id,
+         (coalesce(ts_rank_cd(p.fts, q.query), 0)
+           -- every exact product code hit outranks pure word matches
+           + (select count(*) from unnest(q.patterns) as pat
+               where p.content ilike pat))::float as keyword_rank
+    from rag_pages p, q
+   where (filter->>'source' is null or p.source = filter->>'source')
+     and (not filter ? 'collection' or p.collection = filter->>'collection')
+     and p.metadata @> (filter - 'collection')
+     and (p.fts @@ q.query or p.content ilike any (q.patterns))
+   order by keyword_rank desc
+   limit match_count;
+$$;
+
+-- (the result gained document_id, so drop the old definition first)
+drop function if exists keyword_search_rag_pages(text, int, jsonb);
+
+create or replace function keyword_search_rag_pages (
+  query_text text,
+  match_count int default 20,
+  filter jsonb default '{}'::jsonb
+) returns table (
+  id bigint,
+  url varchar,
+  chunk_number integer,
+  content text,
+  metadata jsonb,
+  document_id bigint,
+  keyword_rank float
+)
+language sql
+stable
+as $$
+  select p.id, p.url, p.chunk_number, p.content, p.metadata, p.document_id,
+         k.keyword_rank
+    from keyword_rag_page_scores(query_text, match_count, filter) k
+    join rag_pages p on p.id = k.id
+   order by k.keyword_rank desc;
+$$;
+
+-- Hybrid search: vector and full-text candidates fused with reciprocal rank
+-- fusion (RRF) by id, so the app needs one round trip per search
+drop function if exists hybrid_search_rag_pages(text, vector, int, jsonb, int, int, int);
+
+create or replace function hybrid_search_rag_pages (
+  query_text text,
+  query_embedding vector(1536),
+  match_count int default 10,
+  filter jsonb default '{}'::jsonb,
+  candidate_count int default 50,
+  rrf_k int default 60,
+  ef_search int default null
+) returns table (
+  id bigint,
+  url varchar,
+  chunk_number integer,
+  content text,
+  metadata jsonb,
+  document_id bigint,
+  similarity float,
+  keyword_rank float,
+  rrf_score float
+)
+language plpgsql
+as $$
+#variable_conflict use_column
+begin
+  if ef_search is not null then
+    perform set_config(
+      'hnsw.ef_search', least(greatest(ef_search, candidate_count), 1000)::text, true
+    );
+  end if;
+
+  return query
+  with vector_hits as (
+    select c.id,
+           c.similarity,
+           row_number() over (order by c.similarity desc) as rank
+      from match_rag_page_candidates(query_embedding, candidate_count, filter) c
+  ),
+  keyword_hits as (
+    select k.id,
+           k.keyword_rank,
+           row_number() over (order by k.keyword_rank desc) as rank
+      from keyword_rag_page_scores(query_text, candidate_count, filter) k
+  ),
+  fused as (
+    select coalesce(v.id, k.id) as id,
+           v.similarity,
+           k.keyword_rank,
+           coalesce(1.0 / (rrf_k + v.rank), 0.0)
+             + coalesce(1.0 / (rrf_k + k.rank), 0.0) as rrf_score
+      from vector_hits v
+      full outer join keyword_hits k on k.id = v.id
+  )
+  select p.id,
+         p.url,
+         p.chunk_number,
+         p.content,
+         p.metadata,
+         p.document_id,
+         -- Keyword-only hits still get their vector similarity
+         coalesce(f.similarity, 1 - (p.embedding <=> query_embedding::__EMBEDDING_TYPE__))::float,
+         coalesce(f.keyword_rank, 0)::float,
+         f.rrf_score::float
+    from fused f
+    join rag_pages p on p.id = f.id
+   order by f.rrf_score desc
+   limit match_count;
 end;
 $$;
 
@@ -81,6 +707,7 @@ $$;
 alter table rag_pages enable row level security;
 
 -- Create a policy that allows anyone to read
+drop policy if exists "Allow public read access" on rag_pages;
 create policy "Allow public read access"
   on rag_pages
   for select
@@ -88,13 +715,374 @@ create policy "Allow public read access"
   using (true);
 
 -- Create a policy that allows anyone to insert
+drop policy if exists "Allow public insert access" on rag_pages;
 create policy "Allow public insert access"
   on rag_pages
   for insert
   to public
   with check (true);
+
+-- One row per document (url) holding the document-level metadata (file
+-- hash, filename, signed URL, upload time, ...) once; chunks reference it
+-- through document_id and keep only chunk fields (page, source). Counts are
+-- maintained by statement-level triggers on rag_pages, so listing and
+-- counting documents never scans the chunks.
+create table if not exists documents (
+    id bigint generated by default as identity unique,
+    url varchar primary key,
+    source text,
+    source_filter text,
+    original_filename text,
+    file_hash text,
+    metadata jsonb not null default '{}'::jsonb,
+    chunk_count integer not null default 0,
+    content_bytes bigint not null default 0,
+    created_at timestamp with time zone default timezone('utc'::text, now()) not null,
+    updated_at timestamp with time zone default timezone('utc'::text, now()) not null
+);
+
+alter table documents
+  add column if not exists id bigint generated by default as identity unique,
+  add column if not exists metadata jsonb not null default '{}'::jsonb;
+
+create index if not exists idx_documents_source on documents (source);
+create index if not exists idx_documents_file_hash on documents (file_hash);
+
+-- Case-insensitive prefix checks (lower(url) like 'title%') independent of
+-- the database collation; replaces the case-sensitive index on url
+drop index if exists idx_documents_url_prefix;
+create index if not exists idx_documents_url_lower_prefix
+  on documents (lower(url) text_pattern_ops);
+
+alter table rag_pages
+  drop constraint if exists rag_pages_document_id_fkey;
+alter table rag_pages
+  add constraint rag_pages_document_id_fkey
+    foreign key (document_id) references documents (id) on delete cascade;
+
+create index if not exists idx_rag_pages_document_id on rag_pages (document_id);
+
+create or replace function documents_after_chunk_insert()
+returns trigger
+language plpgsql
+as $$
+begin
+  -- Chunks written without a document row (older clients) still get one
+  insert into documents as d (
+    url, source, source_filter, original_filename, file_hash,
+    chunk_count, content_bytes
+  )
+  select url, max(source), max(metadata->>'source_filter'),
+         max(metadata->>'original_filename'), max(metadata->>'file_hash'),
+         count(*), sum(octet_length(content))
+    from new_chunks
+   group by url
+  on conflict (url) do update
+     set chunk_count = d.chunk_count + excluded.chunk_count,
+         content_bytes = d.content_bytes + excluded.content_bytes,
+         source = coalesce(d.source, excluded.source),
+         source_filter = coalesce(d.source_filter, excluded.source_filter),
+         original_filename = coalesce(d.original_filename, excluded.original_filename),
+         file_hash = coalesce(d.file_hash, excluded.file_hash),
+         updated_at = now();
+  return null;
+end;
+$$;
+
+create or replace function documents_after_chunk_delete()
+returns trigger
+language plpgsql
+as $$
+begin
+  update documents d
+     set chunk_count = d.chunk_count - o.chunks,
+         content_bytes = d.content_bytes - o.bytes,
+         updated_at = now()
+    from (
+      select url, count(*) as chunks, sum(octet_length(content)) as bytes
+        from old_chunks
+       group by url
+    ) o
+   where d.url = o.url;
+
+  delete from documents d
+   where d.chunk_count <= 0
+     and d.url in (select url from old_chunks);
+  return null;
+end;
+$$;
+
+drop trigger if exists rag_pages_documents_insert on rag_pages;
+create trigger rag_pages_documents_insert
+  after insert on rag_pages
+  referencing new table as new_chunks
+  for each statement execute function documents_after_chunk_insert();
+
+drop trigger if exists rag_pages_documents_delete on rag_pages;
+create trigger rag_pages_documents_delete
+  after delete on rag_pages
+  referencing old table as old_chunks
+  for each statement execute function documents_after_chunk_delete();
+
+-- Backfill (idempotent: recomputes the counts of existing documents)
+insert into documents (
+  url, source, source_filter, original_filename, file_hash,
+  chunk_count, content_bytes, created_at
+)
+select url, max(source), max(metadata->>'source_filter'),
+       max(metadata->>'original_filename'), max(metadata->>'file_hash'),
+       count(*), sum(octet_length(content)), min(created_at)
+  from rag_pages
+ group by url
+on conflict (url) do update
+   set chunk_count = excluded.chunk_count,
+       content_bytes = excluded.content_bytes,
+       updated_at = now();
+
+-- Move document-level metadata of existing chunks into documents, then
+-- strip it from the chunks (rewrites rag_pages once; run off-peak)
+update documents d
+   set metadata = c.metadata - 'page'
+  from (
+    select distinct on (url) url, metadata
+      from rag_pages
+     where document_id is null
+     order by url, chunk_number
+  ) c
+ where d.url = c.url and d.metadata = '{}'::jsonb;
+
+update rag_pages p
+   set document_id = d.id,
+       metadata = jsonb_strip_nulls(jsonb_build_object(
+         'source', p.metadata->'source',
+         'page', p.metadata->'page'))
+  from documents d
+ where d.url = p.url and p.document_id is null;
+
+alter table documents enable row level security;
+
+drop policy if exists "Allow public read access" on documents;
+create policy "Allow public read access"
+  on documents
+  for select
+  to public
+  using (true);
+
+-- The ingestion pipeline upserts the document row before its chunks
+drop policy if exists "Allow public insert access" on documents;
+create policy "Allow public insert access"
+  on documents
+  for insert
+  to public
+  with check (true);
+
+drop policy if exists "Allow public update access" on documents;
+create policy "Allow public update access"
+  on documents
+  for update
+  to public
+  using (true);
+
+-- Delete documents by url: chunks (the triggers above keep the catalog in
+-- sync) and leftover catalog rows, in one call that returns only counts
+create or replace function delete_documents(p_urls text[])
+returns table (documents_deleted bigint, chunks_deleted bigint)
+language plpgsql
+as $$
+begin
+  select count(*) into documents_deleted
+    from documents
+   where url = any (p_urls);
+
+  delete from rag_pages where url = any (p_urls);
+  get diagnostics chunks_deleted = row_count;
+
+  -- Catalog rows without chunks are not removed by the trigger
+  delete from documents where url = any (p_urls);
+  return next;
+end;
+$$;
+
+-- Corpus version, bumped in the same transaction by every statement that
+-- changes rag_pages. Retrieval caches in any worker compare it with one
+-- cheap read (see database/corpus_version.py).
+create table if not exists corpus_version (
+    id integer primary key default 1 check (id = 1),
+    version bigint not null default 0,
+    updated_at timestamp with time zone default timezone('utc'::text, now()) not null
+);
+
+insert into corpus_version (id) values (1) on conflict (id) do nothing;
+
+-- security definer: clients may change rag_pages but not the counter
+create or replace function bump_corpus_version()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  update corpus_version
+     set version = version + 1, updated_at = now()
+   where id = 1;
+  return null;
+end;
+$$;
+
+drop trigger if exists rag_pages_corpus_version on rag_pages;
+create trigger rag_pages_corpus_version
+  after insert or update or delete or truncate on rag_pages
+  for each statement execute function bump_corpus_version();
+
+alter table corpus_version enable row level security;
+
+drop policy if exists "Allow public read access" on corpus_version;
+create policy "Allow public read access"
+  on corpus_version
+  for select
+  to public
+  using (true);
+
+-- Durable ingestion job queue (leased by document_processing/worker.py)
+create table if not exists ingestion_jobs (
+    id uuid primary key default gen_random_uuid(),
+    status text not null default 'queued'
+        check (status in ('queued', 'running', 'done', 'failed')),
+    payload jsonb not null default '{}'::jsonb,
+    attempts integer not null default 0,
+    max_attempts integer not null default 3,
+    lease_owner text,
+    lease_expires_at timestamp with time zone,
+    error text,
+    result jsonb,
+    created_at timestamp with time zone default timezone('utc'::text, now()) not null,
+    updated_at timestamp with time zone default timezone('utc'::text, now()) not null
+);
+
+create index if not exists idx_ingestion_jobs_runnable
+  on ingestion_jobs (created_at)
+  where status in ('queued', 'running');
+
+-- Lease the oldest runnable job; SKIP LOCKED lets many workers poll concurrently
+create or replace function claim_ingestion_job (
+  p_worker_id text,
+  p_lease_seconds int default 300
+) returns setof ingestion_jobs
+language plpgsql
+as $$
+begin
+  -- Jobs whose worker died on the last allowed attempt are given up
+  update ingestion_jobs
+     set status = 'failed', lease_owner = null, error = 'lease expired',
+         updated_at = now()
+   where status = 'running'
+     and lease_expires_at < now()
+     and attempts >= max_attempts;
+
+  return query
+  with claimed as (
+    update ingestion_jobs j
+       set status = 'running',
+           lease_owner = p_worker_id,
+           lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+           attempts = j.attempts + 1,
+           updated_at = now()
+     where j.id = (
+       select q.id from ingestion_jobs q
+        where q.status = 'queued'
+           or (q.status = 'running' and q.lease_expires_at < now())
+        order by q.created_at
+        limit 1
+        for update skip locked
+     )
+    returning j.*
+  )
+  select * from claimed;
+end;
+$$;
+
+create or replace function heartbeat_ingestion_job (
+  p_job_id uuid,
+  p_worker_id text,
+  p_lease_seconds int default 300
+) returns boolean
+language sql
+as $$
+  with updated as (
+    update ingestion_jobs
+       set lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+           updated_at = now()
+     where id = p_job_id and lease_owner = p_worker_id and status = 'running'
+    returning 1
+  )
+  select exists (select 1 from updated);
+$$;
+
+create or replace function finish_ingestion_job (
+  p_job_id uuid,
+  p_worker_id text,
+  p_success boolean,
+  p_result jsonb default null,
+  p_error text default null
+) returns boolean
+language sql
+as $$
+  with updated as (
+    update ingestion_jobs
+       set status = case
+             when p_success then 'done'
+             when attempts >= max_attempts then 'failed'
+             else 'queued'
+           end,
+           result = p_result,
+           error = p_error,
+           lease_owner = null,
+           lease_expires_at = null,
+           updated_at = now()
+     where id = p_job_id and lease_owner = p_worker_id and status = 'running'
+    returning 1
+  )
+  select exists (select 1 from updated);
+$$;
 """
 
+
+
+def build_setup_sql(
+    rescore_factor: Optional[int] = None,
+    iterative_scan: Optional[str] = None,
+    **index_options,
+) -> str:
+    """
+    Return the setup SQL with the configured vector storage and index.
+
+    Args:
+        rescore_factor: Over-fetch factor of the binary pre-filter
+        iterative_scan: Scan mode of filtered searches (see
+            ``candidate_query_sql``)
+        **index_options: Passed to ``vector_index_sql`` (method, m, storage,
+            quantization, ...)
+
+    Returns:
+        SQL script
+    """
+    storage = vector_storage(index_options.get("storage"))
+    quantization = index_options.get("quantization")
+    return (
+        SQL_SETUP_TEMPLATE.replace("__VECTOR_INDEX__", vector_index_sql(**index_options))
+        .replace(
+            "__CANDIDATES_FUNCTION__",
+            candidates_function_sql(
+                storage, quantization, rescore_factor, iterative_scan
+            ),
+        )
+        .replace("__EMBEDDING_TYPE__", VECTOR_STORAGE_TYPES[storage])
+    )
+
+
+SQL_SETUP = build_setup_sql()
+
+
 async def setup_database():
     """
     Set up the database tables and functions in Supabase.
@@ -115,5 +1103,60 @@ async def setup_database():
         print(f"Error setting up database: {e}")
 
 
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Database schema tooling")
+    subparsers = parser.add_subparsers(dest="command")
+
+    def add_index_options(subparser):
+        subparser.add_argument("--index-method", choices=["hnsw", "ivfflat"])
+        subparser.add_argument("--m", type=int, help="HNSW graph degree")
+        subparser.add_argument("--ef-construction", type=int)
+        subparser.add_argument("--lists", type=int, help="ivfflat lists")
+        subparser.add_argument("--storage", choices=sorted(VECTOR_STORAGE_TYPES))
+        subparser.add_argument("--quantization", choices=VECTOR_QUANTIZATIONS)
+        subparser.add_argument("--iterative-scan", choices=ITERATIVE_SCAN_MODES)
+
+    add_index_options(subparsers.add_parser("sql", help="Print the setup SQL"))
+    rebuild = subparsers.add_parser(
+        "rebuild-index", help="Rebuild the vector index CONCURRENTLY"
+    )
+    add_index_options(rebuild)
+    rebuild.add_argument("--maintenance-work-mem", default="512MB")
+    rebuild.add_argument(
+        "--table", default="rag_pages", help="Partition of a partitioned rag_pages"
+    )
+    rebuild.add_argument(
+        "--print", action="store_true", help="Only print the SQL (run with psql)"
+    )
+    args = parser.parse_args(argv)
+
+    index_options = {}
+    if args.command:
+        index_options = {
+            "method": args.index_method,
+            "m": args.m,
+            "ef_construction": args.ef_construction,
+            "lists": args.lists,
+            "storage": args.storage,
+            "quantization": args.quantization,
+            "iterative_scan": args.iterative_scan,
+        }
+
+    if args.command == "sql":
+        print(build_setup_sql(**index_options))
+    elif args.command == "rebuild-index":
+        index_options["maintenance_work_mem"] = args.maintenance_work_mem
+        index_options["table"] = args.table
+        database_url = os.getenv("DATABASE_URL")
+        if args.print or not database_url:
+            if not args.print:
+                print("-- DATABASE_URL not set; run these statements with psql")
+            print(";\n".join(rebuild_index_sql(**index_options)) + ";")
+        else:
+            rebuild_index(database_url, **index_options)
+    else:
+        asyncio.run(setup_database())
+
+
 if __name__ == "__main__":
-    asyncio.run(setup_database())
+    main()
@@ -66,13 +66,7 @@ class TextChunker:
 
             # Only add non-empty chunks
             if chunk.strip():
-                chunks.append(
-                    {
-                        "text": chunk,
-                        "page": len(chunks)
-                        + 1,  # zählt ab 1, du kannst auch bei 0 starten wenn gewünscht
-                    }
-                )
+                chunks.append(chunk)
 
             # Move position forward by step_size
             position += step_size
@@ -0,0 +1,266 @@
+"""
+Command line interface for batch document ingestion.
+
+    python -m document_processing.cli ingest docs/ --recursive
+    python -m document_processing.cli ingest docs/ --recursive --dry-run --workers 4
+
+    python -m document_processing.cli delete a.pdf b.pdf --from-file old.txt
+
+``ingest`` uploads files to storage and enqueues one job per file for the
+ingestion workers, exactly like the Streamlit upload. ``--dry-run`` only
+estimates chunks, tokens, cost, storage and wall time, without contacting
+any external service. ``delete`` removes documents with one database call
+and batched storage removals (see ``utils.delete_helper``).
+"""
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+import contextlib
+import mimetypes
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from document_processing.utils import sanitize_filename
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt")
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def collect_files(paths: Iterable[str], recursive: bool = False) -> List[str]:
+    """
+    Expand files and directories into a sorted list of supported files.
+
+    Args:
+        paths: Files or directories
+        recursive: Descend into subdirectories
+
+    Returns:
+        Paths of all PDF and TXT files
+    """
+    files = set()
+    for path in map(Path, paths):
+        if path.is_dir():
+            pattern = "**/*" if recursive else "*"
+            candidates = path.glob(pattern)
+        else:
+            candidates = [path]
+        for candidate in candidates:
+            if candidate.is_file() and candidate.suffix.lower() in SUPPORTED_EXTENSIONS:
+                files.add(str(candidate))
+    return sorted(files)
+
+
+def hash_file(file_path: str) -> str:
+    """SHA-256 of a file, read in chunks (same digest as ``hash_upload``)."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _format_size(num_bytes: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if num_bytes < 1024:
+            return f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} TB"
+
+
+def _format_duration(seconds: float) -> str:
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}h {minutes:02d}m {seconds:02d}s"
+
+
+def print_estimate(estimate: Dict[str, Any]) -> None:
+    """Print a dry-run estimate as a table with totals."""
+    print(f"{'Datei':<40} {'Seiten':>6} {'OCR':>5} {'Chunks':>7} {'Tokens':>9}")
+    for f in estimate["files"]:
+        name = Path(f["file"]).name[:40]
+        if "error" in f:
+            print(f"{name:<40} ❌ {f['error']}")
+            continue
+        print(
+            f"{name:<40} {f['pages']:>6} {f['ocr_pages']:>5} "
+            f"{f['chunks']:>7} {f['tokens']:>9}"
+        )
+
+    t = estimate["totals"]
+    cost = t["embedding_cost_usd"]
+    print()
+    print(f"📄 Dateien:        {t['files']} ({t['errors']} nicht lesbar)")
+    print(f"📑 Seiten:         {t['pages']} (OCR-Anteil {t['ocr_share']:.0%})")
+    print(f"🧩 Chunks/DB-Rows: {t['chunks']}")
+    print(
+        f"🔤 Tokens:         {t['tokens']} ({t['embedding_model']}"
+        + (f", ~${cost:.4f})" if cost is not None else ")")
+    )
+    print(f"💾 Speicher (DB):  ~{_format_size(t['storage_bytes'])}")
+    print(
+        f"⏱️  Dauer:          ~{_format_duration(t['wall_seconds'])} "
+        f"mit {t['workers']} Worker(n)"
+    )
+
+
+def dry_run(args: argparse.Namespace, files: List[str]) -> int:
+    from document_processing.chunker import TextChunker
+    from document_processing.estimator import (
+        IngestionEstimator,
+        throughputs_from_benchmark,
+    )
+
+    throughputs = (
+        throughputs_from_benchmark(args.throughputs) if args.throughputs else None
+    )
+    # Reason: the chunker prints progress; keep stdout clean for --json
+    with contextlib.redirect_stdout(sys.stderr):
+        estimator = IngestionEstimator(
+            chunker=TextChunker(chunk_size=2000, chunk_overlap=400),
+            throughputs=throughputs,
+            sample_pages=args.sample_pages,
+        )
+        estimate = estimator.estimate_files(files, workers=args.workers)
+    if args.json:
+        print(json.dumps(estimate, indent=2))
+    else:
+        print_estimate(estimate)
+    return 0
+
+
+def ingest(args: argparse.Namespace, files: List[str]) -> int:
+    from database.setup import SupabaseClient
+    from document_processing.job_queue import get_job_queue
+
+    supabase_client = SupabaseClient()
+    client = supabase_client.client
+    job_queue = get_job_queue(client)
+    max_file_size_mb = int(os.getenv("MAX_FILE_SIZE_MB", "200"))
+    enqueued = 0
+
+    for file_path in files:
+        safe_filename = sanitize_filename(Path(file_path).name)
+        if os.path.getsize(file_path) > max_file_size_mb * 1024 * 1024:
+            print(f"⚠️ {safe_filename} ist größer als {max_file_size_mb} MB")
+            continue
+
+        file_hash = hash_file(file_path)
+        if supabase_client.has_file_hash(file_hash) or supabase_client.has_url(
+            safe_filename
+        ):
+            print(f"⚠️ {safe_filename} ist bereits vorhanden, übersprungen")
+            continue
+
+        content_type = (
+            mimetypes.guess_type(safe_filename)[0] or "application/octet-stream"
+        )
+        # open() returns a BufferedReader, which the storage client streams
+        with open(file_path, "rb") as f:
+            client.storage.from_(args.bucket).upload(
+                safe_filename,
+                f,
+                {
+                    "cacheControl": "3600",
+                    "x-upsert": "true",
+                    "content-type": content_type,
+                },
+            )
+
+        job = job_queue.enqueue(
+            {
+                "bucket": args.bucket,
+                "storage_path": safe_filename,
+                "original_filename": safe_filename,
+                "metadata": {
+                    "source": "ui_upload",
+                    "upload_time": str(datetime.now()),
+                    "original_filename": safe_filename,
+                    "file_hash": file_hash,
+                },
+            }
+        )
+        enqueued += 1
+        print(f"✅ {safe_filename} eingereiht (Job {job['id']})")
+
+    print(f"{enqueued} von {len(files)} Dateien zur Verarbeitung eingereiht")
+    return 0
+
+
+def delete(args: argparse.Namespace) -> int:
+    from utils.delete_helper import delete_documents
+
+    urls = list(args.urls)
+    if args.from_file:
+        with open(args.from_file, encoding="utf-8") as f:
+            urls += [line.strip() for line in f if line.strip()]
+    if not urls:
+        print("Keine Dokumente angegeben")
+        return 1
+
+    counts = delete_documents(urls, args.bucket)
+    if args.json:
+        print(json.dumps(counts))
+    else:
+        print(
+            f"🧹 {counts['documents']} Dokumente, {counts['chunks']} Textabschnitte "
+            f"und {counts['files']} Dateien gelöscht"
+        )
+    return 0
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Batch document ingestion")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = subparsers.add_parser(
+        "ingest", help="Upload files and enqueue ingestion jobs"
+    )
+    ingest_parser.add_argument("paths", nargs="+", help="Files or directories")
+    ingest_parser.add_argument("--recursive", "-r", action="store_true")
+    ingest_parser.add_argument("--bucket", default="privatedocs")
+    ingest_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only estimate chunks, tokens, cost, storage and time",
+    )
+    ingest_parser.add_argument(
+        "--workers", type=int, default=1, help="Workers assumed for the estimate"
+    )
+    ingest_parser.add_argument("--sample-pages", type=int, default=5)
+    ingest_parser.add_argument(
+        "--throughputs",
+        default=None,
+        help="JSON output of benchmarks.ingestion_benchmark to calibrate timings",
+    )
+    ingest_parser.add_argument("--json", action="store_true")
+
+    delete_parser = subparsers.add_parser(
+        "delete", help="Delete documents, their chunks and files"
+    )
+    delete_parser.add_argument("urls", nargs="*", help="Document urls (filenames)")
+    delete_parser.add_argument("--from-file", help="File with one url per line")
+    delete_parser.add_argument("--bucket", default="privatedocs")
+    delete_parser.add_argument("--json", action="store_true")
+
+    args = parser.parse_args(argv)
+    if args.command == "delete":
+        return delete(args)
+    files = collect_files(args.paths, args.recursive)
+    if not files:
+        print("Keine PDF- oder TXT-Dateien gefunden")
+        return 1
+
+    if args.dry_run:
+        return dry_run(args, files)
+    return ingest(args, files)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,12 +3,18 @@ Embeddings generation with OpenAI for document processing.
 """
 
 import os
+import sys
 import time
 from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
 import openai
 from pathlib import Path
 
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.metrics import registry as metrics
+
 # Load environment variables from the project root .env file
 project_root = Path(__file__).resolve().parent.parent
 dotenv_path = project_root / ".env"
@@ -38,6 +44,9 @@ class EmbeddingGenerator:
         # Default embedding dimension for text-embedding-3-small
         self.embedding_dim = 1536
 
+        # Running totals; the pipeline diffs them per document
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "tokens": 0}
+
         print(f"Initialized EmbeddingGenerator with model: {self.model}")
 
     def _create_zero_embedding(self) -> List[float]:
@@ -68,16 +77,29 @@ class EmbeddingGenerator:
 
         # Try to generate embedding with retries
         for attempt in range(max_retries):
+            self.stats["requests"] += 1
+            metrics.inc("rag_embedding_requests_total", model=self.model)
             try:
-                response = self.client.embeddings.create(model=self.model, input=text)
+                with metrics.timer("rag_embedding_request_seconds", model=self.model):
+                    response = self.client.embeddings.create(
+                        model=self.model, input=text
+                    )
+                usage = getattr(response, "usage", None)
+                tokens = getattr(usage, "total_tokens", None) or 0
+                self.stats["tokens"] += tokens
+                metrics.inc("rag_embedding_tokens_total", tokens, model=self.model)
                 return response.data[0].embedding
             except Exception as e:
                 print(f"Embedding error (attempt {attempt+1}/{max_retries}): {str(e)}")
                 if attempt < max_retries - 1:
+                    self.stats["retries"] += 1
+                    metrics.inc("rag_embedding_retries_total", model=self.model)
                     # Exponential backoff
                     time.sleep(2**attempt)
                 else:
                     print("All retry attempts failed, returning zero embedding")
+                    self.stats["failures"] += 1
+                    metrics.inc("rag_embedding_failures_total", model=self.model)
                     return self._create_zero_embedding()
 
     def embed_batch(self, texts: List[str], batch_size: int = 5) -> List[List[float]]:
@@ -0,0 +1,285 @@
+"""
+Dry-run estimation of ingestion cost and time.
+
+Predicts chunk, token and row counts, the share of PDF pages that need OCR,
+the database storage footprint and the wall time of an ingestion run without
+calling OpenAI, Supabase or the OCR stack. PDFs are sampled through the fast
+PyPDF2 text layer; TXT files go through the configured chunker.
+"""
+
+import os
+import sys
+import json
+import math
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import PyPDF2
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from document_processing.chunker import TextChunker
+from utils.metrics import MetricsRegistry, registry
+
+# Reason: OpenAI tokenizers average roughly 4 characters per token; German
+# text is slightly worse, so this errs on the cheap side by ~10%
+CHARS_PER_TOKEN = 4.0
+
+# Pages whose text layer has fewer characters are treated as scanned (OCR)
+MIN_TEXT_LAYER_CHARS = 20
+
+# Assumed characters on an OCR page when no sampled page had a text layer
+DEFAULT_CHARS_PER_PAGE = 1800
+
+# USD per 1M input tokens
+EMBEDDING_PRICES = {
+    "text-embedding-3-small": 0.02,
+    "text-embedding-3-large": 0.13,
+    "text-embedding-ada-002": 0.10,
+}
+
+# Seconds per unit for a single worker. Defaults reflect the current
+# pipeline: one embedding request per chunk with a pause every 5 chunks and
+# one PostgREST insert per chunk.
+DEFAULT_THROUGHPUTS = {
+    "extract_seconds_per_page": 0.05,
+    "ocr_seconds_per_page": 3.0,
+    "embed_seconds_per_chunk": 0.35,
+    "store_seconds_per_chunk": 0.05,
+}
+
+# Approximate Postgres sizes of a rag_pages row besides the content
+ROW_OVERHEAD_BYTES = 24 + 8 + 4 + 8  # tuple header, id, chunk_number, created_at
+METADATA_BYTES = 600  # filename, hash, signed URL, ingestion stats
+
+
+def throughputs_from_registry(
+    metrics: Optional[MetricsRegistry] = None,
+) -> Dict[str, float]:
+    """
+    Derive per-chunk embed/store throughputs from recorded ingestion metrics.
+
+    Args:
+        metrics: Registry to read, defaults to the process-wide one
+
+    Returns:
+        Throughputs measured in this process (empty if nothing was ingested)
+    """
+    metrics = metrics or registry
+    chunks = metrics.counter_value("rag_ingestion_chunks_total")
+    if not chunks:
+        return {}
+    measured = {}
+    for stage in ("embed", "store"):
+        count, seconds = metrics.histogram_totals(
+            "rag_ingestion_stage_seconds", stage=stage
+        )
+        if count:
+            measured[f"{stage}_seconds_per_chunk"] = seconds / chunks
+    return measured
+
+
+def throughputs_from_benchmark(path: str) -> Dict[str, float]:
+    """
+    Read per-chunk throughputs from ``ingestion_benchmark --json`` output.
+
+    Args:
+        path: JSON file written by the ingestion benchmark
+
+    Returns:
+        Measured throughputs for the stages covered by the benchmark
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        result = json.load(f)
+    chunks = result.get("chunks") or 0
+    if not chunks:
+        return {}
+    stages = result.get("stage_seconds", {})
+    return {
+        f"{stage}_seconds_per_chunk": stages[stage] / chunks
+        for stage in ("embed", "store")
+        if stages.get(stage)
+    }
+
+
+class IngestionEstimator:
+    """
+    Estimates what ingesting a set of files will cost without ingesting them.
+
+    Args:
+        chunker: Chunker used for TXT files, defaults to the pipeline's settings
+        throughputs: Overrides for ``DEFAULT_THROUGHPUTS``
+        sample_pages: Number of PDF pages to read per document
+        embedding_dim: Embedding vector dimension
+        embedding_model: Model used for the price lookup
+    """
+
+    def __init__(
+        self,
+        chunker: Optional[TextChunker] = None,
+        throughputs: Optional[Dict[str, float]] = None,
+        sample_pages: int = 5,
+        embedding_dim: int = 1536,
+        embedding_model: Optional[str] = None,
+    ):
+        self.chunker = chunker or TextChunker(chunk_size=2000, chunk_overlap=400)
+        self.throughputs = {**DEFAULT_THROUGHPUTS, **(throughputs or {})}
+        self.sample_pages = max(1, sample_pages)
+        self.embedding_dim = embedding_dim
+        self.embedding_model = embedding_model or os.getenv(
+            "EMBEDDING_MODEL", "text-embedding-3-small"
+        )
+
+    def _sample_indices(self, page_count: int) -> List[int]:
+        """Evenly spread page indices, so cover pages don't dominate."""
+        if page_count <= self.sample_pages:
+            return list(range(page_count))
+        step = page_count / self.sample_pages
+        return sorted({int(i * step) for i in range(self.sample_pages)})
+
+    def _estimate_pdf(self, file_path: str) -> Dict[str, Any]:
+        reader = PyPDF2.PdfReader(file_path)
+        page_count = len(reader.pages)
+        indices = self._sample_indices(page_count)
+
+        text_chars = []
+        elements = []
+        ocr_pages = 0
+        for index in indices:
+            text = reader.pages[index].extract_text() or ""
+            if len(text.strip()) < MIN_TEXT_LAYER_CHARS:
+                ocr_pages += 1
+                continue
+            text_chars.append(len(text))
+            # Reason: PdfProcessor stores one chunk per unstructured element
+            # (title, paragraph, list item); text-layer lines approximate them
+            elements.append(sum(1 for line in text.splitlines() if line.strip()))
+
+        sampled = len(indices) or 1
+        ocr_share = ocr_pages / sampled
+        chars_per_page = (
+            sum(text_chars) / len(text_chars) if text_chars else DEFAULT_CHARS_PER_PAGE
+        )
+        elements_per_page = (
+            sum(elements) / len(elements)
+            if elements
+            else chars_per_page / self.chunker.chunk_size
+        )
+        return {
+            "pages": page_count,
+            "sampled_pages": len(indices),
+            "ocr_pages": round(ocr_share * page_count),
+            "characters": round(chars_per_page * page_count),
+            "chunks": max(1, math.ceil(elements_per_page * page_count)),
+        }
+
+    def _estimate_txt(self, file_path: str) -> Dict[str, Any]:
+        from document_processing.processors import TxtProcessor
+
+        text = TxtProcessor().extract_text(file_path)
+        chunks = [c for c in self.chunker.chunk_text(text) if c["text"].strip()]
+        return {
+            "pages": 1,
+            "sampled_pages": 1,
+            "ocr_pages": 0,
+            # Overlapping windows are embedded (and billed) more than once
+            "characters": sum(len(c["text"]) for c in chunks),
+            "chunks": len(chunks),
+        }
+
+    def estimate_file(self, file_path: str) -> Dict[str, Any]:
+        """
+        Estimate the ingestion of a single file.
+
+        Args:
+            file_path: Path to a TXT or PDF file
+
+        Returns:
+            Dict with pages, OCR pages, chunks, tokens, storage bytes and seconds,
+            or an ``error`` entry if the file cannot be read
+        """
+        extension = Path(file_path).suffix.lower()
+        try:
+            if extension == ".pdf":
+                estimate = self._estimate_pdf(file_path)
+            elif extension == ".txt":
+                estimate = self._estimate_txt(file_path)
+            else:
+                return {
+                    "file": file_path,
+                    "error": f"Unsupported file type: {extension}",
+                }
+        except Exception as e:
+            return {"file": file_path, "error": str(e)}
+
+        t = self.throughputs
+        chunks = estimate["chunks"]
+        text_pages = estimate["pages"] - estimate["ocr_pages"]
+        vector_bytes = self.embedding_dim * 4 + 8
+        seconds = (
+            text_pages * t["extract_seconds_per_page"]
+            + estimate["ocr_pages"] * t["ocr_seconds_per_page"]
+            + chunks * (t["embed_seconds_per_chunk"] + t["store_seconds_per_chunk"])
+        )
+        estimate.update(
+            {
+                "file": file_path,
+                "file_size_bytes": os.path.getsize(file_path),
+                "tokens": math.ceil(estimate["characters"] / CHARS_PER_TOKEN),
+                # Row (content, vector, metadata) plus one vector per index entry
+                "storage_bytes": estimate["characters"]
+                + chunks * (ROW_OVERHEAD_BYTES + METADATA_BYTES + 2 * vector_bytes),
+                "seconds": seconds,
+            }
+        )
+        return estimate
+
+    def estimate_files(self, file_paths: Iterable[str], workers: int = 1) -> Dict:
+        """
+        Estimate an ingestion run over many files.
+
+        Args:
+            file_paths: Files to ingest
+            workers: Number of ingestion workers processing the queue
+
+        Returns:
+            Dict with ``totals`` and the per-file estimates in ``files``
+        """
+        files = [self.estimate_file(path) for path in file_paths]
+        ok = [f for f in files if "error" not in f]
+        totals = {
+            key: sum(f[key] for f in ok)
+            for key in (
+                "pages",
+                "ocr_pages",
+                "chunks",
+                "tokens",
+                "storage_bytes",
+                "file_size_bytes",
+                "seconds",
+            )
+        }
+        price = EMBEDDING_PRICES.get(self.embedding_model)
+        totals.update(
+            {
+                "files": len(ok),
+                "errors": len(files) - len(ok),
+                "db_rows": totals["chunks"],
+                "ocr_share": (
+                    round(totals["ocr_pages"] / totals["pages"], 3)
+                    if totals["pages"]
+                    else 0.0
+                ),
+                "embedding_model": self.embedding_model,
+                "embedding_cost_usd": (
+                    round(totals["tokens"] / 1_000_000 * price, 4)
+                    if price is not None
+                    else None
+                ),
+                "workers": max(1, workers),
+                # Jobs are independent, so workers divide the total time
+                "wall_seconds": round(totals["seconds"] / max(1, workers), 1),
+            }
+        )
+        return {"totals": totals, "files": files, "throughputs": self.throughputs}
@@ -0,0 +1,56 @@
+"""
+Deterministic, offline stand-in for ``EmbeddingGenerator``.
+
+Used by the benchmarks and tests together with
+``database.local_store.LocalSupabaseClient``; no API key or network needed.
+
+    from document_processing.fake_embeddings import FakeEmbeddingGenerator
+
+    embedder = FakeEmbeddingGenerator(embedding_dim=64)
+"""
+
+import hashlib
+import time
+from typing import List
+
+import numpy as np
+
+
+class FakeEmbeddingGenerator:
+    """
+    Deterministic, offline replacement for EmbeddingGenerator.
+
+    Texts are embedded by hashing their words into a fixed-size vector, so
+    similar texts get similar vectors and results are reproducible.
+
+    Args:
+        embedding_dim: Vector dimension (1536 like text-embedding-3-small)
+        latency_ms: Simulated API latency per request
+    """
+
+    def __init__(self, embedding_dim: int = 1536, latency_ms: float = 0.0):
+        self.embedding_dim = embedding_dim
+        self.latency_ms = latency_ms
+        self.model = "fake-embedding"
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "tokens": 0}
+
+    def embed_text(self, text: str, max_retries: int = 3) -> List[float]:
+        self.stats["requests"] += 1
+        words = (text or "").lower().split()
+        # Reason: ~4 characters per token is the usual estimate for OpenAI models
+        self.stats["tokens"] += max(1, len(text or "") // 4)
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        vector = np.zeros(self.embedding_dim, dtype=np.float32)
+        for word in words:
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.embedding_dim
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_batch(self, texts: List[str], batch_size: int = 5) -> List[List[float]]:
+        return [self.embed_text(text) for text in texts if text and text.strip()]
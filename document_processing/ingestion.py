@@ -8,7 +8,6 @@ run:  streamlit run ui/app.py
 import os
 
 os.environ["PYTORCH_ENABLE_MPS_FALLBACK"] = "1"
-import uuid
 import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime
@@ -17,6 +16,8 @@ from document_processing.chunker import TextChunker
 from document_processing.embeddings import EmbeddingGenerator
 from document_processing.processors import get_document_processor
 from database.setup import SupabaseClient
+from database.documents import split_metadata
+from utils.metrics import IngestionReport
 
 # Set up logging
 logging.basicConfig(
@@ -26,11 +27,19 @@ logger = logging.getLogger(__name__)
 
 
 class DocumentIngestionPipeline:
-    def __init__(self, supabase_client: Optional[SupabaseClient] = None):
-        self.chunker = TextChunker(chunk_size=2000, chunk_overlap=400)
-        self.embedding_generator = EmbeddingGenerator()
-        self.max_file_size_mb = 10
+    def __init__(
+        self,
+        supabase_client: Optional[SupabaseClient] = None,
+        embedding_generator: Optional[EmbeddingGenerator] = None,
+        chunker: Optional[TextChunker] = None,
+    ):
+        self.chunker = chunker or TextChunker(chunk_size=2000, chunk_overlap=400)
+        self.embedding_generator = embedding_generator or EmbeddingGenerator()
+        # Same default as Streamlit's server.maxUploadSize (200 MB)
+        self.max_file_size_mb = int(os.getenv("MAX_FILE_SIZE_MB", "200"))
         self.supabase_client = supabase_client or SupabaseClient()
+        # Timings and counts of the most recently processed document
+        self.last_report: Optional[IngestionReport] = None
         logger.info("Initialized DocumentIngestionPipeline with default components")
 
     def _check_file(self, file_path: str) -> bool:
@@ -55,8 +64,25 @@ class DocumentIngestionPipeline:
         metadata: Optional[Dict[str, Any]] = None,
         on_progress: Optional[callable] = None,
     ) -> List[Dict[str, Any]]:
-        if not self._check_file(file_path):
-            return []
+        report = IngestionReport()
+        self.last_report = report
+        with report.stage("total"):
+            stored_records = self._process_file(file_path, metadata, report)
+        report.finish(success=bool(stored_records))
+        logger.info(
+            f"Ingestion summary for {os.path.basename(file_path)}: {report.to_dict()}"
+        )
+        return stored_records
+
+    def _process_file(
+        self,
+        file_path: str,
+        metadata: Optional[Dict[str, Any]],
+        report: IngestionReport,
+    ) -> List[Dict[str, Any]]:
+        with report.stage("check"):
+            if not self._check_file(file_path):
+                return []
         print("JETZT DOC PROCESSING......", file_path)
         try:
             processor = get_document_processor(file_path)
@@ -68,7 +94,11 @@ class DocumentIngestionPipeline:
             return []
 
         try:
-            chunks = processor.extract_text(file_path)
+            with report.stage("extract"):
+                chunks = processor.extract_text(file_path)
+                # TxtProcessor returns plain text, PdfProcessor page-tagged chunks
+                if isinstance(chunks, str):
+                    chunks = self.chunker.chunk_text(chunks) if chunks.strip() else []
             if not chunks:
                 logger.warning(
                     f"No chunks extracted from {os.path.basename(file_path)}"
@@ -85,8 +115,19 @@ class DocumentIngestionPipeline:
         try:
             from document_processing.utils import preprocess_text
 
-            chunk_texts = [preprocess_text(chunk["text"]) for chunk in chunks]
-            embeddings = self.embedding_generator.embed_batch(chunk_texts, batch_size=5)
+            with report.stage("preprocess"):
+                chunk_texts = [preprocess_text(chunk["text"]) for chunk in chunks]
+
+            stats_before = dict(self.embedding_generator.stats)
+            with report.stage("embed"):
+                embeddings = self.embedding_generator.embed_batch(
+                    chunk_texts, batch_size=5
+                )
+            for key in ("tokens", "retries", "failures"):
+                report.add(
+                    f"embedding_{key}",
+                    self.embedding_generator.stats[key] - stats_before[key],
+                )
 
             if len(embeddings) != len(chunks):
                 logger.warning("Mismatch between chunks and embeddings")
@@ -97,8 +138,9 @@ class DocumentIngestionPipeline:
             return []
 
         try:
-            document_id = str(uuid.uuid4())
             timestamp = datetime.now().isoformat()
+            report.add("chunks", len(chunks))
+            report.add("characters", sum(len(text) for text in chunk_texts))
             metadata = metadata.copy() if metadata else {}
             metadata.update(
                 {
@@ -109,30 +151,64 @@ class DocumentIngestionPipeline:
                     "file_size_bytes": os.path.getsize(file_path),
                     "processed_at": timestamp,
                     "chunk_count": len(chunks),
+                    # Timings up to the embedding stage; the store stage is
+                    # still running while the chunks are written
+                    "ingestion_stats": report.to_dict(),
                 }
             )
 
-            stored_records = []
+            url = metadata.get("original_filename")
+            document_id = self._store_document(url, metadata)
+
+            rows = []
             for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                chunk_metadata = metadata.copy()
+                # Chunks carry only chunk fields once the document row exists
+                chunk_metadata = (
+                    split_metadata(metadata)[1]
+                    if document_id is not None
+                    else metadata.copy()
+                )
                 page = chunk.get("page")
                 if page is None:
                     chunk_metadata["page"] = 1  # fallback for .txt-Dateien
                 else:
                     chunk_metadata["page"] = page
+                row = {
+                    "url": url,
+                    "chunk_number": i,
+                    "content": chunk_texts[i],
+                    "embedding": embedding,
+                    "metadata": chunk_metadata,
+                }
+                if document_id is not None:
+                    row["document_id"] = document_id
+                rows.append(row)
 
+            stored_records = []
+            with report.stage("store"):
                 try:
-                    stored_record = self.supabase_client.store_document_chunk(
-                        url=metadata.get("original_filename"),
-                        chunk_number=i,
-                        content=chunk_texts[i],
-                        embedding=embedding,
-                        metadata=chunk_metadata,
-                    )
-                    stored_records.append(stored_record)
+                    # One bulk insert (binary COPY on the Postgres backend)
+                    self.supabase_client.store_document_chunks(rows)
+                    stored_records = rows
+                    report.add("bytes_sent", self.supabase_client.last_bytes_sent)
                 except Exception as e:
-                    logger.error(f"Error storing chunk {i}: {str(e)}")
+                    logger.warning(f"Bulk insert failed, storing chunks singly: {e}")
+                    for row in rows:
+                        try:
+                            stored_records.append(
+                                self.supabase_client.store_document_chunk(**row)
+                            )
+                            report.add(
+                                "bytes_sent", self.supabase_client.last_bytes_sent
+                            )
+                        except Exception as e:
+                            report.add("store_errors", 1)
+                            logger.error(
+                                f"Error storing chunk {row['chunk_number']}: {str(e)}"
+                            )
 
+            if not stored_records:
+                self._discard_document(url, document_id)
             logger.info(f"Stored {len(stored_records)} chunks in database")
             return stored_records
 
@@ -140,6 +216,70 @@ class DocumentIngestionPipeline:
             logger.error(f"Error creating document records: {str(e)}")
             return []
 
+    def _store_document(
+        self,
+        url: str,
+        metadata: Dict[str, Any],
+        client: Optional[SupabaseClient] = None,
+    ) -> Optional[int]:
+        """
+        Store the document-level metadata once in the documents table.
+
+        Returns:
+            The document id, or None if the row could not be written; the
+            chunks then carry the full metadata as before
+        """
+        client = client or self.supabase_client
+        try:
+            document_metadata, _ = split_metadata(metadata)
+            return client.upsert_document(url, document_metadata).get("id")
+        except Exception as e:
+            logger.warning(f"Could not store document row for {url}: {str(e)}")
+            return None
+
+    def _discard_document(
+        self,
+        url: str,
+        document_id: Optional[int],
+        client: Optional[SupabaseClient] = None,
+    ) -> None:
+        """Remove the document row written for ``url`` when no chunk was stored."""
+        if document_id is None:
+            return
+        client = client or self.supabase_client
+        try:
+            client.delete_empty_document(document_id)
+        except Exception as e:
+            logger.warning(f"Could not remove empty document row for {url}: {str(e)}")
+
+    def estimate_file(self, file_path: str, sample_pages: int = 5) -> Dict[str, Any]:
+        """
+        Dry run: predict chunks, tokens, OCR pages, storage and time for a file.
+
+        Nothing is extracted with OCR, embedded or stored. Stage throughputs
+        measured by this pipeline instance are used when available.
+
+        Args:
+            file_path: Path to a TXT or PDF file
+            sample_pages: Number of PDF pages to read through the text layer
+
+        Returns:
+            Estimate as returned by ``IngestionEstimator.estimate_file``
+        """
+        from document_processing.estimator import (
+            IngestionEstimator,
+            throughputs_from_registry,
+        )
+
+        estimator = IngestionEstimator(
+            chunker=self.chunker,
+            throughputs=throughputs_from_registry(),
+            sample_pages=sample_pages,
+            embedding_dim=self.embedding_generator.embedding_dim,
+            embedding_model=getattr(self.embedding_generator, "model", None),
+        )
+        return estimator.estimate_file(file_path)
+
     def process_text(
         self, content: str, metadata: dict, url: Optional[str] = None
     ) -> List[dict]:
@@ -147,12 +287,11 @@ class DocumentIngestionPipeline:
         Verarbeitet manuellen Text und speichert ihn samt Embeddings in Supabase.
         """
         from document_processing.chunker import TextChunker
-        from document_processing.embeddings import EmbeddingGenerator
-        from database.setup import SupabaseClient
 
         chunker = TextChunker()
-        embedding_generator = EmbeddingGenerator()
-        supabase = SupabaseClient()
+        # Reason: reuse the pipeline's clients instead of one set per note
+        embedding_generator = self.embedding_generator
+        supabase = self.supabase_client
 
         chunks = chunker.chunk_text(content)
         for chunk in chunks:
@@ -160,13 +299,23 @@ class DocumentIngestionPipeline:
 
         vectors = embedding_generator.embed_batch([c["text"] for c in chunks])
 
+        document_id = self._store_document(url, metadata, client=supabase)
+        chunk_metadata = (
+            split_metadata(metadata)[1] if document_id is not None else metadata
+        )
         for i, (chunk, embedding) in enumerate(zip(chunks, vectors)):
-            supabase.insert_embedding(
-                text=chunk["text"],
-                metadata=chunk["metadata"],
-                embedding=embedding,
-                url=url,
-                chunk_number=i,  # ✅ Index mitgeben
-            )
+            try:
+                supabase.insert_embedding(
+                    text=chunk["text"],
+                    metadata=chunk_metadata,
+                    embedding=embedding,
+                    url=url,
+                    chunk_number=i,  # ✅ Index mitgeben
+                    document_id=document_id,
+                )
+            except Exception:
+                if i == 0:
+                    self._discard_document(url, document_id, client=supabase)
+                raise
 
         return chunks
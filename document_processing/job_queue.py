@@ -0,0 +1,404 @@
+"""
+Durable ingestion job queue shared by the Streamlit UI and ingestion workers.
+
+The UI only enqueues jobs and polls their status; one or more worker processes
+(see ``document_processing/worker.py``) lease jobs and run the ingestion
+pipeline. Two backends are available:
+
+- ``SupabaseJobQueue``: table ``ingestion_jobs`` plus RPC functions that lease
+  jobs with ``FOR UPDATE SKIP LOCKED``. Works for workers on several nodes.
+- ``SQLiteJobQueue``: local stand-in for single-node setups and tests.
+"""
+
+import os
+import json
+import uuid
+import sqlite3
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+# Load environment variables from the project root .env file
+project_root = Path(__file__).resolve().parent.parent
+dotenv_path = project_root / ".env"
+load_dotenv(dotenv_path, override=True)
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class IngestionJobQueue:
+    """
+    Base class for ingestion job queues.
+
+    Jobs are plain dicts with the keys ``id``, ``status``, ``payload``,
+    ``attempts``, ``max_attempts``, ``lease_owner``, ``lease_expires_at``,
+    ``error``, ``result``, ``created_at`` and ``updated_at``.
+    """
+
+    def enqueue(
+        self, payload: Dict[str, Any], max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    ) -> Dict[str, Any]:
+        """
+        Add a new job to the queue.
+
+        Args:
+            payload: JSON-serialisable job description (bucket, storage path, metadata)
+            max_attempts: How often the job may be leased before it is marked failed
+
+        Returns:
+            The created job
+        """
+        raise NotImplementedError("Subclasses must implement enqueue method")
+
+    def claim(
+        self, worker_id: str, lease_seconds: int = DEFAULT_LEASE_SECONDS
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Lease the oldest runnable job for a worker.
+
+        A job is runnable if it is queued or if the lease of a previous worker
+        has expired (e.g. the worker crashed).
+
+        Args:
+            worker_id: Unique identifier of the calling worker
+            lease_seconds: Lease duration; extend it with heartbeat()
+
+        Returns:
+            The leased job or None if nothing is runnable
+        """
+        raise NotImplementedError("Subclasses must implement claim method")
+
+    def heartbeat(
+        self, job_id: str, worker_id: str, lease_seconds: int = DEFAULT_LEASE_SECONDS
+    ) -> bool:
+        """
+        Extend the lease of a running job.
+
+        Returns:
+            False if the worker no longer owns the lease
+        """
+        raise NotImplementedError("Subclasses must implement heartbeat method")
+
+    def complete(
+        self, job_id: str, worker_id: str, result: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        Mark a leased job as done.
+
+        Returns:
+            False if the worker no longer owns the lease
+        """
+        raise NotImplementedError("Subclasses must implement complete method")
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        """
+        Release a leased job after an error.
+
+        The job is queued again until ``max_attempts`` is reached, then it is
+        marked failed.
+
+        Returns:
+            False if the worker no longer owns the lease
+        """
+        raise NotImplementedError("Subclasses must implement fail method")
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a single job by id.
+        """
+        jobs = self.get_many([job_id])
+        return jobs[0] if jobs else None
+
+    def get_many(self, job_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Get several jobs by id in one call (used by the UI to poll status).
+        """
+        raise NotImplementedError("Subclasses must implement get_many method")
+
+
+class SQLiteJobQueue(IngestionJobQueue):
+    """
+    SQLite-backed job queue for single-node deployments and tests.
+
+    Args:
+        db_path: Path of the SQLite database file. Several processes on the
+            same machine may share it.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("""
+                create table if not exists ingestion_jobs (
+                    id text primary key,
+                    status text not null default 'queued',
+                    payload text not null,
+                    attempts integer not null default 0,
+                    max_attempts integer not null default 3,
+                    lease_owner text,
+                    lease_expires_at text,
+                    error text,
+                    result text,
+                    created_at text not null,
+                    updated_at text not null
+                )
+                """)
+            conn.execute(
+                "create index if not exists idx_ingestion_jobs_status "
+                "on ingestion_jobs (status, created_at)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        # Reason: isolation_level=None gives us explicit control over
+        # BEGIN IMMEDIATE, which takes the write lock before we read the next
+        # job, so two workers can never lease the same row.
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("pragma journal_mode=wal")
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"]) if job["payload"] else {}
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def enqueue(
+        self, payload: Dict[str, Any], max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    ) -> Dict[str, Any]:
+        job_id = str(uuid.uuid4())
+        now = _utcnow().isoformat()
+        with self._connect() as conn:
+            conn.execute(
+                "insert into ingestion_jobs "
+                "(id, payload, max_attempts, created_at, updated_at) "
+                "values (?, ?, ?, ?, ?)",
+                (job_id, json.dumps(payload), max_attempts, now, now),
+            )
+        return self.get(job_id)
+
+    def claim(
+        self, worker_id: str, lease_seconds: int = DEFAULT_LEASE_SECONDS
+    ) -> Optional[Dict[str, Any]]:
+        now = _utcnow()
+        expires = (now + timedelta(seconds=lease_seconds)).isoformat()
+        with self._connect() as conn:
+            conn.execute("begin immediate")
+            try:
+                # Jobs whose worker died on the last allowed attempt are given up
+                conn.execute(
+                    "update ingestion_jobs set status = 'failed', "
+                    "lease_owner = null, error = 'lease expired', updated_at = ? "
+                    "where status = 'running' and lease_expires_at < ? "
+                    "and attempts >= max_attempts",
+                    (now.isoformat(), now.isoformat()),
+                )
+                row = conn.execute(
+                    "select id from ingestion_jobs "
+                    "where status = 'queued' "
+                    "or (status = 'running' and lease_expires_at < ?) "
+                    "order by created_at limit 1",
+                    (now.isoformat(),),
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "update ingestion_jobs set status = 'running', "
+                        "lease_owner = ?, lease_expires_at = ?, "
+                        "attempts = attempts + 1, updated_at = ? where id = ?",
+                        (worker_id, expires, now.isoformat(), row["id"]),
+                    )
+                conn.execute("commit")
+            except Exception:
+                conn.execute("rollback")
+                raise
+        return self.get(row["id"]) if row is not None else None
+
+    def _update_owned(self, job_id: str, worker_id: str, sql: str, params) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                sql + " where id = ? and lease_owner = ? and status = 'running'",
+                (*params, job_id, worker_id),
+            )
+            return cursor.rowcount == 1
+
+    def heartbeat(
+        self, job_id: str, worker_id: str, lease_seconds: int = DEFAULT_LEASE_SECONDS
+    ) -> bool:
+        now = _utcnow()
+        expires = (now + timedelta(seconds=lease_seconds)).isoformat()
+        return self._update_owned(
+            job_id,
+            worker_id,
+            "update ingestion_jobs set lease_expires_at = ?, updated_at = ?",
+            (expires, now.isoformat()),
+        )
+
+    def complete(
+        self, job_id: str, worker_id: str, result: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        return self._update_owned(
+            job_id,
+            worker_id,
+            "update ingestion_jobs set status = 'done', lease_owner = null, "
+            "lease_expires_at = null, error = null, result = ?, updated_at = ?",
+            (json.dumps(result or {}), _utcnow().isoformat()),
+        )
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        return self._update_owned(
+            job_id,
+            worker_id,
+            "update ingestion_jobs set "
+            "status = case when attempts >= max_attempts "
+            "then 'failed' else 'queued' end, "
+            "lease_owner = null, lease_expires_at = null, error = ?, updated_at = ?",
+            (error, _utcnow().isoformat()),
+        )
+
+    def get_many(self, job_ids: List[str]) -> List[Dict[str, Any]]:
+        if not job_ids:
+            return []
+        placeholders = ",".join("?" for _ in job_ids)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"select * from ingestion_jobs where id in ({placeholders})",
+                list(job_ids),
+            ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+
+class SupabaseJobQueue(IngestionJobQueue):
+    """
+    Postgres-backed job queue using the ``ingestion_jobs`` table and the
+    ``claim_ingestion_job`` / ``heartbeat_ingestion_job`` /
+    ``finish_ingestion_job`` RPC functions from ``database/setup_db.py``.
+
+    Args:
+        client: Supabase client (``create_client`` result)
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def enqueue(
+        self, payload: Dict[str, Any], max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    ) -> Dict[str, Any]:
+        result = (
+            self.client.table("ingestion_jobs")
+            .insert({"payload": payload, "max_attempts": max_attempts})
+            .execute()
+        )
+        return result.data[0] if result.data else {}
+
+    def claim(
+        self, worker_id: str, lease_seconds: int = DEFAULT_LEASE_SECONDS
+    ) -> Optional[Dict[str, Any]]:
+        result = self.client.rpc(
+            "claim_ingestion_job",
+            {"p_worker_id": worker_id, "p_lease_seconds": lease_seconds},
+        ).execute()
+        return result.data[0] if result.data else None
+
+    def heartbeat(
+        self, job_id: str, worker_id: str, lease_seconds: int = DEFAULT_LEASE_SECONDS
+    ) -> bool:
+        result = self.client.rpc(
+            "heartbeat_ingestion_job",
+            {
+                "p_job_id": job_id,
+                "p_worker_id": worker_id,
+                "p_lease_seconds": lease_seconds,
+            },
+        ).execute()
+        return bool(result.data)
+
+    def _finish(
+        self,
+        job_id: str,
+        worker_id: str,
+        success: bool,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+    ) -> bool:
+        response = self.client.rpc(
+            "finish_ingestion_job",
+            {
+                "p_job_id": job_id,
+                "p_worker_id": worker_id,
+                "p_success": success,
+                "p_result": result,
+                "p_error": error,
+            },
+        ).execute()
+        return bool(response.data)
+
+    def complete(
+        self, job_id: str, worker_id: str, result: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        return self._finish(job_id, worker_id, True, result=result or {})
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        return self._finish(job_id, worker_id, False, error=error)
+
+    def get_many(self, job_ids: List[str]) -> List[Dict[str, Any]]:
+        if not job_ids:
+            return []
+        result = (
+            self.client.table("ingestion_jobs")
+            .select("*")
+            .in_("id", list(job_ids))
+            .execute()
+        )
+        return result.data or []
+
+
+def get_job_queue(client=None) -> IngestionJobQueue:
+    """
+    Create the job queue configured via environment variables.
+
+    ``INGESTION_QUEUE_BACKEND`` selects ``supabase`` (default) or ``sqlite``;
+    ``INGESTION_QUEUE_PATH`` sets the SQLite file location.
+
+    The ``supabase`` backend defaults to the service role client of
+    ``utils.supabase_client``, the same PostgREST client the UI enqueues with;
+    DATABASE_BACKEND=postgres only moves ``rag_pages`` traffic.
+
+    Args:
+        client: Optional Supabase client for the ``supabase`` backend
+
+    Returns:
+        IngestionJobQueue instance
+    """
+    backend = os.getenv("INGESTION_QUEUE_BACKEND", "supabase").lower()
+
+    if backend == "sqlite":
+        db_path = os.getenv(
+            "INGESTION_QUEUE_PATH", str(project_root / "ingestion_jobs.sqlite3")
+        )
+        return SQLiteJobQueue(db_path)
+
+    if backend == "supabase":
+        if client is None:
+            from utils.supabase_client import get_client
+
+            client = get_client()
+        return SupabaseJobQueue(client)
+
+    raise ValueError(f"Unknown INGESTION_QUEUE_BACKEND: {backend}")
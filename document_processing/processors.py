@@ -9,7 +9,8 @@ from pathlib import Path
 import PyPDF2
 
 # processors.py
-from unstructured.partition.pdf import partition_pdf
+# unstructured is imported lazily in PdfProcessor.extract_text, so TXT
+# processing (and tests/benchmarks) work without the heavy OCR stack
 import unicodedata
 from pathlib import Path
 
@@ -133,6 +134,9 @@ class PdfProcessor(DocumentProcessor):
     """
 
     def extract_text(self, file_path: str) -> List[Dict[str, Any]]:
+        if not Path(file_path).exists():
+            raise FileNotFoundError(f"File not found: {file_path}")
+
         from unstructured.partition.pdf import partition_pdf
         import unicodedata
 
@@ -1,4 +1,8 @@
+import io
 import re
+import unicodedata
+import hashlib
+from contextlib import contextmanager
 
 
 def preprocess_text(text: str) -> str:
@@ -14,3 +18,71 @@ def preprocess_text(text: str) -> str:
     text = re.sub(r"-\n\s*", "", text)
 
     return text
+
+
+def sanitize_filename(filename: str) -> str:
+    """Turn a file name into an ASCII storage key (umlauts transliterated)."""
+    filename = filename.strip()
+    filename = filename.replace("ä", "ae").replace("ö", "oe").replace("ü", "ue")
+    filename = filename.replace("Ä", "Ae").replace("Ö", "Oe").replace("Ü", "Ue")
+    filename = filename.replace("ß", "ss")
+    filename = (
+        unicodedata.normalize("NFKD", filename)
+        .encode("ascii", "ignore")
+        .decode("ascii")
+    )
+    filename = re.sub(r"[^a-zA-Z0-9_.-]", "_", filename)
+    return filename
+
+
+def hash_upload(fileobj) -> str:
+    """
+    Compute the SHA-256 of an in-memory upload without copying it.
+
+    Args:
+        fileobj: BytesIO-like object (e.g. Streamlit's UploadedFile)
+
+    Returns:
+        Hex digest of the file content
+    """
+    # Reason: getbuffer() exposes the upload as a memoryview, so hashing does
+    # not materialise another copy of the file like getvalue() would.
+    with fileobj.getbuffer() as view:
+        return hashlib.sha256(view).hexdigest()
+
+
+class _UploadReader(io.BufferedReader):
+    """BufferedReader whose close() detaches instead of closing the upload."""
+
+    _detached = False
+
+    def close(self) -> None:
+        # Reason: storage3 closes the reader after a successful upload, which
+        # would also close the wrapped upload and fail the caller's cleanup
+        if not self._detached:
+            self._detached = True
+            self.detach()
+
+
+@contextmanager
+def upload_stream(fileobj):
+    """
+    Expose an in-memory upload as a BufferedReader for storage uploads.
+
+    The storage client streams BufferedReader objects chunk by chunk instead of
+    requiring the whole file as bytes. The wrapped upload stays open and is
+    rewound afterwards, also when the storage client closes the reader.
+
+    Args:
+        fileobj: BytesIO-like object (e.g. Streamlit's UploadedFile)
+
+    Yields:
+        io.BufferedReader positioned at the start of the upload
+    """
+    fileobj.seek(0)
+    reader = _UploadReader(fileobj)
+    try:
+        yield reader
+    finally:
+        reader.close()
+        fileobj.seek(0)
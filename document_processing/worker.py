@@ -0,0 +1,263 @@
+"""
+Ingestion worker that leases jobs from the job queue and runs the pipeline.
+
+Run one or more workers next to (or on other nodes than) the Streamlit app:
+
+    python -m document_processing.worker
+"""
+
+import os
+import sys
+import time
+import socket
+import logging
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.client_registry import http_client
+from document_processing.job_queue import (
+    DEFAULT_LEASE_SECONDS,
+    IngestionJobQueue,
+    get_job_queue,
+)
+from utils import supabase_client
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class IngestionWorker:
+    """
+    Processes ingestion jobs until stopped.
+
+    Args:
+        queue: Job queue to lease jobs from
+        pipeline: DocumentIngestionPipeline used to process the files
+        storage_client: Supabase client used to download uploaded files.
+            Defaults to the service role client of ``utils.supabase_client``;
+            the pipeline's database client may be a ``PostgresClient``,
+            which has no storage API.
+        worker_id: Unique worker name, defaults to ``<hostname>-<pid>``
+        lease_seconds: Lease duration; renewed every third of it while working
+    """
+
+    def __init__(
+        self,
+        queue: IngestionJobQueue,
+        pipeline,
+        storage_client=None,
+        worker_id: Optional[str] = None,
+        lease_seconds: int = DEFAULT_LEASE_SECONDS,
+    ):
+        self.queue = queue
+        self.pipeline = pipeline
+        self.storage_client = storage_client or supabase_client.get_client()
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = lease_seconds
+
+    def _download(self, payload: Dict[str, Any]) -> str:
+        """
+        Stream the uploaded file from storage into a temp file.
+
+        Reason: storage ``download()`` returns the whole object as bytes; for
+        large uploads we stream a signed URL to disk in fixed-size chunks so a
+        worker's memory does not grow with the file size.
+        """
+        bucket = payload.get("bucket", "privatedocs")
+        storage_path = payload["storage_path"]
+        signed = self.storage_client.storage.from_(bucket).create_signed_url(
+            storage_path, 600
+        )
+        signed_url = signed.get("signedURL") or signed.get("signedUrl")
+
+        with tempfile.NamedTemporaryFile(
+            delete=False, suffix=Path(storage_path).suffix
+        ) as temp_file:
+            try:
+                with http_client().stream("GET", signed_url) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        temp_file.write(chunk)
+            except Exception:
+                temp_file.close()
+                os.unlink(temp_file.name)
+                raise
+            return temp_file.name
+
+    def _keep_lease(
+        self, job_id: str, stop: threading.Event, lost: threading.Event
+    ) -> None:
+        """Renew the lease in the background while a job is being processed."""
+        interval = max(self.lease_seconds / 3, 1)
+        while not stop.wait(interval):
+            if not self.queue.heartbeat(job_id, self.worker_id, self.lease_seconds):
+                logger.warning(f"Lost lease for job {job_id}")
+                lost.set()
+                return
+
+    def _clear_previous_attempt(self, job: Dict[str, Any]) -> None:
+        """
+        Delete what an earlier attempt of the job stored for its document.
+
+        Reason: a worker that crashed after storing the chunks leaves them
+        behind, and the retry would hit ``unique(url, chunk_number)`` on every
+        insert and mark a fully ingested document as failed. Only a document
+        stamped with this job's ``ingestion_job_id`` is deleted; the same url
+        ingested by another job (e.g. a file queued twice) is kept.
+        """
+        payload = job.get("payload") or {}
+        url = (payload.get("metadata") or {}).get("original_filename") or payload.get(
+            "original_filename"
+        )
+        if (job.get("attempts") or 1) <= 1 or not url:
+            return
+        client = self.pipeline.supabase_client
+        filters = {"url": url, "metadata->>ingestion_job_id": str(job["id"])}
+        if next(client.iter_rows("documents", "url", filters, key="url"), None):
+            counts = client.delete_documents([url])
+            logger.info(
+                f"Job {job['id']}: removed {counts['chunks']} chunks "
+                f"of an earlier attempt for {url}"
+            )
+
+    def process_job(self, job: Dict[str, Any]) -> bool:
+        """
+        Run the ingestion pipeline for one leased job.
+
+        Args:
+            job: Job returned by ``queue.claim``
+
+        Returns:
+            True if the job completed successfully
+        """
+        payload = job.get("payload") or {}
+        stop, lost = threading.Event(), threading.Event()
+        heartbeat = threading.Thread(
+            target=self._keep_lease, args=(job["id"], stop, lost), daemon=True
+        )
+        heartbeat.start()
+        temp_file_path = None
+
+        try:
+            temp_file_path = self._download(payload)
+            if lost.is_set():
+                # Reason: another worker owns the job now, don't ingest twice
+                logger.warning(f"Job {job['id']} aborted: lease lost")
+                return False
+            self._clear_previous_attempt(job)
+            metadata = {
+                **(payload.get("metadata") or {}),
+                "ingestion_job_id": str(job["id"]),
+            }
+            chunks = self.pipeline.process_file(temp_file_path, metadata)
+            if not chunks:
+                self._fail(job, "Keine gültigen Textabschnitte gefunden")
+                return False
+
+            result = {"chunk_count": len(chunks)}
+            if self.pipeline.last_report is not None:
+                result["stats"] = self.pipeline.last_report.to_dict()
+            if lost.is_set() or not self.queue.complete(
+                job["id"], self.worker_id, result
+            ):
+                logger.warning(
+                    f"Job {job['id']} processed, but the lease was lost; "
+                    "the result is left to the new owner"
+                )
+                return False
+            logger.info(
+                f"Job {job['id']} done: {payload.get('storage_path')} "
+                f"({len(chunks)} chunks)"
+            )
+            return True
+        except Exception as e:
+            logger.exception(f"Job {job['id']} failed")
+            self._fail(job, str(e))
+            return False
+        finally:
+            stop.set()
+            if temp_file_path and os.path.exists(temp_file_path):
+                os.unlink(temp_file_path)
+
+    def _fail(self, job: Dict[str, Any], error: str) -> None:
+        if not self.queue.fail(job["id"], self.worker_id, error):
+            logger.warning(f"Job {job['id']}: lease lost, failure not recorded")
+
+    def run_once(self) -> bool:
+        """
+        Lease and process a single job.
+
+        Returns:
+            True if a job was found, False if the queue was empty
+        """
+        job = self.queue.claim(self.worker_id, self.lease_seconds)
+        if job is None:
+            return False
+        self.process_job(job)
+        return True
+
+    def run_forever(self, poll_interval: float = 2.0) -> None:
+        """
+        Process jobs until interrupted, sleeping while the queue is empty.
+        """
+        logger.info(f"Ingestion worker {self.worker_id} started")
+        while True:
+            try:
+                found = self.run_once()
+            except Exception as e:
+                logger.error(f"Error while leasing job: {e}")
+                found = False
+            if not found:
+                time.sleep(poll_interval)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run an ingestion worker")
+    parser.add_argument("--worker-id", default=None)
+    parser.add_argument("--poll-interval", type=float, default=2.0)
+    parser.add_argument("--lease-seconds", type=int, default=DEFAULT_LEASE_SECONDS)
+    parser.add_argument(
+        "--once", action="store_true", help="Process at most one job and exit"
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=int(os.getenv("METRICS_PORT", "0")),
+        help="Serve Prometheus metrics on this port (0 = disabled)",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
+    if args.metrics_port:
+        from utils.metrics import start_metrics_server
+
+        start_metrics_server(args.metrics_port)
+
+    from document_processing.ingestion import DocumentIngestionPipeline
+
+    pipeline = DocumentIngestionPipeline()
+    worker = IngestionWorker(
+        get_job_queue(),
+        pipeline,
+        worker_id=args.worker_id,
+        lease_seconds=args.lease_seconds,
+    )
+
+    if args.once:
+        worker.run_once()
+    else:
+        worker.run_forever(args.poll_interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@
 create extension if not exists vector;
 
 -- Create the documentation chunks table
-create table rag_pages (
+create table if not exists rag_pages (
     id bigserial primary key,
     url varchar not null,
     chunk_number integer not null,
@@ -15,43 +15,346 @@ create table rag_pages (
     unique(url, chunk_number)
 );
 
+-- Embedding storage (VECTOR_STORAGE): vector = float32 (6 KB per row),
+-- halfvec = float16 (3 KB per row, also halves the index). Switching
+-- rewrites the table once; the vector index is dropped here and rebuilt
+-- for the new type below. Reason: a halfvec index cannot be built on a
+-- vector column.
+do $$
+begin
+  if (select format_type(atttypid, atttypmod) from pg_attribute
+       where attrelid = 'rag_pages'::regclass and attname = 'embedding')
+     <> 'vector(1536)' then
+    drop index if exists idx_rag_pages_embedding;
+    drop index if exists rag_pages_embedding_idx;
+    alter table rag_pages
+      alter column embedding type vector(1536) using embedding::vector(1536);
+  end if;
+end;
+$$;
+
 -- Create an index for better vector similarity search performance
-create index on rag_pages using ivfflat (embedding vector_cosine_ops);
+-- (HNSW by default; see vector_index_sql in database/setup_db.py for the options).
+-- A partitioned rag_pages has one index per partition instead (database/partitioning.py).
+do $$
+begin
+  if (select relkind from pg_class where oid = 'rag_pages'::regclass) <> 'p' then
+    execute $index$
+create index if not exists idx_rag_pages_embedding
+  on rag_pages using hnsw (embedding vector_cosine_ops)
+  with (m = 16, ef_construction = 64)
+    $index$;
+  end if;
+end;
+$$;
+
+-- Typed copy of the metadata key used in search filters, with a B-tree
+-- index. Reason: a GIN index on the whole metadata column slows every insert
+-- and cannot serve ->> equality lookups. Document-level keys (file hash,
+-- filename, ...) live in the documents table below.
+alter table rag_pages
+  add column if not exists source text
+    generated always as (metadata->>'source') stored;
+
+alter table rag_pages
+  drop column if exists file_hash,
+  drop column if exists source_filter,
+  drop column if exists original_filename;
+
+drop index if exists idx_rag_pages_metadata;
+drop index if exists idx_rag_pages_source;
+drop index if exists idx_rag_pages_url_prefix;
 
--- Create an index on metadata for faster filtering
-create index idx_rag_pages_metadata on rag_pages using gin (metadata);
+create index if not exists idx_rag_pages_source on rag_pages (source);
+
+-- Owning document (foreign key added with the documents table below)
+alter table rag_pages add column if not exists document_id bigint;
+
+-- Collection (documents, notes, or a customer): the partition key when
+-- rag_pages is partitioned (see database/partitioning.py). The client sets it
+-- on insert; source filters are routed to it (database/routing.py).
+alter table rag_pages
+  add column if not exists collection text not null default 'documents';
+
+update rag_pages set collection = 'notes'
+ where source = 'manuell' and collection = 'documents';
+
+-- Full-text search: generated German tsvector with a GIN index
+alter table rag_pages
+  add column if not exists fts tsvector
+  generated always as (to_tsvector('german', content)) stored;
+
+create index if not exists idx_rag_pages_fts on rag_pages using gin (fts);
+
+-- Trigram index for exact product codes such as "2-T" or "10W-40"
+create extension if not exists pg_trgm;
+
+create index if not exists idx_rag_pages_content_trgm
+  on rag_pages using gin (content gin_trgm_ops);
+
+-- Vector candidates (id, cosine similarity) shared by all search functions;
+-- with VECTOR_QUANTIZATION=binary they are pre-filtered on the bit index and
+-- re-scored exactly; filtered searches use iterative index scans so they
+-- still return candidate_count rows (see candidate_query_sql)
+create or replace function match_rag_page_candidates (
+  query_embedding vector(1536),
+  candidate_count int,
+  filter jsonb default '{}'::jsonb
+) returns table (
+  id bigint,
+  similarity float
+)
+language sql
+volatile
+as $$
+  -- Filtered searches keep scanning the index until candidate_count
+  -- rows match instead of returning the few that survive the filter
+  select set_config('hnsw.iterative_scan', case when filter = '{}'::jsonb
+           then 'off' else 'relaxed_order' end, true),
+         set_config('ivfflat.iterative_scan', case when filter = '{}'::jsonb
+           then 'off' else 'relaxed_order' end, true);
 
-CREATE INDEX idx_rag_pages_source ON rag_pages ((metadata->>'source'));
+  select c.id, c.similarity
+    from (
+      (select p.id, 1 - (p.embedding <=> query_embedding::vector(1536)) as similarity
+         from rag_pages p
+        where filter ? 'collection' and p.collection = filter->>'collection'
+          and (filter->>'source' is null or p.source = filter->>'source')
+          and p.metadata @> (filter - 'collection')
+        order by p.embedding <=> query_embedding::vector(1536)
+        limit candidate_count)
+      union all
+      (select p.id, 1 - (p.embedding <=> query_embedding::vector(1536)) as similarity
+         from rag_pages p
+        where not filter ? 'collection'
+          and (filter->>'source' is null or p.source = filter->>'source')
+          and p.metadata @> (filter - 'collection')
+        order by p.embedding <=> query_embedding::vector(1536)
+        limit candidate_count)
+    ) c
+   order by c.similarity desc;
+$$;
 
 -- Create a function to search for documentation chunks
+-- (the signature changed, so drop the old overloads first)
+drop function if exists match_rag_pages(vector, int, jsonb);
+drop function if exists match_rag_pages(vector, int, jsonb, int, int);
+drop function if exists match_rag_pages(vector, int, jsonb, int, int, float);
+
 create or replace function match_rag_pages (
   query_embedding vector(1536),
   match_count int default 10,
-  filter jsonb DEFAULT '{}'::jsonb
+  filter jsonb DEFAULT '{}'::jsonb,
+  ef_search int default null,
+  probes int default null,
+  match_threshold float default null
 ) returns table (
   id bigint,
   url varchar,
   chunk_number integer,
   content text,
   metadata jsonb,
+  document_id bigint,
   similarity float
 )
 language plpgsql
 as $$
 #variable_conflict use_column
 begin
+  -- Per-call search tuning; is_local = true limits it to this transaction
+  if ef_search is not null then
+    -- HNSW returns at most ef_search rows, so never go below match_count
+    perform set_config(
+      'hnsw.ef_search', least(greatest(ef_search, match_count), 1000)::text, true
+    );
+  end if;
+  if probes is not null then
+    perform set_config('ivfflat.probes', probes::text, true);
+  end if;
+
   return query
-  select
-    id,
-    url,
-    chunk_number,
-    content,
-    metadata,
-    1 - (rag_pages.embedding <=> query_embedding) as similarity
-  from rag_pages
-  where metadata @> filter
-  order by rag_pages.embedding <=> query_embedding
-  limit match_count;
+  select p.id, p.url, p.chunk_number, p.content, p.metadata, p.document_id,
+         c.similarity
+    from match_rag_page_candidates(query_embedding, match_count, filter) c
+    join rag_pages p on p.id = c.id
+  -- Threshold after the ordered LIMIT, so the vector index is still used
+   where match_threshold is null or c.similarity >= match_threshold
+   order by c.similarity desc;
+end;
+$$;
+
+-- Two-phase retrieval, phase 1: ids and scores only (no content/metadata)
+create or replace function match_rag_page_scores (
+  query_embedding vector(1536),
+  match_count int default 50,
+  filter jsonb default '{}'::jsonb,
+  match_threshold float default null,
+  ef_search int default null
+) returns table (
+  id bigint,
+  similarity float
+)
+language plpgsql
+as $$
+#variable_conflict use_column
+begin
+  if ef_search is not null then
+    perform set_config(
+      'hnsw.ef_search', least(greatest(ef_search, match_count), 1000)::text, true
+    );
+  end if;
+
+  return query
+  select c.id, c.similarity
+    from match_rag_page_candidates(query_embedding, match_count, filter) c
+   where match_threshold is null or c.similarity >= match_threshold
+   order by c.similarity desc;
+end;
+$$;
+
+-- Product codes in a question, e.g. 10W-40, 2-T, HLP 46
+create or replace function product_codes (query_text text)
+returns text[]
+language sql
+immutable
+as $$
+  select coalesce(array_agg(distinct m[1]), '{}')
+    from regexp_matches(
+      query_text, '\m(\d{1,2}[Ww]-?\d{2,3}|\d-[Tt]|[A-Z]{2,5} ?\d{1,4})\M', 'g'
+    ) as m;
+$$;
+
+-- Keyword search on the fts column (GIN) plus exact product codes (pg_trgm);
+-- ids and ranks only, see keyword_search_rag_pages for full rows
+create or replace function keyword_rag_page_scores (
+  query_text text,
+  match_count int default 20,
+  filter jsonb default '{}'::jsonb
+) returns table (
+  id bigint,
+  keyword_rank float
+)
+language sql
+stable
+as $$
+  with q as (
+    select
+      -- OR of the question's lexemes: a chunk need not contain every word
+      -- of the question, ts_rank_cd ranks chunks with more of them higher
+      (select string_agg(quote_literal(t.lexeme), ' | ')
+         from unnest(to_tsvector('german', query_text)) as t)::tsquery as query,
+      (select coalesce(array_agg('%' || c || '%'), '{}')
+         from unnest(product_codes(query_text)) as c) as patterns
+  )
+  select p.id,
+         (coalesce(ts_rank_cd(p.fts, q.query), 0)
+           -- every exact product code hit outranks pure word matches
+           + (select count(*) from unnest(q.patterns) as pat
+               where p.content ilike pat))::float as keyword_rank
+    from rag_pages p, q
+   where (filter->>'source' is null or p.source = filter->>'source')
+     and (not filter ? 'collection' or p.collection = filter->>'collection')
+     and p.metadata @> (filter - 'collection')
+     and (p.fts @@ q.query or p.content ilike any (q.patterns))
+   order by keyword_rank desc
+   limit match_count;
+$$;
+
+-- (the result gained document_id, so drop the old definition first)
+drop function if exists keyword_search_rag_pages(text, int, jsonb);
+
+create or replace function keyword_search_rag_pages (
+  query_text text,
+  match_count int default 20,
+  filter jsonb default '{}'::jsonb
+) returns table (
+  id bigint,
+  url varchar,
+  chunk_number integer,
+  content text,
+  metadata jsonb,
+  document_id bigint,
+  keyword_rank float
+)
+language sql
+stable
+as $$
+  select p.id, p.url, p.chunk_number, p.content, p.metadata, p.document_id,
+         k.keyword_rank
+    from keyword_rag_page_scores(query_text, match_count, filter) k
+    join rag_pages p on p.id = k.id
+   order by k.keyword_rank desc;
+$$;
+
+-- Hybrid search: vector and full-text candidates fused with reciprocal rank
+-- fusion (RRF) by id, so the app needs one round trip per search
+drop function if exists hybrid_search_rag_pages(text, vector, int, jsonb, int, int, int);
+
+create or replace function hybrid_search_rag_pages (
+  query_text text,
+  query_embedding vector(1536),
+  match_count int default 10,
+  filter jsonb default '{}'::jsonb,
+  candidate_count int default 50,
+  rrf_k int default 60,
+  ef_search int default null
+) returns table (
+  id bigint,
+  url varchar,
+  chunk_number integer,
+  content text,
+  metadata jsonb,
+  document_id bigint,
+  similarity float,
+  keyword_rank float,
+  rrf_score float
+)
+language plpgsql
+as $$
+#variable_conflict use_column
+begin
+  if ef_search is not null then
+    perform set_config(
+      'hnsw.ef_search', least(greatest(ef_search, candidate_count), 1000)::text, true
+    );
+  end if;
+
+  return query
+  with vector_hits as (
+    select c.id,
+           c.similarity,
+           row_number() over (order by c.similarity desc) as rank
+      from match_rag_page_candidates(query_embedding, candidate_count, filter) c
+  ),
+  keyword_hits as (
+    select k.id,
+           k.keyword_rank,
+           row_number() over (order by k.keyword_rank desc) as rank
+      from keyword_rag_page_scores(query_text, candidate_count, filter) k
+  ),
+  fused as (
+    select coalesce(v.id, k.id) as id,
+           v.similarity,
+           k.keyword_rank,
+           coalesce(1.0 / (rrf_k + v.rank), 0.0)
+             + coalesce(1.0 / (rrf_k + k.rank), 0.0) as rrf_score
+      from vector_hits v
+      full outer join keyword_hits k on k.id = v.id
+  )
+  select p.id,
+         p.url,
+         p.chunk_number,
+         p.content,
+         p.metadata,
+         p.document_id,
+         -- Keyword-only hits still get their vector similarity
+         coalesce(f.similarity, 1 - (p.embedding <=> query_embedding::vector(1536)))::float,
+         coalesce(f.keyword_rank, 0)::float,
+         f.rrf_score::float
+    from fused f
+    join rag_pages p on p.id = f.id
+   order by f.rrf_score desc
+   limit match_count;
 end;
 $$;
 
@@ -59,8 +362,332 @@ $$;
 alter table rag_pages enable row level security;
 
 -- Create a policy that allows anyone to read
+drop policy if exists "Allow public read access" on rag_pages;
 create policy "Allow public read access"
   on rag_pages
   for select
   to public
-  using (true);
\ No newline at end of file
+  using (true);
+
+-- One row per document (url) holding the document-level metadata (file
+-- hash, filename, signed URL, upload time, ...) once; chunks reference it
+-- through document_id and keep only chunk fields (page, source). Counts are
+-- maintained by statement-level triggers on rag_pages, so listing and
+-- counting documents never scans the chunks.
+create table if not exists documents (
+    id bigint generated by default as identity unique,
+    url varchar primary key,
+    source text,
+    source_filter text,
+    original_filename text,
+    file_hash text,
+    metadata jsonb not null default '{}'::jsonb,
+    chunk_count integer not null default 0,
+    content_bytes bigint not null default 0,
+    created_at timestamp with time zone default timezone('utc'::text, now()) not null,
+    updated_at timestamp with time zone default timezone('utc'::text, now()) not null
+);
+
+alter table documents
+  add column if not exists id bigint generated by default as identity unique,
+  add column if not exists metadata jsonb not null default '{}'::jsonb;
+
+create index if not exists idx_documents_source on documents (source);
+create index if not exists idx_documents_file_hash on documents (file_hash);
+
+-- Case-insensitive prefix checks (lower(url) like 'title%') independent of
+-- the database collation; replaces the case-sensitive index on url
+drop index if exists idx_documents_url_prefix;
+create index if not exists idx_documents_url_lower_prefix
+  on documents (lower(url) text_pattern_ops);
+
+alter table rag_pages
+  drop constraint if exists rag_pages_document_id_fkey;
+alter table rag_pages
+  add constraint rag_pages_document_id_fkey
+    foreign key (document_id) references documents (id) on delete cascade;
+
+create index if not exists idx_rag_pages_document_id on rag_pages (document_id);
+
+create or replace function documents_after_chunk_insert()
+returns trigger
+language plpgsql
+as $$
+begin
+  -- Chunks written without a document row (older clients) still get one
+  insert into documents as d (
+    url, source, source_filter, original_filename, file_hash,
+    chunk_count, content_bytes
+  )
+  select url, max(source), max(metadata->>'source_filter'),
+         max(metadata->>'original_filename'), max(metadata->>'file_hash'),
+         count(*), sum(octet_length(content))
+    from new_chunks
+   group by url
+  on conflict (url) do update
+     set chunk_count = d.chunk_count + excluded.chunk_count,
+         content_bytes = d.content_bytes + excluded.content_bytes,
+         source = coalesce(d.source, excluded.source),
+         source_filter = coalesce(d.source_filter, excluded.source_filter),
+         original_filename = coalesce(d.original_filename, excluded.original_filename),
+         file_hash = coalesce(d.file_hash, excluded.file_hash),
+         updated_at = now();
+  return null;
+end;
+$$;
+
+create or replace function documents_after_chunk_delete()
+returns trigger
+language plpgsql
+as $$
+begin
+  update documents d
+     set chunk_count = d.chunk_count - o.chunks,
+         content_bytes = d.content_bytes - o.bytes,
+         updated_at = now()
+    from (
+      select url, count(*) as chunks, sum(octet_length(content)) as bytes
+        from old_chunks
+       group by url
+    ) o
+   where d.url = o.url;
+
+  delete from documents d
+   where d.chunk_count <= 0
+     and d.url in (select url from old_chunks);
+  return null;
+end;
+$$;
+
+drop trigger if exists rag_pages_documents_insert on rag_pages;
+create trigger rag_pages_documents_insert
+  after insert on rag_pages
+  referencing new table as new_chunks
+  for each statement execute function documents_after_chunk_insert();
+
+drop trigger if exists rag_pages_documents_delete on rag_pages;
+create trigger rag_pages_documents_delete
+  after delete on rag_pages
+  referencing old table as old_chunks
+  for each statement execute function documents_after_chunk_delete();
+
+-- Backfill (idempotent: recomputes the counts of existing documents)
+insert into documents (
+  url, source, source_filter, original_filename, file_hash,
+  chunk_count, content_bytes, created_at
+)
+select url, max(source), max(metadata->>'source_filter'),
+       max(metadata->>'original_filename'), max(metadata->>'file_hash'),
+       count(*), sum(octet_length(content)), min(created_at)
+  from rag_pages
+ group by url
+on conflict (url) do update
+   set chunk_count = excluded.chunk_count,
+       content_bytes = excluded.content_bytes,
+       updated_at = now();
+
+-- Move document-level metadata of existing chunks into documents, then
+-- strip it from the chunks (rewrites rag_pages once; run off-peak)
+update documents d
+   set metadata = c.metadata - 'page'
+  from (
+    select distinct on (url) url, metadata
+      from rag_pages
+     where document_id is null
+     order by url, chunk_number
+  ) c
+ where d.url = c.url and d.metadata = '{}'::jsonb;
+
+update rag_pages p
+   set document_id = d.id,
+       metadata = jsonb_strip_nulls(jsonb_build_object(
+         'source', p.metadata->'source',
+         'page', p.metadata->'page'))
+  from documents d
+ where d.url = p.url and p.document_id is null;
+
+alter table documents enable row level security;
+
+drop policy if exists "Allow public read access" on documents;
+create policy "Allow public read access"
+  on documents
+  for select
+  to public
+  using (true);
+
+-- The ingestion pipeline upserts the document row before its chunks
+drop policy if exists "Allow public insert access" on documents;
+create policy "Allow public insert access"
+  on documents
+  for insert
+  to public
+  with check (true);
+
+drop policy if exists "Allow public update access" on documents;
+create policy "Allow public update access"
+  on documents
+  for update
+  to public
+  using (true);
+
+-- Delete documents by url: chunks (the triggers above keep the catalog in
+-- sync) and leftover catalog rows, in one call that returns only counts
+create or replace function delete_documents(p_urls text[])
+returns table (documents_deleted bigint, chunks_deleted bigint)
+language plpgsql
+as $$
+begin
+  select count(*) into documents_deleted
+    from documents
+   where url = any (p_urls);
+
+  delete from rag_pages where url = any (p_urls);
+  get diagnostics chunks_deleted = row_count;
+
+  -- Catalog rows without chunks are not removed by the trigger
+  delete from documents where url = any (p_urls);
+  return next;
+end;
+$$;
+
+-- Corpus version, bumped in the same transaction by every statement that
+-- changes rag_pages. Retrieval caches in any worker compare it with one
+-- cheap read (see database/corpus_version.py).
+create table if not exists corpus_version (
+    id integer primary key default 1 check (id = 1),
+    version bigint not null default 0,
+    updated_at timestamp with time zone default timezone('utc'::text, now()) not null
+);
+
+insert into corpus_version (id) values (1) on conflict (id) do nothing;
+
+-- security definer: clients may change rag_pages but not the counter
+create or replace function bump_corpus_version()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  update corpus_version
+     set version = version + 1, updated_at = now()
+   where id = 1;
+  return null;
+end;
+$$;
+
+drop trigger if exists rag_pages_corpus_version on rag_pages;
+create trigger rag_pages_corpus_version
+  after insert or update or delete or truncate on rag_pages
+  for each statement execute function bump_corpus_version();
+
+alter table corpus_version enable row level security;
+
+drop policy if exists "Allow public read access" on corpus_version;
+create policy "Allow public read access"
+  on corpus_version
+  for select
+  to public
+  using (true);
+
+-- Durable ingestion job queue (leased by document_processing/worker.py)
+create table if not exists ingestion_jobs (
+    id uuid primary key default gen_random_uuid(),
+    status text not null default 'queued'
+        check (status in ('queued', 'running', 'done', 'failed')),
+    payload jsonb not null default '{}'::jsonb,
+    attempts integer not null default 0,
+    max_attempts integer not null default 3,
+    lease_owner text,
+    lease_expires_at timestamp with time zone,
+    error text,
+    result jsonb,
+    created_at timestamp with time zone default timezone('utc'::text, now()) not null,
+    updated_at timestamp with time zone default timezone('utc'::text, now()) not null
+);
+
+create index if not exists idx_ingestion_jobs_runnable
+  on ingestion_jobs (created_at)
+  where status in ('queued', 'running');
+
+-- Lease the oldest runnable job; SKIP LOCKED lets many workers poll concurrently
+create or replace function claim_ingestion_job (
+  p_worker_id text,
+  p_lease_seconds int default 300
+) returns setof ingestion_jobs
+language plpgsql
+as $$
+begin
+  -- Jobs whose worker died on the last allowed attempt are given up
+  update ingestion_jobs
+     set status = 'failed', lease_owner = null, error = 'lease expired',
+         updated_at = now()
+   where status = 'running'
+     and lease_expires_at < now()
+     and attempts >= max_attempts;
+
+  return query
+  with claimed as (
+    update ingestion_jobs j
+       set status = 'running',
+           lease_owner = p_worker_id,
+           lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+           attempts = j.attempts + 1,
+           updated_at = now()
+     where j.id = (
+       select q.id from ingestion_jobs q
+        where q.status = 'queued'
+           or (q.status = 'running' and q.lease_expires_at < now())
+        order by q.created_at
+        limit 1
+        for update skip locked
+     )
+    returning j.*
+  )
+  select * from claimed;
+end;
+$$;
+
+create or replace function heartbeat_ingestion_job (
+  p_job_id uuid,
+  p_worker_id text,
+  p_lease_seconds int default 300
+) returns boolean
+language sql
+as $$
+  with updated as (
+    update ingestion_jobs
+       set lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+           updated_at = now()
+     where id = p_job_id and lease_owner = p_worker_id and status = 'running'
+    returning 1
+  )
+  select exists (select 1 from updated);
+$$;
+
+create or replace function finish_ingestion_job (
+  p_job_id uuid,
+  p_worker_id text,
+  p_success boolean,
+  p_result jsonb default null,
+  p_error text default null
+) returns boolean
+language sql
+as $$
+  with updated as (
+    update ingestion_jobs
+       set status = case
+             when p_success then 'done'
+             when attempts >= max_attempts then 'failed'
+             else 'queued'
+           end,
+           result = p_result,
+           error = p_error,
+           lease_owner = null,
+           lease_expires_at = null,
+           updated_at = now()
+     where id = p_job_id and lease_owner = p_worker_id and status = 'running'
+    returning 1
+  )
+  select exists (select 1 from updated);
+$$;
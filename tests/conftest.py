@@ -0,0 +1,56 @@
+"""
+Shared fixtures: a small product corpus in the in-process Supabase stand-in.
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.async_client import AsyncSupabaseClient
+from database.local_store import LocalAsyncSupabaseClient, LocalSupabaseClient
+from database.setup import SupabaseClient
+from document_processing.fake_embeddings import FakeEmbeddingGenerator
+
+# Stored as doc0.pdf, doc1.pdf, ... by the ``populated`` fixtures
+CHUNKS = [
+    "Hydrauliköl HLP 46 für Pressen und Hebebühnen",
+    "Motorenöl 10W-40 teilsynthetisch für Dieselmotoren",
+    "Getriebeöl SAE 90 für Achsen",
+]
+
+
+def chunk_row(embedder, url, text):
+    return {
+        "url": url,
+        "chunk_number": 0,
+        "content": text,
+        "embedding": embedder.embed_text(text),
+        "metadata": {"source": "ui_upload"},
+    }
+
+
+def store_chunk(client, embedder, url, text):
+    client.store_document_chunk(**chunk_row(embedder, url, text))
+
+
+@pytest.fixture
+def populated():
+    client = SupabaseClient(client=LocalSupabaseClient())
+    embedder = FakeEmbeddingGenerator(embedding_dim=128)
+    for i, text in enumerate(CHUNKS):
+        store_chunk(client, embedder, f"doc{i}.pdf", text)
+    return client, embedder
+
+
+@pytest.fixture
+def async_populated():
+    client = AsyncSupabaseClient(client=LocalAsyncSupabaseClient())
+    embedder = FakeEmbeddingGenerator(embedding_dim=128)
+    rows = [chunk_row(embedder, f"doc{i}.pdf", text) for i, text in enumerate(CHUNKS)]
+    asyncio.run(client.store_document_chunks(rows))
+    return client, embedder
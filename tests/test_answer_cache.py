@@ -0,0 +1,144 @@
+"""
+Unit tests for the semantic answer cache.
+"""
+
+import os
+import sys
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.answer_cache import AnswerCache, replay
+from agent.agent import RAGAgent
+from agent.tools import KnowledgeBaseSearch
+from conftest import store_chunk
+from database.local_store import LocalSupabaseClient
+from database.setup import SupabaseClient
+from document_processing.fake_embeddings import FakeEmbeddingGenerator
+
+CITATIONS = [{"id": 1, "url": "a.pdf", "metadata": {"page": 2}, "similarity": 0.8}]
+
+
+class TestAnswerCache:
+    """
+    Test cases for the similarity lookup, eviction and stats.
+    """
+
+    def test_similar_question_hits(self):
+        """
+        Test that a question above the threshold gets the cached answer.
+        """
+        cache = AnswerCache(size=4, ttl=60, threshold=0.9)
+        cache.put("Welches Öl?", [1.0, 0.0], 1, "HLP 46", CITATIONS)
+
+        hit = cache.lookup([0.99, 0.05], 1)
+
+        assert hit["answer"] == "HLP 46"
+        assert hit["citations"] == CITATIONS
+        assert cache.lookup([0.0, 1.0], 1) is None
+        assert cache.stats()["hit_rate"] == 0.5
+
+    def test_new_version_invalidates(self):
+        """
+        Test that a newer corpus version drops all answers.
+        """
+        cache = AnswerCache(size=4, ttl=60, threshold=0.9)
+        cache.put("Welches Öl?", [1.0, 0.0], 1, "HLP 46", CITATIONS)
+
+        assert cache.lookup([1.0, 0.0], 2) is None
+        assert cache.stats()["size"] == 0
+
+    def test_lru_eviction_and_ttl(self):
+        """
+        Test that the least recently used answer is evicted and old ones expire.
+        """
+        cache = AnswerCache(size=1, ttl=60, threshold=0.9)
+        cache.put("eins", [1.0, 0.0], 1, "A", [])
+        cache.put("zwei", [0.0, 1.0], 1, "B", [])
+
+        assert cache.lookup([1.0, 0.0], 1) is None
+        assert cache.lookup([0.0, 1.0], 1)["answer"] == "B"
+
+        cache.ttl = -1
+        assert cache.lookup([0.0, 1.0], 1) is None
+
+    @pytest.mark.asyncio
+    async def test_replay_reproduces_answer(self):
+        """
+        Test that the replayed pieces add up to the answer.
+        """
+        answer = "Für Pressen empfehlen wir  HLP 46.\n\nQuelle: a.pdf"
+        pieces = [piece async for piece in replay(answer, chunk_chars=8)]
+
+        assert len(pieces) > 1
+        assert "".join(pieces) == answer
+
+
+class TestAgentAnswerCache:
+    """
+    Test cases for the answer cache in RAGAgent.query.
+    """
+
+    @pytest.mark.asyncio
+    async def test_repeated_question_skips_llm(self):
+        """
+        Test that a repeated question is answered from the cache until the
+        corpus changes, and that use_cache=False bypasses it.
+        """
+        client = SupabaseClient(client=LocalSupabaseClient())
+        embedder = FakeEmbeddingGenerator(embedding_dim=64)
+        store_chunk(client, embedder, "a.pdf", "Hydrauliköl HLP 46")
+        with patch("agent.tools.CrossEncoderReranker"):
+            kb_search = KnowledgeBaseSearch(client, embedder)
+        run = AsyncMock(return_value=MagicMock(output="HLP 46", tool_calls=[]))
+        with patch.object(sys.modules["agent.agent"], "Agent") as agent_class:
+            agent_class.return_value.run = run
+            rag_agent = RAGAgent(
+                api_key="test_api_key",
+                kb_search=kb_search,
+                answer_cache=AnswerCache(size=8, ttl=60, threshold=0.95),
+            )
+
+        first = await rag_agent.query("Welches Öl für Pressen?")
+        second = await rag_agent.query("Welches Öl für Pressen?")
+        bypassed = await rag_agent.query("Welches Öl für Pressen?", use_cache=False)
+
+        assert (first["cached"], second["cached"], bypassed["cached"]) == (
+            False,
+            True,
+            False,
+        )
+        assert second["response"] == "HLP 46"
+        assert run.await_count == 2
+
+        store_chunk(client, embedder, "b.pdf", "Motorenöl 10W-40")
+        third = await rag_agent.query("Welches Öl für Pressen?")
+
+        assert third["cached"] is False
+        assert run.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_initial_corpus_version_is_cached(self):
+        """
+        Test that answers are cached at the seeded corpus version 0.
+        """
+        client = SupabaseClient(client=LocalSupabaseClient())
+        with patch("agent.tools.CrossEncoderReranker"):
+            kb_search = KnowledgeBaseSearch(
+                client, FakeEmbeddingGenerator(embedding_dim=64)
+            )
+        kb_search.corpus_version = AsyncMock(return_value=0)
+        with patch.object(sys.modules["agent.agent"], "Agent"):
+            rag_agent = RAGAgent(
+                api_key="test_api_key",
+                kb_search=kb_search,
+                answer_cache=AnswerCache(size=8, ttl=60, threshold=0.95),
+            )
+
+        lookup = await rag_agent.lookup_answer("Welches Öl?")
+        rag_agent.remember_answer(lookup, "HLP 46", CITATIONS)
+
+        assert (await rag_agent.lookup_answer("Welches Öl?"))["answer"] is not None
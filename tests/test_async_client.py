@@ -0,0 +1,124 @@
+"""
+Unit tests for the non-blocking AsyncSupabaseClient.
+"""
+
+import asyncio
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.tools import KnowledgeBaseSearch, KnowledgeBaseSearchParams
+from conftest import CHUNKS
+from database.async_client import AsyncSupabaseClient, default_client
+from database.setup import SupabaseClient
+
+
+class TestAsyncSupabaseClient:
+    """
+    Test cases for AsyncSupabaseClient.
+    """
+
+    @pytest.mark.asyncio
+    async def test_concurrent_searches(self, async_populated):
+        """
+        Test that concurrent vector and keyword searches find the chunk.
+        """
+        client, embedder = async_populated
+        query = embedder.embed_text(CHUNKS[1])
+
+        vector, keyword = await asyncio.gather(
+            client.search_documents(query, match_threshold=0.0, match_count=3),
+            client.keyword_search_documents("Motorenöl 10W-40"),
+        )
+
+        assert vector[0]["content"] == CHUNKS[1]
+        assert vector[0]["similarity"] == pytest.approx(1.0)
+        assert keyword[0]["content"] == CHUNKS[1]
+
+    @pytest.mark.asyncio
+    async def test_delete_and_sources(self, async_populated):
+        """
+        Test that deletes and the document listing go through the async client.
+        """
+        client, _ = async_populated
+        assert await client.delete_documents_by_filename("doc0.pdf") == 1
+        assert await client.get_all_document_sources() == ["doc1.pdf", "doc2.pdf"]
+
+    @pytest.mark.asyncio
+    async def test_same_requests_as_sync_client(self, async_populated, capsys):
+        """
+        Test that row filters, the rag_pages fallback and the match printout
+        are shared with SupabaseClient.
+        """
+        client, embedder = async_populated
+        filters = {"url": ["doc1.pdf"]}
+        rows = [row async for row in client.iter_rows("rag_pages", "url", filters)]
+        assert [row["url"] for row in rows] == ["doc1.pdf"]
+
+        await client.search_documents(embedder.embed_text(CHUNKS[1]), 0.0)
+        assert "RAG-Matches" in capsys.readouterr().out
+
+        table = client.client.table
+
+        def without_catalog(name):
+            if name == "documents":
+                raise RuntimeError('relation "documents" does not exist')
+            return table(name)
+
+        with patch.object(client.client, "table", side_effect=without_catalog):
+            sources = await client.get_all_document_sources()
+        assert sources == ["doc0.pdf", "doc1.pdf", "doc2.pdf"]
+
+    def test_default_client_follows_backend(self, monkeypatch):
+        """
+        Test that PostgREST gets the async client, Postgres the sync one.
+        """
+        monkeypatch.setenv("SUPABASE_URL", "https://example.supabase.co")
+        monkeypatch.setenv("SUPABASE_KEY", "key")
+        monkeypatch.delenv("LOCAL_INDEX_DIR", raising=False)
+        monkeypatch.delenv("DATABASE_BACKEND", raising=False)
+        assert isinstance(default_client(), AsyncSupabaseClient)
+
+        monkeypatch.setenv("DATABASE_BACKEND", "postgres")
+        monkeypatch.setenv("DATABASE_URL", "postgresql://localhost/test")
+        client = default_client()
+        assert isinstance(client, SupabaseClient)
+        client.client.close()
+
+
+class TestAsyncKnowledgeBaseSearch:
+    """
+    Test cases for KnowledgeBaseSearch with the async client.
+    """
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("mode", ["hybrid", "fanout", "lean"])
+    async def test_search_without_db_threads(self, async_populated, monkeypatch, mode):
+        """
+        Test that database calls are awaited instead of run in threads.
+        """
+        monkeypatch.setenv("RETRIEVAL_MODE", mode)
+        monkeypatch.setenv("MIN_SIMILARITY_SCORE", "-1")
+        client, embedder = async_populated
+        with patch("agent.tools.CrossEncoderReranker"):
+            tool = KnowledgeBaseSearch(client, embedder)
+
+        threaded = []
+        to_thread = asyncio.to_thread
+
+        async def record(func, *args, **kwargs):
+            threaded.append(func)
+            return await to_thread(func, *args, **kwargs)
+
+        with patch("agent.tools.asyncio.to_thread", side_effect=record):
+            results = await tool.search(
+                KnowledgeBaseSearchParams(query="Motorenöl 10W-40", max_results=2)
+            )
+
+        assert results[0].content == CHUNKS[1]
+        assert threaded == [embedder.embed_text]
@@ -0,0 +1,160 @@
+"""
+Unit tests for the process-wide Supabase client registry.
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import client_registry
+from database.local_store import LocalSupabaseClient
+from database.setup import SupabaseClient
+
+URL = "https://example.supabase.co"
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    client_registry.reset()
+    yield
+    client_registry.reset()
+
+
+class TestClientRegistry:
+    """
+    Test cases for shared clients and pool statistics.
+    """
+
+    def test_one_client_per_credential_set(self):
+        """
+        Test that equal credentials share a client and all clients share
+        one HTTP pool.
+        """
+        anon = client_registry.get_client(URL, "anon-key")
+        admin = client_registry.get_client(URL, "service-key")
+
+        assert client_registry.get_client(URL, "anon-key") is anon
+        assert SupabaseClient(URL, "anon-key").client is anon
+        assert admin is not anon
+        assert anon.postgrest.session is client_registry.http_client()
+        assert admin.postgrest.session is client_registry.http_client()
+        assert client_registry.pool_stats()["clients"] == 2
+
+    def test_register_and_missing_credentials(self, monkeypatch):
+        """
+        Test that a registered client is handed out and missing credentials
+        raise ValueError.
+        """
+        local = LocalSupabaseClient()
+        client_registry.register(local, URL, "anon-key")
+
+        assert client_registry.get_client(URL, "anon-key") is local
+
+        monkeypatch.delenv("SUPABASE_URL", raising=False)
+        monkeypatch.delenv("SUPABASE_KEY", raising=False)
+        with pytest.raises(ValueError):
+            client_registry.get_client()
+
+    def test_pool_stats_counts_requests(self):
+        """
+        Test that requests over the shared pool are counted.
+        """
+        import httpx
+
+        http = client_registry.http_client()
+        http._transport.transport = httpx.MockTransport(
+            lambda request: httpx.Response(200)
+        )
+
+        http.get(f"{URL}/rest/v1/")
+        stats = client_registry.pool_stats()
+
+        assert stats["requests"] == 1
+        assert stats["in_flight"] == 0
+        assert stats["max_connections"] == int(
+            os.getenv("SUPABASE_MAX_CONNECTIONS", "20")
+        )
+        assert set(stats["connections"]) == {"open", "idle", "active", "http2"}
+
+    def test_failed_requests_leave_no_in_flight_count(self):
+        """
+        Test that transport errors on the sync and async pool do not leak
+        in-flight requests.
+        """
+        import asyncio
+
+        import httpx
+
+        def fail(request):
+            raise httpx.ConnectTimeout("timed out", request=request)
+
+        http = client_registry.http_client()
+        http._transport.transport = httpx.MockTransport(fail)
+        with pytest.raises(httpx.ConnectTimeout):
+            http.get(f"{URL}/rest/v1/")
+
+        async def request():
+            client = await client_registry.get_async_client(URL, "anon-key")
+            session = client.postgrest.session
+            session._transport.transport = httpx.MockTransport(fail)
+            await client_registry.run_async(session.get(URL))
+
+        with pytest.raises(httpx.ConnectTimeout):
+            asyncio.run(request())
+
+        stats = client_registry.pool_stats()
+        assert stats["requests"] == 2
+        assert stats["in_flight"] == 0
+
+    def test_bytes_sent_from_request_body(self):
+        """
+        Test that bytes sent are read from the encoded request body, and that
+        SupabaseClient records them per request.
+        """
+        import httpx
+
+        http = client_registry.http_client()
+        http._transport = httpx.MockTransport(lambda request: httpx.Response(201))
+
+        with client_registry.count_bytes_sent() as sent:
+            request = http.post(f"{URL}/rest/v1/rag_pages", json={"a": 1}).request
+        assert sent[0] == len(request.content) > 0
+        http.get(f"{URL}/rest/v1/")
+        assert sent[0] == len(request.content)
+
+        client = SupabaseClient(client=LocalSupabaseClient())
+        client.store_document_chunks(
+            [{"url": "a.pdf", "chunk_number": 0, "content": "x", "metadata": {}}]
+        )
+        assert client.last_bytes_sent > 0
+
+    def test_async_client_outlives_event_loops(self):
+        """
+        Test that every event loop gets the same async client and pool, and
+        that requests run on the registry's loop.
+        """
+        import asyncio
+
+        import httpx
+
+        async def request():
+            client = await client_registry.get_async_client(URL, "anon-key")
+            http = client.postgrest.session
+            http._transport = httpx.MockTransport(lambda r: httpx.Response(200))
+            with client_registry.count_bytes_sent() as sent:
+                await client_registry.run_async(http.post(URL, json={"a": 1}))
+            return client, sent[0]
+
+        # Reason: Streamlit starts a new loop per rerun with asyncio.run
+        first, sent = asyncio.run(request())
+        second, _ = asyncio.run(request())
+
+        assert first is second
+        assert sent > 0
+        stats = client_registry.pool_stats()
+        assert stats["async_clients"] == 1
+        assert stats["requests"] == 2
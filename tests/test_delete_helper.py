@@ -5,7 +5,63 @@ import os
 # Projekt-Wurzelverzeichnis zum Python-Path hinzufügen
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from utils.delete_helper import delete_file_and_records
+from database.local_store import LocalSupabaseClient
+from database.setup import SupabaseClient
+from utils import delete_helper
+from utils.delete_helper import delete_documents, delete_file_and_records
+
+
+@pytest.fixture
+def local_client():
+    """
+    In-Memory-Supabase mit drei Dokumenten (je zwei Chunks) und ihren Dateien.
+    """
+    client = LocalSupabaseClient()
+    db = SupabaseClient(client=client)
+    for url in ("a.pdf", "b.pdf", "c.pdf"):
+        for chunk_number in range(2):
+            db.store_document_chunk(
+                url=url,
+                chunk_number=chunk_number,
+                content=f"{url} Teil {chunk_number}",
+                embedding=[1.0, 0.0],
+                metadata={"source": "ui_upload"},
+            )
+        client.storage.from_("privatedocs").upload(url, b"%PDF")
+    return client
+
+
+def test_delete_documents_returns_counts(local_client, monkeypatch):
+    """
+    Testet, dass Chunks, Katalog und Dateien mit einem RPC und gebündelten
+    Storage-Aufrufen gelöscht werden.
+    """
+    monkeypatch.setattr(delete_helper, "STORAGE_REMOVE_BATCH", 2)
+    bucket = local_client.storage.from_("privatedocs")
+    calls = []
+    monkeypatch.setattr(
+        type(bucket), "remove", lambda self, paths: calls.append(paths) or []
+    )
+
+    counts = delete_documents(["a.pdf", "b.pdf", "x.pdf"], client=local_client)
+
+    assert counts == {"documents": 2, "chunks": 4, "files": 0}
+    assert calls == [["a.pdf", "b.pdf"], ["x.pdf"]]
+    assert [d["url"] for d in local_client.tables["documents"]] == ["c.pdf"]
+
+
+def test_delete_file_and_records_offline(local_client):
+    """
+    Testet das Löschprotokoll für ein vollständig gelöschtes Dokument.
+    """
+    log_output = delete_file_and_records("a.pdf", client=local_client)
+
+    assert "🧹 2 Datenbankeinträge" in log_output
+    assert "✅ Vollständig gelöscht." in log_output
+    assert local_client.storage.from_("privatedocs").list() == [
+        {"name": "b.pdf", "bucket_id": "privatedocs"},
+        {"name": "c.pdf", "bucket_id": "privatedocs"},
+    ]
 
 
 @pytest.mark.integration
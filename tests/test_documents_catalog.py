@@ -0,0 +1,172 @@
+"""
+Unit tests for the trigger-maintained documents catalog.
+"""
+
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import documents
+from database.documents import split_metadata
+from database.local_store import LocalSupabaseClient
+from database.setup import SupabaseClient
+from database.setup_db import build_setup_sql
+from document_processing.fake_embeddings import FakeEmbeddingGenerator
+
+
+def store_chunks(client, url, count, source="ui_upload"):
+    for i in range(count):
+        client.store_document_chunk(
+            url=url,
+            chunk_number=i,
+            content="äbc",
+            embedding=[0.1],
+            metadata={"source": source, "file_hash": f"hash-{url}"},
+        )
+
+
+class TestDocumentsCatalog:
+    """
+    Test cases for listing and counting documents.
+    """
+
+    def test_catalog_follows_inserts_and_deletes(self):
+        """
+        Test that chunk counts and sizes track inserts and deletes.
+        """
+        client = SupabaseClient(client=LocalSupabaseClient())
+        store_chunks(client, "a.pdf", 3)
+        store_chunks(client, "note", 1, source="manuell")
+
+        docs = {d["url"]: d for d in client.list_documents()}
+        assert docs["a.pdf"]["chunk_count"] == 3
+        assert docs["a.pdf"]["content_bytes"] == 3 * len("äbc".encode("utf-8"))
+        assert client.count_documents() == 2
+        assert [d["url"] for d in client.list_documents(sources=["manuell"])] == [
+            "note"
+        ]
+
+        client.delete_documents_by_filename("a.pdf")
+        assert client.get_all_document_sources() == ["note"]
+
+    def test_listing_pages_past_row_limit(self):
+        """
+        Test that listing follows keyset pages instead of stopping at the cap.
+        """
+        client = SupabaseClient(client=LocalSupabaseClient())
+        for i in range(5):
+            store_chunks(client, f"doc{i}.pdf", 1)
+
+        with patch.object(documents, "ROWS_PAGE_SIZE", 2):
+            assert len(client.get_all_document_sources()) == 5
+
+    def test_falls_back_without_catalog(self):
+        """
+        Test that a missing documents table falls back to de-duplicating chunks.
+        """
+        raw = LocalSupabaseClient()
+        client = SupabaseClient(client=raw)
+        store_chunks(client, "a.pdf", 2)
+        table = raw.table
+
+        def without_catalog(name):
+            if name == "documents":
+                raise Exception("relation documents does not exist")
+            return table(name)
+
+        raw.table = without_catalog
+
+        assert client.count_documents() == 1
+        assert client.get_all_document_sources() == ["a.pdf"]
+
+    def test_setup_sql_has_triggers(self):
+        """
+        Test that the setup script creates the catalog and its triggers.
+        """
+        sql = build_setup_sql()
+        assert "create table if not exists documents" in sql
+        assert "referencing new table as new_chunks" in sql
+        assert "referencing old table as old_chunks" in sql
+
+
+class TestDocumentMetadata:
+    """
+    Test cases for document-level metadata stored once per document.
+    """
+
+    def test_split_metadata(self):
+        """
+        Test that only chunk fields stay on the chunk.
+        """
+        document, chunk = split_metadata(
+            {
+                "source": "ui_upload",
+                "page": 3,
+                "signed_url": "https://x",
+                "file_hash": "h",
+            }
+        )
+        assert chunk == {"source": "ui_upload", "page": 3}
+        assert document == {
+            "source": "ui_upload",
+            "signed_url": "https://x",
+            "file_hash": "h",
+        }
+
+    def test_search_hits_resolve_document_metadata(self):
+        """
+        Test that chunk rows are small and hits get the document metadata once.
+        """
+        raw = LocalSupabaseClient()
+        client = SupabaseClient(client=raw)
+        document = client.upsert_document(
+            "a.pdf", {"original_filename": "a.pdf", "signed_url": "https://x"}
+        )
+        for page in (1, 2):
+            client.store_document_chunk(
+                url="a.pdf",
+                chunk_number=page,
+                content=f"Seite {page}",
+                embedding=[1.0, float(page)],
+                metadata={"source": "ui_upload", "page": page},
+                document_id=document["id"],
+            )
+
+        stored = raw.tables["rag_pages"][0]
+        assert "signed_url" not in stored["metadata"]
+        assert raw.tables["documents"][0]["chunk_count"] == 2
+
+        client = SupabaseClient(client=raw)
+        with patch.object(raw, "table", wraps=raw.table) as table:
+            hits = client.search_documents([1.0, 1.0], match_threshold=0.0)
+        assert hits[0]["metadata"]["signed_url"] == "https://x"
+        assert {h["metadata"]["page"] for h in hits} == {1, 2}
+        assert [c.args[0] for c in table.call_args_list] == ["documents"]
+
+    def test_failed_store_leaves_no_document_row(self):
+        """
+        Test that a note whose chunks cannot be stored leaves no catalog row
+        that would block the re-upload.
+        """
+        from document_processing.ingestion import DocumentIngestionPipeline
+
+        raw = LocalSupabaseClient()
+        client = SupabaseClient(client=raw)
+        pipeline = DocumentIngestionPipeline(
+            supabase_client=client,
+            embedding_generator=FakeEmbeddingGenerator(embedding_dim=8),
+        )
+
+        with patch.object(client, "insert_embedding", side_effect=RuntimeError):
+            with pytest.raises(RuntimeError):
+                pipeline.process_text(
+                    "Hydrauliköl", {"source": "manuell", "file_hash": "h1"}, "Notiz"
+                )
+
+        assert not client.has_url("Notiz")
+        assert not client.has_file_hash("h1")
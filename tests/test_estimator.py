@@ -0,0 +1,117 @@
+"""
+Unit tests for the ingestion dry-run estimator and the batch CLI.
+"""
+
+import os
+import sys
+import json
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.ingestion_benchmark import write_text_pdf
+from document_processing.chunker import TextChunker
+from document_processing.cli import collect_files, main
+from document_processing.estimator import IngestionEstimator
+
+
+class TestIngestionEstimator:
+    """
+    Test cases for the IngestionEstimator class.
+    """
+
+    def test_txt_uses_configured_chunker(self, tmp_path):
+        """
+        Test that TXT estimates match the chunker output exactly.
+        """
+        path = tmp_path / "a.txt"
+        path.write_text("Motorenöl 10W-40. " * 300, encoding="utf-8")
+        chunker = TextChunker(chunk_size=1000, chunk_overlap=200)
+
+        estimate = IngestionEstimator(chunker=chunker).estimate_file(str(path))
+        expected = chunker.chunk_text(path.read_text(encoding="utf-8"))
+        assert estimate["chunks"] == len(expected)
+        assert estimate["ocr_pages"] == 0
+        assert estimate["tokens"] > 0
+        assert estimate["seconds"] > 0
+
+    def test_pdf_ocr_share(self, tmp_path):
+        """
+        Test that pages without a text layer are counted as OCR pages.
+        """
+        path = tmp_path / "scan.pdf"
+        write_text_pdf(str(path), ["Datenblatt Hydrauliköl HLP 46 " * 20, "", ""])
+
+        result = IngestionEstimator(sample_pages=3).estimate_files([str(path)])
+        totals = result["totals"]
+        assert totals["pages"] == 3
+        assert totals["ocr_pages"] == 2
+        assert totals["ocr_share"] == round(2 / 3, 3)
+        assert totals["db_rows"] == totals["chunks"] > 0
+
+    def test_workers_divide_wall_time(self, tmp_path):
+        """
+        Test that more workers reduce the predicted wall time.
+        """
+        path = tmp_path / "a.txt"
+        path.write_text("Getriebeöl " * 2000, encoding="utf-8")
+        estimator = IngestionEstimator()
+        one = estimator.estimate_files([str(path)], workers=1)["totals"]
+        four = estimator.estimate_files([str(path)], workers=4)["totals"]
+        assert four["wall_seconds"] < one["wall_seconds"]
+
+    def test_unsupported_file_is_reported(self, tmp_path):
+        """
+        Test that unreadable files are reported instead of raising.
+        """
+        path = tmp_path / "a.docx"
+        path.write_bytes(b"x")
+        result = IngestionEstimator().estimate_files([str(path)])
+        assert result["totals"]["errors"] == 1
+
+
+class TestCli:
+    """
+    Test cases for the batch ingestion CLI.
+    """
+
+    def test_collect_files(self, tmp_path):
+        """
+        Test that only supported files are collected, recursively if asked.
+        """
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "a.txt").write_text("a")
+        (tmp_path / "b.png").write_bytes(b"x")
+        (tmp_path / "sub" / "c.pdf").write_bytes(b"x")
+
+        assert collect_files([str(tmp_path)]) == [str(tmp_path / "a.txt")]
+        assert len(collect_files([str(tmp_path)], recursive=True)) == 2
+
+    def test_dry_run_json(self, tmp_path, capsys):
+        """
+        Test that the dry run prints an estimate without touching Supabase.
+        """
+        (tmp_path / "a.txt").write_text("Schmierstoff " * 500)
+
+        assert main(["ingest", str(tmp_path), "--dry-run", "--json"]) == 0
+        estimate = json.loads(capsys.readouterr().out)
+        assert estimate["totals"]["files"] == 1
+        assert estimate["totals"]["embedding_cost_usd"] is not None
+
+    def test_delete_reads_url_file(self, tmp_path, capsys, monkeypatch):
+        """
+        Test that delete passes all urls to one delete_documents call.
+        """
+        calls = []
+        monkeypatch.setattr(
+            "utils.delete_helper.delete_documents",
+            lambda urls, bucket: calls.append((urls, bucket))
+            or {"documents": 2, "chunks": 5, "files": 2},
+        )
+        url_file = tmp_path / "urls.txt"
+        url_file.write_text("b.pdf\n\nc.pdf\n", encoding="utf-8")
+
+        assert main(["delete", "a.pdf", "--from-file", str(url_file), "--json"]) == 0
+
+        assert calls == [(["a.pdf", "b.pdf", "c.pdf"], "privatedocs")]
+        assert json.loads(capsys.readouterr().out)["chunks"] == 5
@@ -0,0 +1,124 @@
+"""
+Unit tests for the server-side hybrid search (vector + keyword with RRF).
+"""
+
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conftest import CHUNKS
+from database.setup import SupabaseClient
+
+
+class TestHybridSearch:
+    """
+    Test cases for SupabaseClient.hybrid_search_documents.
+    """
+
+    def test_results_are_fused_by_id(self, populated):
+        """
+        Test that a chunk found by both retrievers appears once, ranked first.
+        """
+        client, embedder = populated
+        query = "Motorenöl 10W-40"
+        results = client.hybrid_search_documents(
+            query, embedder.embed_text(query), match_count=3
+        )
+
+        ids = [r["id"] for r in results]
+        assert len(ids) == len(set(ids))
+        assert results[0]["content"] == CHUNKS[1]
+        assert results[0]["keyword_rank"] > 0
+        assert {"similarity", "rrf_score"} <= set(results[0])
+
+    def test_falls_back_to_vector_search(self):
+        """
+        Test that a database without the hybrid function still returns hits.
+        """
+        client = MagicMock()
+        vector_hit = {"id": 1, "content": "x", "similarity": 0.9}
+
+        def rpc(name, params):
+            request = MagicMock()
+            if name == "hybrid_search_rag_pages":
+                request.execute.side_effect = Exception("function does not exist")
+            else:
+                request.execute.return_value.data = [vector_hit]
+            return request
+
+        client.rpc.side_effect = rpc
+        supabase = SupabaseClient(client=client)
+        assert supabase.hybrid_search_documents("x", [0.1]) == [vector_hit]
+
+
+class TestKnowledgeBaseSearchHybrid:
+    """
+    Test cases for KnowledgeBaseSearch using the hybrid RPC.
+    """
+
+    @pytest.mark.asyncio
+    async def test_search_uses_single_rpc(self, populated):
+        """
+        Test that the tool issues one hybrid RPC and returns unique chunks.
+        """
+        from agent.tools import KnowledgeBaseSearch, KnowledgeBaseSearchParams
+
+        client, embedder = populated
+        owner = MagicMock()
+        with patch("agent.tools.CrossEncoderReranker"):
+            tool = KnowledgeBaseSearch(client, embedder, owner_agent=owner)
+
+        with patch.object(
+            client.client, "rpc", wraps=client.client.rpc
+        ) as rpc, patch.object(client, "keyword_search_documents") as keyword:
+            results = await tool.search(
+                KnowledgeBaseSearchParams(query="Getriebeöl SAE 90", max_results=2)
+            )
+
+        assert [call.args[0] for call in rpc.call_args_list] == [
+            "hybrid_search_rag_pages"
+        ]
+        keyword.assert_not_called()
+        assert len(results) == 2
+        assert results[0].content == CHUNKS[2]
+        assert owner.last_match[0]["content"] == CHUNKS[2]
+
+
+class TestKeywordSearch:
+    """
+    Test cases for SupabaseClient.keyword_search_documents.
+    """
+
+    def test_uses_keyword_rpc(self):
+        """
+        Test that keyword search goes through the indexed RPC, not ilike.
+        """
+        client = MagicMock()
+        client.rpc.return_value.execute.return_value.data = [{"id": 1}]
+        supabase = SupabaseClient(client=client)
+
+        assert supabase.keyword_search_documents(
+            "Welches Öl für 2-T?", 5, {"source": "ui_upload"}
+        ) == [{"id": 1}]
+        name, params = client.rpc.call_args[0]
+        assert name == "keyword_search_rag_pages"
+        assert params == {
+            "query_text": "Welches Öl für 2-T?",
+            "match_count": 5,
+            # Reason: source filters are routed to their collection partition
+            "filter": {"source": "ui_upload", "collection": "documents"},
+        }
+        client.table.assert_not_called()
+
+    def test_product_codes_rank_first(self, populated):
+        """
+        Test that an exact product code outranks plain word matches.
+        """
+        client, _ = populated
+        results = client.keyword_search_documents("Öl für Achsen oder 10W-40")
+        assert results[0]["content"] == CHUNKS[1]
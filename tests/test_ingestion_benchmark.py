@@ -0,0 +1,73 @@
+"""
+Tests for the offline ingestion benchmark and the local Supabase stand-in.
+"""
+
+import os
+import sys
+
+import PyPDF2
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.ingestion_benchmark import run_benchmark, write_text_pdf
+from database.local_store import LocalSupabaseClient
+from database.setup import SupabaseClient
+from document_processing.fake_embeddings import FakeEmbeddingGenerator
+
+
+class TestLocalSupabaseClient:
+    """
+    Test cases for the LocalSupabaseClient stand-in.
+    """
+
+    def test_store_and_search(self):
+        """
+        Test that stored chunks are found again via match_rag_pages.
+        """
+        client = SupabaseClient(client=LocalSupabaseClient())
+        embedder = FakeEmbeddingGenerator(embedding_dim=64)
+        texts = ["Motorenöl 10W-40 Datenblatt", "Hydrauliköl HLP 46 Freigabe"]
+        for i, text in enumerate(texts):
+            client.store_document_chunk(
+                url="a.txt",
+                chunk_number=i,
+                content=text,
+                embedding=embedder.embed_text(text),
+                metadata={"source": "benchmark"},
+            )
+
+        results = client.search_documents(
+            embedder.embed_text("Hydrauliköl HLP 46"),
+            match_count=1,
+            match_threshold=0.0,
+        )
+        assert results[0]["content"] == texts[1]
+        assert client.get_all_document_sources() == ["a.txt"]
+        assert client.delete_documents_by_filename("a.txt") == 2
+
+
+class TestIngestionBenchmark:
+    """
+    Test cases for the ingestion benchmark.
+    """
+
+    def test_run_benchmark_txt(self):
+        """
+        Test that TXT documents run through the full pipeline offline.
+        """
+        result = run_benchmark(docs=3, formats=["txt"], words_per_page=200)
+        assert result["failed_docs"] == 0
+        assert result["chunks"] > 0
+        assert result["docs_per_second"] > 0
+        assert result["stage_seconds"]["store"] > 0
+
+    def test_write_text_pdf(self, tmp_path):
+        """
+        Test that the synthetic PDF has a readable text layer.
+        """
+        path = tmp_path / "doc.pdf"
+        write_text_pdf(str(path), ["Seite eins (Test)", "Seite zwei"])
+        reader = PyPDF2.PdfReader(str(path))
+        assert len(reader.pages) == 2
+        assert "Seite eins (Test)" in reader.pages[0].extract_text()
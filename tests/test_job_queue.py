@@ -0,0 +1,263 @@
+"""
+Unit tests for the ingestion job queue and worker.
+"""
+
+import os
+import sys
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.local_store import LocalSupabaseClient
+from database.postgres import PostgresClient
+from database.setup import SupabaseClient
+from document_processing.job_queue import (
+    SQLiteJobQueue,
+    SupabaseJobQueue,
+    get_job_queue,
+)
+from document_processing.worker import IngestionWorker
+from utils import supabase_client
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SQLiteJobQueue(str(tmp_path / "jobs.sqlite3"))
+
+
+class TestSQLiteJobQueue:
+    """
+    Test cases for the SQLiteJobQueue class.
+    """
+
+    def test_enqueue_and_claim(self, queue):
+        """
+        Test that an enqueued job can be leased exactly once.
+        """
+        job = queue.enqueue({"storage_path": "a.pdf"})
+        assert job["status"] == "queued"
+
+        claimed = queue.claim("worker-1")
+        assert claimed["id"] == job["id"]
+        assert claimed["status"] == "running"
+        assert claimed["attempts"] == 1
+        assert claimed["payload"] == {"storage_path": "a.pdf"}
+
+        # A second worker must not get the same job
+        assert queue.claim("worker-2") is None
+
+    def test_claim_empty_queue(self, queue):
+        """
+        Test that claiming from an empty queue returns None.
+        """
+        assert queue.claim("worker-1") is None
+
+    def test_expired_lease_is_reclaimed(self, queue):
+        """
+        Test that a job whose worker died is handed to another worker.
+        """
+        job = queue.enqueue({"storage_path": "a.pdf"})
+        queue.claim("worker-1", lease_seconds=-1)
+
+        claimed = queue.claim("worker-2")
+        assert claimed["id"] == job["id"]
+        assert claimed["lease_owner"] == "worker-2"
+        assert claimed["attempts"] == 2
+
+        # The old worker lost its lease and cannot finish the job anymore
+        assert queue.complete(job["id"], "worker-1") is False
+        assert queue.complete(job["id"], "worker-2", {"chunk_count": 3}) is True
+        assert queue.get(job["id"])["result"] == {"chunk_count": 3}
+
+    def test_fail_requeues_until_max_attempts(self, queue):
+        """
+        Test that failed jobs are retried and finally marked failed.
+        """
+        job = queue.enqueue({"storage_path": "a.pdf"}, max_attempts=2)
+
+        queue.claim("worker-1")
+        queue.fail(job["id"], "worker-1", "boom")
+        assert queue.get(job["id"])["status"] == "queued"
+
+        queue.claim("worker-1")
+        queue.fail(job["id"], "worker-1", "boom again")
+        failed = queue.get(job["id"])
+        assert failed["status"] == "failed"
+        assert failed["error"] == "boom again"
+        assert queue.claim("worker-1") is None
+
+    def test_get_many(self, queue):
+        """
+        Test that several jobs can be polled in one call.
+        """
+        ids = [queue.enqueue({"n": i})["id"] for i in range(3)]
+        assert {job["id"] for job in queue.get_many(ids)} == set(ids)
+        assert queue.get_many([]) == []
+
+
+class TestIngestionWorker:
+    """
+    Test cases for the IngestionWorker class.
+    """
+
+    @pytest.fixture(autouse=True)
+    def fake_download(self, monkeypatch):
+        response = MagicMock()
+        response.iter_bytes.return_value = [b"Text"]
+        http = MagicMock()
+        http.stream.return_value.__enter__.return_value = response
+        monkeypatch.setattr("document_processing.worker.http_client", lambda: http)
+
+    def _worker(self, queue, chunks):
+        pipeline = MagicMock()
+        pipeline.process_file.return_value = chunks
+        pipeline.last_report = None
+        storage_client = MagicMock()
+        storage_client.storage.from_.return_value.create_signed_url.return_value = {
+            "signedURL": "https://example.invalid/a"
+        }
+        return IngestionWorker(queue, pipeline, storage_client, worker_id="w1")
+
+    def test_run_once_completes_job(self, queue):
+        """
+        Test that the worker processes a job and stores the chunk count.
+        """
+        job = queue.enqueue({"storage_path": "a.txt", "metadata": {"x": 1}})
+        worker = self._worker(queue, [{"id": 1}, {"id": 2}])
+
+        assert worker.run_once() is True
+        done = queue.get(job["id"])
+        assert done["status"] == "done"
+        assert done["result"] == {"chunk_count": 2}
+
+        file_path, metadata = worker.pipeline.process_file.call_args[0]
+        assert file_path.endswith(".txt")
+        assert not os.path.exists(file_path)  # temp file cleaned up
+        assert metadata == {"x": 1, "ingestion_job_id": str(job["id"])}
+
+    def test_run_once_fails_job_without_chunks(self, queue):
+        """
+        Test that a job without extracted chunks is released with an error.
+        """
+        job = queue.enqueue({"storage_path": "a.txt"}, max_attempts=1)
+        worker = self._worker(queue, [])
+
+        worker.run_once()
+        assert queue.get(job["id"])["status"] == "failed"
+        assert worker.run_once() is False
+
+    def _store(self, client, url, job_id):
+        document = client.upsert_document(
+            url, {"original_filename": url, "ingestion_job_id": job_id}
+        )
+        client.store_document_chunks(
+            [
+                {
+                    "url": url,
+                    "chunk_number": 0,
+                    "content": "Text",
+                    "metadata": {},
+                    "document_id": document["id"],
+                }
+            ]
+        )
+
+    def test_retry_clears_earlier_attempt(self, queue):
+        """
+        Test that a retried job first deletes what the crashed attempt stored.
+        """
+        job = queue.enqueue(
+            {"storage_path": "a.txt", "metadata": {"original_filename": "a.txt"}}
+        )
+        queue.claim("crashed-worker", lease_seconds=-1)
+        worker = self._worker(queue, [{"id": 1}])
+        client = SupabaseClient(client=LocalSupabaseClient())
+        worker.pipeline.supabase_client = client
+        self._store(client, "a.txt", str(job["id"]))
+
+        assert worker.run_once() is True
+        assert not client.has_url("a.txt")
+        assert queue.get(job["id"])["status"] == "done"
+
+    def test_retry_keeps_document_of_other_job(self, queue):
+        """
+        Test that a retry leaves the same url alone when another job
+        ingested it, e.g. a file queued twice.
+        """
+        first = queue.enqueue(
+            {"storage_path": "a.txt", "metadata": {"original_filename": "a.txt"}}
+        )
+        second = queue.enqueue(
+            {"storage_path": "a.txt", "metadata": {"original_filename": "a.txt"}}
+        )
+        queue.claim("crashed-worker", lease_seconds=-1)
+        worker = self._worker(queue, [{"id": 1}])
+        client = SupabaseClient(client=LocalSupabaseClient())
+        worker.pipeline.supabase_client = client
+        self._store(client, "a.txt", str(second["id"]))
+
+        assert worker.run_once() is True
+        assert queue.get(first["id"])["status"] == "done"
+        assert client.has_url("a.txt")
+        assert client.count_documents() == 1
+
+    def test_lost_lease_aborts_job(self, queue, monkeypatch):
+        """
+        Test that a worker whose lease is lost stops before ingesting.
+        """
+        job = queue.enqueue({"storage_path": "a.txt"})
+        worker = self._worker(queue, [{"id": 1}])
+        lease_checked = threading.Event()
+
+        def keep_lease(job_id, stop, lost):
+            lost.set()
+            lease_checked.set()
+
+        download = worker._download
+        monkeypatch.setattr(worker, "_keep_lease", keep_lease)
+        monkeypatch.setattr(
+            worker, "_download", lambda p: lease_checked.wait(5) and download(p)
+        )
+
+        assert worker.process_job(queue.claim(worker.worker_id)) is False
+        assert not worker.pipeline.process_file.called
+        assert queue.get(job["id"])["status"] == "running"
+
+    def test_postgres_backend_keeps_supabase_storage_and_queue(
+        self, queue, monkeypatch
+    ):
+        """
+        Test that with DATABASE_BACKEND=postgres downloads and queue RPCs
+        still use the service role Supabase client, not the asyncpg backend.
+        """
+        monkeypatch.setenv("DATABASE_BACKEND", "postgres")
+        monkeypatch.setenv("DATABASE_URL", "postgresql://localhost/test")
+        monkeypatch.delenv("INGESTION_QUEUE_BACKEND", raising=False)
+        service = MagicMock()
+        service.storage.from_.return_value.create_signed_url.return_value = {
+            "signedURL": "https://example.invalid/a"
+        }
+        supabase_client.set_client(service)
+        pipeline = MagicMock()
+        pipeline.supabase_client = SupabaseClient()
+        pipeline.process_file.return_value = [{"id": 1}]
+        pipeline.last_report = None
+        try:
+            assert isinstance(pipeline.supabase_client.client, PostgresClient)
+            worker = IngestionWorker(queue, pipeline, worker_id="w1")
+            job = queue.enqueue({"storage_path": "a.txt"})
+
+            assert worker.run_once() is True
+            assert queue.get(job["id"])["status"] == "done"
+            service.storage.from_.assert_called_once_with("privatedocs")
+
+            job_queue = get_job_queue()
+            assert isinstance(job_queue, SupabaseJobQueue)
+            assert job_queue.client is service
+        finally:
+            supabase_client.set_client(None)
+            pipeline.supabase_client.client.close()
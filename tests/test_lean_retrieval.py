@@ -0,0 +1,105 @@
+"""
+Unit tests for the two-phase ("lean") retrieval: scores first, content last.
+"""
+
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.tools import KnowledgeBaseSearch, KnowledgeBaseSearchParams, adaptive_cut
+from conftest import CHUNKS
+
+
+class TestScoreQueries:
+    """
+    Test cases for the scores-only queries and the batched fetch.
+    """
+
+    def test_scores_carry_no_content(self, populated):
+        """
+        Test that phase one returns ids and scores only.
+        """
+        client, embedder = populated
+        vector = client.search_document_scores(
+            embedder.embed_text(CHUNKS[0]), match_count=3, match_threshold=-1.0
+        )
+        keyword = client.keyword_search_scores("Motorenöl 10W-40")
+
+        assert set(vector[0]) == {"id", "similarity"}
+        assert set(keyword[0]) == {"id", "keyword_rank"}
+
+    def test_match_threshold_is_applied(self, populated):
+        """
+        Test that an explicit threshold is no longer overridden by the env.
+        """
+        client, embedder = populated
+        query = embedder.embed_text(CHUNKS[0])
+        results = client.search_documents(query, match_threshold=0.99)
+
+        assert [r["content"] for r in results] == [CHUNKS[0]]
+
+    def test_fetch_chunks_keeps_order(self, populated):
+        """
+        Test that fetched chunks follow the requested id order.
+        """
+        client, _ = populated
+        rows = client.fetch_chunks([3, 1, 42])
+
+        assert [r["id"] for r in rows] == [3, 1]
+        assert rows[0]["content"] == CHUNKS[2]
+
+
+class TestAdaptiveCut:
+    """
+    Test cases for adaptive_cut.
+    """
+
+    def test_drops_weak_vector_hits(self):
+        """
+        Test that hits far below the best similarity are dropped, keyword hits kept.
+        """
+        fused = [
+            {"id": 1, "similarity": 0.9},
+            {"id": 2, "similarity": 0.85},
+            {"id": 3, "similarity": 0.8},
+            {"id": 4, "similarity": 0.3},
+            {"id": 5, "similarity": 0.2, "keyword_rank": 0.5},
+        ]
+        cut = adaptive_cut(fused, max_results=10, margin=0.2)
+
+        assert [r["id"] for r in cut] == [1, 2, 3, 5]
+
+
+class TestLeanSearch:
+    """
+    Test cases for the lean retrieval mode.
+    """
+
+    @pytest.mark.asyncio
+    async def test_content_fetched_once_for_winners(self, populated, monkeypatch):
+        """
+        Test that content is loaded in one query for the final results only.
+        """
+        monkeypatch.setenv("RETRIEVAL_MODE", "lean")
+        monkeypatch.setenv("MIN_SIMILARITY_SCORE", "-1")
+        client, embedder = populated
+        with patch("agent.tools.CrossEncoderReranker"):
+            tool = KnowledgeBaseSearch(client, embedder)
+
+        with patch.object(
+            client, "fetch_chunks", wraps=client.fetch_chunks
+        ) as fetch, patch.object(
+            client, "search_documents", side_effect=AssertionError
+        ):
+            results = await tool.search(
+                KnowledgeBaseSearchParams(query="Motorenöl 10W-40", max_results=2)
+            )
+
+        fetch.assert_called_once()
+        assert len(fetch.call_args.args[0]) <= 2
+        assert results[0].content == CHUNKS[1]
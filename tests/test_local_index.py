@@ -0,0 +1,165 @@
+"""
+Unit tests for the memory-mapped local vector index replica.
+"""
+
+import os
+import sys
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.local_index import LocalVectorIndex
+from database.local_store import LocalSupabaseClient
+from database.setup import SupabaseClient
+from document_processing.fake_embeddings import FakeEmbeddingGenerator
+
+TEXTS = [f"Produktdatenblatt {i} Hydrauliköl HLP {i}" for i in range(40)]
+
+
+@pytest.fixture
+def store():
+    client = LocalSupabaseClient()
+    embedder = FakeEmbeddingGenerator(embedding_dim=64)
+    for i, text in enumerate(TEXTS):
+        client.table("rag_pages").insert(
+            {
+                "url": f"doc{i}.pdf",
+                "chunk_number": 0,
+                "content": text,
+                "embedding": embedder.embed_text(text),
+                "metadata": {"source": "ui_upload"},
+            }
+        ).execute()
+    return client, embedder
+
+
+class TestLocalVectorIndex:
+    """
+    Test cases for LocalVectorIndex.
+    """
+
+    @pytest.mark.parametrize("dtype", ["float32", "int8"])
+    def test_matches_exact_search(self, store, tmp_path, dtype):
+        """
+        Test that the replica returns the same top hits as the database.
+        """
+        client, embedder = store
+        index = LocalVectorIndex(str(tmp_path), dtype=dtype)
+        assert index.sync(client) == len(TEXTS)
+
+        query = embedder.embed_text(TEXTS[7])
+        expected = client.rpc(
+            "match_rag_pages", {"query_embedding": query, "match_count": 5}
+        ).execute()
+        hits = index.search(query, match_count=5)
+
+        assert hits[0]["id"] == expected.data[0]["id"]
+        assert [h["id"] for h in hits] == [r["id"] for r in expected.data]
+        assert hits[0]["similarity"] == pytest.approx(1.0, abs=0.02)
+
+    def test_incremental_sync_and_reconcile(self, store, tmp_path):
+        """
+        Test that only new rows are appended and deleted rows are tombstoned.
+        """
+        client, embedder = store
+        index = LocalVectorIndex(str(tmp_path))
+        index.sync(client)
+        client.table("rag_pages").insert(
+            {
+                "url": "new.pdf",
+                "content": "neu",
+                "embedding": embedder.embed_text("neu"),
+            }
+        ).execute()
+        client.table("rag_pages").delete().eq("url", "doc3.pdf").execute()
+
+        assert index.sync(client) == 1
+        assert index.reconcile(client) == 1
+        hits = index.search(embedder.embed_text(TEXTS[3]), match_count=len(TEXTS) + 1)
+        assert 4 not in {h["id"] for h in hits}
+        assert len(hits) == len(TEXTS)
+
+    def test_ivf_finds_nearest_row(self, store, tmp_path):
+        """
+        Test that IVF search with all lists probed equals exact search.
+        """
+        client, embedder = store
+        index = LocalVectorIndex(str(tmp_path))
+        index.sync(client)
+        lists = index.build_ivf(lists=4)
+
+        query = embedder.embed_text(TEXTS[11])
+        exact = index.search(query, match_count=3)
+        assert index.search(query, match_count=3, nprobe=lists) == exact
+        assert index.search(query, match_count=1, nprobe=1)
+
+    def test_readers_see_published_rows(self, store, tmp_path):
+        """
+        Test that a second (reader) instance picks up a new sync.
+        """
+        client, embedder = store
+        writer = LocalVectorIndex(str(tmp_path))
+        reader = LocalVectorIndex(str(tmp_path))
+        assert reader.search(embedder.embed_text("x")) == []
+
+        writer.sync(client)
+        assert reader.is_fresh()
+        assert isinstance(reader._arrays["vectors"], np.memmap)
+
+
+class TestSupabaseClientLocalIndex:
+    """
+    Test cases for serving SupabaseClient searches from the replica.
+    """
+
+    def test_search_served_locally(self, store, tmp_path):
+        """
+        Test that unfiltered searches skip the RPC and filtered ones use it.
+        """
+        client, embedder = store
+        index = LocalVectorIndex(str(tmp_path))
+        index.sync(client)
+        supabase = SupabaseClient(client=client, local_index=index)
+        query = embedder.embed_text(TEXTS[5])
+
+        with patch.object(client, "rpc", wraps=client.rpc) as rpc:
+            results = supabase.search_documents(query, match_threshold=0.5)
+            assert not rpc.called
+            assert results[0]["content"] == TEXTS[5]
+
+            supabase.search_documents(
+                query, match_threshold=0.5, filter_metadata={"source": "ui_upload"}
+            )
+            assert rpc.called
+
+    def test_tenant_search_goes_to_database(self, store, tmp_path, monkeypatch):
+        """
+        Test that with RAG_COLLECTION set, unfiltered searches are routed to
+        SQL, since the replica holds every collection.
+        """
+        client, embedder = store
+        index = LocalVectorIndex(str(tmp_path))
+        index.sync(client)
+        supabase = SupabaseClient(client=client, local_index=index)
+        monkeypatch.setenv("RAG_COLLECTION", "kunde_a")
+
+        with patch.object(client, "rpc", wraps=client.rpc) as rpc:
+            supabase.search_document_scores(embedder.embed_text(TEXTS[1]))
+            assert rpc.called
+
+    def test_stale_index_falls_back(self, store, tmp_path):
+        """
+        Test that a stale replica is bypassed.
+        """
+        client, embedder = store
+        index = LocalVectorIndex(str(tmp_path), max_age=0)
+        index.sync(client)
+        supabase = SupabaseClient(client=client, local_index=index)
+
+        with patch.object(client, "rpc", wraps=client.rpc) as rpc:
+            supabase.search_document_scores(embedder.embed_text(TEXTS[1]))
+            assert rpc.called
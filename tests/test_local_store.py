@@ -0,0 +1,122 @@
+"""
+Unit tests for the in-process Supabase stand-in (query builder and storage).
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.local_storage import LocalStorageError
+from database.local_store import LocalSupabaseClient
+from utils import supabase_client
+
+
+@pytest.fixture
+def client():
+    client = LocalSupabaseClient()
+    client.table("rag_pages").insert(
+        [
+            {
+                "url": "Hydraulik.pdf",
+                "chunk_number": 0,
+                "content": "HLP 46",
+                "metadata": {"source": "ui_upload", "tags": ["öl", "hydraulik"]},
+            },
+            {
+                "url": "notiz",
+                "chunk_number": 0,
+                "content": "Rückruf",
+                "metadata": {"source": "manuell", "tags": ["kunde"]},
+            },
+        ]
+    ).execute()
+    return client
+
+
+class TestLocalQuery:
+    """
+    Test cases for the PostgREST filters of the local client.
+    """
+
+    def test_ilike_ignores_case(self, client):
+        """
+        Test that ilike matches case-insensitively.
+        """
+        rows = client.table("rag_pages").select("url").ilike("url", "hydr%").execute()
+
+        assert rows.data == [{"url": "Hydraulik.pdf"}]
+
+    def test_contains_matches_jsonb_and_arrays(self, client):
+        """
+        Test that contains behaves like jsonb @> on objects and nested arrays.
+        """
+        query = client.table("rag_pages").select("url")
+        by_source = query.contains("metadata", {"source": "manuell"}).execute()
+        by_tag = (
+            client.table("rag_pages")
+            .select("url")
+            .contains("metadata", {"tags": ["hydraulik"]})
+            .execute()
+        )
+
+        assert by_source.data == [{"url": "notiz"}]
+        assert by_tag.data == [{"url": "Hydraulik.pdf"}]
+
+
+class TestLocalStorage:
+    """
+    Test cases for the storage stand-in.
+    """
+
+    def test_upload_sign_and_remove(self, client):
+        """
+        Test the upload, signed URL and remove round trip.
+        """
+        bucket = client.storage.from_("privatedocs")
+        response = bucket.upload("a.pdf", b"%PDF", {"content-type": "application/pdf"})
+
+        signed = bucket.create_signed_url("a.pdf", 3600)
+        assert response.full_path == "privatedocs/a.pdf"
+        assert signed["signedURL"] == signed["signedUrl"]
+        assert bucket.download("a.pdf") == b"%PDF"
+
+        assert bucket.remove(["a.pdf", "missing.pdf"]) == [
+            {"name": "a.pdf", "bucket_id": "privatedocs"}
+        ]
+        with pytest.raises(LocalStorageError):
+            bucket.create_signed_url("a.pdf", 3600)
+
+    def test_duplicate_upload_needs_upsert(self, client):
+        """
+        Test that overwriting a file requires x-upsert like the real API.
+        """
+        bucket = client.storage.from_("privatedocs")
+        bucket.upload("a.pdf", b"1")
+
+        with pytest.raises(LocalStorageError) as error:
+            bucket.upload("a.pdf", b"2")
+        bucket.upload("a.pdf", b"2", {"x-upsert": "true"})
+
+        assert error.value.status == 409
+        assert bucket.download("a.pdf") == b"2"
+
+
+class TestSharedClient:
+    """
+    Test cases for the lazily created client in utils.
+    """
+
+    def test_injected_client_is_used(self, client):
+        """
+        Test that set_client replaces the shared client without credentials.
+        """
+        supabase_client.set_client(client)
+        try:
+            assert supabase_client.client is client
+            assert supabase_client.get_client() is client
+        finally:
+            supabase_client.set_client(None)
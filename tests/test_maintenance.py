@@ -0,0 +1,107 @@
+"""
+Unit tests for keyset row streaming and the maintenance jobs built on it.
+"""
+
+import io
+import json
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.local_store import LocalSupabaseClient
+from database.maintenance import check_consistency, export_chunks, reembed_chunks
+from database.setup import SupabaseClient
+
+
+class ConstantEmbedder:
+    def embed_text(self, text):
+        return [float(len(text))]
+
+
+@pytest.fixture
+def client():
+    # Reason: a response cap below the page size must not truncate scans
+    supabase = SupabaseClient(client=LocalSupabaseClient(max_rows=3))
+    for i in range(7):
+        document = supabase.upsert_document(
+            f"doc{i % 2}.pdf", {"source": "ui_upload", "signed_url": "https://x"}
+        )
+        supabase.store_document_chunk(
+            url=f"doc{i % 2}.pdf",
+            chunk_number=i,
+            content=f"Chunk {i}",
+            embedding=[0.0],
+            metadata={"source": "ui_upload", "page": i},
+            document_id=document["id"],
+        )
+    return supabase
+
+
+class TestIterRows:
+    """
+    Test cases for SupabaseClient.iter_rows.
+    """
+
+    def test_streams_all_rows_in_id_order(self, client):
+        """
+        Test that pages are followed past the server row cap.
+        """
+        rows = list(client.iter_rows("rag_pages", "content", page_size=5))
+
+        assert [r["id"] for r in rows] == list(range(1, 8))
+        assert set(rows[0]) == {"id", "content"}
+
+    def test_filters(self, client):
+        """
+        Test that equality and list filters are applied on every page.
+        """
+        urls = {r["url"] for r in client.iter_rows(filters={"url": "doc1.pdf"})}
+        assert urls == {"doc1.pdf"}
+        assert len(list(client.iter_rows(filters={"id": [2, 4, 9]}))) == 2
+
+
+class TestMaintenance:
+    """
+    Test cases for export, re-embedding and consistency checks.
+    """
+
+    def test_export_merges_document_metadata(self, client):
+        """
+        Test that every chunk is exported with its document metadata.
+        """
+        out = io.StringIO()
+        assert export_chunks(client, out, page_size=2) == 7
+
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert rows[0]["metadata"]["signed_url"] == "https://x"
+        assert "embedding" not in rows[0]
+
+    def test_reembed_updates_matching_chunks(self, client):
+        """
+        Test that only filtered chunks get new embeddings.
+        """
+        assert reembed_chunks(client, ConstantEmbedder(), {"url": "doc0.pdf"}) == 4
+
+        rows = client.client.tables["rag_pages"]
+        assert {tuple(r["embedding"]) for r in rows if r["url"] == "doc0.pdf"} == {
+            (7.0,)
+        }
+        assert all(r["embedding"] == [0.0] for r in rows if r["url"] == "doc1.pdf")
+
+    def test_check_reports_drift(self, client):
+        """
+        Test that a clean store passes and catalog drift is reported.
+        """
+        report = check_consistency(client)
+        assert report["chunks"] == 7 and report["documents"] == 2
+        assert not report["wrong_chunk_counts"]
+
+        client.client.tables["documents"][0]["chunk_count"] = 1
+        client.client.tables["rag_pages"][-1]["document_id"] = None
+        report = check_consistency(client)
+        assert report["wrong_chunk_counts"][0]["catalog"] == 1
+        assert report["chunks_without_document"] == [7]
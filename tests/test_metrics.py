@@ -0,0 +1,108 @@
+"""
+Unit tests for the in-process metrics registry.
+"""
+
+import os
+import sys
+import urllib.request
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.metrics import IngestionReport, MetricsRegistry, start_metrics_server
+
+
+class TestMetricsRegistry:
+    """
+    Test cases for the MetricsRegistry class.
+    """
+
+    def test_counter_with_labels(self):
+        """
+        Test that counters are tracked per label set.
+        """
+        metrics = MetricsRegistry()
+        metrics.inc("rag_db_rows_total", 3, operation="insert_chunk")
+        metrics.inc("rag_db_rows_total", 2, operation="insert_chunk")
+        metrics.inc("rag_db_rows_total", 1, operation="match_rag_pages")
+
+        assert metrics.counter_value("rag_db_rows_total", operation="insert_chunk") == 5
+        assert metrics.counter_value("rag_db_rows_total", operation="unknown") == 0
+
+    def test_render_prometheus_histogram(self):
+        """
+        Test that histograms are exported with cumulative buckets.
+        """
+        metrics = MetricsRegistry()
+        metrics.describe("stage_seconds", "Stage duration")
+        metrics.observe("stage_seconds", 0.2, buckets=(0.1, 1.0), stage="embed")
+        metrics.observe("stage_seconds", 0.05, buckets=(0.1, 1.0), stage="embed")
+
+        text = metrics.render_prometheus()
+        assert "# HELP stage_seconds Stage duration" in text
+        assert "# TYPE stage_seconds histogram" in text
+        assert 'stage_seconds_bucket{stage="embed",le="0.1"} 1' in text
+        assert 'stage_seconds_bucket{stage="embed",le="1.0"} 2' in text
+        assert 'stage_seconds_bucket{stage="embed",le="+Inf"} 2' in text
+        assert 'stage_seconds_count{stage="embed"} 2' in text
+
+    def test_render_empty_registry(self):
+        """
+        Test that an empty registry renders without errors.
+        """
+        assert MetricsRegistry().render_prometheus() == "\n"
+
+    def test_metrics_server(self):
+        """
+        Test that the HTTP endpoint serves the Prometheus text.
+        """
+        metrics = MetricsRegistry()
+        metrics.inc("rag_ingestion_documents_total", status="ok")
+        server = start_metrics_server(0, host="127.0.0.1", metrics=metrics)
+        try:
+            port = server.server_address[1]
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as resp:
+                body = resp.read().decode("utf-8")
+        finally:
+            server.shutdown()
+        assert 'rag_ingestion_documents_total{status="ok"} 1' in body
+
+
+class TestIngestionReport:
+    """
+    Test cases for the IngestionReport class.
+    """
+
+    def test_report_summary_and_registry(self):
+        """
+        Test that stage timings end up in both the summary and the registry.
+        """
+        metrics = MetricsRegistry()
+        report = IngestionReport(metrics)
+        with report.stage("extract"):
+            pass
+        report.add("chunks", 4)
+        report.finish(success=True)
+
+        summary = report.to_dict()
+        assert "extract_seconds" in summary
+        assert summary["chunks"] == 4
+        count, _ = metrics.histogram_totals(
+            "rag_ingestion_stage_seconds", stage="extract"
+        )
+        assert count == 1
+        assert metrics.counter_value("rag_ingestion_chunks_total") == 4
+
+    def test_failed_document(self):
+        """
+        Test that failed documents are counted without chunks.
+        """
+        metrics = MetricsRegistry()
+        report = IngestionReport(metrics)
+        report.add("chunks", 4)
+        report.finish(success=False)
+
+        assert (
+            metrics.counter_value("rag_ingestion_documents_total", status="failed") == 1
+        )
+        assert metrics.counter_value("rag_ingestion_chunks_total") == 0
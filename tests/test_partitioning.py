@@ -0,0 +1,153 @@
+"""
+Unit tests for collection routing and the rag_pages partitioning SQL.
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.routing import collection_for_source, route_filter, with_collection
+from database.local_store import LocalSupabaseClient
+from database.partitioning import add_collection_sql, partition_name, partition_sql
+from database.setup import SupabaseClient
+from database.setup_db import (
+    build_setup_sql,
+    candidate_query_sql,
+    rebuild_index_sql,
+)
+
+
+class TestCollectionRouting:
+    """
+    Test cases for mapping chunks and filters to collections.
+    """
+
+    def test_rows_get_collection_from_source(self):
+        """
+        Test that notes and uploads are written to their own collection.
+        """
+        rows = with_collection(
+            [
+                {"metadata": {"source": "manuell"}},
+                {"metadata": {"source": "ui_upload"}},
+                {"metadata": {}, "collection": "kunde_a"},
+            ]
+        )
+        assert [row["collection"] for row in rows] == ["notes", "documents", "kunde_a"]
+
+    def test_source_filter_is_routed(self):
+        """
+        Test that only known sources are routed to a partition.
+        """
+        assert route_filter({"source": "manuell"}) == {
+            "source": "manuell",
+            "collection": "notes",
+        }
+        assert route_filter({"source": "import"}) == {"source": "import"}
+        assert route_filter(None) is None
+
+    def test_tenant_collection(self, monkeypatch):
+        """
+        Test that RAG_COLLECTION puts everything into one collection.
+        """
+        monkeypatch.setenv("RAG_COLLECTION", "kunde_a")
+        assert collection_for_source("manuell") == "kunde_a"
+        assert route_filter(None) == {"collection": "kunde_a"}
+
+    def test_client_writes_and_searches_by_collection(self):
+        """
+        Test that a routed search only returns chunks of its collection.
+        """
+        local = LocalSupabaseClient()
+        supabase = SupabaseClient(client=local)
+        supabase.store_document_chunk(
+            "Notiz", 0, "Öl", [1.0, 0.0], {"source": "manuell"}
+        )
+        supabase.store_document_chunks(
+            [
+                {
+                    "url": "a.pdf",
+                    "chunk_number": 0,
+                    "content": "Öl",
+                    "embedding": [1.0, 0.0],
+                    "metadata": {"source": "ui_upload"},
+                }
+            ]
+        )
+        collections = {r["url"]: r["collection"] for r in local.tables["rag_pages"]}
+        assert collections == {"Notiz": "notes", "a.pdf": "documents"}
+
+        hits = supabase.search_documents([1.0, 0.0], 0.0, 5, {"source": "manuell"})
+        assert [hit["url"] for hit in hits] == ["Notiz"]
+
+
+class TestPartitioningSql:
+    """
+    Test cases for the partitioning migration.
+    """
+
+    def test_partition_per_collection(self):
+        """
+        Test that each collection gets a partition with its own vector index.
+        """
+        sql = ";\n".join(partition_sql(["documents", "notes"]))
+        assert ") partition by list (collection)" in sql
+        assert "primary key (id, collection)" in sql
+        assert "partition of rag_pages for values in ('notes')" in sql
+        assert "create table rag_pages_default partition of rag_pages default" in sql
+        assert "idx_rag_pages_notes_embedding\n  on rag_pages_notes using hnsw" in sql
+        assert "idx_rag_pages_default_embedding" in sql
+        assert (
+            "for each statement execute function documents_after_chunk_insert()" in sql
+        )
+        # Rows are copied before the triggers exist, so counts are not doubled
+        assert sql.index("insert into rag_pages") < sql.index("create trigger")
+
+    def test_add_collection_moves_rows(self):
+        """
+        Test that a new partition takes over its rows from the default partition.
+        """
+        statements = add_collection_sql("kunde_a", quantization="binary")
+        sql = ";\n".join(statements)
+        assert sql.index("delete from rag_pages_default") < sql.index(
+            "attach partition rag_pages_kunde_a for values in ('kunde_a')"
+        )
+        assert "bit_hamming_ops" in sql
+
+    def test_invalid_collection(self):
+        """
+        Test that collection names are validated before they become identifiers.
+        """
+        with pytest.raises(ValueError):
+            partition_name("x; drop table rag_pages")
+
+    def test_setup_and_rebuild_support_partitions(self):
+        """
+        Test that setup skips the table-wide index and rebuilds take a partition.
+        """
+        assert "relkind from pg_class where oid = 'rag_pages'::regclass" in (
+            build_setup_sql()
+        )
+        sql = ";\n".join(rebuild_index_sql(table="rag_pages_notes"))
+        assert "on rag_pages_notes using hnsw" in sql
+        assert "rename to idx_rag_pages_notes_embedding" in sql
+        assert "analyze rag_pages_notes" in sql
+
+    @pytest.mark.parametrize("quantization", [None, "binary"])
+    def test_routed_branch_is_gated(self, quantization):
+        """
+        Test that both candidate branches start with a condition on the
+        filter alone, so unrouted searches skip the routed ANN scan.
+        """
+        sql = candidate_query_sql(quantization=quantization)
+
+        assert (
+            "where filter ? 'collection' and p.collection = filter->>'collection'"
+            in sql
+        )
+        assert "where not filter ? 'collection'" in sql
+        assert "where p.collection" not in sql
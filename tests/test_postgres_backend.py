@@ -0,0 +1,136 @@
+"""
+Unit tests for the SQL compiled by the direct Postgres backend.
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.postgres import PostgresClient, _jsonb_decoder, _jsonb_encoder
+from database.setup import SupabaseClient
+
+
+@pytest.fixture
+def client():
+    # Reason: no connection is opened until the first query runs
+    postgres = PostgresClient("postgresql://localhost/test")
+    yield postgres
+    postgres.close()
+
+
+class TestQueryCompiler:
+    """
+    Test cases for compiling query builder calls to SQL.
+    """
+
+    def test_keyset_select(self, client):
+        """
+        Test that filters, ordering and limits become one parameterized query.
+        """
+        query = (
+            client.table("rag_pages")
+            .select("id,url,metadata->>source")
+            .eq("url", "a.pdf")
+            .in_("document_id", [1, 2])
+            .gt("id", 10)
+            .order("id")
+            .limit(100)
+        )
+        [(sql, args)] = query.compile()
+
+        assert sql == (
+            "select id, url, metadata->>'source' from rag_pages "
+            "where url = $1 and document_id = any($2) and id > $3 "
+            "order by id limit 100"
+        )
+        assert args == ["a.pdf", [1, 2], 10]
+
+    def test_ilike_can_use_lower_index(self, client):
+        """
+        Test that ilike compiles to a lower() comparison.
+        """
+        query = client.table("documents").select("id").ilike("url", "notiz%")
+        [(sql, args)] = query.limit(1).compile()
+
+        assert "where lower(url) like lower($1)" in sql
+        assert args == ["notiz%"]
+
+    def test_bulk_insert_without_rows_back_uses_copy(self, client):
+        """
+        Test that minimal inserts are loaded with COPY, others use INSERT.
+        """
+        rows = [{"url": "a", "chunk_number": i} for i in range(3)]
+        assert client.table("rag_pages").insert(rows, returning="minimal")._use_copy()
+
+        query = client.table("rag_pages").insert(rows)
+        [(sql, args)] = query.compile()
+        assert not query._use_copy()
+        assert sql.endswith("values ($1, $2), ($3, $4), ($5, $6) returning *")
+
+    def test_upsert_and_update(self, client):
+        """
+        Test that upserts update on conflict and updates bind values first.
+        """
+        [(upsert, _)] = (
+            client.table("documents")
+            .upsert({"url": "a", "metadata": {}}, on_conflict="url")
+            .compile()
+        )
+        [(update, args)] = (
+            client.table("rag_pages").update({"embedding": [0.1]}).eq("id", 5).compile()
+        )
+
+        assert "on conflict (url) do update set metadata = excluded.metadata" in upsert
+        assert update == "update rag_pages set embedding = $1 where id = $2 returning *"
+        assert args == [[0.1], 5]
+
+    def test_rejects_unsafe_input(self, client):
+        """
+        Test that identifiers are validated and unfiltered deletes refused.
+        """
+        with pytest.raises(ValueError):
+            client.table("rag_pages").select("id; drop table rag_pages")
+        with pytest.raises(ValueError):
+            client.table("rag_pages").delete().compile()
+
+    def test_rpc_uses_named_arguments(self, client):
+        """
+        Test that RPC params map to named function arguments.
+        """
+        sql, args = client.rpc(
+            "match_rag_pages", {"query_embedding": [0.1], "match_count": 5}
+        ).compile()
+
+        assert sql == (
+            "select * from match_rag_pages(query_embedding => $1, match_count => $2)"
+        )
+        assert args == [[0.1], 5]
+
+    def test_jsonb_codec_round_trip(self):
+        """
+        Test the binary jsonb codec.
+        """
+        value = {"source": "ui_upload", "page": 2}
+        assert _jsonb_decoder(_jsonb_encoder(value)) == value
+
+
+class TestBackendSelection:
+    """
+    Test cases for choosing the backend via configuration.
+    """
+
+    def test_backend_selected_by_config(self, monkeypatch):
+        """
+        Test that DATABASE_BACKEND=postgres swaps the PostgREST client.
+        """
+        monkeypatch.setenv("DATABASE_BACKEND", "postgres")
+        monkeypatch.setenv("DATABASE_URL", "postgresql://localhost/test")
+        monkeypatch.delenv("LOCAL_INDEX_DIR", raising=False)
+
+        supabase = SupabaseClient()
+        assert isinstance(supabase.client, PostgresClient)
+        supabase.client.close()
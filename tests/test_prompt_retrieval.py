@@ -1,8 +1,45 @@
 import pytest
 from document_processing.embeddings import EmbeddingGenerator
 from database.setup import SupabaseClient
+from database.local_store import LocalSupabaseClient
+from document_processing.fake_embeddings import FakeEmbeddingGenerator
 
+OFFLINE_CHUNKS = {
+    "zweitakt.pdf": "Welche Öle sind für 2-Takt-Motoren geeignet? "
+    "Zweitaktöl 2-Takt für Motorsägen und Roller",
+    "hydraulik.pdf": "Hydrauliköl HLP 46 für Pressen und Hebebühnen",
+    "motor.pdf": "Motorenöl 10W-40 teilsynthetisch für Dieselmotoren",
+}
 
+
+def test_prompt_retrieves_correct_documents_offline():
+    """
+    Gleicher Ablauf wie der Live-Test, aber mit In-Memory-Supabase und
+    deterministischen Embeddings.
+    """
+    query = "Welche Öle sind für 2-Takt-Motoren geeignet?"
+    embedding_generator = FakeEmbeddingGenerator(embedding_dim=256)
+    supabase_client = SupabaseClient(client=LocalSupabaseClient())
+    for url, text in OFFLINE_CHUNKS.items():
+        supabase_client.store_document_chunk(
+            url=url,
+            chunk_number=0,
+            content=text,
+            embedding=embedding_generator.embed_text(text),
+            metadata={"source": "ui_upload", "original_filename": url},
+        )
+
+    results = supabase_client.search_documents(
+        query_embedding=embedding_generator.embed_text(query),
+        match_count=5,
+        match_threshold=0.5,
+    )
+
+    assert [r["metadata"]["original_filename"] for r in results] == ["zweitakt.pdf"]
+    assert "2-Takt" in results[0]["content"]
+
+
+@pytest.mark.integration
 def test_prompt_retrieves_correct_documents():
     query = "Welche Öle sind für 2-Takt-Motoren geeignet?"
     embedding_generator = EmbeddingGenerator()
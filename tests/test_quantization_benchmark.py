@@ -0,0 +1,31 @@
+"""
+Tests for the offline vector quantization benchmark.
+"""
+
+import os
+import sys
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.quantization_benchmark import MODES, run_offline
+
+
+class TestQuantizationBenchmark:
+    """
+    Test cases for the numpy simulation of the quantization modes.
+    """
+
+    def test_offline_modes(self):
+        """
+        Test that every mode is reported and rescoring keeps recall usable.
+        """
+        results = run_offline(rows=2000, queries=10, k=10, rescore_factor=10)
+        by_mode = {(r["storage"], r["quantization"]): r for r in results}
+
+        assert set(by_mode) == set(MODES)
+        assert by_mode[("vector", "none")]["recall_at_k"] == 1.0
+        assert by_mode[("halfvec", "none")]["recall_at_k"] >= 0.99
+        assert by_mode[("halfvec", "none")]["column_bytes_per_row"] == 3072
+        assert by_mode[("vector", "binary")]["index_bytes_per_row"] == 192
+        assert by_mode[("vector", "binary")]["recall_at_k"] >= 0.8
@@ -0,0 +1,151 @@
+"""
+Unit tests for the retrieval result cache and the corpus version.
+"""
+
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.retrieval_cache import RetrievalCache, normalize_query
+from agent.tools import KnowledgeBaseSearch, KnowledgeBaseSearchParams
+from conftest import CHUNKS, store_chunk
+from database.corpus_version import CorpusVersion, note_local_write
+
+ROWS = [
+    {"id": 1, "url": "a.pdf", "content": "A", "similarity": 0.9},
+    {"id": 2, "url": "b.pdf", "content": "B", "similarity": 0.8},
+]
+
+
+class TestRetrievalCache:
+    """
+    Test cases for the LRU + TTL cache.
+    """
+
+    def test_normalize_query(self):
+        """
+        Test that case, whitespace and trailing punctuation are ignored.
+        """
+        assert normalize_query("  Welches  Öl? ") == normalize_query("welches öl")
+
+    def test_hit_joins_scores_and_chunks(self):
+        """
+        Test that a hit returns the stored rows.
+        """
+        cache = RetrievalCache(size=4, ttl=60)
+        key = cache.key("Öl", None, 2, "hybrid")
+        cache.put(key, 1, ROWS)
+
+        results, missing = cache.resolve(cache.get(key, 1))
+
+        assert missing == []
+        assert results == ROWS
+
+    def test_new_version_invalidates(self):
+        """
+        Test that a newer corpus version drops all entries and chunks.
+        """
+        cache = RetrievalCache(size=4, ttl=60)
+        key = cache.key("Öl", None, 2, "hybrid")
+        cache.put(key, 1, ROWS)
+
+        assert cache.get(key, 2) is None
+        assert not cache.chunks
+
+    def test_lru_eviction_and_ttl(self):
+        """
+        Test that the oldest entry is evicted and expired entries miss.
+        """
+        cache = RetrievalCache(size=1, ttl=60)
+        first = cache.key("eins", None, 2, "hybrid")
+        second = cache.key("zwei", None, 2, "hybrid")
+        cache.put(first, 1, ROWS)
+        cache.put(second, 1, ROWS)
+
+        assert cache.get(first, 1) is None
+        assert cache.get(second, 1) is not None
+
+        cache.ttl = -1
+        assert cache.get(second, 1) is None
+
+    def test_missing_chunks_are_reported(self):
+        """
+        Test that evicted chunk rows are reported for re-fetching.
+        """
+        cache = RetrievalCache(size=4, ttl=60, chunk_size=1)
+        key = cache.key("Öl", None, 2, "hybrid")
+        cache.put(key, 1, ROWS)
+
+        results, missing = cache.resolve(cache.get(key, 1))
+
+        assert missing == [1]
+        assert [r["id"] for r in results] == [2]
+
+
+class TestCorpusVersion:
+    """
+    Test cases for the corpus version counter.
+    """
+
+    def test_local_store_bumps_version(self, populated):
+        """
+        Test that chunk inserts and deletes move the version.
+        """
+        client, _ = populated
+        before = client.get_corpus_version()
+        client.delete_documents_by_filename("doc0.pdf")
+
+        assert before == 3
+        assert client.get_corpus_version() == 4
+
+    def test_read_is_throttled_until_local_write(self):
+        """
+        Test that the version is trusted for the interval unless we wrote.
+        """
+        tracker = CorpusVersion(interval=60)
+        tracker.update(5)
+
+        assert tracker.cached() == 5
+        note_local_write()
+        assert tracker.cached() is None
+
+
+class TestCachedSearch:
+    """
+    Test cases for the cache inside KnowledgeBaseSearch.
+    """
+
+    @pytest.mark.asyncio
+    async def test_repeated_question_skips_retrieval(self, populated, monkeypatch):
+        """
+        Test that an identical question is served without a search and that
+        a new chunk invalidates it.
+        """
+        monkeypatch.setenv("MIN_SIMILARITY_SCORE", "-1")
+        client, embedder = populated
+        with patch("agent.tools.CrossEncoderReranker"):
+            tool = KnowledgeBaseSearch(client, embedder)
+        params = KnowledgeBaseSearchParams(query="Motorenöl 10W-40", max_results=2)
+
+        first = await tool.search(params)
+        with patch.object(
+            client, "hybrid_search_documents", side_effect=AssertionError
+        ):
+            second = await tool.search(
+                KnowledgeBaseSearchParams(query="motorenöl  10w-40?", max_results=2)
+            )
+
+        assert [r.content for r in second] == [r.content for r in first]
+
+        store_chunk(client, embedder, "doc3.pdf", "Motorenöl 10W-40 vollsynthetisch")
+        with patch.object(
+            client, "hybrid_search_documents", wraps=client.hybrid_search_documents
+        ) as search:
+            await tool.search(params)
+
+        search.assert_called_once()
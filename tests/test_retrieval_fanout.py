@@ -0,0 +1,114 @@
+"""
+Unit tests for the concurrent retrieval fan-out in KnowledgeBaseSearch.
+"""
+
+import os
+import sys
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.tools import (
+    KnowledgeBaseSearch,
+    KnowledgeBaseSearchParams,
+    reciprocal_rank_fusion,
+)
+
+
+def slow(result, seconds):
+    def call(*args, **kwargs):
+        time.sleep(seconds)
+        return result
+
+    return call
+
+
+def make_tool(monkeypatch, embed=0.2, vector=0.2, keyword=0.3):
+    monkeypatch.setenv("RETRIEVAL_MODE", "fanout")
+    supabase = MagicMock()
+    supabase.search_documents.side_effect = slow(
+        [{"id": 1, "content": "a", "similarity": 0.9}], vector
+    )
+    supabase.keyword_search_documents.side_effect = slow(
+        [
+            {"id": 2, "content": "b", "keyword_rank": 1.0},
+            {"id": 1, "content": "a", "keyword_rank": 0.5},
+        ],
+        keyword,
+    )
+    embedder = MagicMock()
+    embedder.embed_text.side_effect = slow([0.1, 0.2], embed)
+    with patch("agent.tools.CrossEncoderReranker"):
+        return KnowledgeBaseSearch(supabase, embedder)
+
+
+class TestReciprocalRankFusion:
+    """
+    Test cases for reciprocal_rank_fusion.
+    """
+
+    def test_merges_by_id(self):
+        """
+        Test that rows found by both retrievers are merged and ranked first.
+        """
+        vector = [{"id": 1, "similarity": 0.9}, {"id": 2, "similarity": 0.8}]
+        keyword = [{"id": 2, "keyword_rank": 0.4}, {"id": 3, "keyword_rank": 0.1}]
+        fused = reciprocal_rank_fusion([vector, keyword], limit=10)
+
+        assert [r["id"] for r in fused] == [2, 1, 3]
+        assert fused[0]["similarity"] == 0.8
+        assert fused[0]["keyword_rank"] == 0.4
+
+
+class TestFanoutSearch:
+    """
+    Test cases for the fanout retrieval mode.
+    """
+
+    @pytest.mark.asyncio
+    async def test_stages_overlap(self, monkeypatch):
+        """
+        Test that keyword search runs while the embedding is computed.
+        """
+        tool = make_tool(monkeypatch)
+        embedding, keyword = threading.Event(), threading.Event()
+        overlapped = []
+
+        def meet(started, other, call):
+            def wait_for_other(*args, **kwargs):
+                started.set()
+                # Reason: only set in time if the other stage runs concurrently
+                overlapped.append(other.wait(timeout=5))
+                return call(*args, **kwargs)
+
+            return wait_for_other
+
+        embedder = tool.embedding_generator
+        embedder.embed_text.side_effect = meet(
+            embedding, keyword, embedder.embed_text.side_effect
+        )
+        supabase = tool.supabase_client
+        supabase.keyword_search_documents.side_effect = meet(
+            keyword, embedding, supabase.keyword_search_documents.side_effect
+        )
+
+        results = await tool.search(KnowledgeBaseSearchParams(query="x"))
+
+        assert overlapped == [True, True]
+        assert [r.content for r in results] == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_stage_timeout_keeps_other_results(self, monkeypatch):
+        """
+        Test that a stage exceeding its timeout is skipped, not fatal.
+        """
+        tool = make_tool(monkeypatch, keyword=1.0)
+        tool.stage_timeouts["keyword"] = 0.1
+
+        results = await tool.search(KnowledgeBaseSearchParams(query="x"))
+        assert [r.content for r in results] == ["a"]
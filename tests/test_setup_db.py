@@ -0,0 +1,246 @@
+"""
+Unit tests for the database schema tooling and search tuning parameters.
+"""
+
+import os
+import re
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.setup import SupabaseClient
+from database.setup_db import (
+    VECTOR_INDEX_NAME,
+    build_setup_sql,
+    candidates_function_sql,
+    rebuild_index_sql,
+    recommended_lists,
+    vector_index_sql,
+)
+
+
+class TestVectorIndexSql:
+    """
+    Test cases for the vector index SQL builders.
+    """
+
+    def test_hnsw_options(self):
+        """
+        Test that HNSW parameters end up in the index definition.
+        """
+        sql = vector_index_sql("hnsw", m=24, ef_construction=128)
+        assert "using hnsw (embedding vector_cosine_ops)" in sql
+        assert "with (m = 24, ef_construction = 128)" in sql
+
+    def test_ivfflat_lists(self):
+        """
+        Test that ivfflat indexes always get an explicit lists setting.
+        """
+        assert "with (lists = 250)" in vector_index_sql("ivfflat", lists=250)
+
+    def test_unknown_method(self):
+        """
+        Test that unsupported index methods are rejected.
+        """
+        with pytest.raises(ValueError):
+            vector_index_sql("btree")
+
+    def test_setup_sql_uses_configured_index(self):
+        """
+        Test that the setup script contains the chosen index.
+        """
+        sql = build_setup_sql(method="ivfflat", lists=42)
+        assert "with (lists = 42)" in sql
+        assert "__VECTOR_INDEX__" not in sql
+        assert "ef_search int default null" in sql
+
+    def test_rebuild_is_online(self):
+        """
+        Test that the rebuild builds concurrently and swaps by renaming.
+        """
+        statements = rebuild_index_sql("hnsw", m=16, ef_construction=64)
+        create = next(s for s in statements if s.startswith("create index"))
+        assert "concurrently" in create
+        assert statements.index(create) < statements.index(
+            f"alter index {VECTOR_INDEX_NAME}_new rename to {VECTOR_INDEX_NAME}"
+        )
+        assert statements[-1] == "analyze rag_pages"
+
+    def test_recommended_lists(self):
+        """
+        Test the pgvector sizing rule for ivfflat lists.
+        """
+        assert recommended_lists(0) == 10
+        assert recommended_lists(500_000) == 500
+        assert recommended_lists(4_000_000) == 2000
+
+
+class TestSearchTuning:
+    """
+    Test cases for per-query search parameters.
+    """
+
+    def test_ef_search_is_passed_to_rpc(self):
+        """
+        Test that ef_search/probes are only sent when set.
+        """
+        client = MagicMock()
+        client.rpc.return_value.execute.return_value.data = []
+        supabase = SupabaseClient(client=client)
+
+        supabase.search_documents([0.1, 0.2], match_count=3, ef_search=100)
+        params = client.rpc.call_args[0][1]
+        assert params["ef_search"] == 100
+        assert "probes" not in params
+
+
+class TestTypedMetadataColumns:
+    """
+    Test cases for the typed, indexed metadata columns.
+    """
+
+    def test_setup_sql_indexes_typed_columns(self):
+        """
+        Test that hot metadata keys get B-tree indexes instead of one GIN index.
+        """
+        sql = build_setup_sql()
+        assert "generated always as (metadata->>'source') stored" in sql
+        assert "on rag_pages (source);" in sql
+        assert "on documents (file_hash);" in sql
+        assert "on documents (lower(url) text_pattern_ops)" in sql
+        assert "drop index if exists idx_rag_pages_metadata;" in sql
+
+    def test_setup_sql_is_rerunnable(self):
+        """
+        Test that tables and policies are guarded, so the migrations after
+        them also run on an existing database.
+        """
+        sql = build_setup_sql()
+        assert "create table rag_pages" not in sql
+        assert "create table if not exists rag_pages (" in sql
+        for name, table in re.findall(r'create policy "([^"]+)"\n  on (\w+)', sql):
+            assert f'drop policy if exists "{name}" on {table};' in sql
+
+    def test_duplicate_checks_use_columns(self):
+        """
+        Test that duplicate checks filter on the typed columns.
+        """
+        from database.local_store import LocalSupabaseClient
+
+        supabase = SupabaseClient(client=LocalSupabaseClient())
+        supabase.store_document_chunk(
+            url="Notiz 50%_rabatt (2026-10-19 10:00)",
+            chunk_number=0,
+            content="x",
+            embedding=[0.1],
+            metadata={"file_hash": "abc", "source": "manuell"},
+        )
+
+        assert supabase.has_file_hash("abc")
+        assert not supabase.has_file_hash("abd")
+        assert supabase.has_url_prefix("Notiz 50%_rabatt")
+        assert supabase.has_url_prefix("notiz 50%_RABATT")
+        assert not supabase.has_url_prefix("Notiz 50%x")
+        assert supabase.has_url("Notiz 50%_rabatt (2026-10-19 10:00)")
+
+
+class TestVectorQuantization:
+    """
+    Test cases for halfvec storage and the binary-quantized index.
+    """
+
+    def test_halfvec_storage(self):
+        """
+        Test that halfvec storage changes the column, index and distance casts.
+        """
+        sql = build_setup_sql(storage="halfvec")
+        assert "embedding halfvec(1536)," in sql
+        assert "using hnsw (embedding halfvec_cosine_ops)" in sql
+        assert "query_embedding::halfvec(1536)" in sql
+        # The column is converted before the index for the new type is built
+        assert sql.index("alter column embedding type") < sql.index(
+            "halfvec_cosine_ops"
+        )
+        assert "__EMBEDDING_TYPE__" not in sql
+        assert "__CANDIDATES_FUNCTION__" not in sql
+
+    def test_binary_index_uses_hamming_distance(self):
+        """
+        Test that binary quantization indexes the bit expression.
+        """
+        sql = vector_index_sql("hnsw", quantization="binary")
+        assert "(binary_quantize(embedding)::bit(1536)) bit_hamming_ops" in sql
+
+    def test_binary_candidates_are_rescored(self):
+        """
+        Test that the binary pre-filter over-fetches and re-orders exactly.
+        """
+        sql = candidates_function_sql("vector", "binary", rescore_factor=5)
+        assert "limit candidate_count * 5" in sql
+        assert "<~> binary_quantize(query_embedding)" in sql
+        assert "order by c.embedding <=> query_embedding::vector(1536)" in sql
+        assert "volatile" in sql
+
+        exact = candidates_function_sql(
+            "vector", "none", iterative_scan="off", filter_overfetch=1
+        )
+        assert "binary_quantize" not in exact
+        assert "stable" in exact
+
+    def test_rebuild_replaces_candidates_function(self):
+        """
+        Test that a rebuild switches the search function to the new index.
+        """
+        statements = rebuild_index_sql(quantization="binary")
+        assert any("bit_hamming_ops" in s for s in statements)
+        assert any("match_rag_page_candidates" in s for s in statements)
+
+    def test_unknown_modes(self):
+        """
+        Test that unsupported storage and quantization modes are rejected.
+        """
+        with pytest.raises(ValueError):
+            build_setup_sql(storage="float8")
+        with pytest.raises(ValueError):
+            vector_index_sql(quantization="pq")
+
+
+class TestFilteredVectorSearch:
+    """
+    Test cases for vector searches with a selective metadata filter.
+    """
+
+    def test_iterative_scan_for_filtered_searches(self):
+        """
+        Test that only filtered searches enable iterative index scans.
+        """
+        sql = candidates_function_sql("vector", "none", iterative_scan="strict_order")
+        assert "set_config('hnsw.iterative_scan'" in sql
+        assert "then 'off' else 'strict_order' end" in sql
+        # ivfflat only supports relaxed_order
+        assert "set_config('ivfflat.iterative_scan'" in sql
+        assert "order by c.similarity desc" in sql
+        assert "volatile" in sql
+
+    def test_overfetch_without_iterative_scan(self):
+        """
+        Test that older pgvector versions raise ef_search for filtered searches.
+        """
+        sql = candidates_function_sql(
+            "vector", "none", iterative_scan="off", filter_overfetch=8
+        )
+        assert "iterative_scan" not in sql
+        assert "then 1 else 8 end" in sql
+
+    def test_setup_sql_scan_mode(self):
+        """
+        Test that the scan mode is configurable and validated.
+        """
+        assert "iterative_scan" not in build_setup_sql(iterative_scan="off")
+        assert "relaxed_order" in build_setup_sql()
+        with pytest.raises(ValueError):
+            build_setup_sql(iterative_scan="sometimes")
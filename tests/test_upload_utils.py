@@ -0,0 +1,50 @@
+"""
+Unit tests for hashing and streaming in-memory uploads.
+"""
+
+import hashlib
+import io
+import os
+import sys
+
+import httpx
+
+# Add parent directory to path to allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from document_processing.utils import hash_upload, upload_stream
+
+URL = "https://example.supabase.co"
+
+
+class TestUploadStream:
+    """
+    Test cases for upload_stream with the real storage client.
+    """
+
+    def test_storage_upload_leaves_upload_open(self):
+        """
+        Test that storage3 closing the reader after the upload neither closes
+        the wrapped upload nor fails the context manager.
+        """
+        from supabase import ClientOptions, create_client
+
+        bodies = []
+
+        def handler(request):
+            bodies.append(request.read())
+            return httpx.Response(200, json={"Key": "privatedocs/a.pdf"})
+
+        http = httpx.Client(transport=httpx.MockTransport(handler))
+        client = create_client(URL, "key", ClientOptions(httpx_client=http))
+        upload = io.BytesIO(b"%PDF-1.4 Datenblatt")
+
+        with upload_stream(upload) as stream:
+            client.storage.from_("privatedocs").upload(
+                "a.pdf", stream, {"content-type": "application/pdf"}
+            )
+
+        assert b"%PDF-1.4 Datenblatt" in bodies[0]
+        assert not upload.closed
+        assert upload.read() == b"%PDF-1.4 Datenblatt"
+        assert hash_upload(upload) == hashlib.sha256(upload.getvalue()).hexdigest()
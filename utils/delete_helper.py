@@ -1,50 +1,70 @@
-from supabase import Client
-from typing import Optional
-from supabase.lib.client_options import ClientOptions
-from supabase import create_client
-import os
-from dotenv import load_dotenv
+from typing import Any, Dict, List, Optional
 
-load_dotenv()
+from database.setup import SupabaseClient
+from utils.supabase_client import get_client
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+# Objects per storage.remove request
+STORAGE_REMOVE_BATCH = 1000
 
-client: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+def delete_documents(
+    urls: List[str], bucket: str = "privatedocs", client: Optional[Any] = None
+) -> Dict[str, int]:
+    """
+    Delete documents completely: chunks and catalog rows, then the files.
 
-def delete_file_and_records(filename: str, bucket: str = "privatedocs") -> str:
+    The database part is one ``delete_documents`` RPC for all urls; the files
+    (stored under their url) are removed in batches of STORAGE_REMOVE_BATCH.
+    If the RPC fails nothing is removed from storage.
+
+    Args:
+        urls: Document urls
+        bucket: Storage bucket of the files
+        client: Supabase client with the service role key (default: shared)
+
+    Returns:
+        ``{"documents": ..., "chunks": ..., "files": ...}`` deleted counts
+    """
+    client = client or get_client()
+    urls = list(dict.fromkeys(urls))
+    counts = SupabaseClient(client=client).delete_documents(urls)
+    files = 0
+    for start in range(0, len(urls), STORAGE_REMOVE_BATCH):
+        removed = client.storage.from_(bucket).remove(
+            urls[start : start + STORAGE_REMOVE_BATCH]
+        )
+        files += len(removed or [])
+    return {**counts, "files": files}
+
+
+def delete_file_and_records(
+    filename: str, bucket: str = "privatedocs", client: Optional[Any] = None
+) -> str:
     log = []
 
-    # 1. SQL-basierter Delete (per RPC)
     try:
-        print(f"[DEBUG] Sende SQL DELETE für URL = {filename}")
-        response = client.postgrest.rpc(
-            "execute_sql", {"query": f"DELETE FROM rag_pages WHERE url = '{filename}'"}
-        ).execute()
-        log.append(f"🧨 SQL-Delete für '{filename}' ausgeführt.")
-        db_deleted = True
+        counts = delete_documents([filename], bucket, client)
     except Exception as e:
-        log.append(f"❌ Fehler bei SQL-Delete: {e}")
-        db_deleted = False
+        return (
+            f"❌ Fehler beim Löschen von '{filename}': {e}\n🚫 Nichts wurde gelöscht."
+        )
 
-    # 2. Datei im Storage löschen
-    try:
-        client.storage.from_(bucket).remove([filename])
+    log.append(
+        f"🧹 {counts['chunks']} Datenbankeinträge und {counts['documents']} "
+        f"Dokument(e) für '{filename}' gelöscht."
+    )
+    if counts["files"]:
         log.append(f"🗑️ Storage-Datei gelöscht: {filename}")
-        storage_deleted = True
-    except Exception as e:
-        log.append(f"❌ Fehler beim Löschen im Storage: {e}")
-        storage_deleted = False
 
-    # Zusammenfassung
-    if storage_deleted and db_deleted:
+    # Zusammenfassung (Notizen haben keine Datei im Storage)
+    in_database = counts["chunks"] or counts["documents"]
+    if in_database and counts["files"]:
         log.append("✅ Vollständig gelöscht.")
-    elif storage_deleted:
-        log.append("⚠️ Nur aus dem Storage gelöscht.")
-    elif db_deleted:
-        log.append("⚠️ Nur aus der Datenbank gelöscht.")
+    elif in_database:
+        log.append("✅ Gelöscht (keine Datei im Storage vorhanden).")
+    elif counts["files"]:
+        log.append("⚠️ Nur aus dem Storage gelöscht, keine Datenbankeinträge gefunden.")
     else:
-        log.append("🚫 Nichts wurde gelöscht.")
+        log.append("⚠️ Weder Datenbankeinträge noch Datei gefunden.")
 
     return "\n".join(log)
@@ -0,0 +1,320 @@
+"""
+Lightweight in-process metrics for ingestion and retrieval.
+
+Counters and histograms are kept in a process-wide ``MetricsRegistry`` and can
+be exported in the Prometheus text format, either via ``render_prometheus()``
+or the small HTTP endpoint started with ``start_metrics_server()``.
+"""
+
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers fast PostgREST inserts up to OCR of large PDFs
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+    300.0,
+)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Dict[str, str]] = None) -> str:
+    items = list(key) + list((extra or {}).items())
+    if not items:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"'))
+        for k, v in items
+    )
+    return "{" + body + "}"
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed bucket bounds.
+
+    Args:
+        buckets: Upper bounds of the buckets in ascending order
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store for counters and histograms.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str) -> None:
+        """Set the HELP text shown in the Prometheus export."""
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        """
+        Increase a counter.
+
+        Args:
+            name: Metric name, e.g. ``rag_embedding_retries_total``
+            value: Amount to add
+            **labels: Prometheus labels
+        """
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        **labels: Any,
+    ) -> None:
+        """
+        Record a value in a histogram.
+
+        Args:
+            name: Metric name, e.g. ``rag_ingestion_stage_seconds``
+            value: Observed value
+            buckets: Bucket bounds, only used when the series is created
+            **labels: Prometheus labels
+        """
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram(buckets)
+            series[key].observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        """Observe the duration of the ``with`` block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def counter_value(self, name: str, **labels: Any) -> float:
+        """Current value of a counter (0 if never increased)."""
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def histogram_totals(self, name: str, **labels: Any) -> Tuple[int, float]:
+        """
+        Count and sum of a histogram series.
+
+        Returns:
+            Tuple of (number of observations, sum of observed values)
+        """
+        with self._lock:
+            hist = self._histograms.get(name, {}).get(_label_key(labels))
+            return (hist.count, hist.sum) if hist else (0, 0.0)
+
+    def reset(self) -> None:
+        """Drop all recorded values (mainly for tests and benchmarks)."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render_prometheus(self) -> str:
+        """
+        Export all metrics in the Prometheus text exposition format.
+
+        Returns:
+            Metrics text, one sample per line
+        """
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+
+            for name in sorted(self._histograms):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, hist in sorted(self._histograms[name].items()):
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        labels = _format_labels(key, {"le": repr(float(bound))})
+                        lines.append(f"{name}_bucket{labels} {count}")
+                    labels = _format_labels(key, {"le": "+Inf"})
+                    lines.append(f"{name}_bucket{labels} {hist.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {hist.sum}")
+                    lines.append(f"{name}_count{_format_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide default registry
+registry = MetricsRegistry()
+registry.describe(
+    "rag_ingestion_stage_seconds", "Duration of ingestion pipeline stages"
+)
+registry.describe("rag_ingestion_documents_total", "Processed documents by status")
+registry.describe("rag_ingestion_chunks_total", "Chunks stored by the pipeline")
+registry.describe("rag_embedding_requests_total", "Embedding API requests")
+registry.describe("rag_embedding_retries_total", "Retried embedding API requests")
+registry.describe("rag_embedding_tokens_total", "Tokens billed for embeddings")
+registry.describe("rag_db_request_seconds", "Duration of database requests")
+registry.describe("rag_db_bytes_sent_total", "JSON payload bytes sent to the DB")
+registry.describe("rag_db_rows_total", "Rows written to or read from the DB")
+registry.describe("rag_retrieval_stage_seconds", "Duration of retrieval stages")
+registry.describe("rag_retrieval_timeouts_total", "Retrieval stages that timed out")
+registry.describe(
+    "rag_local_index_search_seconds", "Duration of local vector index searches"
+)
+registry.describe(
+    "rag_local_index_rows_synced_total", "Rows appended to the local vector index"
+)
+registry.describe(
+    "rag_local_index_fallbacks_total", "Vector searches sent to the DB instead"
+)
+registry.describe(
+    "rag_retrieval_cache_total", "Retrieval cache lookups by result (hit, miss)"
+)
+registry.describe(
+    "rag_answer_cache_total", "Answer cache lookups by result (hit, miss, bypass)"
+)
+registry.describe(
+    "rag_answer_cache_similarity", "Question similarity of answer cache hits"
+)
+registry.describe(
+    "rag_http_requests_total", "HTTP requests sent over the shared Supabase pool"
+)
+
+
+class IngestionReport:
+    """
+    Collects stage timings and counts for a single document.
+
+    Every stage is also recorded in the shared registry, so the report is both
+    a per-document summary (stored in the chunk metadata) and a source of the
+    aggregated histograms.
+
+    Args:
+        metrics: Registry to record into, defaults to the process-wide one
+    """
+
+    def __init__(self, metrics: Optional[MetricsRegistry] = None):
+        self.metrics = metrics or registry
+        self.stages: Dict[str, float] = {}
+        self.counts: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a pipeline stage, e.g. ``extract``, ``embed`` or ``store``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.stages[name] = self.stages.get(name, 0.0) + duration
+            self.metrics.observe("rag_ingestion_stage_seconds", duration, stage=name)
+
+    def add(self, key: str, value: float) -> None:
+        """Add to a per-document count such as ``chunks`` or ``bytes_sent``."""
+        self.counts[key] = self.counts.get(key, 0) + value
+
+    def finish(self, success: bool) -> None:
+        """Record the document outcome in the shared registry."""
+        status = "ok" if success else "failed"
+        self.metrics.inc("rag_ingestion_documents_total", status=status)
+        if success:
+            self.metrics.inc("rag_ingestion_chunks_total", self.counts.get("chunks", 0))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Summary suitable for JSON metadata.
+
+        Returns:
+            Dict with ``<stage>_seconds`` entries and all counts
+        """
+        summary: Dict[str, Any] = {
+            f"{name}_seconds": round(value, 4) for name, value in self.stages.items()
+        }
+        summary.update(self.counts)
+        return summary
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    metrics: MetricsRegistry = registry
+
+    def do_GET(self):  # noqa: N802 (http.server naming)
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.metrics.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("metrics endpoint: " + format, *args)
+
+
+def start_metrics_server(
+    port: int, host: str = "0.0.0.0", metrics: Optional[MetricsRegistry] = None
+) -> ThreadingHTTPServer:
+    """
+    Serve ``/metrics`` in a daemon thread for Prometheus scraping.
+
+    Args:
+        port: TCP port to listen on
+        host: Interface to bind
+        metrics: Registry to export, defaults to the process-wide one
+
+    Returns:
+        The running HTTP server (call ``shutdown()`` to stop it)
+    """
+    handler = type(
+        "MetricsHandler", (_MetricsHandler,), {"metrics": metrics or registry}
+    )
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Metrics endpoint listening on {host}:{port}/metrics")
+    return server
@@ -1,10 +1,48 @@
-from supabase import create_client, Client
-from dotenv import load_dotenv
+"""
+Shared Supabase client with the service role key, created on first use.
+
+The client comes from ``database.client_registry``, so it shares the
+process-wide HTTP connection pool with all other Supabase clients.
+
+Importing this module needs no credentials, so tests and benchmarks can
+inject an offline client (``database.local_store.LocalSupabaseClient``)
+with ``set_client`` before any code uses it.
+"""
+
 import os
+from typing import Any
+
+from dotenv import load_dotenv
 
 load_dotenv()
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+_client = None
+
+
+def get_client() -> Any:
+    """The shared client; created from SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY."""
+    global _client
+    if _client is None:
+        from database.client_registry import get_client as shared_client
+
+        url = os.getenv("SUPABASE_URL")
+        key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+        if not url or not key:
+            raise ValueError(
+                "SUPABASE_URL und SUPABASE_SERVICE_ROLE_KEY müssen gesetzt sein"
+            )
+        _client = shared_client(url, key)
+    return _client
+
+
+def set_client(client: Any) -> None:
+    """Replace the shared client (None: create it again on next use)."""
+    global _client
+    _client = client
+
 
-client: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+def __getattr__(name: str) -> Any:
+    # Reason: keeps ``from utils.supabase_client import client`` working
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")